@@ -2,10 +2,12 @@
 AI 模組
 
 提供 Gemini API 整合與報告生成功能
+
+匯出名稱延遲載入：google.generativeai 只在實際使用 GeminiClient 時才 import
+（ai.job_queue、ai.report_cache 等子模組可單獨載入，不拖慢 API 伺服器啟動）
 """
 
-from .gemini_client import GeminiClient
-from .report_generator import DailyReportGenerator, DecisionTemplateGenerator
+from utils.lazy_import import lazy_exports
 
 __all__ = [
     'GeminiClient',
@@ -13,4 +15,10 @@ __all__ = [
     'DecisionTemplateGenerator'
 ]
 
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'GeminiClient': '.gemini_client',
+    'DailyReportGenerator': '.report_generator',
+    'DecisionTemplateGenerator': '.report_generator',
+})
+
 __version__ = '1.0.0'
@@ -3,17 +3,39 @@ Gemini API 客戶端
 
 提供與 Google Gemini 的 AI 整合功能
 """
+import asyncio
+import hashlib
+import json
+import os
 import sys
+import threading
+from datetime import timedelta
 from pathlib import Path
-import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 import time
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from config.settings import API_KEYS
+from ai.rate_limiter import estimate_tokens, get_rate_limiter
+from ai.streaming import GenerationStream
+from config.settings import AI_CONFIG, API_KEYS
+from utils.api_telemetry import track_call
+from utils.lazy_import import lazy_module
 from loguru import logger
 
+# 約 2 秒的 import（含 protobuf / grpc），建立 GeminiClient 時才載入
+genai = lazy_module('google.generativeai')
+
+
+def parse_json_response(text: str) -> Dict:
+    """解析 JSON 回應（容許 ```json 區塊包裹）"""
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        text = text.rsplit('```', 1)[0]
+    return json.loads(text)
+
 
 class GeminiClient:
     """Gemini AI 客戶端"""
@@ -25,7 +47,7 @@ class GeminiClient:
         Args:
             api_key: Gemini API Key（若不提供則從設定檔讀取）
         """
-        self.api_key = api_key or API_KEYS.get('GEMINI_API_KEY')
+        self.api_key = api_key or API_KEYS.get('gemini') or os.getenv('GOOGLE_AI_API_KEY')
         
         if not self.api_key:
             raise ValueError("未設定 GEMINI_API_KEY")
@@ -34,16 +56,216 @@ class GeminiClient:
         genai.configure(api_key=self.api_key)
         
         # 使用 Gemini 2.5 Pro（規格書指定）
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.model_name = 'gemini-2.0-flash-exp'
+        self.model = genai.GenerativeModel(self.model_name)
+        
+        # 同一程序內所有客戶端共用 RPM/TPM 配額
+        self.limiter = get_rate_limiter()
+        
+        # system prefix → (模型, 到期時間)
+        self._prefixed_models = {}
+        self._prefix_lock = threading.Lock()
         
         logger.info("Gemini 客戶端初始化成功")
     
+    def _model_for(self, system_instruction: Optional[str]):
+        """
+        取得帶有 system prefix 的模型（同一前綴跨請求共用）
+        
+        前綴夠長時建立顯式 context cache（快取部分以折扣計費、不重複上傳）；
+        否則以 system_instruction 傳入，共同前綴由 Gemini 隱式快取
+        """
+        if not system_instruction:
+            return self.model
+        
+        key = hashlib.sha256(system_instruction.encode('utf-8')).hexdigest()
+        with self._prefix_lock:
+            cached = self._prefixed_models.get(key)
+            if cached and (cached[1] is None or cached[1] > time.monotonic()):
+                return cached[0]
+            
+            model, expires = None, None
+            if estimate_tokens(system_instruction) >= AI_CONFIG['context_cache_min_tokens']:
+                ttl_minutes = AI_CONFIG['context_cache_ttl_minutes']
+                try:
+                    from google.generativeai import caching
+                    content = caching.CachedContent.create(
+                        model=f'models/{self.model_name}',
+                        system_instruction=system_instruction,
+                        ttl=timedelta(minutes=ttl_minutes)
+                    )
+                    model = genai.GenerativeModel.from_cached_content(cached_content=content)
+                    # 提前一分鐘重建，避免使用到剛過期的快取
+                    expires = time.monotonic() + (ttl_minutes - 1) * 60
+                except Exception as e:
+                    logger.warning(f"建立 context cache 失敗，改用 system_instruction：{e}")
+            
+            if model is None:
+                model = genai.GenerativeModel(self.model_name, system_instruction=system_instruction)
+            
+            self._prefixed_models[key] = (model, expires)
+            return model
+    
+    def _generation_config(
+        self,
+        temperature: float,
+        max_tokens: int,
+        response_schema: Optional[Dict] = None
+    ):
+        if response_schema:
+            return genai.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+                response_mime_type='application/json',
+                response_schema=response_schema
+            )
+        return genai.GenerationConfig(temperature=temperature, max_output_tokens=max_tokens)
+    
+    def generate_with_usage(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        system_instruction: Optional[str] = None,
+        response_schema: Optional[Dict] = None
+    ) -> Dict:
+        """
+        單次生成（不重試），回傳內容與 token 用量
+        
+        Args:
+            prompt: 提示詞
+            temperature: 溫度參數
+            max_tokens: 最大輸出 token 數
+            system_instruction: 跨請求共用的 system prefix
+            response_schema: 結構化輸出的 JSON schema（回傳 JSON 字串）
+        
+        Returns:
+            {'content', 'prompt_tokens', 'completion_tokens'}
+        """
+        estimated = estimate_tokens(prompt) + estimate_tokens(system_instruction or '')
+        self.limiter.wait(estimated)
+        
+        with track_call('gemini'):
+            response = self._model_for(system_instruction).generate_content(
+                prompt,
+                generation_config=self._generation_config(temperature, max_tokens, response_schema)
+            )
+        return self._usage_result(response, estimated)
+    
+    async def generate_with_usage_async(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        system_instruction: Optional[str] = None,
+        response_schema: Optional[Dict] = None
+    ) -> Dict:
+        """generate_with_usage 的協程版本（等待配額與 API 回應時不佔用事件迴圈）"""
+        estimated = estimate_tokens(prompt) + estimate_tokens(system_instruction or '')
+        await self.limiter.wait_async(estimated)
+        
+        with track_call('gemini'):
+            response = await self._model_for(system_instruction).generate_content_async(
+                prompt,
+                generation_config=self._generation_config(temperature, max_tokens, response_schema)
+            )
+        return self._usage_result(response, estimated)
+    
+    def _usage_result(self, response, estimated: int) -> Dict:
+        """取出內容與 token 用量，並以實際用量修正限流器預扣"""
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None)
+        completion_tokens = getattr(usage, 'candidates_token_count', None)
+        if prompt_tokens is not None:
+            self.limiter.record(estimated, prompt_tokens + (completion_tokens or 0))
+        
+        return {
+            'content': response.text or "",
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens
+        }
+    
+    def generate_structured(
+        self,
+        prompt: str,
+        response_schema: Dict,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.6,
+        max_tokens: int = 8000
+    ) -> Dict:
+        """
+        結構化輸出：單次呼叫取得符合 schema 的 JSON
+        
+        Returns:
+            {'data': 解析後的字典, 'content', 'prompt_tokens', 'completion_tokens'}
+        
+        Raises:
+            ValueError: 回應無法解析為 JSON
+        """
+        result = self.generate_with_usage(
+            prompt, temperature, max_tokens,
+            system_instruction=system_instruction,
+            response_schema=response_schema
+        )
+        try:
+            result['data'] = parse_json_response(result['content'])
+        except json.JSONDecodeError as e:
+            raise ValueError(f"結構化輸出解析失敗：{e}")
+        return result
+    
+    def generate_stream(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        system_instruction: Optional[str] = None
+    ) -> GenerationStream:
+        """
+        串流生成：邊生成邊回傳分段文字（不重試，首段送出後無法重來）
+        
+        Args:
+            prompt: 提示詞
+            temperature: 溫度參數
+            max_tokens: 最大輸出 token 數
+            system_instruction: 跨請求共用的 system prefix
+        
+        Returns:
+            GenerationStream，迭代取得分段；結束後可讀 text 與 token 用量
+        """
+        estimated = estimate_tokens(prompt) + estimate_tokens(system_instruction or '')
+        self.limiter.wait(estimated)
+        
+        response = self._model_for(system_instruction).generate_content(
+            prompt,
+            generation_config=self._generation_config(temperature, max_tokens),
+            stream=True
+        )
+        
+        def chunks():
+            for chunk in response:
+                # 僅含結束原因的分段沒有 parts，讀取 text 會拋出 ValueError
+                try:
+                    yield chunk.text
+                except ValueError:
+                    continue
+        
+        def usage():
+            metadata = getattr(response, 'usage_metadata', None)
+            prompt_tokens = getattr(metadata, 'prompt_token_count', None)
+            completion_tokens = getattr(metadata, 'candidates_token_count', None)
+            if prompt_tokens is not None:
+                self.limiter.record(estimated, prompt_tokens + (completion_tokens or 0))
+            return prompt_tokens, completion_tokens
+        
+        return GenerationStream(chunks(), usage)
+    
     def generate_text(
         self,
         prompt: str,
         temperature: float = 0.7,
         max_tokens: int = 8000,
-        retry_count: int = 3
+        retry_count: int = 3,
+        system_instruction: Optional[str] = None
     ) -> str:
         """
         生成文本
@@ -53,23 +275,20 @@ class GeminiClient:
             temperature: 溫度參數（0-1，越高越創意）
             max_tokens: 最大 token 數
             retry_count: 重試次數
+            system_instruction: 跨請求共用的 system prefix
         
         Returns:
             生成的文本
         """
         for attempt in range(retry_count):
             try:
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=genai.GenerationConfig(
-                        temperature=temperature,
-                        max_output_tokens=max_tokens
-                    )
-                )
+                content = self.generate_with_usage(
+                    prompt, temperature, max_tokens, system_instruction=system_instruction
+                )['content']
                 
-                if response.text:
+                if content:
                     logger.success("Gemini 生成成功")
-                    return response.text
+                    return content
                 else:
                     logger.warning("Gemini 返回空內容")
                     return ""
@@ -88,6 +307,31 @@ class GeminiClient:
         
         return ""
     
+    async def generate_text_async(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        retry_count: int = 3,
+        system_instruction: Optional[str] = None
+    ) -> str:
+        """generate_text 的協程版本（重試退避以 asyncio.sleep 等待）"""
+        for attempt in range(retry_count):
+            try:
+                result = await self.generate_with_usage_async(
+                    prompt, temperature, max_tokens, system_instruction=system_instruction
+                )
+                return result['content']
+            except Exception as e:
+                logger.error(f"Gemini API 錯誤（嘗試 {attempt+1}/{retry_count}）: {e}")
+                if attempt < retry_count - 1:
+                    await asyncio.sleep(2 ** attempt)
+                else:
+                    logger.error("Gemini API 請求失敗，已達最大重試次數")
+                    raise
+        
+        return ""
+    
     def generate_with_context(
         self,
         prompt: str,
@@ -153,31 +397,25 @@ class GeminiClient:
     def batch_generate(
         self,
         prompts: List[str],
-        delay: float = 1.0
+        concurrency: Optional[int] = None
     ) -> List[str]:
         """
-        批次生成（避免超過 API 限流）
+        批次並行生成（由共用限流器控制 RPM/TPM）
+        
+        大量或需要可續跑的批次請改用 ai.job_queue.AIJobQueue
         
         Args:
             prompts: 提示詞列表
-            delay: 每次請求間隔（秒）
+            concurrency: 並行數（預設 AI_CONFIG['job_concurrency']）
         
         Returns:
-            生成結果列表
+            生成結果列表（順序與 prompts 相同）
         """
-        results = []
-        
-        for i, prompt in enumerate(prompts):
-            logger.info(f"批次生成 {i+1}/{len(prompts)}")
-            
-            result = self.generate_text(prompt)
-            results.append(result)
-            
-            # 避免超過限流
-            if i < len(prompts) - 1:
-                time.sleep(delay)
+        workers = concurrency or AI_CONFIG['job_concurrency']
+        logger.info(f"批次生成 {len(prompts)} 筆（並行 {workers}）")
         
-        return results
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.generate_text, prompts))
 
 
 # 測試
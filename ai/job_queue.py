@@ -0,0 +1,339 @@
+"""
+AI 任務佇列
+
+以 PostgreSQL (ai_jobs) 保存待生成的報告，N 個工作執行緒並行呼叫模型：
+- 模型客戶端共用 RPM/TPM token bucket 限流（ai.rate_limiter）
+- 失敗以指數退避重排，超過 max_attempts 標記 failed
+- 程序中斷後重新啟動即可續跑（逾時的 running 任務會被重新排入）
+- 結果經 ReportCache 寫入 ai_reports，含 prompt_tokens / completion_tokens
+"""
+import os
+import random
+import socket
+import sys
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+from psycopg2.extras import Json, RealDictCursor
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai.report_cache import ReportCache, canonical_inputs, compute_fingerprint
+from config.settings import AI_CONFIG, DATABASE_CONFIG
+from loguru import logger
+
+# 重試退避：base * 2^(attempts-1)，上限 MAX_BACKOFF 秒
+BASE_BACKOFF = 30
+MAX_BACKOFF = 900
+
+_JOB_COLUMNS = """
+    id, batch_id, report_type, report_title, security_type, security_code,
+    status, attempts, max_attempts, run_after, last_error, worker_id,
+    report_id, prompt_tokens, completion_tokens, created_at, started_at, finished_at
+"""
+
+
+def create_ai_client():
+    """依 AI_CONFIG['model_provider'] 建立模型客戶端"""
+    if AI_CONFIG['model_provider'] == 'stub':
+        from ai.stub_client import StubGeminiClient
+        return StubGeminiClient()
+    from ai.gemini_client import GeminiClient
+    return GeminiClient()
+
+
+def backoff_seconds(attempts: int) -> float:
+    """第 attempts 次失敗後的等待秒數（含 ±20% 抖動）"""
+    delay = min(BASE_BACKOFF * 2 ** max(attempts - 1, 0), MAX_BACKOFF)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class AIJobQueue:
+    """PostgreSQL 持久化的 AI 報告生成佇列"""
+
+    def __init__(
+        self,
+        client=None,
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        connect: Optional[Callable] = None
+    ):
+        """
+        Args:
+            client: 模型客戶端（需提供 model_name 與 generate_with_usage）
+            concurrency: 並行工作執行緒數
+            max_attempts: 每個任務的最大嘗試次數
+            connect: 建立資料庫連線的函式（每個工作執行緒各一條）
+        """
+        self.client = client or create_ai_client()
+        self.concurrency = concurrency or AI_CONFIG['job_concurrency']
+        self.max_attempts = max_attempts or AI_CONFIG['job_max_attempts']
+        self.connect = connect or (lambda: psycopg2.connect(**DATABASE_CONFIG))
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stats_lock = threading.Lock()
+
+    # ========== 排入任務 ==========
+
+    def enqueue(
+        self,
+        report_type: str,
+        prompt: str,
+        inputs: Dict[str, Any],
+        title: str,
+        template_version: str,
+        security_type: Optional[str] = None,
+        security_code: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+        batch_id: Optional[str] = None,
+        priority: int = 100,
+        conn=None
+    ) -> Optional[int]:
+        """
+        排入一個生成任務
+
+        已有有效快取報告、或相同輸入已在佇列中時不重複排入
+
+        Returns:
+            任務 ID；略過時回傳 None
+        """
+        own_conn = conn is None
+        conn = conn or self.connect()
+        fingerprint = compute_fingerprint(report_type, inputs, template_version, self.client.model_name)
+        try:
+            if ReportCache(conn).lookup(fingerprint):
+                return None
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO ai_jobs (
+                        batch_id, report_type, report_title, security_type, security_code,
+                        prompt, inputs, generation_config, template_version, model_version,
+                        input_fingerprint, priority, max_attempts
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (input_fingerprint) WHERE status IN ('pending', 'running') DO NOTHING
+                    RETURNING id
+                """, (
+                    batch_id, report_type, title, security_type, security_code,
+                    prompt, Json(canonical_inputs(inputs)), Json(generation_config or {}),
+                    template_version, self.client.model_name, fingerprint, priority, self.max_attempts
+                ))
+                row = cursor.fetchone()
+            conn.commit()
+            return row[0] if row else None
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if own_conn:
+                conn.close()
+
+    # ========== 執行 ==========
+
+    def requeue_stale(self, conn, stale_minutes: Optional[int] = None) -> int:
+        """
+        將逾時的 running 任務（工作程序中斷）重新排入
+
+        Returns:
+            重新排入的任務數
+        """
+        minutes = stale_minutes or AI_CONFIG['job_stale_minutes']
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE ai_jobs
+                SET status = 'pending', worker_id = NULL, run_after = NOW()
+                WHERE status = 'running' AND started_at < NOW() - make_interval(mins => %s)
+            """, (minutes,))
+            requeued = cursor.rowcount
+        conn.commit()
+        if requeued:
+            logger.warning(f"重新排入 {requeued} 個中斷的 AI 任務")
+        return requeued
+
+    def claim(self, conn, worker_id: str, batch_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        領取一個可執行的任務（FOR UPDATE SKIP LOCKED，多程序安全）
+
+        Returns:
+            任務字典；沒有可執行任務時回傳 None
+        """
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                UPDATE ai_jobs
+                SET status = 'running', attempts = attempts + 1,
+                    started_at = NOW(), worker_id = %s
+                WHERE id = (
+                    SELECT id FROM ai_jobs
+                    WHERE status = 'pending' AND run_after <= NOW()
+                      AND (%s::text IS NULL OR batch_id = %s)
+                    ORDER BY priority, id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING id, report_type, report_title, security_type, security_code,
+                          prompt, inputs, generation_config, template_version,
+                          input_fingerprint, attempts, max_attempts
+            """, (worker_id, batch_id, batch_id))
+            job = cursor.fetchone()
+        conn.commit()
+        return dict(job) if job else None
+
+    def process(self, conn, job: Dict[str, Any]) -> bool:
+        """
+        執行單一任務並記錄結果
+
+        Returns:
+            是否成功
+        """
+        cache = ReportCache(conn)
+        try:
+            report = cache.lookup(job['input_fingerprint'])
+            if report is None:
+                result = self.client.generate_with_usage(job['prompt'], **(job['generation_config'] or {}))
+                if not result['content']:
+                    raise ValueError("模型回傳空內容")
+                report = cache.store(
+                    job['input_fingerprint'], job['report_type'], job['report_title'],
+                    result['content'], job['inputs'] or {}, self.client.model_name,
+                    job['template_version'], job['security_type'], job['security_code'],
+                    result.get('prompt_tokens'), result.get('completion_tokens')
+                )
+        except Exception as e:
+            conn.rollback()
+            self._record_failure(conn, job, e)
+            return False
+
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE ai_jobs
+                SET status = 'done', finished_at = NOW(), last_error = NULL,
+                    report_id = %s, prompt_tokens = %s, completion_tokens = %s
+                WHERE id = %s
+            """, (report['id'], report.get('prompt_tokens'), report.get('completion_tokens'), job['id']))
+        conn.commit()
+        logger.success(f"AI 任務完成 #{job['id']} {job['report_type']} {job['security_code'] or ''}")
+        return True
+
+    def _record_failure(self, conn, job: Dict[str, Any], error: Exception):
+        final = job['attempts'] >= job['max_attempts']
+        delay = backoff_seconds(job['attempts'])
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE ai_jobs
+                SET status = %s, last_error = %s, worker_id = NULL,
+                    run_after = NOW() + make_interval(secs => %s),
+                    finished_at = CASE WHEN %s THEN NOW() END
+                WHERE id = %s
+            """, ('failed' if final else 'pending', str(error)[:2000], delay, final, job['id']))
+        conn.commit()
+        if final:
+            logger.error(f"AI 任務失敗 #{job['id']}（已嘗試 {job['attempts']} 次）: {error}")
+        else:
+            logger.warning(f"AI 任務 #{job['id']} 第 {job['attempts']} 次失敗，{delay:.0f} 秒後重試: {error}")
+
+    def _worker(self, index: int, batch_id: Optional[str], stop: threading.Event, stats: Dict[str, int]):
+        worker_id = f"{self.worker_prefix}:{index}"
+        conn = self.connect()
+        try:
+            while not stop.is_set():
+                job = self.claim(conn, worker_id, batch_id)
+                if job is None:
+                    break
+                key = 'done' if self.process(conn, job) else 'failed'
+                with self._stats_lock:
+                    stats[key] += 1
+        finally:
+            conn.close()
+
+    def run(self, batch_id: Optional[str] = None, stop: Optional[threading.Event] = None) -> Dict[str, int]:
+        """
+        以 concurrency 個工作執行緒處理佇列，直到沒有可立即執行的任務
+
+        退避中的任務留待下次執行（排程重複呼叫 run 即可續跑）
+
+        Args:
+            batch_id: 只處理指定批次
+            stop: 外部停止訊號
+
+        Returns:
+            {'done': 成功數, 'failed': 失敗（含待重試）數}
+        """
+        stop = stop or threading.Event()
+        conn = self.connect()
+        try:
+            self.requeue_stale(conn)
+        finally:
+            conn.close()
+
+        stats = {'done': 0, 'failed': 0}
+        threads = [
+            threading.Thread(target=self._worker, args=(i, batch_id, stop, stats), daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        logger.info(f"AI 佇列執行完畢：成功 {stats['done']}，失敗 {stats['failed']}")
+        return stats
+
+
+def new_batch_id(prefix: str = 'batch') -> str:
+    """產生批次 ID"""
+    return f"{prefix}-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+
+def get_queue_status(conn, batch_id: Optional[str] = None, recent_failures: int = 10) -> Dict[str, Any]:
+    """
+    佇列狀態摘要
+
+    Args:
+        conn: 資料庫連線
+        batch_id: 只統計指定批次
+        recent_failures: 回傳最近的失敗任務數
+
+    Returns:
+        {'counts': {status: 數量}, 'prompt_tokens', 'completion_tokens', 'failures': [...]}
+    """
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("""
+            SELECT status, COUNT(*) AS count,
+                   COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+                   COALESCE(SUM(completion_tokens), 0) AS completion_tokens
+            FROM ai_jobs
+            WHERE %s::text IS NULL OR batch_id = %s
+            GROUP BY status
+        """, (batch_id, batch_id))
+        rows = cursor.fetchall()
+
+        cursor.execute(f"""
+            SELECT {_JOB_COLUMNS}
+            FROM ai_jobs
+            WHERE last_error IS NOT NULL AND (%s::text IS NULL OR batch_id = %s)
+            ORDER BY id DESC
+            LIMIT %s
+        """, (batch_id, batch_id, recent_failures))
+        failures = cursor.fetchall()
+
+    counts = {status: 0 for status in ('pending', 'running', 'done', 'failed')}
+    counts.update({row['status']: row['count'] for row in rows})
+    return {
+        'batch_id': batch_id,
+        'counts': counts,
+        'total': sum(counts.values()),
+        'prompt_tokens': int(sum(row['prompt_tokens'] for row in rows)),
+        'completion_tokens': int(sum(row['completion_tokens'] for row in rows)),
+        'failures': [dict(row) for row in failures],
+    }
+
+
+def get_job(conn, job_id: int) -> Optional[Dict[str, Any]]:
+    """讀取單一任務（不含提示詞全文）"""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(f"SELECT {_JOB_COLUMNS} FROM ai_jobs WHERE id = %s", (job_id,))
+        row = cursor.fetchone()
+    return dict(row) if row else None
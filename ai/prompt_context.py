@@ -0,0 +1,118 @@
+"""
+精簡提示詞上下文
+
+把各來源資料整理成一段精簡的結構化文字（每個區塊一行 key=value），
+送出前估算 token 數，超過預算時依優先序捨棄或截斷區塊。
+固定的指示與報告格式放在 system prefix，跨標的重複使用（見 GeminiClient 的前綴快取），
+每次請求只送出這段精簡上下文。
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from ai.rate_limiter import estimate_tokens
+
+
+def format_value(value: Any) -> Optional[str]:
+    """數值格式化：去除多餘小數位，大數加千分位；None / NaN 回傳 None（略過）"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'Y' if value else 'N'
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10] if isinstance(value, datetime) else value.isoformat()
+    if isinstance(value, (int, float, Decimal)) or hasattr(value, 'item'):
+        number = float(value)
+        if number != number:  # NaN
+            return None
+        if abs(number) >= 1000:
+            return f"{number:,.0f}"
+        return f"{number:.2f}".rstrip('0').rstrip('.')
+    text = str(value).strip()
+    return text or None
+
+
+def flatten(values: Dict[str, Any], prefix: str = '') -> List[Tuple[str, str]]:
+    """攤平巢狀字典為 (key, 格式化值)，略過空值"""
+    items = []
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            items.extend(flatten(value, f"{name}."))
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ','.join(filter(None, (format_value(v) for v in value)))
+        formatted = format_value(value)
+        if formatted is not None:
+            items.append((name, formatted))
+    return items
+
+
+class PromptContext:
+    """依 token 預算組裝的精簡上下文"""
+
+    def __init__(self, budget_tokens: int, counter: Callable[[str], int] = estimate_tokens):
+        """
+        Args:
+            budget_tokens: 上下文 token 上限
+            counter: token 計數函式（預設本地估算，不額外呼叫 API）
+        """
+        self.budget_tokens = budget_tokens
+        self.counter = counter
+        self.sections: List[Tuple[int, int, str, List[Tuple[str, str]]]] = []
+
+    def add(self, title: str, values: Dict[str, Any], priority: int = 50) -> 'PromptContext':
+        """
+        加入區塊
+
+        Args:
+            title: 區塊標題
+            values: 資料（可巢狀）
+            priority: 優先序，數字越小越重要（超過預算時最後捨棄）
+        """
+        items = flatten(values or {})
+        if items:
+            self.sections.append((priority, len(self.sections), title, items))
+        return self
+
+    @staticmethod
+    def _render(sections) -> str:
+        ordered = sorted(sections, key=lambda section: section[1])
+        return '\n'.join(
+            f"[{title}] " + ' | '.join(f"{key}={value}" for key, value in items)
+            for _, _, title, items in ordered
+        )
+
+    def build(self) -> Tuple[str, int]:
+        """
+        產生上下文文字
+
+        超過預算時先捨棄優先序最低的區塊；剩下最重要的區塊仍超過時，從尾端截斷欄位
+
+        Returns:
+            (上下文文字, 估算 token 數)
+        """
+        sections = list(self.sections)
+        text = self._render(sections)
+        tokens = self.counter(text)
+        dropped = []
+
+        while tokens > self.budget_tokens and len(sections) > 1:
+            least = max(sections, key=lambda section: (section[0], section[1]))
+            sections.remove(least)
+            dropped.append(least[2])
+            text = self._render(sections)
+            tokens = self.counter(text)
+
+        if tokens > self.budget_tokens and sections:
+            priority, order, title, items = sections[0]
+            while tokens > self.budget_tokens and len(items) > 1:
+                items = items[:-1]
+                text = self._render([(priority, order, title, items)])
+                tokens = self.counter(text)
+
+        if dropped:
+            logger.info(f"上下文超過 {self.budget_tokens} tokens，略過區塊：{', '.join(dropped)}")
+        return text, tokens
@@ -0,0 +1,128 @@
+"""
+Gemini 配額限流器
+
+以兩個 token bucket 同時控制每分鐘請求數 (RPM) 與每分鐘 token 數 (TPM)：
+- 呼叫前依提示詞估算 token 預扣
+- 呼叫後依 usage_metadata 實際用量補扣差額（可為負，後續請求會多等）
+多執行緒（或同一事件迴圈內的協程，使用 wait_async）共用同一個限流器即可讓 N 個並行呼叫整體不超過配額。
+"""
+import asyncio
+import math
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import AI_CONFIG
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗估 token 數（呼叫前預扣用）
+
+    中日韓文字約 1 字 1 token，其餘約 4 字元 1 token
+    """
+    if not text:
+        return 0
+    cjk = sum(1 for ch in text if '\u2e80' <= ch <= '\u9fff' or '\uf900' <= ch <= '\uffef')
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+class TokenBucket:
+    """執行緒安全的 token bucket"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate_per_minute: 每分鐘補充量
+            capacity: 桶容量（預設等於每分鐘補充量）
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        預扣 amount，回傳需要等待的秒數（0 表示可立即執行）
+
+        超過容量的單次請求以容量計，避免永遠等不到
+        """
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill()
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def adjust(self, amount: float):
+        """補扣（正數）或退還（負數）用量"""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class TokenRateLimiter:
+    """RPM + TPM 限流器"""
+
+    def __init__(self, rpm: int, tpm: int):
+        """
+        Args:
+            rpm: 每分鐘請求上限
+            tpm: 每分鐘 token 上限（輸入 + 輸出）
+        """
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def wait(self, estimated_tokens: int) -> float:
+        """
+        等待至可以送出請求
+
+        Args:
+            estimated_tokens: 預估 token 數
+
+        Returns:
+            實際等待秒數
+        """
+        delay = self.reserve(estimated_tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, estimated_tokens: int) -> float:
+        """wait 的協程版本（等待期間不佔用事件迴圈）"""
+        delay = self.reserve(estimated_tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def reserve(self, estimated_tokens: int) -> float:
+        """預扣一次請求與預估 token，回傳需要等待的秒數"""
+        return max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+
+    def record(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """以實際用量修正預扣"""
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+def get_rate_limiter() -> TokenRateLimiter:
+    """取得程序內共用的 Gemini 限流器（依 AI_CONFIG 的 rpm / tpm）"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = TokenRateLimiter(AI_CONFIG['rpm'], AI_CONFIG['tpm'])
+        return _shared_limiter
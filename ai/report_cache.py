@@ -0,0 +1,360 @@
+"""
+AI 報告快取
+
+以輸入資料指紋（因子分數、價格日期、TDCC 日期、模板版本、模型）定址 ai_reports：
+- 指紋相同且未過期、未標記過時 → 直接回傳已儲存的報告，不呼叫 Gemini
+- 相同指紋的並行請求只生成一次（程序內鎖 + PostgreSQL advisory lock）
+- 底層資料更新時由 DatabaseWriter 呼叫 data_loader.report_invalidation.mark_reports_outdated() 標記過時
+"""
+import asyncio
+import hashlib
+import json
+import math
+import sys
+import threading
+import time
+import weakref
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+import psycopg2
+from psycopg2.extras import Json, RealDictCursor
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import AI_CONFIG, DATABASE_CONFIG
+from data_loader.report_invalidation import MARKET_REPORT_TYPES, STOCK_REPORT_TYPES, mark_reports_outdated  # noqa: F401
+from utils.metrics import record_cache
+from loguru import logger
+
+_REPORT_COLUMNS = """
+    id, report_type, report_title, report_content, market_data, generated_by,
+    security_type, security_code, analysis_date, valid_until, input_fingerprint,
+    template_version, prompt_tokens, completion_tokens, created_at
+"""
+
+
+def canonical_inputs(value: Any) -> Any:
+    """轉為可穩定序列化的型別（日期、Decimal、numpy 數值）"""
+    if isinstance(value, dict):
+        return {str(key): canonical_inputs(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical_inputs(val) for val in value]
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, float)):
+        value = float(value)
+        return round(value, 6) if math.isfinite(value) else None
+    if hasattr(value, 'item'):  # numpy 純量
+        return canonical_inputs(value.item())
+    return value
+
+
+def compute_fingerprint(
+    report_type: str,
+    inputs: Dict[str, Any],
+    template_version: str,
+    model: str
+) -> str:
+    """
+    計算報告輸入指紋
+
+    Args:
+        report_type: 報告類型
+        inputs: 提示詞輸入（因子分數、資料日期等）
+        template_version: 模板版本
+        model: 模型名稱
+
+    Returns:
+        SHA-256 十六進位字串
+    """
+    payload = json.dumps(
+        canonical_inputs({
+            'report_type': report_type,
+            'inputs': inputs,
+            'template_version': template_version,
+            'model': model,
+        }),
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def advisory_lock_key(fingerprint: str) -> int:
+    """指紋轉為 PostgreSQL advisory lock 使用的有號 64 位元整數"""
+    return int.from_bytes(bytes.fromhex(fingerprint[:16]), 'big', signed=True)
+
+
+class ReportCache:
+    """以輸入指紋定址的 AI 報告快取"""
+
+    # 同一程序內各指紋的生成鎖；以弱參照保存，最後一個持有者結束後自動移除
+    _inflight: 'weakref.WeakValueDictionary[str, threading.Lock]' = weakref.WeakValueDictionary()
+    _inflight_async: 'weakref.WeakValueDictionary[str, asyncio.Lock]' = weakref.WeakValueDictionary()
+    _inflight_guard = threading.Lock()
+
+    def __init__(self, conn=None, ttl_days: Optional[int] = None):
+        """
+        Args:
+            conn: 資料庫連線（未提供則自行建立）
+            ttl_days: 報告有效天數，預設 AI_CONFIG['report_cache_days']
+        """
+        self.conn = conn or psycopg2.connect(**DATABASE_CONFIG)
+        self.ttl_days = ttl_days if ttl_days is not None else AI_CONFIG['report_cache_days']
+
+    def lookup(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        查詢有效的快取報告
+
+        Args:
+            fingerprint: 輸入指紋
+
+        Returns:
+            報告字典，無有效快取時回傳 None
+        """
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(f"""
+                SELECT {_REPORT_COLUMNS}
+                FROM ai_reports
+                WHERE input_fingerprint = %s
+                  AND is_outdated = FALSE
+                  AND (valid_until IS NULL OR valid_until >= CURRENT_DATE)
+                ORDER BY created_at DESC
+                LIMIT 1
+            """, (fingerprint,))
+            row = cursor.fetchone()
+        self.conn.commit()
+        record_cache('ai_report', row is not None)
+        return dict(row) if row else None
+
+    def store(
+        self,
+        fingerprint: str,
+        report_type: str,
+        title: str,
+        content: str,
+        market_data: Dict[str, Any],
+        model: str,
+        template_version: str,
+        security_type: Optional[str] = None,
+        security_code: Optional[str] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        儲存新生成的報告
+
+        Returns:
+            儲存後的報告字典
+        """
+        today = date.today()
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(f"""
+                    INSERT INTO ai_reports (
+                        report_type, report_title, report_content, market_data,
+                        generated_by, model_version, security_type, security_code, analysis_date, valid_until, is_outdated,
+                        input_fingerprint, template_version, prompt_tokens, completion_tokens
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, FALSE, %s, %s, %s, %s)
+                    RETURNING {_REPORT_COLUMNS}
+                """, (
+                    report_type, title, content, Json(canonical_inputs(market_data)), model, model,
+                    security_type, security_code, today, today + timedelta(days=self.ttl_days),
+                    fingerprint, template_version, prompt_tokens, completion_tokens
+                ))
+                row = dict(cursor.fetchone())
+            self.conn.commit()
+            return row
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def get_or_generate(
+        self,
+        report_type: str,
+        inputs: Dict[str, Any],
+        generate: Callable[[], Union[str, Dict[str, Any]]],
+        title: str,
+        model: str,
+        template_version: str,
+        security_type: Optional[str] = None,
+        security_code: Optional[str] = None,
+        lock_timeout: float = 180.0,
+        poll_interval: float = 1.0
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        取得快取報告，無有效快取時生成並儲存
+
+        Args:
+            report_type: 報告類型
+            inputs: 提示詞輸入（決定指紋，並存入 market_data）
+            generate: 生成函式，回傳報告文字，或
+                      {'content', 'prompt_tokens', 'completion_tokens', 'market_data'} 字典
+                      （market_data 為生成結果的附加資料，與 inputs 合併存入）
+            title: 報告標題
+            model: 模型名稱
+            template_version: 模板版本
+            security_type: 標的類型（'TW' / 'US'）
+            security_code: 標的代碼
+            lock_timeout: 等待其他程序生成的最長秒數，逾時則自行生成
+            poll_interval: 等待時的輪詢間隔
+
+        Returns:
+            (報告字典, 是否命中快取)
+        """
+        fingerprint = compute_fingerprint(report_type, inputs, template_version, model)
+
+        cached = self.lookup(fingerprint)
+        if cached:
+            logger.info(f"AI 報告快取命中：{report_type} {security_code or ''} ({fingerprint[:12]})")
+            return cached, True
+
+        with self._inflight_lock(fingerprint):
+            # 等待期間可能已由同程序的其他執行緒生成
+            cached = self.lookup(fingerprint)
+            if cached:
+                return cached, True
+
+            locked = self._acquire_advisory_lock(fingerprint, lock_timeout, poll_interval)
+            try:
+                cached = self.lookup(fingerprint)
+                if cached:
+                    return cached, True
+
+                report = self._store_result(
+                    fingerprint, report_type, inputs, generate(), title, model,
+                    template_version, security_type, security_code
+                )
+                return report, False
+            finally:
+                if locked:
+                    self._release_advisory_lock(fingerprint)
+
+    async def get_or_generate_async(
+        self,
+        report_type: str,
+        inputs: Dict[str, Any],
+        generate: Callable[[], Awaitable[Union[str, Dict[str, Any]]]],
+        title: str,
+        model: str,
+        template_version: str,
+        security_type: Optional[str] = None,
+        security_code: Optional[str] = None,
+        lock_timeout: float = 180.0,
+        poll_interval: float = 1.0
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        get_or_generate 的協程版本（ASGI 服務使用）
+
+        generate 為協程函式；資料庫操作在執行緒中執行，
+        同程序內相同指紋的請求以 asyncio.Lock 合併，跨程序仍以 advisory lock 協調
+        """
+        fingerprint = compute_fingerprint(report_type, inputs, template_version, model)
+
+        cached = await asyncio.to_thread(self.lookup, fingerprint)
+        if cached:
+            logger.info(f"AI 報告快取命中：{report_type} {security_code or ''} ({fingerprint[:12]})")
+            return cached, True
+
+        async with self._inflight_async_lock(fingerprint):
+            cached = await asyncio.to_thread(self.lookup, fingerprint)
+            if cached:
+                return cached, True
+
+            locked = await self._acquire_advisory_lock_async(fingerprint, lock_timeout, poll_interval)
+            try:
+                cached = await asyncio.to_thread(self.lookup, fingerprint)
+                if cached:
+                    return cached, True
+
+                result = await generate()
+                report = await asyncio.to_thread(
+                    self._store_result, fingerprint, report_type, inputs, result, title, model,
+                    template_version, security_type, security_code
+                )
+                return report, False
+            finally:
+                if locked:
+                    await asyncio.to_thread(self._release_advisory_lock, fingerprint)
+
+    def _store_result(
+        self,
+        fingerprint: str,
+        report_type: str,
+        inputs: Dict[str, Any],
+        result: Union[str, Dict[str, Any]],
+        title: str,
+        model: str,
+        template_version: str,
+        security_type: Optional[str],
+        security_code: Optional[str]
+    ) -> Dict[str, Any]:
+        if isinstance(result, str):
+            result = {'content': result}
+
+        report = self.store(
+            fingerprint, report_type, title, result['content'],
+            {**inputs, **result.get('market_data', {})}, model,
+            template_version, security_type, security_code,
+            result.get('prompt_tokens'), result.get('completion_tokens')
+        )
+        logger.success(f"AI 報告已生成並快取：{report_type} {security_code or ''} ({fingerprint[:12]})")
+        return report
+
+    def _inflight_lock(self, fingerprint: str) -> threading.Lock:
+        with self._inflight_guard:
+            return self._inflight.setdefault(fingerprint, threading.Lock())
+
+    def _inflight_async_lock(self, fingerprint: str) -> asyncio.Lock:
+        with self._inflight_guard:
+            return self._inflight_async.setdefault(fingerprint, asyncio.Lock())
+
+    def _try_advisory_lock(self, fingerprint: str) -> bool:
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (advisory_lock_key(fingerprint),))
+            acquired = cursor.fetchone()[0]
+        self.conn.commit()
+        return acquired
+
+    def _acquire_advisory_lock(self, fingerprint: str, timeout: float, poll_interval: float) -> bool:
+        """
+        取得跨程序生成鎖；以 try-lock 輪詢，避免阻塞共用連線
+        另一程序生成完成時，輪詢中的 lookup 會直接命中
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._try_advisory_lock(fingerprint):
+                return True
+            if time.monotonic() >= deadline:
+                logger.warning(f"等待其他程序生成逾時，自行生成 ({fingerprint[:12]})")
+                return False
+            time.sleep(poll_interval)
+            if self.lookup(fingerprint):
+                return False
+
+    async def _acquire_advisory_lock_async(self, fingerprint: str, timeout: float, poll_interval: float) -> bool:
+        """_acquire_advisory_lock 的協程版本（輪詢間隔以 asyncio.sleep 等待）"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if await asyncio.to_thread(self._try_advisory_lock, fingerprint):
+                return True
+            if time.monotonic() >= deadline:
+                logger.warning(f"等待其他程序生成逾時，自行生成 ({fingerprint[:12]})")
+                return False
+            await asyncio.sleep(poll_interval)
+            if await asyncio.to_thread(self.lookup, fingerprint):
+                return False
+
+    def _release_advisory_lock(self, fingerprint: str):
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (advisory_lock_key(fingerprint),))
+        self.conn.commit()
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
@@ -3,45 +3,58 @@ AI 報告生成器
 
 基於 Gemini 生成投資分析報告
 """
+import asyncio
 import sys
 from pathlib import Path
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from ai.gemini_client import GeminiClient
-from config.settings import DATABASE_CONFIG
+from ai.prompt_context import PromptContext
+from ai.report_cache import ReportCache
+from ai.streaming import stream_report
+from config.settings import AI_CONFIG, DATABASE_CONFIG
 import psycopg2
 from loguru import logger
 
+# 提示詞模板版本（修改提示詞時遞增，使舊快取失效）
+DAILY_REPORT_VERSION = 'daily-v1'
+DECISION_TEMPLATE_VERSION = 'decision-v2'
+
 
 class DailyReportGenerator:
     """每日戰略投資分析報告生成器"""
     
-    def __init__(self):
-        self.ai_client = GeminiClient()
+    GENERATION_CONFIG = {'temperature': 0.7}
+    
+    def __init__(self, ai_client=None):
+        """
+        Args:
+            ai_client: 模型客戶端（預設 GeminiClient）
+        """
+        self.ai_client = ai_client or GeminiClient()
         self.conn = psycopg2.connect(**DATABASE_CONFIG)
+        self.cache = ReportCache(self.conn)
     
-    def generate_daily_report(
+    def prepare_daily_report(
         self,
         target_date: Optional[str] = None
-    ) -> str:
+    ) -> Tuple[Dict, str]:
         """
-        生成每日戰略投資分析報告
+        收集每日報告所需資料並構建 Prompt
         
         Args:
             target_date: 目標日期（預設今天）
         
         Returns:
-            Markdown 格式的報告
+            (快取指紋輸入, Prompt)
         """
         if not target_date:
             target_date = datetime.now().strftime('%Y-%m-%d')
         
-        logger.info(f"生成每日戰略報告：{target_date}")
-        
         # 1. 收集市場數據
         market_data = self._collect_market_data(target_date)
         
@@ -59,15 +72,69 @@ class DailyReportGenerator:
             target_date
         )
         
-        # 5. 生成報告
-        report = self.ai_client.generate_text(prompt, temperature=0.7)
+        inputs = {
+            'date': target_date,
+            'market': market_data,
+            'macro': macro_data,
+            'sentiment': sentiment_data,
+        }
+        
+        return inputs, prompt
+    
+    def generate_daily_report(
+        self,
+        target_date: Optional[str] = None
+    ) -> str:
+        """
+        生成每日戰略投資分析報告
+        
+        Args:
+            target_date: 目標日期（預設今天）
+        
+        Returns:
+            Markdown 格式的報告
+        """
+        inputs, prompt = self.prepare_daily_report(target_date)
+        target_date = inputs['date']
+        
+        logger.info(f"生成每日戰略報告：{target_date}")
+        
+        # 輸入未變則沿用快取，否則生成並儲存
+        report, cache_hit = self.cache.get_or_generate(
+            'daily_strategy',
+            inputs,
+            lambda: self.ai_client.generate_text(prompt, **self.GENERATION_CONFIG),
+            title=f"{target_date} 每日戰略投資分析報告",
+            model=self.ai_client.model_name,
+            template_version=DAILY_REPORT_VERSION
+        )
         
-        # 6. 儲存到資料庫
-        self._save_report(report, 'daily_strategy', target_date)
+        if not cache_hit:
+            logger.success(f"每日戰略報告生成完成：{target_date}")
         
-        logger.success(f"每日戰略報告生成完成：{target_date}")
+        return report['report_content']
+    
+    def stream_daily_report(
+        self,
+        target_date: Optional[str] = None
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        串流生成每日戰略報告（事件格式見 ai.streaming.stream_report）
         
-        return report
+        Args:
+            target_date: 目標日期（預設今天）
+        """
+        inputs, prompt = self.prepare_daily_report(target_date)
+        
+        yield from stream_report(
+            self.cache,
+            'daily_strategy',
+            inputs,
+            lambda: self.ai_client.generate_stream(prompt, **self.GENERATION_CONFIG),
+            title=f"{inputs['date']} 每日戰略投資分析報告",
+            model=self.ai_client.model_name,
+            template_version=DAILY_REPORT_VERSION
+        )
     
     def _collect_market_data(self, date: str) -> Dict:
         """收集市場數據"""
@@ -209,66 +276,97 @@ class DailyReportGenerator:
         
         return "\n".join(lines)
     
-    def _save_report(
-        self,
-        content: str,
-        report_type: str,
-        date: str
-    ):
-        """儲存報告到資料庫"""
-        cursor = self.conn.cursor()
-        
-        try:
-            query = """
-                INSERT INTO ai_reports (report_type, report_date, content, created_at)
-                VALUES (%s, %s, %s, NOW())
-                ON CONFLICT (report_type, report_date)
-                DO UPDATE SET content = EXCLUDED.content, updated_at = NOW()
-            """
-            
-            cursor.execute(query, (report_type, date, content))
-            self.conn.commit()
-            
-            logger.success(f"報告已儲存：{report_type} @ {date}")
-            
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"儲存報告失敗：{e}")
-        finally:
-            cursor.close()
-    
     def close(self):
         """關閉資料庫連接"""
         if self.conn:
             self.conn.close()
 
 
+# 決策模板的固定指示（作為 system prefix，跨標的共用並由模型端快取）
+DECISION_SYSTEM_PROMPT = """
+你是一位資深投資分析師，請根據使用者提供的個股資料，生成完整的「統合究極版決策模板」。
+資料以「[區塊] 欄位=值 | 欄位=值」表示，缺少的欄位代表無資料，請勿自行捏造數字。
+
+請以 Markdown 格式撰寫完整的決策模板，包含：
+
+# <股票代碼> 統合究極版決策模板
+
+## Part 1: 數據駕駛艙
+用文字描述六大因子雷達圖的特徵，說明這支股票的因子 DNA
+
+## Part 2: 核心投資論證
+### 2.1 Bull Case（看多論證）
+至少 3 個具體理由
+
+### 2.2 Bear Case（看空論證）
+至少 3 個風險因素
+
+## Part 3: 宏觀背景
+分析當前宏觀環境對該股的影響
+
+## Part 4: 企業深度剖析
+### 4.Z 動態六因子診斷
+詳細解讀每個因子的強弱
+
+### 4.Y 籌碼分析
+基於 TDCC 數據，分析大戶動向與同步率
+
+### 4.W 機構持倉
+（若有 13F 資料，分析機構持倉）
+
+### 4.X 散戶輿情
+基於社群與新聞情緒分析
+
+## Part 5: 前瞻性分析與戰術規劃
+- 未來 3 個月展望
+- 關鍵催化劑
+- 買入/賣出條件
+
+## Part 6: 最終檢核
+- 投資建議：買入/持有/賣出
+- 目標價
+- 停損點
+- 持有週期建議
+
+---
+請用專業、客觀的語言，提供可執行的建議。
+""".strip()
+
+
 class DecisionTemplateGenerator:
     """統合究極版決策模板生成器"""
     
-    def __init__(self):
-        self.ai_client = GeminiClient()
+    # 決策模板的生成參數（同步生成與任務佇列共用）
+    GENERATION_CONFIG = {
+        'temperature': 0.6,
+        'max_tokens': 8000,
+        'system_instruction': DECISION_SYSTEM_PROMPT
+    }
+    
+    def __init__(self, ai_client=None):
+        """
+        Args:
+            ai_client: 模型客戶端（預設 GeminiClient；批次排程可傳入佇列使用的客戶端）
+        """
+        self.ai_client = ai_client or GeminiClient()
         self.conn = psycopg2.connect(**DATABASE_CONFIG)
+        self.cache = ReportCache(self.conn)
     
-    def generate_decision_template(
+    def prepare_decision_template(
         self,
         stock_code: str,
         market: str = 'tw'
-    ) -> str:
+    ) -> Tuple[Dict, str]:
         """
-        生成統合究極版決策模板
-        
-        根據規格書 Part 1-6 完整生成
+        收集決策模板所需資料並構建 Prompt
         
         Args:
             stock_code: 股票代碼
             market: 市場
         
         Returns:
-            完整決策模板 (Markdown)
+            (快取指紋輸入, Prompt)
         """
-        logger.info(f"生成決策模板：{stock_code}")
-        
         # 1. 收集六因子數據
         factor_data = self._get_factor_scores(stock_code, market)
         
@@ -290,15 +388,164 @@ class DecisionTemplateGenerator:
             sentiment_data
         )
         
-        # 6. 生成模板
-        template = self.ai_client.generate_text(prompt, temperature=0.6, max_tokens=8000)
+        inputs = {
+            'stock_code': stock_code,
+            'market': market,
+            'price_date': self._get_price_date(stock_code, market),
+            'factors': factor_data,
+            'financials': financial_data,
+            'chips': chip_data,
+            'sentiment': sentiment_data,
+        }
+        
+        return inputs, prompt
+    
+    def generate_decision_template(
+        self,
+        stock_code: str,
+        market: str = 'tw'
+    ) -> str:
+        """
+        生成統合究極版決策模板
+        
+        根據規格書 Part 1-6 完整生成
+        
+        Args:
+            stock_code: 股票代碼
+            market: 市場
+        
+        Returns:
+            完整決策模板 (Markdown)
+        """
+        logger.info(f"生成決策模板：{stock_code}")
+        
+        inputs, prompt = self.prepare_decision_template(stock_code, market)
+        
+        # 輸入未變則沿用快取，否則生成並儲存
+        template, cache_hit = self.cache.get_or_generate(
+            'decision_template',
+            inputs,
+            lambda: self.ai_client.generate_text(prompt, **self.GENERATION_CONFIG),
+            title=f"{stock_code} 統合究極版決策模板",
+            model=self.ai_client.model_name,
+            template_version=DECISION_TEMPLATE_VERSION,
+            security_type=market.upper(),
+            security_code=stock_code
+        )
+        
+        if not cache_hit:
+            logger.success(f"決策模板生成完成：{stock_code}")
+        
+        return template['report_content']
+    
+    async def generate_decision_template_async(
+        self,
+        stock_code: str,
+        market: str = 'tw'
+    ) -> str:
+        """
+        generate_decision_template 的協程版本（ASGI 服務使用）
+        
+        資料收集與快取讀寫在執行緒中執行，模型呼叫為可等待的 I/O
+        """
+        inputs, prompt = await asyncio.to_thread(self.prepare_decision_template, stock_code, market)
+        
+        template, _ = await self.cache.get_or_generate_async(
+            'decision_template',
+            inputs,
+            lambda: self.ai_client.generate_text_async(prompt, **self.GENERATION_CONFIG),
+            title=f"{stock_code} 統合究極版決策模板",
+            model=self.ai_client.model_name,
+            template_version=DECISION_TEMPLATE_VERSION,
+            security_type=market.upper(),
+            security_code=stock_code
+        )
+        
+        return template['report_content']
+        
+    def stream_decision_template(
+        self,
+        stock_code: str,
+        market: str = 'tw'
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        串流生成決策模板（事件格式見 ai.streaming.stream_report）
+        
+        Args:
+            stock_code: 股票代碼
+            market: 市場
+        """
+        inputs, prompt = self.prepare_decision_template(stock_code, market)
+        
+        yield from stream_report(
+            self.cache,
+            'decision_template',
+            inputs,
+            lambda: self.ai_client.generate_stream(prompt, **self.GENERATION_CONFIG),
+            title=f"{stock_code} 統合究極版決策模板",
+            model=self.ai_client.model_name,
+            template_version=DECISION_TEMPLATE_VERSION,
+            security_type=market.upper(),
+            security_code=stock_code
+        )
+    
+    def enqueue_decision_template(
+        self,
+        queue,
+        stock_code: str,
+        market: str = 'tw',
+        batch_id: Optional[str] = None,
+        priority: int = 100
+    ) -> Optional[int]:
+        """
+        將決策模板排入 AI 任務佇列（由 AIJobQueue 並行生成）
+        
+        Args:
+            queue: ai.job_queue.AIJobQueue
+            stock_code: 股票代碼
+            market: 市場
+            batch_id: 批次 ID
+            priority: 優先序（越小越優先）
         
-        # 7. 儲存
-        self._save_template(stock_code, template)
+        Returns:
+            任務 ID；已有有效報告或已在佇列中時回傳 None
+        """
+        inputs, prompt = self.prepare_decision_template(stock_code, market)
+        
+        return queue.enqueue(
+            'decision_template',
+            prompt,
+            inputs,
+            title=f"{stock_code} 統合究極版決策模板",
+            template_version=DECISION_TEMPLATE_VERSION,
+            security_type=market.upper(),
+            security_code=stock_code,
+            generation_config=self.GENERATION_CONFIG,
+            batch_id=batch_id,
+            priority=priority,
+            conn=self.conn
+        )
+    
+    def _get_price_date(self, stock_code: str, market: str) -> Optional[str]:
+        """獲取最新價格日期（latest_quotes）"""
+        cursor = self.conn.cursor()
         
-        logger.success(f"決策模板生成完成：{stock_code}")
+        try:
+            cursor.execute("""
+                SELECT trade_date
+                FROM latest_quotes
+                WHERE market = %s AND symbol = %s
+            """, (market, stock_code))
+            row = cursor.fetchone()
+            self.conn.commit()
+            return str(row[0]) if row else None
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"獲取價格日期失敗：{e}")
+        finally:
+            cursor.close()
         
-        return template
+        return None
     
     def _get_factor_scores(self, stock_code: str, market: str) -> Dict:
         """獲取因子分數"""
@@ -309,12 +556,12 @@ class DecisionTemplateGenerator:
                 SELECT value_score, quality_score, momentum_score,
                        size_score, volatility_score, growth_score, total_score
                 FROM quant_scores
-                WHERE security_id = (SELECT id FROM securities_master WHERE ticker = %s)
+                WHERE security_type = %s AND security_code = %s
                 ORDER BY calculation_date DESC
                 LIMIT 1
             """
             
-            cursor.execute(query, (stock_code,))
+            cursor.execute(query, (market.upper(), stock_code))
             row = cursor.fetchone()
             
             if row:
@@ -328,6 +575,7 @@ class DecisionTemplateGenerator:
                     'total': row[6]
                 }
         except Exception as e:
+            self.conn.rollback()
             logger.error(f"獲取因子分數失敗：{e}")
         finally:
             cursor.close()
@@ -371,6 +619,7 @@ class DecisionTemplateGenerator:
                     'money_flow': row[4]
                 }
         except Exception as e:
+            self.conn.rollback()
             logger.error(f"獲取籌碼數據失敗：{e}")
         finally:
             cursor.close()
@@ -394,112 +643,20 @@ class DecisionTemplateGenerator:
         chips: Dict,
         sentiment: Dict
     ) -> str:
-        """構建決策模板Prompt"""
-        
-        prompt = f"""
-你是一位資深投資分析師，請為股票 {stock_code} 生成完整的「統合究極版決策模板」。
-
-=== 六大因子分數 ===
-- 價值 (Value): {factors.get('value', 'N/A')}/100
-- 品質 (Quality): {factors.get('quality', 'N/A')}/100
-- 動能 (Momentum): {factors.get('momentum', 'N/A')}/100
-- 規模 (Size): {factors.get('size', 'N/A')}/100
-- 波動率 (Volatility): {factors.get('volatility', 'N/A')}/100
-- 成長 (Growth): {factors.get('growth', 'N/A')}/100
-- **總分**: {factors.get('total', 'N/A')}/100
-
-=== 財務指標 ===
-- 本益比 (P/E): {financials.get('pe', 'N/A')}
-- 股價淨值比 (P/B): {financials.get('pb', 'N/A')}
-- ROE: {financials.get('roe', 'N/A')}%
-- 營收成長率: {financials.get('revenue_growth', 'N/A')}%
-
-=== 籌碼分析（TDCC）===
-- 總股東數: {chips.get('total_shareholders', 'N/A')}
-- 大戶比例: {chips.get('large_holders_pct', 'N/A')}%
-- 同步率指標: {chips.get('sync_index', 'N/A')}
-- 資金流向: {chips.get('money_flow', 'N/A')}
-
-=== 市場情緒 ===
-- 新聞情緒: {sentiment.get('news_sentiment', 'N/A')}
-- 社群討論度: {sentiment.get('social_mentions', 'N/A')}
-- 情緒分數: {sentiment.get('sentiment_score', 'N/A')}
-
-=== 報告要求 ===
-請以 Markdown 格式撰寫完整的決策模板，包含：
-
-# {stock_code} 統合究極版決策模板
-
-## Part 1: 數據駕駛艙
-用文字描述六大因子雷達圖的特徵，說明這支股票的因子 DNA
-
-## Part 2: 核心投資論證
-### 2.1 Bull Case（看多論證）
-至少 3 個具體理由
-
-### 2.2 Bear Case（看空論證）
-至少 3 個風險因素
-
-## Part 3: 宏觀背景
-分析當前宏觀環境對該股的影響
-
-## Part 4: 企業深度剖析
-### 4.Z 動態六因子診斷
-詳細解讀每個因子的強弱
-
-### 4.Y 籌碼分析
-基於 TDCC 數據，分析大戶動向與同步率
-
-### 4.W 機構持倉
-（若有 13F 資料，分析機構持倉）
-
-### 4.X 散戶輿情
-基於社群與新聞情緒分析
-
-## Part 5: 前瞻性分析與戰術規劃
-- 未來 3 個月展望
-- 關鍵催化劑
-- 買入/賣出條件
-
-## Part 6: 最終檢核
-- 投資建議：買入/持有/賣出
-- 目標價
-- 停損點
-- 持有週期建議
-
----
-請用專業、客觀的語言，提供可執行的建議。
-"""
-        
-        return prompt
-    
-    def _save_template(self, stock_code: str, content: str):
-        """儲存模板"""
-        cursor = self.conn.cursor()
+        """
+        構建決策模板 Prompt（僅含該股資料的精簡上下文）
         
-        try:
-            query = """
-                INSERT INTO ai_reports (
-                    report_type, security_id, content, created_at
-                )
-                VALUES (
-                    'decision_template',
-                    (SELECT id FROM securities_master WHERE ticker = %s),
-                    %s,
-                    NOW()
-                )
-            """
-            
-            cursor.execute(query, (stock_code, content))
-            self.conn.commit()
-            
-            logger.success(f"決策模板已儲存：{stock_code}")
-            
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"儲存模板失敗：{e}")
-        finally:
-            cursor.close()
+        角色、章節結構與寫作要求放在 DECISION_SYSTEM_PROMPT，所有標的共用
+        """
+        context = PromptContext(AI_CONFIG['prompt_budget_tokens'])
+        context.add('因子分數/100', factors, priority=10)
+        context.add('財務', financials, priority=20)
+        context.add('籌碼TDCC', chips, priority=30)
+        context.add('情緒', sentiment, priority=40)
+        text, tokens = context.build()
+        
+        logger.debug(f"{stock_code} 決策模板上下文約 {tokens} tokens")
+        return f"標的：{stock_code}\n{text or '（無可用資料）'}"
     
     def close(self):
         if self.conn:
@@ -0,0 +1,109 @@
+"""
+AI 串流生成
+
+- GenerationStream：包裝模型的分段輸出，迭代結束後提供完整文字與 token 用量
+- stream_report：快取命中時直接回放，否則邊生成邊輸出，完成後寫入 ai_reports
+- format_sse：轉為 Server-Sent Events 格式
+"""
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from loguru import logger
+
+from ai.report_cache import ReportCache, compute_fingerprint
+
+
+class GenerationStream:
+    """可迭代的文字分段；迭代完成後 text / prompt_tokens / completion_tokens 才完整"""
+
+    def __init__(
+        self,
+        chunks: Iterable[str],
+        usage: Optional[Callable[[], Tuple[Optional[int], Optional[int]]]] = None
+    ):
+        """
+        Args:
+            chunks: 文字分段
+            usage: 迭代結束後取得 (prompt_tokens, completion_tokens) 的函式
+        """
+        self._chunks = chunks
+        self._usage = usage
+        self.parts = []
+        self.prompt_tokens = None
+        self.completion_tokens = None
+
+    def __iter__(self) -> Iterator[str]:
+        for text in self._chunks:
+            if text:
+                self.parts.append(text)
+                yield text
+        if self._usage:
+            self.prompt_tokens, self.completion_tokens = self._usage()
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+
+def format_sse(event: str, data: Any) -> str:
+    """格式化為 SSE 訊息（data 以 JSON 編碼，避免換行截斷）"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def stream_report(
+    cache: ReportCache,
+    report_type: str,
+    inputs: Dict[str, Any],
+    start_stream: Callable[[], GenerationStream],
+    title: str,
+    model: str,
+    template_version: str,
+    security_type: Optional[str] = None,
+    security_code: Optional[str] = None
+) -> Iterator[Tuple[str, Any]]:
+    """
+    串流產生報告事件
+
+    快取命中時一次送出整份報告；否則逐段轉送，串流完整結束才寫入 ai_reports
+    （客戶端中途斷線時不儲存不完整的報告）
+
+    Yields:
+        (event, data)：
+        - ('meta', {'cached', 'fingerprint'})
+        - ('chunk', 文字)
+        - ('done', {'report_id', 'prompt_tokens', 'completion_tokens'})
+        - ('error', {'message'})
+    """
+    fingerprint = compute_fingerprint(report_type, inputs, template_version, model)
+    cached = cache.lookup(fingerprint)
+    yield 'meta', {'cached': cached is not None, 'fingerprint': fingerprint}
+
+    if cached:
+        yield 'chunk', cached['report_content']
+        yield 'done', {
+            'report_id': cached['id'],
+            'prompt_tokens': cached.get('prompt_tokens'),
+            'completion_tokens': cached.get('completion_tokens'),
+        }
+        return
+
+    try:
+        stream = start_stream()
+        for text in stream:
+            yield 'chunk', text
+        if not stream.text:
+            raise ValueError("模型回傳空內容")
+        report = cache.store(
+            fingerprint, report_type, title, stream.text, inputs, model, template_version,
+            security_type, security_code, stream.prompt_tokens, stream.completion_tokens
+        )
+    except Exception as e:
+        logger.error(f"串流生成失敗：{report_type} {security_code or ''}: {e}")
+        yield 'error', {'message': str(e)}
+        return
+
+    yield 'done', {
+        'report_id': report['id'],
+        'prompt_tokens': report.get('prompt_tokens'),
+        'completion_tokens': report.get('completion_tokens'),
+    }
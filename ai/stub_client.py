@@ -0,0 +1,148 @@
+"""
+本地 Stub 模型
+
+介面與 GeminiClient 相同，不呼叫外部 API，回傳可重現的內容。
+用於測試與本地開發（設定 AI_MODEL_PROVIDER=stub）。
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ai.rate_limiter import estimate_tokens
+from ai.streaming import GenerationStream
+
+
+def _sample_from_schema(schema: Dict, text: str) -> Any:
+    """依 JSON schema 產生可重現的範例值"""
+    kind = schema.get('type', 'string')
+    if kind == 'object':
+        return {key: _sample_from_schema(sub, text) for key, sub in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [_sample_from_schema(schema.get('items', {}), text)]
+    if kind in ('number', 'integer'):
+        return 70
+    if kind == 'boolean':
+        return True
+    if schema.get('enum'):
+        return schema['enum'][0]
+    return text
+
+
+class StubGeminiClient:
+    """可重現的 Gemini 替身"""
+
+    def __init__(self, latency: float = 0.0, fail_times: int = 0, model_name: str = 'stub-model'):
+        """
+        Args:
+            latency: 每次呼叫的模擬延遲（秒）
+            fail_times: 前 N 次呼叫拋出例外（測試重試用）
+            model_name: 模型名稱（納入報告快取指紋）
+        """
+        self.model_name = model_name
+        self.latency = latency
+        self.fail_times = fail_times
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_with_usage(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        system_instruction: Optional[str] = None,
+        response_schema: Optional[Dict] = None
+    ) -> Dict:
+        """
+        生成文本並回傳用量（提供 response_schema 時回傳符合 schema 的 JSON 字串）
+
+        Returns:
+            {'content', 'prompt_tokens', 'completion_tokens'}
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt, system_instruction, response_schema)
+
+    async def generate_with_usage_async(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        system_instruction: Optional[str] = None,
+        response_schema: Optional[Dict] = None
+    ) -> Dict:
+        """generate_with_usage 的協程版本（延遲以 asyncio.sleep 模擬）"""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(prompt, system_instruction, response_schema)
+
+    def _respond(self, prompt: str, system_instruction: Optional[str], response_schema: Optional[Dict]) -> Dict:
+        with self.lock:
+            self.calls += 1
+            should_fail = self.calls <= self.fail_times
+        if should_fail:
+            raise RuntimeError("stub: 模擬 API 錯誤")
+
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+        content = f"# Stub 報告 {digest}\n\n{prompt.strip()[:200]}"
+        if response_schema:
+            content = json.dumps(_sample_from_schema(response_schema, content), ensure_ascii=False)
+        return {
+            'content': content,
+            'prompt_tokens': estimate_tokens(prompt) + estimate_tokens(system_instruction or ''),
+            'completion_tokens': estimate_tokens(content),
+        }
+
+    def generate_structured(
+        self,
+        prompt: str,
+        response_schema: Dict,
+        system_instruction: Optional[str] = None,
+        temperature: float = 0.6,
+        max_tokens: int = 8000
+    ) -> Dict:
+        result = self.generate_with_usage(prompt, temperature, max_tokens, system_instruction, response_schema)
+        result['data'] = json.loads(result['content'])
+        return result
+
+    def generate_stream(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        system_instruction: Optional[str] = None,
+        chunk_size: int = 40
+    ) -> GenerationStream:
+        """分段回傳 generate_with_usage 的內容"""
+        result = self.generate_with_usage(prompt, temperature, max_tokens, system_instruction)
+        content = result['content']
+        return GenerationStream(
+            (content[i:i + chunk_size] for i in range(0, len(content), chunk_size)),
+            lambda: (result['prompt_tokens'], result['completion_tokens'])
+        )
+
+    def generate_text(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        retry_count: int = 3,
+        system_instruction: Optional[str] = None
+    ) -> str:
+        return self.generate_with_usage(prompt, temperature, max_tokens, system_instruction)['content']
+
+    async def generate_text_async(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 8000,
+        retry_count: int = 3,
+        system_instruction: Optional[str] = None
+    ) -> str:
+        result = await self.generate_with_usage_async(prompt, temperature, max_tokens, system_instruction)
+        return result['content']
+
+    def batch_generate(self, prompts: List[str], concurrency: Optional[int] = None) -> List[str]:
+        return [self.generate_text(prompt) for prompt in prompts]
@@ -34,7 +34,8 @@ class GeminiClient:
         genai.configure(api_key=self.api_key)
         
         # 使用 Gemini 2.5 Flash 模型
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model_name = 'gemini-2.5-flash'
+        self.model = genai.GenerativeModel(self.model_name)
         
         # 追蹤使用統計
         self.requests_count = 0
@@ -54,7 +55,7 @@ class GeminiClient:
                 "status": "success",
                 "message": "Gemini API 連接成功",
                 "response": response.text,
-                "model": "gemini-2.5-flash"
+                "model": self.model_name
             }
         except Exception as e:
             return {
@@ -0,0 +1,94 @@
+"""
+AI 任務佇列 API
+提供批次排入決策模板與查詢佇列進度端點（實際生成由 scripts/run_ai_jobs.py work 執行）
+"""
+from flask import Blueprint, jsonify, request
+import psycopg2
+import os
+from dotenv import load_dotenv
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from ai.job_queue import AIJobQueue, get_job, get_queue_status, new_batch_id
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'))
+
+ai_jobs_bp = Blueprint('ai_jobs_api', __name__)
+
+def get_db():
+    return psycopg2.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '15432')),
+        database=os.getenv('DB_NAME', 'quant_db'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'postgres')
+    )
+
+def _serialize(row):
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else value for key, value in row.items()}
+
+@ai_jobs_bp.route('/api/ai/jobs', methods=['GET'])
+def queue_status():
+    """佇列進度（?batch_id= 只看單一批次）"""
+    try:
+        conn = get_db()
+        try:
+            status = get_queue_status(conn, request.args.get('batch_id'))
+        finally:
+            conn.close()
+        status['failures'] = [_serialize(job) for job in status['failures']]
+        return jsonify({'success': True, 'data': status})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@ai_jobs_bp.route('/api/ai/jobs/<int:job_id>', methods=['GET'])
+def job_detail(job_id):
+    """單一任務狀態"""
+    try:
+        conn = get_db()
+        try:
+            job = get_job(conn, job_id)
+        finally:
+            conn.close()
+        if not job:
+            return jsonify({'success': False, 'error': '任務不存在'}), 404
+        return jsonify({'success': True, 'data': _serialize(job)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@ai_jobs_bp.route('/api/ai/jobs/decision-templates', methods=['POST'])
+def enqueue_decision_templates():
+    """
+    批次排入決策模板
+    Body: {"stocks": [{"code": "2330", "market": "tw"}, ...], "priority": 100}
+    """
+    from ai.report_generator import DecisionTemplateGenerator
+
+    try:
+        data = request.json or {}
+        stocks = data.get('stocks', [])
+        if not stocks:
+            return jsonify({'success': False, 'error': '請提供 stocks'}), 400
+
+        queue = AIJobQueue()
+        generator = DecisionTemplateGenerator(ai_client=queue.client)
+        batch_id = data.get('batch_id') or new_batch_id('decision')
+        job_ids = []
+        try:
+            for stock in stocks:
+                job_id = generator.enqueue_decision_template(
+                    queue, stock['code'], stock.get('market', 'tw').lower(),
+                    batch_id, int(data.get('priority', 100))
+                )
+                if job_id:
+                    job_ids.append(job_id)
+        finally:
+            generator.close()
+
+        return jsonify({
+            'success': True,
+            'data': {'batch_id': batch_id, 'queued': len(job_ids), 'job_ids': job_ids,
+                     'skipped': len(stocks) - len(job_ids)}
+        }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,11 +1,6 @@
-"""API客戶端模組"""
+"""API客戶端模組（匯出名稱延遲載入，只 import 實際使用的客戶端）"""
 
-from .tw_stock_client import TWStockClient
-from .us_stock_client import USStockClient
-from .gold_client import GoldClient
-from .exchange_rate_client import ExchangeRateClient
-from .macro_client import MacroClient
-from .news_client import NewsClient
+from utils.lazy_import import lazy_exports
 
 __all__ = [
     'TWStockClient',
@@ -15,3 +10,12 @@ __all__ = [
     'MacroClient',
     'NewsClient'
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'TWStockClient': '.tw_stock_client',
+    'USStockClient': '.us_stock_client',
+    'GoldClient': '.gold_client',
+    'ExchangeRateClient': '.exchange_rate_client',
+    'MacroClient': '.macro_client',
+    'NewsClient': '.news_client',
+})
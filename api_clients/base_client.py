@@ -5,10 +5,12 @@
 - 自動重試機制（exponential backoff）
 - 錯誤處理與日誌記錄
 - 響應快取
+- 流量遙測（延遲、錯誤、重試、快取命中，見 utils.api_telemetry）
 """
 
 import time
 import requests
+from contextlib import contextmanager
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 from functools import wraps
@@ -16,17 +18,22 @@ from loguru import logger
 import hashlib
 import json
 
+from utils.api_telemetry import telemetry, track_call
+from utils.metrics import record_cache
+
 
 class RateLimiter:
     """API 請求頻率限制器"""
     
-    def __init__(self, delay: float = 1.0, daily_limit: Optional[int] = None):
+    def __init__(self, delay: float = 1.0, daily_limit: Optional[int] = None, source: Optional[str] = None):
         """
         Args:
             delay: 每次請求間隔秒數
             daily_limit: 每日請求次數上限（None 表示無限制）
+            source: 遙測來源名稱（記錄因每日上限而等待的次數）
         """
         self.delay = delay
+        self.source = source
         self.daily_limit = daily_limit
         self.last_request_time = 0
         self.daily_count = 0
@@ -44,6 +51,8 @@ class RateLimiter:
             wait_time = (self.daily_reset_time - datetime.now()).total_seconds()
             if wait_time > 0:
                 logger.warning(f"已達每日請求上限 {self.daily_limit}，等待 {wait_time:.0f} 秒至明日重置")
+                if self.source:
+                    telemetry.record_rate_limit_wait(self.source)
                 time.sleep(wait_time)
                 self.daily_count = 0
         
@@ -102,6 +111,11 @@ def retry_on_failure(max_retries: int = 3, backoff_factor: float = 2.0):
                         logger.error(f"達到最大重試次數 {max_retries}，放棄請求")
                         raise
                     
+                    # BaseAPIClient 方法：計入該來源的重試數
+                    source = getattr(args[0], 'source', None) if args else None
+                    if source:
+                        telemetry.record_retry(source)
+                    
                     wait_time = backoff_factor ** retries
                     logger.warning(f"請求失敗（{e}），{wait_time:.1f} 秒後重試（{retries}/{max_retries}）")
                     time.sleep(wait_time)
@@ -121,7 +135,8 @@ class BaseAPIClient:
         rate_limit_delay: float = 1.0,
         daily_limit: Optional[int] = None,
         cache_ttl: int = 3600,
-        timeout: int = 30
+        timeout: int = 30,
+        source: Optional[str] = None
     ):
         """
         Args:
@@ -132,14 +147,16 @@ class BaseAPIClient:
             daily_limit: 每日請求上限
             cache_ttl: 快取存活時間（秒）
             timeout: 請求逾時時間（秒）
+            source: 遙測來源名稱（API_RATE_LIMITS 的鍵，用於計算剩餘配額；預設為 api_name）
         """
         self.api_name = api_name
+        self.source = source or api_name
         self.api_key = api_key
         self.base_url = base_url
         self.timeout = timeout
         
         # 初始化元件
-        self.rate_limiter = RateLimiter(delay=rate_limit_delay, daily_limit=daily_limit)
+        self.rate_limiter = RateLimiter(delay=rate_limit_delay, daily_limit=daily_limit, source=self.source)
         self.cache = ResponseCache(ttl=cache_ttl)
         self.session = requests.Session()
         
@@ -153,6 +170,30 @@ class BaseAPIClient:
         key_data = f"{url}_{json.dumps(params, sort_keys=True) if params else ''}"
         return hashlib.md5(key_data.encode()).hexdigest()
     
+    @contextmanager
+    def track(self, source: Optional[str] = None):
+        """
+        記錄一次外部呼叫（延遲、成功 / 失敗）至遙測與目前請求的效能統計
+        
+        用於未經 _make_request 的呼叫（yfinance、twstock、直接的 requests.get）：
+        
+            with self.track('yfinance'):
+                df = yf.Ticker(symbol).history(...)
+        
+        Args:
+            source: 來源名稱（預設為本客戶端的 source）
+        """
+        with track_call(source or self.source) as call:
+            yield call
+    
+    def _http_get(self, source: str, url: str, **kwargs) -> requests.Response:
+        """requests.get 並記錄遙測（HTTP 4xx / 5xx 計為失敗，但不拋出例外）"""
+        with self.track(source) as call:
+            response = requests.get(url, **kwargs)
+            if response.status_code >= 400:
+                call.error = f"HTTP {response.status_code}"
+        return response
+    
     @retry_on_failure(max_retries=3, backoff_factor=2.0)
     def _make_request(
         self,
@@ -179,7 +220,9 @@ class BaseAPIClient:
         if use_cache and method.upper() == 'GET':
             cache_key = self._generate_cache_key(url, params)
             cached_data = self.cache.get(cache_key)
+            record_cache(f'api:{self.source}', cached_data is not None)
             if cached_data is not None:
+                telemetry.record_cache_hit(self.source)
                 logger.debug(f"[{self.api_name}] 使用快取資料: {url}")
                 return cached_data
         
@@ -199,16 +242,17 @@ class BaseAPIClient:
         # 發送請求
         logger.debug(f"[{self.api_name}] 請求: {method} {url}")
         
-        response = self.session.request(
-            method=method,
-            url=url,
-            params=params,
-            headers=headers,
-            timeout=self.timeout
-        )
-        
-        # 檢查回應狀態
-        response.raise_for_status()
+        with self.track():
+            response = self.session.request(
+                method=method,
+                url=url,
+                params=params,
+                headers=headers,
+                timeout=self.timeout
+            )
+            
+            # 檢查回應狀態
+            response.raise_for_status()
         
         # 解析 JSON
         data = response.json()
@@ -26,7 +26,8 @@ class ExchangeRateClient(BaseAPIClient):
             base_url="https://v6.exchangerate-api.com/v6",
             rate_limit_delay=60,  # 1分鐘
             daily_limit=1500,  # 每月1500次
-            cache_ttl=3600
+            cache_ttl=3600,
+            source='exchange_rate_api'
         )
     
     def get_historical_rate(
@@ -111,8 +112,9 @@ class ExchangeRateClient(BaseAPIClient):
             
             if ticker_symbol:
                 logger.info(f"嘗試使用 yfinance 取得匯率 ({ticker_symbol})...")
-                ticker = yf.Ticker(ticker_symbol)
-                df = ticker.history(start=start_date, end=end_date)
+                with self.track('yfinance'):
+                    ticker = yf.Ticker(ticker_symbol)
+                    df = ticker.history(start=start_date, end=end_date)
                 
                 if not df.empty:
                     df = df.reset_index()
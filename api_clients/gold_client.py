@@ -14,12 +14,11 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from api_clients.base_client import BaseAPIClient
 from config.settings import API_KEYS
 from loguru import logger
+from utils.lazy_import import lazy_module, module_available
 
-try:
-    import yfinance as yf
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    YFINANCE_AVAILABLE = False
+# yfinance 於第一次查詢時才 import
+yf = lazy_module('yfinance')
+YFINANCE_AVAILABLE = module_available('yfinance')
 
 
 class GoldClient(BaseAPIClient):
@@ -32,7 +31,8 @@ class GoldClient(BaseAPIClient):
             base_url="https://www.goldapi.io/api",
             rate_limit_delay=900,  # 15分鐘（免費層限制）
             daily_limit=100,  # 每月100次
-            cache_ttl=3600
+            cache_ttl=3600,
+            source='gold_api'
         )
     
     def get_daily_price(
@@ -59,8 +59,9 @@ class GoldClient(BaseAPIClient):
         if YFINANCE_AVAILABLE:
             try:
                 # GLD 是最大的黃金 ETF
-                ticker = yf.Ticker("GLD")
-                df = ticker.history(start=start_date, end=end_date)
+                with self.track('yfinance'):
+                    ticker = yf.Ticker("GLD")
+                    df = ticker.history(start=start_date, end=end_date)
                 
                 if not df.empty:
                     df = df.reset_index()
@@ -47,7 +47,8 @@ class MacroClient(BaseAPIClient):
             api_key=API_KEYS.get('fred'),
             rate_limit_delay=0.5,
             daily_limit=None,
-            cache_ttl=86400  # 24小時快取
+            cache_ttl=86400,  # 24小時快取
+            source='fred'
         )
         
         # 初始化 FRED 客戶端
@@ -86,11 +87,12 @@ class MacroClient(BaseAPIClient):
         
         try:
             # 使用 fredapi 取得資料
-            series = self.fred.get_series(
-                indicator_code,
-                observation_start=start_date,
-                observation_end=end_date
-            )
+            with self.track():
+                series = self.fred.get_series(
+                    indicator_code,
+                    observation_start=start_date,
+                    observation_end=end_date
+                )
             
             if not series.empty:
                 df = series.reset_index()
@@ -26,7 +26,8 @@ class NewsClient(BaseAPIClient):
             base_url="https://www.alphavantage.co/query",
             rate_limit_delay=12,  # Alpha Vantage: 5 req/min
             daily_limit=500,
-            cache_ttl=3600
+            cache_ttl=3600,
+            source='alpha_vantage'
         )
         
         self.marketaux_key = API_KEYS.get('marketaux')
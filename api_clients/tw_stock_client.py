@@ -9,8 +9,8 @@ import sys
 from pathlib import Path
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-import requests
 import time
 
 # 添加專案根目錄
@@ -18,19 +18,18 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from api_clients.base_client import BaseAPIClient
 from loguru import logger
+from utils.lazy_import import lazy_module, module_available
+from data_loader.trading_calendar import get_calendar
 
-try:
-    import twstock
-    TWSTOCK_AVAILABLE = True
-except ImportError:
-    TWSTOCK_AVAILABLE = False
+# twstock / yfinance 於第一次查詢時才 import
+twstock = lazy_module('twstock')
+TWSTOCK_AVAILABLE = module_available('twstock')
+if not TWSTOCK_AVAILABLE:
     logger.warning("twstock 未安裝，將使用備援方案")
 
-try:
-    import yfinance as yf
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    YFINANCE_AVAILABLE = False
+yf = lazy_module('yfinance')
+YFINANCE_AVAILABLE = module_available('yfinance')
+if not YFINANCE_AVAILABLE:
     logger.warning("yfinance 未安裝")
 
 
@@ -42,7 +41,8 @@ class TWStockClient(BaseAPIClient):
             api_name="台股",
             rate_limit_delay=3,  # TWSE API 限流：建議每次請求間隔 3 秒
             daily_limit=None,
-            cache_ttl=3600
+            cache_ttl=3600,
+            source='twse'
         )
         
         # TWSE API（證券交易所）
@@ -67,7 +67,7 @@ class TWStockClient(BaseAPIClient):
             # TWSE 股票清單 API
             url = f"{self.twse_base_url}/rwd/zh/afterTrading/STOCK_DAY_ALL"
             
-            response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+            response = self._http_get('twse', url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -117,7 +117,7 @@ class TWStockClient(BaseAPIClient):
                 'se': 'EW'  # 上櫃股票
             }
             
-            response = requests.get(url, params=params, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+            response = self._http_get('tpex', url, params=params, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -216,10 +216,14 @@ class TWStockClient(BaseAPIClient):
             start_dt = datetime.strptime(start_date, '%Y-%m-%d')
             end_dt = datetime.strptime(end_date, '%Y-%m-%d')
             
-            # TWSE API 需要逐月查詢
-            current = start_dt
+            # TWSE API 需要逐月查詢；只查詢區間內有交易日的月份（整段休市、週末不發請求）
+            sessions = get_calendar('TWSE').sessions(start_dt, end_dt)
+            if len(sessions) == 0:
+                logger.info(f"{start_date} ~ {end_date} 沒有交易日，略過")
+                return pd.DataFrame()
+            months = np.unique(sessions.astype('datetime64[M]')).astype(object)
             
-            while current <= end_dt:
+            for current in months:
                 year = current.year
                 month = current.month
                 
@@ -232,7 +236,7 @@ class TWStockClient(BaseAPIClient):
                 }
                 
                 try:
-                    response = requests.get(url, params=params, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+                    response = self._http_get('twse', url, params=params, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
                     
                     if response.status_code == 200:
                         data = response.json()
@@ -264,16 +268,12 @@ class TWStockClient(BaseAPIClient):
                     
                 except Exception as e:
                     logger.warning(f"取得 {year}/{month} 資料失敗: {e}")
-                
-                # 移到下個月
-                if current.month == 12:
-                    current = current.replace(year=current.year + 1, month=1)
-                else:
-                    current = current.replace(month=current.month + 1)
             
             if all_data:
                 df = pd.DataFrame(all_data)
                 df['trade_date'] = pd.to_datetime(df['trade_date']).dt.date
+                # 每次查詢回傳整月資料，只保留要求的區間
+                df = df[(df['trade_date'] >= start_dt.date()) & (df['trade_date'] <= end_dt.date())]
                 df = df.sort_values('trade_date')
                 df['adjusted_close'] = df['close']  # 簡化處理
                 
@@ -309,7 +309,12 @@ class TWStockClient(BaseAPIClient):
             end_date = datetime.now().strftime('%Y-%m-%d')
         
         logger.info(f"取得 {stock_code} 價格資料：{start_date} ~ {end_date}")
-        
+
+        # 區間內沒有交易日時，任何來源都不會有資料
+        if get_calendar('TWSE').count_trading_days(start_date, end_date) == 0:
+            logger.info(f"{start_date} ~ {end_date} 沒有交易日，略過")
+            return pd.DataFrame()
+
         # 優先使用 TWSE OpenAPI（支援早期資料）
         df = self.get_daily_price_from_twse(stock_code, start_date, end_date)
         
@@ -319,8 +324,11 @@ class TWStockClient(BaseAPIClient):
         # 備援：使用 yfinance
         if YFINANCE_AVAILABLE:
             try:
-                ticker = yf.Ticker(f"{stock_code}.TW")
-                hist = ticker.history(start=start_date, end=end_date)
+                with self.track('yfinance'):
+                    ticker = yf.Ticker(f"{stock_code}.TW")
+                    # yfinance 的 end 不含當日，往後一天讓結束日期與 TWSE 一致（含當日）
+                    yf_end = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+                    hist = ticker.history(start=start_date, end=yf_end)
                 
                 if not hist.empty:
                     # 整理資料格式
@@ -352,7 +360,8 @@ class TWStockClient(BaseAPIClient):
                 
                 while current <= end_dt:
                     try:
-                        data = stock.fetch(current.year, current.month)
+                        with self.track('twstock'):
+                            data = stock.fetch(current.year, current.month)
                         all_data.extend(data)
                     except:
                         pass
@@ -442,7 +451,7 @@ class TWStockClient(BaseAPIClient):
                 'id': '1-5'  # 股權分散表
             }
             
-            response = requests.get(url, params=params, timeout=30)
+            response = self._http_get('tdcc', url, params=params, timeout=30)
             
             if response.status_code == 200:
                 # TDCC 資料是 CSV 格式
@@ -8,7 +8,7 @@
 import sys
 from pathlib import Path
 from typing import List, Dict, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -16,12 +16,12 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from api_clients.base_client import BaseAPIClient
 from config.settings import API_KEYS
 from loguru import logger
+from utils.lazy_import import lazy_module, module_available
 
-try:
-    import yfinance as yf
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    YFINANCE_AVAILABLE = False
+# yfinance 於第一次查詢時才 import
+yf = lazy_module('yfinance')
+YFINANCE_AVAILABLE = module_available('yfinance')
+if not YFINANCE_AVAILABLE:
     logger.warning("yfinance 未安裝")
 
 
@@ -35,7 +35,8 @@ class USStockClient(BaseAPIClient):
             base_url="https://api.tiingo.com",
             rate_limit_delay=1.0,
             daily_limit=None,
-            cache_ttl=3600
+            cache_ttl=3600,
+            source='tiingo'
         )
         
         self.alpha_vantage_key = API_KEYS.get('alpha_vantage')
@@ -116,8 +117,11 @@ class USStockClient(BaseAPIClient):
         # 優先使用 yfinance（免費且穩定）
         if YFINANCE_AVAILABLE:
             try:
-                ticker = yf.Ticker(symbol)
-                df = ticker.history(start=start_date, end=end_date)
+                with self.track('yfinance'):
+                    ticker = yf.Ticker(symbol)
+                    # yfinance 的 end 不含當日，往後一天讓結束日期包含在內
+                    yf_end = (datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+                    df = ticker.history(start=start_date, end=yf_end)
                 
                 if not df.empty:
                     # 整理格式
@@ -180,8 +184,9 @@ class USStockClient(BaseAPIClient):
         
         if YFINANCE_AVAILABLE:
             try:
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
+                with self.track('yfinance'):
+                    ticker = yf.Ticker(symbol)
+                    info = ticker.info
                 
                 return {
                     'symbol': symbol,
@@ -3,7 +3,7 @@ Flask API 服務 - 整合所有後端模組
 提供 RESTful API 給前端應用使用
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import os
@@ -16,19 +16,23 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'
 from calculators import FactorEngine
 from calculators.technical_indicators import TechnicalIndicators
 from ai.report_generator import DailyReportGenerator, DecisionTemplateGenerator
+from ai.streaming import format_sse
 from api_clients import TWStockClient, USStockClient
 from data_loader.database_connector import DatabaseConnector
+from utils import profiling
+from utils.lazy_import import lazy_singleton
 
 app = Flask(__name__)
 CORS(app)  # 允許跨域請求
+profiling.init_app(app)  # 路由延遲 / DB 時間統計（/api/system/metrics）
 
-# 初始化
+# 初始化（引擎、API 客戶端與 AI 報告產生器在第一次使用時才建立）
 db = DatabaseConnector()
-factor_engine = FactorEngine()
-tw_client = TWStockClient()
-us_client = USStockClient()
-daily_report_gen = DailyReportGenerator()
-decision_gen = DecisionTemplateGenerator()
+get_factor_engine = lazy_singleton(FactorEngine)
+get_tw_client = lazy_singleton(TWStockClient)
+get_us_client = lazy_singleton(USStockClient)
+get_daily_report_gen = lazy_singleton(DailyReportGenerator)
+get_decision_gen = lazy_singleton(DecisionTemplateGenerator)
 
 # ============ 健康檢查 ============
 @app.route('/health', methods=['GET'])
@@ -63,7 +67,7 @@ def get_factor_scores(stock_code):
         current_price = result[0]['close_price']
         
         # 計算因子分數
-        scores = factor_engine.calculate_all_factors(
+        scores = get_factor_engine().calculate_all_factors(
             stock_code, 
             current_price, 
             market,
@@ -113,7 +117,7 @@ def ai_daily_report():
     if request.method == 'POST':
         # 生成新報告
         try:
-            report = daily_report_gen.generate_daily_report()
+            report = get_daily_report_gen().generate_daily_report()
             return jsonify({
                 'success': True,
                 'report': report
@@ -144,7 +148,7 @@ def ai_decision_template(stock_code):
     """生成個股決策模板"""
     try:
         market = request.json.get('market', 'tw')
-        report = decision_gen.generate_decision_template(stock_code, market)
+        report = get_decision_gen().generate_decision_template(stock_code, market)
         
         return jsonify({
             'success': True,
@@ -155,6 +159,51 @@ def ai_decision_template(stock_code):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ============ AI 串流 API（Server-Sent Events）============
+def sse_response(make_generator, stream_method, *args):
+    """
+    以 SSE 轉送生成事件：meta → chunk... → done / error
+    
+    每個請求使用獨立的資料庫連線（共用 Gemini 客戶端與限流器）
+    """
+    def stream():
+        # 先送出註解行，讓代理與瀏覽器立即建立連線
+        yield ": connected\n\n"
+        generator = make_generator()
+        try:
+            for event, data in getattr(generator, stream_method)(*args):
+                yield format_sse(event, data)
+        except Exception as e:
+            yield format_sse('error', {'message': str(e)})
+        finally:
+            generator.close()
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/ai/daily-report/stream', methods=['GET'])
+@app.route('/api/ai/market-report/stream', methods=['GET'])
+def ai_daily_report_stream():
+    """串流生成每日戰略報告（?date=YYYY-MM-DD）"""
+    return sse_response(
+        lambda: DailyReportGenerator(ai_client=get_daily_report_gen().ai_client),
+        'stream_daily_report',
+        request.args.get('date')
+    )
+
+@app.route('/api/ai/decision-template/<stock_code>/stream', methods=['GET'])
+def ai_decision_template_stream(stock_code):
+    """串流生成個股決策模板（?market=tw|us）"""
+    return sse_response(
+        lambda: DecisionTemplateGenerator(ai_client=get_decision_gen().ai_client),
+        'stream_decision_template',
+        stock_code,
+        request.args.get('market', 'tw')
+    )
+
 # ============ TDCC 籌碼 API ============
 @app.route('/api/tdcc/<stock_code>', methods=['GET'])
 def get_tdcc_data(stock_code):
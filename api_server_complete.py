@@ -9,11 +9,13 @@ from psycopg2 import extras
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from utils import profiling
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'))
 
 app = Flask(__name__)
 CORS(app)
+profiling.init_app(app)
 
 # 資料庫連接函數
 def get_db():
@@ -8,12 +8,14 @@ from flask_cors import CORS
 import os
 from dotenv import load_dotenv
 from datetime import datetime
+from utils import profiling
 
 # 載入環境變數
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'))
 
 app = Flask(__name__)
 CORS(app)  # 允許跨域請求
+profiling.init_app(app)
 
 # ============ 健康檢查 ============
 @app.route('/api/health', methods=['GET'])
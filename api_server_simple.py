@@ -9,12 +9,14 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 import json
+from utils import profiling
 
 # 載入環境變數
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'))
 
 app = Flask(__name__)
 CORS(app)
+profiling.init_app(app)
 
 def get_db():
     return psycopg2.connect(
@@ -16,6 +16,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 from calculators.indicators import TechnicalIndicators
 from calculators.factors import FactorCalculator
+from data_loader.table_stats import get_source_freshness, get_table_stats
 
 # 添加AI clients
 try:
@@ -342,39 +343,37 @@ def market_summary():
     conn = get_db()
     cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
     
+    # 黃金與USD/TWD匯率：一次讀取 latest_quotes，尚未建立時回查原始表
     cursor.execute("""
-        SELECT close_price, trade_date 
-        FROM commodity_prices 
-        WHERE commodity_code = 'GOLD' 
-        ORDER BY trade_date DESC LIMIT 1
+        SELECT market, close_price, close_price AS rate, trade_date
+        FROM latest_quotes
+        WHERE (market, symbol) IN (('gold', 'GOLD'), ('fx', 'TWD/USD'))
     """)
-    gold = cursor.fetchone()
+    quotes = {row['market']: row for row in cursor.fetchall()}
+    gold = quotes.get('gold')
+    forex = quotes.get('fx')
     
-    cursor.execute("""
-        SELECT rate, trade_date 
-        FROM exchange_rates 
-        WHERE base_currency = 'USD' AND quote_currency = 'TWD' 
-        ORDER BY trade_date DESC LIMIT 1
-    """)
-    forex = cursor.fetchone()
+    if gold is None:
+        cursor.execute("""
+            SELECT close_price, trade_date 
+            FROM commodity_prices 
+            WHERE commodity_code = 'GOLD' 
+            ORDER BY trade_date DESC LIMIT 1
+        """)
+        gold = cursor.fetchone()
     
-    cursor.execute("SELECT COUNT(*) as count FROM tw_stock_info")
-    tw_count = cursor.fetchone()['count']
+    if forex is None:
+        cursor.execute("""
+            SELECT rate, trade_date 
+            FROM exchange_rates 
+            WHERE base_currency = 'USD' AND quote_currency = 'TWD' 
+            ORDER BY trade_date DESC LIMIT 1
+        """)
+        forex = cursor.fetchone()
     
-    cursor.execute("SELECT COUNT(*) as count FROM us_stock_info")
-    us_count = cursor.fetchone()['count']
-
-    cursor.execute("SELECT COUNT(*) as count FROM tw_stock_prices")
-    tw_price_count = cursor.fetchone()['count']
-
-    cursor.execute("SELECT COUNT(*) as count FROM us_stock_prices")
-    us_price_count = cursor.fetchone()['count']
-
-    cursor.execute("SELECT COUNT(*) as count FROM commodity_prices WHERE commodity_code = 'GOLD'")
-    gold_count = cursor.fetchone()['count']
-
-    cursor.execute("SELECT COUNT(*) as count FROM exchange_rates")
-    forex_count = cursor.fetchone()['count']
+    # 筆數與新鮮度：讀計數表與 sync_status，不對大表做 COUNT(*)
+    counts = get_table_stats(conn)
+    freshness = get_source_freshness(conn)
     
     cursor.close()
     conn.close()
@@ -383,19 +382,20 @@ def market_summary():
         'gold': {
             'price': float(gold['close_price']) if gold else 0,
             'date': str(gold['trade_date']) if gold else None,
-            'count': gold_count
+            'count': counts['gold_prices']['count'] or counts['commodity_prices']['count']
         },
         'forex': {
             'usd_twd': float(forex['rate']) if forex else 0,
             'date': str(forex['trade_date']) if forex else None,
-            'count': forex_count
+            'count': counts['exchange_rates']['count']
         },
         'stocks': {
-            'tw': tw_count,
-            'us': us_count,
-            'tw_prices': tw_price_count,
-            'us_prices': us_price_count
-        }
+            'tw': counts['tw_stock_info']['count'],
+            'us': counts['us_stock_info']['count'],
+            'tw_prices': counts['tw_stock_prices']['count'],
+            'us_prices': counts['us_stock_prices']['count']
+        },
+        'freshness': freshness
     })
 
 # ========== AI端點 - 測試連接 ==========
@@ -876,7 +876,7 @@ def get_portfolio():
                 up.avg_cost,
                 up.purchase_date,
                 up.notes,
-                CASE 
+                COALESCE(lq.close_price, CASE 
                     WHEN up.market = 'tw' THEN (
                         SELECT close_price 
                         FROM tw_stock_prices 
@@ -887,12 +887,14 @@ def get_portfolio():
                     WHEN up.market = 'us' THEN (
                         SELECT close_price 
                         FROM us_stock_prices 
-                        WHERE stock_code = up.stock_code 
+                        WHERE symbol = up.stock_code 
                         ORDER BY trade_date DESC 
                         LIMIT 1
                     )
-                END as current_price
+                END) as current_price
             FROM user_portfolios up
+            LEFT JOIN latest_quotes lq
+                ON lq.market = up.market AND lq.symbol = up.stock_code
             WHERE up.user_id = 1
             ORDER BY up.created_at DESC
         """)
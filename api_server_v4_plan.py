@@ -15,11 +15,13 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 from calculators.indicators import TechnicalIndicators
 from calculators.factors import FactorCalculator
+from utils import profiling
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'))
 
 app = Flask(__name__)
 CORS(app)
+profiling.init_app(app)
 
 def get_db():
     return psycopg2.connect(
@@ -5,11 +5,9 @@ API Server V5 - 完整版股價深度分析系統
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import psycopg2
-from psycopg2 import extras
 import os
 from dotenv import load_dotenv
 from datetime import datetime
-import pandas as pd
 import numpy as np
 import json
 import sys
@@ -19,6 +17,12 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 from calculators.position_analyzer import PositionAnalyzer
 from calculators.technical_indicators import TechnicalIndicators
+from calculators import indicator_kernels as kernels
+from data_loader.table_stats import get_source_freshness, get_table_stats
+from utils.typed_fetch import fetch_arrays, dates_to_iso
+from utils import fast_json
+from utils import pagination
+from utils import profiling
 
 # 導入籌碼API
 from chips_api import chips_api
@@ -31,11 +35,21 @@ from cycle_sentiment_api import cycle_sentiment_bp
 from quant_api import quant_bp
 # 導入稅務API
 from tax_api import tax_api
+# 導入AI任務佇列API
+from ai_jobs_api import ai_jobs_bp
+# 導入多標的批次查詢API
+from bulk_api import PRICE_KEYS, PRICE_TABLES, bulk_api, ma_column
+# 導入系統API狀態（實際流量遙測）
+from system_status_api import system_status_bp
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'))
 
 app = Flask(__name__)
 CORS(app)
+# orjson 編碼、ETag / If-None-Match、大型回應壓縮
+fast_json.init_app(app)
+# 路由延遲、DB / 外部 API 時間、快取命中率（/api/system/metrics）與 X-Profile 單請求分析
+profiling.init_app(app)
 
 # 註冊Blueprint
 app.register_blueprint(chips_api)
@@ -43,6 +57,9 @@ app.register_blueprint(macro_bp)
 app.register_blueprint(cycle_sentiment_bp)
 app.register_blueprint(quant_bp)
 app.register_blueprint(tax_api, url_prefix='/api/tax')
+app.register_blueprint(ai_jobs_bp)
+app.register_blueprint(bulk_api)
+app.register_blueprint(system_status_bp)
 
 def get_db():
     return psycopg2.connect(
@@ -56,55 +73,32 @@ def get_db():
 # ========== 健康檢查 ==========
 @app.route('/api/market/summary', methods=['GET'])
 def market_summary():
-    """獲取市場數據庫狀態總覽"""
+    """
+    獲取市場數據庫狀態總覽
+    
+    筆數讀取 table_row_counts（無計數時以 pg_class 估計值代替），
+    新鮮度讀取 sync_status，不對價格大表做 COUNT(*)
+    """
     try:
         conn = get_db()
-        cursor = conn.cursor()
-        
-        # 定義要檢查的表
-        queries = {
-            'tw_prices': "SELECT COUNT(*) FROM tw_stock_prices",
-            'us_prices': "SELECT COUNT(*) FROM us_stock_prices",
-            'gold': "SELECT COUNT(*) FROM commodities WHERE type='gold'", # 假設表結構
-            'forex': "SELECT COUNT(*) FROM exchange_rates"
-        }
+        try:
+            counts = get_table_stats(conn)
+            freshness = get_source_freshness(conn)
+        finally:
+            conn.close()
         
         stats = {
-            'stocks': {'tw_prices': 0, 'us_prices': 0},
-            'gold': {'count': 0},
-            'forex': {'count': 0},
+            'stocks': {
+                'tw_prices': counts['tw_stock_prices']['count'],
+                'us_prices': counts['us_stock_prices']['count']
+            },
+            'gold': {'count': counts['gold_prices']['count'] or counts['commodity_prices']['count']},
+            'forex': {'count': counts['exchange_rates']['count']},
+            'exact': all(counts[t]['exact'] for t in ('tw_stock_prices', 'us_stock_prices', 'exchange_rates')),
+            'freshness': freshness,
             'status': 'online'
         }
         
-        # 執行查詢
-        try:
-            cursor.execute(queries['tw_prices'])
-            stats['stocks']['tw_prices'] = cursor.fetchone()[0]
-        except: pass
-
-        try:
-            cursor.execute(queries['us_prices'])
-            stats['stocks']['us_prices'] = cursor.fetchone()[0]
-        except: pass
-        
-        try:
-            # 檢查表是否存在
-            cursor.execute("SELECT to_regclass('commodities')")
-            if cursor.fetchone()[0]:
-                cursor.execute("SELECT COUNT(*) FROM commodities")
-                stats['gold']['count'] = cursor.fetchone()[0]
-        except: pass
-
-        try:
-            cursor.execute("SELECT to_regclass('exchange_rates')")
-            if cursor.fetchone()[0]:
-                cursor.execute(queries['forex'])
-                stats['forex']['count'] = cursor.fetchone()[0]
-        except: pass
-
-        cursor.close()
-        conn.close()
-        
         return jsonify(stats)
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)}), 500
@@ -126,6 +120,12 @@ def health():
         return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
 
 # ========== 股價深度分析 ==========
+def _last_or(values, default):
+    """取陣列最後一個值；空陣列或 NaN 時回傳預設值"""
+    if len(values) == 0 or np.isnan(values[-1]):
+        return default
+    return float(values[-1])
+
 @app.route('/api/analysis/depth/<stock_code>', methods=['GET'])
 def depth_analysis(stock_code):
     """
@@ -137,63 +137,59 @@ def depth_analysis(stock_code):
     
     try:
         conn = get_db()
-        cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
-        
-        # 獲取價格與成交量數據
-        table_name = 'tw_stock_prices' if market == 'tw' else 'us_stock_prices'
-        cursor.execute(f"""
-            SELECT trade_date, high_price, low_price, close_price, volume
-            FROM {table_name}
-            WHERE stock_code = %s
+        cursor = conn.cursor()
+        
+        # 獲取價格與成交量數據（直接取為陣列，反轉為由舊到新）
+        columns = fetch_arrays(cursor, f"""
+            SELECT high_price, low_price, close_price, volume
+            FROM {price_table(market)}
+            WHERE {price_key(market)} = %s
             ORDER BY trade_date DESC
             LIMIT 252
-        """, (stock_code,))
+        """, (stock_code,), reverse=True)
         
-        data = cursor.fetchall()
         cursor.close()
         conn.close()
         
-        if not data:
-            return jsonify({'error': f'找不到 {stock_code} 的數據'}), 404
+        prices = columns['close_price']
+        highs = columns['high_price']
+        lows = columns['low_price']
+        volumes = columns['volume']
         
-        # 轉換為Series（反轉順序，從舊到新）
-        data = list(reversed(data))
-        prices = pd.Series([float(d['close_price']) for d in data])
-        highs = pd.Series([float(d['high_price']) for d in data])
-        lows = pd.Series([float(d['low_price']) for d in data])
-        volumes = pd.Series([int(d['volume']) for d in data])
+        if not len(prices):
+            return jsonify({'error': f'找不到 {stock_code} 的數據'}), 404
         
-        # 使用計算器
+        # 使用計算器（陣列版本，不建立 Series）
         analyzer = PositionAnalyzer()
-        tech_calc = TechnicalIndicators()
         
         # 1. 位階分析
-        position_level = analyzer.calculate_position_level(prices)
+        position_level = analyzer.calculate_position_level_array(prices)
         
         # 2. 趨勢分析
-        trend = analyzer.analyze_trend(prices)
+        trend = analyzer.analyze_trend_array(prices)
         
         # 3. 量價關係
-        volume_price = analyzer.analyze_volume_price_relation(prices, volumes)
+        volume_price = analyzer.analyze_volume_price_relation_array(prices, volumes)
         
         # 4. 技術指標
-        rsi = tech_calc.calculate_rsi(prices)
-        macd_line, signal_line, histogram = tech_calc.calculate_macd(prices)
-        k, d = tech_calc.calculate_kd(highs, lows, prices)
+        rsi = kernels.rsi(prices)
+        macd = kernels.macd(prices)
+        kd = kernels.kd(highs, lows, prices)
         
-        # 整理技術指標訊號
+        # 整理技術指標訊號（NaN 時以中性值代替）
+        rsi_value = _last_or(rsi, 50)
         technical_signals = {
             'rsi': {
-                'value': float(rsi.iloc[-1]) if len(rsi) > 0 else 50,
-                'signal': tech_calc.get_signal_interpretation('rsi', rsi.iloc[-1] if len(rsi) > 0 else 50)['signal']
+                'value': rsi_value,
+                'signal': TechnicalIndicators.get_signal_interpretation('rsi', rsi_value)['signal']
             },
             'macd': {
-                'value': float(macd_line.iloc[-1]) if len(macd_line) > 0 else 0,
-                'signal': '多頭訊號' if (len(histogram) > 0 and histogram.iloc[-1] > 0) else '空頭訊號'
+                'value': _last_or(macd['macd'], 0),
+                'signal': '多頭訊號' if _last_or(macd['histogram'], 0) > 0 else '空頭訊號'
             },
             'kd': {
-                'k': float(k.iloc[-1]) if len(k) > 0 else 50,
-                'd': float(d.iloc[-1]) if len(d) > 0 else 50
+                'k': _last_or(kd['k'], 50),
+                'd': _last_or(kd['d'], 50)
             }
         }
         
@@ -210,7 +206,7 @@ def depth_analysis(stock_code):
             'stock_code': stock_code,
             'market': market,
             'analysis_date': datetime.now().isoformat(),
-            'data_points': len(data),
+            'data_points': len(prices),
             'position_analysis': position_level,
             'trend_analysis': trend,
             'volume_price_relation': volume_price,
@@ -275,73 +271,109 @@ def get_ai_reports():
         return jsonify({'error': str(e)}), 500
 
 # ========== 價格數據 ==========
+PRICE_COLUMNS = 'trade_date, open_price, high_price, low_price, close_price, volume'
+
+
+def price_table(market: str) -> str:
+    return PRICE_TABLES['tw' if market == 'tw' else 'us']
+
+
+def price_key(market: str) -> str:
+    """價格表的標的欄位（tw_stock_prices.stock_code / us_stock_prices.symbol）"""
+    return PRICE_KEYS['tw' if market == 'tw' else 'us']
+
+
+def price_filters(market: str, code: str) -> dict:
+    return {price_key(market): code}
+
+
+def price_payload(columns, page, columnar=None):
+    """價格查詢結果（keyset_query 原始順序）→ 回應內容（ASGI 服務共用）"""
+    columns, has_more = pagination.trim_page(columns, page)
+    dates = dates_to_iso(columns['trade_date'])
+    data = fast_json.tabular({
+        'trade_date': dates,
+        'open_price': np.nan_to_num(columns['open_price'], nan=0.0),
+        'high_price': np.nan_to_num(columns['high_price'], nan=0.0),
+        'low_price': np.nan_to_num(columns['low_price'], nan=0.0),
+        'close_price': np.nan_to_num(columns['close_price'], nan=0.0),
+        'volume': np.nan_to_num(columns['volume'], nan=0.0).astype(np.int64)
+    }, columnar)
+    return {'data': data, 'page': pagination.page_info(dates, page, has_more)}
+
+
 @app.route('/api/prices/<code>', methods=['GET'])
 def get_prices(code):
-    """獲取股價數據"""
+    """
+    獲取股價數據（依交易日 keyset 分頁，由舊到新）
+    Query Parameters:
+        market: 'tw' or 'us' (預設 'tw')
+        limit: 筆數（舊參數 days 相同，上限 1000）
+        before: 取早於該日的資料（往前翻頁）
+        since / after: 只取晚於該日的新資料（增量更新）
+        format: 'columnar' 時以欄式回傳
+    """
     try:
         market = request.args.get('market', 'tw')
-        days = int(request.args.get('days', 100))
-        
+        page = pagination.parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
         conn = get_db()
         cursor = conn.cursor()
         
-        table = 'tw_stock_prices' if market == 'tw' else 'us_stock_prices'
-        
-        cursor.execute(f"""
-            SELECT trade_date, open_price, high_price, low_price, close_price, volume
-            FROM {table}
-            WHERE stock_code = %s
-            ORDER BY trade_date ASC
-            LIMIT %s
-        """, (code, days))
-        
-        data = []
-        for row in cursor.fetchall():
-            data.append({
-                'trade_date': row[0].isoformat() if row[0] else None,
-                'open_price': float(row[1]) if row[1] else 0,
-                'high_price': float(row[2]) if row[2] else 0,
-                'low_price': float(row[3]) if row[3] else 0,
-                'close_price': float(row[4]) if row[4] else 0,
-                'volume': int(row[5]) if row[5] else 0
-            })
+        query, params = pagination.keyset_query(price_table(market), PRICE_COLUMNS, price_filters(market, code), page)
+        columns = fetch_arrays(cursor, query, params, dtypes={'trade_date': 'datetime64[D]'})
         
         cursor.close()
         conn.close()
         
-        return jsonify({'data': data})
+        return jsonify(price_payload(columns, page))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # ========== 技術指標 ==========
+def indicator_filters(market: str, code: str) -> dict:
+    """technical_indicators 的標的條件（security_type 為 'TW' / 'US'）"""
+    return {'security_type': market.upper(), 'security_code': code}
+
+
 @app.route('/api/indicators/<code>/ma', methods=['GET'])
 def get_ma(code):
-    """獲取移動平均"""
+    """
+    獲取移動平均（分頁參數同 /api/prices/<code>，預設最近 1000 筆）
+    """
     market = request.args.get('market', 'tw')
-    period = int(request.args.get('period', 20))
+    try:
+        column = ma_column(int(request.args.get('period', 20)))
+        page = pagination.parse_page_args(request.args, default_limit=pagination.MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
         conn = get_db()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT trade_date, ma
-            FROM technical_indicators
-            WHERE stock_code = %s AND market = %s AND period = %s
-            ORDER BY trade_date ASC
-        """, (code, market, period))
-        
-        data = []
-        for row in cursor.fetchall():
-            data.append({
-                'trade_date': row[0].isoformat() if row[0] else None,
-                'ma': float(row[1]) if row[1] else 0
-            })
+        query, params = pagination.keyset_query(
+            'technical_indicators',
+            f'trade_date, {column} AS ma',
+            indicator_filters(market, code),
+            page
+        )
+        columns = fetch_arrays(cursor, query, params, dtypes={'trade_date': 'datetime64[D]'})
         
         cursor.close()
         conn.close()
         
-        return jsonify({'data': data})
+        columns, has_more = pagination.trim_page(columns, page)
+        dates = dates_to_iso(columns['trade_date'])
+        data = fast_json.tabular({
+            'trade_date': dates,
+            'ma': np.nan_to_num(columns['ma'], nan=0.0)
+        })
+        
+        return jsonify({'data': data, 'page': pagination.page_info(dates, page, has_more)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -357,34 +389,34 @@ def get_signals(code):
         cursor = conn.cursor()
         
         # 獲取MA5和MA20數據
-        cursor.execute("""
-            SELECT ti5.trade_date, ti5.ma as ma5, ti20.ma as ma20
-            FROM (SELECT * FROM technical_indicators WHERE stock_code = %s AND market = %s AND period = 5 ORDER BY trade_date ASC LIMIT %s) ti5
-            LEFT JOIN (SELECT * FROM technical_indicators WHERE stock_code = %s AND market = %s AND period = 20) ti20
-            ON ti5.trade_date = ti20.trade_date AND ti5.stock_code = ti20.stock_code
-            WHERE ti5.ma IS NOT NULL AND ti20.ma IS NOT NULL
-            ORDER BY ti5.trade_date ASC
-        """, (code, market, days, code, market))
-        
-        ma_data = cursor.fetchall()
+        ma = fetch_arrays(cursor, """
+            SELECT trade_date, ma_5 AS ma5, ma_20 AS ma20
+            FROM technical_indicators
+            WHERE security_type = %s AND security_code = %s
+              AND ma_5 IS NOT NULL AND ma_20 IS NOT NULL
+            ORDER BY trade_date DESC
+            LIMIT %s
+        """, (market.upper(), code, days), dtypes={'trade_date': 'datetime64[D]'}, reverse=True)
+        
         signals = []
         
-        # 檢測黃金/死亡交叉
-        for i in range(1, len(ma_data)):
-            prev_ma5, prev_ma20 = float(ma_data[i-1][1] or 0), float(ma_data[i-1][2] or 0)
-            curr_ma5, curr_ma20 = float(ma_data[i][1] or 0), float(ma_data[i][2] or 0)
-            
-            if prev_ma5 <= prev_ma20 and curr_ma5 > curr_ma20:
+        # 檢測黃金/死亡交叉（以陣列比較前後兩日）
+        ma5, ma20 = ma['ma5'], ma['ma20']
+        ma_dates = dates_to_iso(ma['trade_date'])
+        golden = (ma5[:-1] <= ma20[:-1]) & (ma5[1:] > ma20[1:])
+        death = (ma5[:-1] >= ma20[:-1]) & (ma5[1:] < ma20[1:])
+        for i in np.flatnonzero(golden | death) + 1:
+            if golden[i - 1]:
                 signals.append({
-                    'date': ma_data[i][0].isoformat(),
+                    'date': ma_dates[i],
                     'type': 'golden_cross',
                     'description': 'MA5上穿MA20',
                     'action': 'buy',
                     'position': 'belowBar'
                 })
-            elif prev_ma5 >= prev_ma20 and curr_ma5 < curr_ma20:
+            else:
                 signals.append({
-                    'date': ma_data[i][0].isoformat(),
+                    'date': ma_dates[i],
                     'type': 'death_cross',
                     'description': 'MA5下穿MA20',
                     'action': 'sell',
@@ -392,27 +424,31 @@ def get_signals(code):
                 })
         
         # 獲取RSI數據
-        cursor.execute("""
-            SELECT trade_date, rsi
+        rsi_columns = fetch_arrays(cursor, """
+            SELECT trade_date, COALESCE(rsi_14_wilder, rsi_14) AS rsi
             FROM technical_indicators
-            WHERE stock_code = %s AND market = %s AND rsi IS NOT NULL
-            ORDER BY trade_date ASC
+            WHERE security_type = %s AND security_code = %s
+              AND COALESCE(rsi_14_wilder, rsi_14) IS NOT NULL
+            ORDER BY trade_date DESC
             LIMIT %s
-        """, (code, market, days))
+        """, (market.upper(), code, days), dtypes={'trade_date': 'datetime64[D]'}, reverse=True)
         
-        for row in cursor.fetchall():
-            rsi = float(row[1]) if row[1] else 50
+        rsi_values = rsi_columns['rsi']
+        rsi_values = np.where(rsi_values > 0, rsi_values, 50)
+        rsi_dates = dates_to_iso(rsi_columns['trade_date'])
+        for i in np.flatnonzero((rsi_values >= 70) | (rsi_values <= 30)):
+            rsi = float(rsi_values[i])
             if rsi >= 70:
                 signals.append({
-                    'date': row[0].isoformat(),
+                    'date': rsi_dates[i],
                     'type': 'rsi_overbought',
                     'description': f'RSI超買 ({rsi:.1f})',
                     'action': 'sell',
                     'position': 'aboveBar'
                 })
-            elif rsi <= 30:
+            else:
                 signals.append({
-                    'date': row[0].isoformat(),
+                    'date': rsi_dates[i],
                     'type': 'rsi_oversold',
                     'description': f'RSI超賣 ({rsi:.1f})',
                     'action': 'buy',
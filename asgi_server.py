@@ -0,0 +1,221 @@
+"""
+ASGI API 服務 - 非同步模式
+
+與 api_server_v5.py 提供相同的 API：
+- 長時間或高併發的端點以 async handler 實作
+    · 價格查詢：asyncpg 連線池，等待資料庫時不佔用 worker
+    · 量化計算（蒙地卡羅 / 效率前緣 / 風險分析）：calculators.quant_jobs 任務，
+      指紋快取命中直接回傳，否則於程序池計算，等待時不阻塞事件迴圈
+    · AI 決策模板：模型呼叫為可等待的 I/O，同一 worker 可同時等待多個生成
+- 其餘 Blueprint 路由掛載原 Flask app（a2wsgi，於執行緒池中執行）
+
+啟動方式：
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+import asyncio
+import contextlib
+import hashlib
+import os
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from a2wsgi import WSGIMiddleware
+from loguru import logger
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+sys.path.insert(0, str(Path(__file__).parent))
+import api_server_v5
+import bulk_api
+import quant_api
+from ai.job_queue import create_ai_client
+from ai.report_generator import DecisionTemplateGenerator
+from calculators import quant_jobs
+from calculators.quant_jobs import QuantInputError
+from config.settings import QUANT_JOB_CONFIG
+from utils import async_db, fast_json, pagination
+from utils.typed_fetch import group_arrays
+
+
+class _State:
+    """lifespan 建立的程序內共用資源"""
+    pool = None
+    ai_client = None
+
+
+state = _State()
+
+
+def json_response(request, payload, status_code: int = 200) -> Response:
+    """
+    以 orjson 編碼的 JSON 回應（行為與 Flask 端 fast_json.init_app 相同：
+    GET 加上 weak ETag 並處理 If-None-Match，大型回應依 Accept-Encoding 壓縮）
+    """
+    body = fast_json.dumps_bytes(payload)
+    headers = {}
+    if status_code == 200 and request.method == 'GET':
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        if etag in request.headers.get('if-none-match', ''):
+            return Response(status_code=304, headers={'ETag': etag})
+        headers['ETag'] = etag
+
+    body, encoding = fast_json.compress_body(body, request.headers.get('accept-encoding', ''))
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        headers['Vary'] = 'Accept-Encoding'
+    return Response(body, status_code, headers, media_type='application/json')
+
+
+async def _request_body(request) -> dict:
+    try:
+        return await request.json() or {}
+    except ValueError:
+        return {}
+
+
+# ========== 價格數據 ==========
+async def get_prices(request):
+    """同 api_server_v5 /api/prices/<code>（asyncpg）"""
+    code = request.path_params['code']
+    try:
+        market = request.query_params.get('market', 'tw')
+        page = pagination.parse_page_args(request.query_params)
+    except ValueError as e:
+        return json_response(request, {'error': str(e)}, 400)
+
+    try:
+        query, params = pagination.keyset_query(
+            api_server_v5.price_table(market), api_server_v5.PRICE_COLUMNS,
+            api_server_v5.price_filters(market, code), page
+        )
+        columns = await async_db.fetch_arrays_async(
+            state.pool, query, params, dtypes={'trade_date': 'datetime64[D]'}
+        )
+        payload = api_server_v5.price_payload(
+            columns, page, fast_json.columnar_requested(request.query_params)
+        )
+        return json_response(request, payload)
+    except Exception as e:
+        return json_response(request, {'error': str(e)}, 500)
+
+
+async def bulk_prices(request):
+    """同 bulk_api /api/bulk/prices（asyncpg，各市場查詢並行）"""
+    options = await _request_body(request) if request.method == 'POST' else request.query_params
+    try:
+        symbols = bulk_api.parse_symbols(options.get('symbols'), options.get('market', 'tw'))
+        page = pagination.parse_page_args(options)
+    except ValueError as e:
+        return json_response(request, {'error': str(e)}, 400)
+
+    async def fetch_market(market, codes):
+        query = bulk_api.price_rows_query(market, api_server_v5.PRICE_COLUMNS, page)
+        columns = await async_db.fetch_arrays_async(
+            state.pool, query, (codes,) + bulk_api.cursor_params(page),
+            dtypes={'stock_code': object, 'trade_date': 'datetime64[D]'}
+        )
+        return market, codes, group_arrays(columns, 'stock_code')
+
+    try:
+        results = await asyncio.gather(*(fetch_market(m, c) for m, c in symbols.items()))
+        data, missing = {}, []
+        for market, codes, grouped in results:
+            data[market] = {code: bulk_api.columnar_series(grouped[code]) for code in codes if code in grouped}
+            missing += [f'{market}:{code}' for code in codes if code not in grouped]
+        return json_response(request, {'data': data, 'missing': missing, 'limit': page['limit']})
+    except Exception as e:
+        return json_response(request, {'error': str(e)}, 500)
+
+
+# ========== 進階量化分析 ==========
+def quant_endpoint(job_type: str):
+    """同 quant_api /api/quant/<job_type>（任務於程序池執行，等待時不阻塞事件迴圈）"""
+    async def handler(request):
+        data = await _request_body(request)
+        try:
+            # 指紋快取查詢與建立任務為阻塞式資料庫操作
+            job = await asyncio.to_thread(quant_api.submit_job, job_type, data)
+            if job['status'] not in quant_jobs.FINISHED_STATUSES:
+                future = quant_jobs.default_executor().future(job['id'])
+                if future is None:
+                    # 其他程序正在計算相同指紋的任務：輪詢資料表
+                    job = await asyncio.to_thread(quant_api.load_job, job['id'], QUANT_JOB_CONFIG['wait_seconds'])
+                else:
+                    # shield：逾時只停止等待，不取消程序池中的任務
+                    with contextlib.suppress(Exception):
+                        await asyncio.wait_for(
+                            asyncio.shield(asyncio.wrap_future(future)), QUANT_JOB_CONFIG['wait_seconds']
+                        )
+                    job = await asyncio.to_thread(quant_api.load_job, job['id'])
+            payload, status_code = quant_api.job_response(job)
+            return json_response(request, payload, status_code)
+        except QuantInputError as e:
+            return json_response(request, {'success': False, 'error': str(e)}, 400)
+        except Exception as e:
+            return json_response(request, {'success': False, 'error': str(e)}, 500)
+
+    return handler
+
+
+# ========== AI 報告 ==========
+def _shared_ai_client():
+    """程序內共用的模型客戶端（首次使用時建立，共用限流器）"""
+    if state.ai_client is None:
+        state.ai_client = create_ai_client()
+    return state.ai_client
+
+
+async def ai_decision_template(request):
+    """生成個股決策模板（body: {"market": "tw"}；快取命中時不呼叫模型）"""
+    stock_code = request.path_params['stock_code']
+    market = (await _request_body(request)).get('market', 'tw')
+
+    generator = None
+    try:
+        # 每個請求使用獨立的資料庫連線（建立連線為阻塞操作）
+        generator = await asyncio.to_thread(DecisionTemplateGenerator, _shared_ai_client())
+        report = await generator.generate_decision_template_async(stock_code, market)
+        return json_response(request, {'success': True, 'stock_code': stock_code, 'report': report})
+    except Exception as e:
+        return json_response(request, {'error': str(e)}, 500)
+    finally:
+        if generator:
+            await asyncio.to_thread(generator.close)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    state.pool = await async_db.create_pool()
+    logger.info(f"ASGI 服務啟動（pid {os.getpid()}）")
+    try:
+        yield
+    finally:
+        quant_jobs.default_executor().shutdown()
+        await state.pool.close()
+
+
+routes = [
+    Route('/api/prices/{code}', get_prices, methods=['GET']),
+    Route('/api/bulk/prices', bulk_prices, methods=['GET', 'POST']),
+    Route('/api/quant/monte-carlo', quant_endpoint('monte-carlo'), methods=['POST']),
+    Route('/api/quant/efficient-frontier', quant_endpoint('efficient-frontier'), methods=['POST']),
+    Route('/api/quant/risk-analysis', quant_endpoint('risk-analysis'), methods=['POST']),
+    Route('/api/ai/decision-template/{stock_code}', ai_decision_template, methods=['POST']),
+    # 其餘路由沿用 Flask app（Blueprint 不需改寫）
+    Mount('/', app=WSGIMiddleware(api_server_v5.app)),
+]
+
+app = Starlette(
+    routes=routes,
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('asgi_server:app', host='0.0.0.0', port=5000, workers=int(os.getenv('ASGI_WORKERS', 4)))
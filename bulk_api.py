@@ -0,0 +1,278 @@
+"""
+多標的批次查詢 API
+儀表板與投資組合頁一次取得多檔股票的價格、均線與籌碼分析
+
+標的以 symbols 傳入（逗號分隔字串或列表），'2330' 使用預設市場，
+'us:AAPL' 指定市場；每個資料表只執行一次查詢，回傳 {市場: {代碼: 欄式資料}}。
+"""
+from collections import OrderedDict
+from flask import Blueprint, jsonify, request
+import numpy as np
+import psycopg2
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from calculators.institutional_analyzer import InstitutionalAnalyzer
+from calculators.margin_analyzer import MarginAnalyzer
+from data_loader.sync_planner import SYNC_SOURCES
+from utils.typed_fetch import fetch_arrays, dates_to_iso, group_arrays
+from utils import pagination
+
+bulk_api = Blueprint('bulk_api', __name__)
+
+MAX_SYMBOLS = 200
+# 價格表與標的欄位（tw_stock_prices.stock_code / us_stock_prices.symbol）
+PRICE_TABLES = {market.lower(): source['table'] for market, source in SYNC_SOURCES.items()}
+PRICE_KEYS = {market.lower(): source['key'] for market, source in SYNC_SOURCES.items()}
+
+# technical_indicators 每個 (security_type, security_code, trade_date) 一列，均線各週期為 ma_<週期> 欄位
+MA_PERIODS = (5, 10, 20, 60, 120, 240)
+
+
+def get_db():
+    return psycopg2.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '15432')),
+        database=os.getenv('DB_NAME', 'quant_db'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'postgres')
+    )
+
+
+def parse_symbols(values, default_market: str = 'tw') -> 'OrderedDict[str, list]':
+    """
+    解析標的列表
+
+    Args:
+        values: ['2330', 'us:AAPL'] 或 '2330,us:AAPL'
+        default_market: 未指定市場時使用
+
+    Returns:
+        {市場: [代碼, ...]}（去除重複，保留順序）
+
+    Raises:
+        ValueError: 未提供標的、超過上限或市場不支援
+    """
+    if isinstance(values, str):
+        values = values.split(',')
+
+    grouped = OrderedDict()
+    for value in values or []:
+        value = str(value).strip()
+        if not value:
+            continue
+        market, _, code = value.rpartition(':')
+        market = (market or default_market).lower()
+        if market not in PRICE_TABLES:
+            raise ValueError(f'不支援的市場：{market}')
+        codes = grouped.setdefault(market, [])
+        if code not in codes:
+            codes.append(code)
+
+    count = sum(len(codes) for codes in grouped.values())
+    if not count:
+        raise ValueError('請提供 symbols')
+    if count > MAX_SYMBOLS:
+        raise ValueError(f'一次最多 {MAX_SYMBOLS} 檔標的')
+    return grouped
+
+
+def _request_options() -> dict:
+    """GET 讀 query string，POST 讀 JSON body（兩者欄位相同）"""
+    if request.method == 'POST':
+        return request.get_json(silent=True) or {}
+    return request.args
+
+
+def latest_rows_query(table: str, columns: str, page: dict, filters: str = '', key: str = 'stock_code') -> str:
+    """
+    每個標的最近 N 筆（或 since 之後）的單一查詢
+
+    以 unnest(代碼陣列) LATERAL JOIN 讓每個標的各走一次 (代碼, trade_date) 索引；
+    key 為資料表的標的欄位，結果一律以 stock_code 欄位回傳代碼；
+    參數順序：代碼陣列、filters 參數、游標日期（若有）、limit
+    """
+    if page['after']:
+        cursor_clause, order = 'AND trade_date > %s', 'ASC'
+    elif page['before']:
+        cursor_clause, order = 'AND trade_date < %s', 'DESC'
+    else:
+        cursor_clause, order = '', 'DESC'
+
+    return f"""
+        SELECT s.code AS stock_code, t.*
+        FROM unnest(%s::text[]) AS s(code)
+        CROSS JOIN LATERAL (
+            SELECT {columns}
+            FROM {table}
+            WHERE {key} = s.code {filters} {cursor_clause}
+            ORDER BY trade_date {order}
+            LIMIT %s
+        ) t
+        ORDER BY s.code, t.trade_date
+    """
+
+
+def ma_column(period: int) -> str:
+    """均線週期 → technical_indicators 欄位名稱（不支援的週期丟出 ValueError）"""
+    if period not in MA_PERIODS:
+        raise ValueError(f"period 必須為 {' / '.join(map(str, MA_PERIODS))}")
+    return f'ma_{period}'
+
+
+def price_rows_query(market: str, columns: str, page: dict) -> str:
+    """市場價格表的 latest_rows_query（美股以 symbol 欄位查詢）"""
+    return latest_rows_query(PRICE_TABLES[market], columns, page, key=PRICE_KEYS[market])
+
+
+def cursor_params(page: dict) -> tuple:
+    """latest_rows_query 中 filters 之後的參數（游標日期、limit）"""
+    cursor_date = page['after'] or page['before']
+    return ((cursor_date,) if cursor_date else ()) + (page['limit'],)
+
+
+def _fetch_grouped(cursor, query: str, params: tuple) -> dict:
+    columns = fetch_arrays(cursor, query, params, dtypes={
+        'stock_code': object, 'trade_date': 'datetime64[D]'
+    })
+    return group_arrays(columns, 'stock_code')
+
+
+def columnar_series(series: dict) -> dict:
+    """單一標的的欄位陣列 → 欄式回應（日期轉 ISO、空值補 0）"""
+    payload = {'trade_date': dates_to_iso(series.pop('trade_date'))}
+    for name, values in series.items():
+        values = np.nan_to_num(values, nan=0.0)
+        payload[name] = values.astype(np.int64) if name == 'volume' else values
+    return payload
+
+
+@bulk_api.route('/api/bulk/prices', methods=['GET', 'POST'])
+def bulk_prices():
+    """
+    批次獲取股價（欄式）
+    參數：
+        symbols: 標的列表
+        market: 預設市場（預設 'tw'）
+        limit / before / since: 同 /api/prices/<code>，套用於每個標的
+    """
+    options = _request_options()
+    try:
+        symbols = parse_symbols(options.get('symbols'), options.get('market', 'tw'))
+        page = pagination.parse_page_args(options)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+
+        data, missing = {}, []
+        for market, codes in symbols.items():
+            query = price_rows_query(
+                market,
+                'trade_date, open_price, high_price, low_price, close_price, volume',
+                page
+            )
+            grouped = _fetch_grouped(cursor, query, (codes,) + cursor_params(page))
+            data[market] = {code: columnar_series(grouped[code]) for code in codes if code in grouped}
+            missing += [f'{market}:{code}' for code in codes if code not in grouped]
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({'data': data, 'missing': missing, 'limit': page['limit']})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bulk_api.route('/api/bulk/indicators/ma', methods=['GET', 'POST'])
+def bulk_ma():
+    """
+    批次獲取移動平均（欄式）
+    參數：symbols、market、period（預設 20）、limit / before / since
+    """
+    options = _request_options()
+    try:
+        symbols = parse_symbols(options.get('symbols'), options.get('market', 'tw'))
+        column = ma_column(int(options.get('period', 20)))
+        page = pagination.parse_page_args(options)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+
+        data, missing = {}, []
+        for market, codes in symbols.items():
+            query = latest_rows_query(
+                'technical_indicators', f'trade_date, {column} AS ma', page,
+                filters='AND security_type = %s', key='security_code'
+            )
+            grouped = _fetch_grouped(cursor, query, (codes, market.upper()) + cursor_params(page))
+            data[market] = {code: columnar_series(grouped[code]) for code in codes if code in grouped}
+            missing += [f'{market}:{code}' for code in codes if code not in grouped]
+
+        cursor.close()
+        conn.close()
+
+        return jsonify({'data': data, 'missing': missing, 'limit': page['limit']})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bulk_api.route('/api/bulk/chips', methods=['GET', 'POST'])
+def bulk_chips():
+    """
+    批次獲取籌碼分析（三大法人 + 融資融券，僅台股）
+    參數：symbols、days（三大法人分析天數，預設 20）
+    """
+    options = _request_options()
+    try:
+        symbols = parse_symbols(options.get('symbols'), 'tw')
+        days = int(options.get('days', 20))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    codes = symbols.get('tw', [])
+    unsupported = [f'{market}:{code}' for market, items in symbols.items() if market != 'tw' for code in items]
+
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+
+        latest = {'after': None, 'before': None}
+        trades = _fetch_grouped(cursor, latest_rows_query(
+            'institutional_trades',
+            'trade_date, foreign_buy, foreign_sell, trust_buy, trust_sell, dealer_buy, dealer_sell, close_price',
+            latest
+        ), (codes, days))
+        margins = _fetch_grouped(cursor, latest_rows_query(
+            'margin_trading',
+            'trade_date, margin_balance, margin_quota, short_balance, short_quota',
+            latest
+        ), (codes, 30))
+
+        cursor.close()
+        conn.close()
+
+        data = {}
+        for code in codes:
+            if code not in trades and code not in margins:
+                continue
+            data[code] = {
+                'institutional': InstitutionalAnalyzer.analyze_daily_trades_array(
+                    trades[code], days=min(days, len(trades[code]['trade_date']))
+                ) if code in trades else None,
+                'margin': MarginAnalyzer.analyze_margin_trading_array(margins[code]) if code in margins else None
+            }
+
+        return jsonify({
+            'data': {'tw': data},
+            'missing': [f'tw:{code}' for code in codes if code not in data] + unsupported
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
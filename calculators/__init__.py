@@ -1,11 +1,9 @@
 """
 Calculators Package Initializer
+
+匯出名稱延遲載入（例如 quant_engine 的 scipy.optimize 只在使用量化引擎時才 import）
 """
-from .position_analyzer import PositionAnalyzer
-from .technical_indicators import TechnicalIndicators
-from .institutional_analyzer import InstitutionalAnalyzer
-from .margin_analyzer import MarginAnalyzer
-from .quant_engine import MonteCarloSimulator, EfficientFrontierOptimizer, RiskFactorAnalyzer
+from utils.lazy_import import lazy_exports
 
 __all__ = [
     'PositionAnalyzer', 
@@ -14,5 +12,19 @@ __all__ = [
     'MarginAnalyzer',
     'MonteCarloSimulator',
     'EfficientFrontierOptimizer',
-    'RiskFactorAnalyzer'
+    'RiskFactorAnalyzer',
+    'DecisionScoreEngine',
+    'FactorEngine'
 ]
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'PositionAnalyzer': '.position_analyzer',
+    'TechnicalIndicators': '.technical_indicators',
+    'InstitutionalAnalyzer': '.institutional_analyzer',
+    'MarginAnalyzer': '.margin_analyzer',
+    'MonteCarloSimulator': '.quant_engine',
+    'EfficientFrontierOptimizer': '.quant_engine',
+    'RiskFactorAnalyzer': '.quant_engine',
+    'DecisionScoreEngine': '.decision_scores',
+    'FactorEngine': '.factor_engine',
+})
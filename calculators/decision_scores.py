@@ -0,0 +1,460 @@
+"""
+決策六維評分引擎
+
+以資料庫既有的預計算資料，對整個標的池一次算出六維評分（0-100）：
+- 宏觀 macro：macro_indicators（通膨、失業率、利率、GDP 趨勢，全市場共用）
+- 技術 technical：technical_indicators（RSI、均線排列、MACD 柱、ADX/DMI）
+- 籌碼 chips：institutional_trades 近 20 日法人買賣超、shareholder_dispersion 大戶動向（台股）
+- 基本面 fundamental：quant_scores 品質與成長分數
+- 情緒 sentiment：financial_news 近 7 日新聞情緒、quant_scores 動能分數
+- 估值 valuation：quant_scores 價值分數
+
+缺資料的維度以中性分數 50 代替並記錄於 missing_dimensions，信賴度依有資料的維度數決定。
+結果寫入 decision_scores，AI 報告直接引用，不再由模型產生分數。
+"""
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+
+DIMENSIONS = ['macro', 'technical', 'chips', 'fundamental', 'sentiment', 'valuation']
+
+# 綜合評分權重
+DIMENSION_WEIGHTS = {
+    'macro': 0.10,
+    'technical': 0.20,
+    'chips': 0.20,
+    'fundamental': 0.20,
+    'sentiment': 0.10,
+    'valuation': 0.20,
+}
+
+NEUTRAL_SCORE = 50.0
+
+# 評級門檻
+BUY_THRESHOLD = 65
+SELL_THRESHOLD = 40
+
+# 法人買賣超、新聞情緒的回看天數（日曆日）
+CHIPS_LOOKBACK_DAYS = 30
+NEWS_LOOKBACK_DAYS = 7
+
+MONEY_FLOW_ADJUSTMENT = {'INFLOW': 15, 'OUTFLOW': -15, 'NEUTRAL': 0}
+
+
+def _clip(values):
+    return np.clip(values, 0, 100)
+
+
+def _row_mean(frame: pd.DataFrame) -> pd.Series:
+    """逐列平均（忽略 NaN；全為 NaN 時為 NaN）"""
+    return frame.mean(axis=1, skipna=True)
+
+
+def _pct_rank(series: pd.Series) -> pd.Series:
+    """橫斷面百分位（0-100），NaN 保持 NaN"""
+    return series.rank(pct=True) * 100
+
+
+def score_macro(macro: pd.DataFrame) -> Optional[float]:
+    """
+    宏觀評分（全市場共用）
+
+    Args:
+        macro: 欄位 indicator_type, release_date, value（依時間排序前後皆可）
+
+    Returns:
+        0-100；無資料回傳 None
+    """
+    if macro is None or macro.empty:
+        return None
+
+    parts = []
+    series = {
+        name: group.sort_values('release_date')['value'].astype(float).to_numpy()
+        for name, group in macro.groupby('indicator_type')
+    }
+
+    cpi = series.get('CPI')
+    if cpi is not None and len(cpi) > 12 and cpi[-13] > 0:
+        # 通膨年增率 2% 以下為佳，每高 1 個百分點扣 15 分
+        inflation = (cpi[-1] / cpi[-13] - 1) * 100
+        parts.append(85 - max(inflation - 2, 0) * 15)
+
+    unemployment = series.get('UNEMPLOYMENT')
+    if unemployment is not None and len(unemployment) > 3:
+        # 失業率三期變化：上升 0.5 個百分點約扣 20 分
+        parts.append(60 - (unemployment[-1] - unemployment[-4]) * 40)
+
+    rate = series.get('INTEREST_RATE')
+    if rate is not None and len(rate) > 3:
+        # 利率三期變化：降息加分、升息扣分
+        parts.append(60 - (rate[-1] - rate[-4]) * 20)
+
+    gdp = series.get('GDP')
+    if gdp is not None and len(gdp) > 1 and gdp[-2] > 0:
+        # 最新一期 GDP 成長率，每 1% 加減 20 分
+        parts.append(50 + (gdp[-1] / gdp[-2] - 1) * 100 * 20)
+
+    if not parts:
+        return None
+    return float(np.clip(np.mean(parts), 0, 100))
+
+
+def score_technical(technical: pd.DataFrame) -> pd.Series:
+    """
+    技術面評分
+
+    Args:
+        technical: 以 security_key 為索引，欄位 close_price, rsi_14, ma_20, ma_60,
+                   macd_histogram, adx_14, plus_di_14, minus_di_14
+    """
+    t = technical.astype(float)
+    parts = pd.DataFrame(index=t.index)
+
+    # RSI：50-70 為健康多頭，超買/超賣逐步扣分
+    rsi = t['rsi_14']
+    parts['rsi'] = _clip(np.where(rsi > 70, 100 - (rsi - 70) * 2.5, rsi * 1.4))
+
+    # 均線排列：價 > MA20 > MA60 為多頭
+    trend = (
+        (t['close_price'] > t['ma_20']).astype(float)
+        + (t['close_price'] > t['ma_60']).astype(float)
+        + (t['ma_20'] > t['ma_60']).astype(float)
+    )
+    parts['trend'] = trend.where(t[['close_price', 'ma_20', 'ma_60']].notna().all(axis=1)) / 3 * 100
+
+    # MACD 柱：相對股價的強弱
+    histogram = t['macd_histogram'] / t['close_price'] * 100
+    parts['macd'] = _clip(50 + histogram * 25)
+
+    # DMI/ADX：趨勢方向 × 趨勢強度
+    direction = np.sign(t['plus_di_14'] - t['minus_di_14'])
+    strength = np.minimum(t['adx_14'], 50) / 50
+    parts['dmi'] = 50 + direction * strength * 50
+
+    return _row_mean(parts)
+
+
+def score_chips(chips: pd.DataFrame) -> pd.Series:
+    """
+    籌碼面評分
+
+    Args:
+        chips: 以 security_key 為索引，欄位 net_lots（近 20 日法人合計買賣超，張）,
+               avg_volume_20d（股）, large_holders_percentage, large_holders_change, smart_money_flow
+    """
+    c = chips
+    parts = pd.DataFrame(index=c.index)
+
+    # 法人買賣超佔 20 日成交量比例，取橫斷面百分位
+    volume_lots = c['avg_volume_20d'].astype(float) * 20 / 1000
+    flow_ratio = c['net_lots'].astype(float) / volume_lots.where(volume_lots > 0)
+    parts['institutional'] = _pct_rank(flow_ratio)
+
+    # 大戶持股比例百分位，再依大戶人數變化與資金流向調整
+    holders = _pct_rank(c['large_holders_percentage'].astype(float))
+    change = np.sign(c['large_holders_change'].astype(float)).fillna(0) * 10
+    flow = c['smart_money_flow'].map(MONEY_FLOW_ADJUSTMENT).fillna(0)
+    parts['holders'] = _clip(holders + change + flow)
+
+    return _row_mean(parts)
+
+
+def score_fundamental(quant: pd.DataFrame) -> pd.Series:
+    """基本面評分：品質與成長因子分數平均"""
+    return _row_mean(quant[['quality_score', 'growth_score']].astype(float))
+
+
+def score_valuation(quant: pd.DataFrame) -> pd.Series:
+    """估值評分：價值因子分數（越高越低估）"""
+    return quant['value_score'].astype(float)
+
+
+def score_sentiment(sentiment: pd.DataFrame) -> pd.Series:
+    """
+    情緒評分
+
+    Args:
+        sentiment: 以 security_key 為索引，欄位 news_sentiment（-1 ~ 1）, momentum_score
+    """
+    s = sentiment.astype(float)
+    parts = pd.DataFrame(index=s.index)
+    parts['news'] = 50 + s['news_sentiment'] * 50
+    parts['momentum'] = s['momentum_score']
+    return _row_mean(parts)
+
+
+def combine_scores(
+    scores: pd.DataFrame,
+    weights: Optional[Dict[str, float]] = None
+) -> pd.DataFrame:
+    """
+    缺資料維度補中性分數，計算綜合評分、評級與信賴度
+
+    Args:
+        scores: 以 security_key 為索引，欄位為 DIMENSIONS（可含 NaN）
+        weights: 維度權重（預設 DIMENSION_WEIGHTS）
+
+    Returns:
+        含 DIMENSIONS、overall_score、recommendation、confidence、missing_dimensions 的 DataFrame
+    """
+    weights = weights or DIMENSION_WEIGHTS
+    raw = scores.reindex(columns=DIMENSIONS).astype(float)
+    missing = raw.isna()
+
+    result = raw.fillna(NEUTRAL_SCORE).clip(0, 100).round(2)
+    overall = sum(result[name] * weights[name] for name in DIMENSIONS) / sum(weights.values())
+    result['overall_score'] = overall.round(2)
+
+    result['recommendation'] = np.select(
+        [overall >= BUY_THRESHOLD, overall < SELL_THRESHOLD], ['買入', '賣出'], default='持有'
+    )
+    available = len(DIMENSIONS) - missing.sum(axis=1)
+    result['confidence'] = np.select([available >= 5, available >= 3], ['高', '中'], default='低')
+    result['missing_dimensions'] = [
+        [name for name in DIMENSIONS if row[name]] for _, row in missing.iterrows()
+    ]
+    return result
+
+
+def neutral_scores() -> Dict:
+    """全部維度缺資料時的中性評分"""
+    row = combine_scores(pd.DataFrame(index=[0], columns=DIMENSIONS)).iloc[0]
+    return {**row.to_dict(), 'score_date': None}
+
+
+class DecisionScoreEngine:
+    """決策六維評分批次計算"""
+
+    def __init__(self, conn):
+        """
+        Args:
+            conn: psycopg2 連線
+        """
+        self.conn = conn
+
+    def _read(self, query: str, params=None) -> pd.DataFrame:
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
+        return pd.DataFrame(rows, columns=columns)
+
+    def load(self, as_of: date, codes: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        一次讀取整個標的池的評分輸入（每張表一個查詢）
+
+        Args:
+            as_of: 評分日期（只使用此日以前的資料）
+            codes: 限定代碼（預設 latest_quotes 中的全部台股與美股）
+        """
+        code_filter = "AND symbol = ANY(%s)" if codes else ""
+        universe = self._read(f"""
+            SELECT UPPER(market) AS security_type, symbol AS security_code,
+                   close_price, avg_volume_20d
+            FROM latest_quotes
+            WHERE market IN ('tw', 'us') {code_filter}
+        """, (list(codes),) if codes else None)
+
+        quant = self._read("""
+            SELECT DISTINCT ON (security_type, security_code)
+                   security_type, security_code,
+                   value_score, quality_score, momentum_score, growth_score
+            FROM quant_scores
+            WHERE calculation_date <= %s
+            ORDER BY security_type, security_code, calculation_date DESC
+        """, (as_of,))
+
+        technical = self._read("""
+            SELECT DISTINCT ON (security_type, security_code)
+                   security_type, security_code,
+                   COALESCE(rsi_14_wilder, rsi_14) AS rsi_14, ma_20, ma_60,
+                   macd_histogram, adx_14, plus_di_14, minus_di_14
+            FROM technical_indicators
+            WHERE trade_date <= %s AND trade_date > %s - 30
+            ORDER BY security_type, security_code, trade_date DESC
+        """, (as_of, as_of))
+
+        institutional = self._read("""
+            SELECT 'TW' AS security_type, stock_code AS security_code,
+                   SUM(COALESCE(foreign_net, 0) + COALESCE(trust_net, 0) + COALESCE(dealer_net, 0)) AS net_lots
+            FROM institutional_trades
+            WHERE trade_date <= %s AND trade_date > %s
+            GROUP BY stock_code
+        """, (as_of, as_of - timedelta(days=CHIPS_LOOKBACK_DAYS)))
+
+        holders = self._read("""
+            SELECT DISTINCT ON (stock_code)
+                   'TW' AS security_type, stock_code AS security_code,
+                   large_holders_percentage, large_holders_change, smart_money_flow
+            FROM shareholder_dispersion
+            WHERE data_date <= %s
+            ORDER BY stock_code, data_date DESC
+        """, (as_of,))
+
+        news = self._read("""
+            SELECT symbol AS security_code, AVG(sentiment_score) AS news_sentiment
+            FROM financial_news, UNNEST(related_symbols) AS symbol
+            WHERE sentiment_score IS NOT NULL
+              AND published_at <= %s::date + 1 AND published_at > %s
+            GROUP BY symbol
+        """, (as_of, as_of - timedelta(days=NEWS_LOOKBACK_DAYS)))
+
+        macro = self._read("""
+            SELECT indicator_type, release_date, value
+            FROM macro_indicators
+            WHERE indicator_type IN ('CPI', 'UNEMPLOYMENT', 'INTEREST_RATE', 'GDP')
+              AND release_date <= %s AND release_date > %s
+        """, (as_of, as_of - timedelta(days=800)))
+        self.conn.commit()
+
+        return {
+            'universe': universe, 'quant': quant, 'technical': technical,
+            'institutional': institutional, 'holders': holders,
+            'news': news, 'macro': macro,
+        }
+
+    @staticmethod
+    def compute(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """
+        由 load() 的結果計算六維評分（純計算，不存取資料庫）
+
+        Returns:
+            以 (security_type, security_code) 為索引的評分 DataFrame
+        """
+        keys = ['security_type', 'security_code']
+        universe = frames['universe'].set_index(keys)
+        index = universe.index
+
+        def aligned(name: str) -> pd.DataFrame:
+            frame = frames.get(name)
+            if frame is None or frame.empty:
+                return pd.DataFrame(index=index)
+            return frame.drop_duplicates(keys).set_index(keys).reindex(index)
+
+        quant = aligned('quant').reindex(
+            columns=['value_score', 'quality_score', 'momentum_score', 'growth_score'])
+        technical = aligned('technical').reindex(
+            columns=['rsi_14', 'ma_20', 'ma_60', 'macd_histogram', 'adx_14', 'plus_di_14', 'minus_di_14'])
+        technical['close_price'] = universe['close_price']
+
+        chips = aligned('institutional').reindex(columns=['net_lots']).join(
+            aligned('holders').reindex(
+                columns=['large_holders_percentage', 'large_holders_change', 'smart_money_flow']))
+        chips['avg_volume_20d'] = universe['avg_volume_20d']
+
+        news = frames.get('news')
+        news_by_code = (
+            news.drop_duplicates('security_code').set_index('security_code')['news_sentiment']
+            if news is not None and not news.empty else pd.Series(dtype=float)
+        )
+        sentiment = pd.DataFrame({
+            'news_sentiment': news_by_code.reindex(index.get_level_values('security_code')).to_numpy(),
+            'momentum_score': quant['momentum_score'].to_numpy(),
+        }, index=index)
+
+        macro = score_macro(frames.get('macro'))
+        scores = pd.DataFrame({
+            'macro': macro if macro is not None else np.nan,
+            'technical': score_technical(technical),
+            'chips': score_chips(chips),
+            'fundamental': score_fundamental(quant),
+            'sentiment': score_sentiment(sentiment),
+            'valuation': score_valuation(quant),
+        }, index=index)
+        return combine_scores(scores)
+
+    def save(self, scores: pd.DataFrame, as_of: date) -> int:
+        """寫入 decision_scores（同日重算覆蓋）"""
+        from psycopg2.extras import execute_values
+
+        rows = [
+            (security_type, security_code, as_of,
+             *(float(row[name]) for name in DIMENSIONS), float(row['overall_score']),
+             row['recommendation'], row['confidence'], row['missing_dimensions'])
+            for (security_type, security_code), row in scores.iterrows()
+        ]
+        if not rows:
+            return 0
+
+        with self.conn.cursor() as cursor:
+            execute_values(cursor, """
+                INSERT INTO decision_scores
+                (security_type, security_code, score_date,
+                 macro_score, technical_score, chips_score, fundamental_score,
+                 sentiment_score, valuation_score, overall_score,
+                 recommendation, confidence, missing_dimensions)
+                VALUES %s
+                ON CONFLICT (security_type, security_code, score_date) DO UPDATE SET
+                    macro_score = EXCLUDED.macro_score,
+                    technical_score = EXCLUDED.technical_score,
+                    chips_score = EXCLUDED.chips_score,
+                    fundamental_score = EXCLUDED.fundamental_score,
+                    sentiment_score = EXCLUDED.sentiment_score,
+                    valuation_score = EXCLUDED.valuation_score,
+                    overall_score = EXCLUDED.overall_score,
+                    recommendation = EXCLUDED.recommendation,
+                    confidence = EXCLUDED.confidence,
+                    missing_dimensions = EXCLUDED.missing_dimensions,
+                    created_at = NOW()
+            """, rows, page_size=1000)
+        self.conn.commit()
+        return len(rows)
+
+    def run(self, as_of: Optional[date] = None, codes: Optional[List[str]] = None) -> int:
+        """載入、計算並寫入；回傳寫入筆數"""
+        as_of = as_of or date.today()
+        scores = self.compute(self.load(as_of, codes))
+        saved = self.save(scores, as_of)
+        logger.success(f"決策六維評分完成：{saved} 檔（{as_of}）")
+        return saved
+
+
+def _fetch_latest_scores(conn, security_type: str, security_code: str):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT macro_score, technical_score, chips_score, fundamental_score,
+                   sentiment_score, valuation_score, overall_score,
+                   recommendation, confidence, missing_dimensions, score_date
+            FROM decision_scores
+            WHERE security_type = %s AND security_code = %s
+            ORDER BY score_date DESC
+            LIMIT 1
+        """, (security_type.upper(), security_code))
+        row = cursor.fetchone()
+    conn.commit()
+    return row
+
+
+def get_decision_scores(conn, security_type: str, security_code: str) -> Optional[Dict]:
+    """
+    讀取標的最新的六維評分；尚未批次計算時即時計算該檔並寫入
+
+    Returns:
+        {'macro', 'technical', 'chips', 'fundamental', 'sentiment', 'valuation',
+         'overall_score', 'recommendation', 'confidence', 'missing_dimensions', 'score_date'}；
+        標的不在 latest_quotes 時回傳 None
+    """
+    row = _fetch_latest_scores(conn, security_type, security_code)
+    if row is None:
+        DecisionScoreEngine(conn).run(codes=[security_code])
+        row = _fetch_latest_scores(conn, security_type, security_code)
+    if row is None:
+        return None
+
+    values = dict(zip(DIMENSIONS + ['overall_score'], (float(v) for v in row[:7])))
+    values.update({
+        'recommendation': row[7],
+        'confidence': row[8],
+        'missing_dimensions': list(row[9] or []),
+        'score_date': str(row[10]),
+    })
+    return values
@@ -12,6 +12,7 @@ from datetime import datetime, timedelta
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from config.settings import DATABASE_CONFIG
+from data_loader.universe import get_universe
 import psycopg2
 from loguru import logger
 
@@ -113,19 +114,23 @@ class FactorCalculatorBase:
         query = """
             SELECT report_date, metric, value
             FROM quarterly_fundamentals
-            WHERE security_id = (
-                SELECT id FROM securities_master WHERE ticker = %s
-            )
+            WHERE security_id = %s
               AND metric = %s
             ORDER BY report_date DESC
             LIMIT %s
         """
         
         try:
+            with self.conn.cursor() as cursor:
+                security_id = get_universe().security_id(cursor, stock_code)
+            if security_id is None:
+                logger.warning(f"證券主檔無此標的：{stock_code}")
+                return pd.DataFrame()
+            
             df = pd.read_sql_query(
                 query,
                 self.conn,
-                params=(stock_code, metric, periods)
+                params=(security_id, metric, periods)
             )
             return df
         except Exception as e:
@@ -289,10 +294,7 @@ class FactorScoreStorage:
                     size_score, volatility_score, growth_score,
                     total_score, created_at
                 )
-                VALUES (
-                    (SELECT id FROM securities_master WHERE ticker = %s),
-                    %s, %s, %s, %s, %s, %s, %s, %s, NOW()
-                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
                 ON CONFLICT (security_id, calculation_date) 
                 DO UPDATE SET
                     value_score = EXCLUDED.value_score,
@@ -315,8 +317,13 @@ class FactorScoreStorage:
                 scores.get('growth', 50)
             ])
             
+            security_id = get_universe().security_id(cursor, stock_code)
+            if security_id is None:
+                logger.warning(f"證券主檔無此標的，略過儲存：{stock_code}")
+                return
+            
             cursor.execute(query, (
-                stock_code,
+                security_id,
                 date,
                 scores.get('value'),
                 scores.get('quality'),
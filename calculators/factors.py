@@ -6,6 +6,8 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Optional
 
+from calculators import indicator_kernels as kernels
+
 class FactorCalculator:
     """因子計算器"""
     
@@ -50,11 +52,7 @@ class FactorCalculator:
                                     market_prices: Optional[pd.Series] = None) -> Dict:
         """計算動能因子"""
         # RSI-14
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        rsi = kernels.rsi(prices.to_numpy(dtype=np.float64, na_value=np.nan), 14)
         
         # 相對報酬率
         stock_return = (prices.iloc[-1] / prices.iloc[0] - 1) * 100 if len(prices) > 0 else None
@@ -64,7 +62,7 @@ class FactorCalculator:
         distance_from_high = ((prices - high_52w) / high_52w * 100)
         
         result = {
-            'rsi_14': rsi.iloc[-1] if len(rsi) > 0 else None,
+            'rsi_14': rsi[-1] if len(rsi) > 0 else None,
             'return_1m': stock_return,
             'distance_from_52w_high': distance_from_high.iloc[-1] if len(distance_from_high) > 0 else None
         }
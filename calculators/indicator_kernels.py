@@ -0,0 +1,613 @@
+"""
+技術指標核心運算 - Indicator Kernels
+
+以 NumPy 陣列為輸入的向量化技術指標核心，供所有指標計算共用：
+- 支援 1-D（單一標的時間序列）與 2-D（標的 × 交易日）矩陣
+- 時間軸一律為最後一個維度（axis=-1）
+- 缺值（NaN）語意與 pandas rolling / ewm(adjust=False) 一致
+
+pandas 版本的包裝請使用 calculators.technical_indicators.TechnicalIndicators
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Optional, Tuple
+
+
+def _prepare(values) -> Tuple[np.ndarray, bool]:
+    """
+    轉為 float64 的 2-D 陣列
+
+    Returns:
+        (2-D 陣列, 原始輸入是否為 1-D)
+    """
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr.reshape(1, -1), True
+    if arr.ndim != 2:
+        raise ValueError(f"僅支援 1-D 或 2-D 陣列，收到 {arr.ndim}-D")
+    return arr, False
+
+
+def _finish(arr: np.ndarray, squeeze: bool) -> np.ndarray:
+    """還原輸入維度"""
+    return arr[0] if squeeze else arr
+
+
+def _check_window(window: int):
+    if int(window) != window or window < 1:
+        raise ValueError(f"window 必須為正整數，收到 {window}")
+
+
+# ============================================
+# 基礎運算
+# ============================================
+
+def diff(values) -> np.ndarray:
+    """一階差分（首筆為 NaN，等同 Series.diff()）"""
+    arr, squeeze = _prepare(values)
+    out = np.full(arr.shape, np.nan)
+    out[:, 1:] = arr[:, 1:] - arr[:, :-1]
+    return _finish(out, squeeze)
+
+
+def shift(values, periods: int = 1) -> np.ndarray:
+    """向後平移 periods 期（等同 Series.shift()）"""
+    arr, squeeze = _prepare(values)
+    out = np.full(arr.shape, np.nan)
+    if periods == 0:
+        out[:] = arr
+    elif 0 < periods < arr.shape[1]:
+        out[:, periods:] = arr[:, :-periods]
+    elif -arr.shape[1] < periods < 0:
+        out[:, :periods] = arr[:, -periods:]
+    return _finish(out, squeeze)
+
+
+def _window_sums(arr: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    以累積和計算每個完整窗口的總和與缺值數
+
+    Returns:
+        (窗口總和, 窗口內 NaN 數)，長度皆為 n - window + 1
+    """
+    nan_mask = np.isnan(arr)
+    filled = np.where(nan_mask, 0.0, arr)
+    zeros = np.zeros((arr.shape[0], 1))
+    csum = np.concatenate([zeros, np.cumsum(filled, axis=1)], axis=1)
+    ccount = np.concatenate([zeros, np.cumsum(nan_mask, axis=1)], axis=1)
+    return csum[:, window:] - csum[:, :-window], ccount[:, window:] - ccount[:, :-window]
+
+
+def rolling_mean(values, window: int) -> np.ndarray:
+    """
+    滾動平均（等同 Series.rolling(window).mean()）
+
+    窗口內只要有 NaN 或資料不足 window 筆即為 NaN
+    """
+    _check_window(window)
+    arr, squeeze = _prepare(values)
+    out = np.full(arr.shape, np.nan)
+    if arr.shape[1] >= window:
+        sums, nans = _window_sums(arr, window)
+        means = sums / window
+        means[nans > 0] = np.nan
+        out[:, window - 1:] = means
+    return _finish(out, squeeze)
+
+
+def rolling_std(values, window: int, ddof: int = 1) -> np.ndarray:
+    """
+    滾動標準差（等同 Series.rolling(window).std()）
+
+    先以每列首個有效值平移資料，降低累積和相減的數值誤差
+    """
+    _check_window(window)
+    arr, squeeze = _prepare(values)
+    out = np.full(arr.shape, np.nan)
+    if arr.shape[1] >= window and window > ddof:
+        valid = ~np.isnan(arr)
+        first_idx = np.where(valid.any(axis=1), valid.argmax(axis=1), 0)
+        offset = arr[np.arange(arr.shape[0]), first_idx]
+        offset = np.where(np.isnan(offset), 0.0, offset)
+        centered = arr - offset[:, None]
+
+        sums, nans = _window_sums(centered, window)
+        sq_sums, _ = _window_sums(centered * centered, window)
+        var = (sq_sums - sums * sums / window) / (window - ddof)
+        std = np.sqrt(np.maximum(var, 0.0))
+        std[nans > 0] = np.nan
+        out[:, window - 1:] = std
+    return _finish(out, squeeze)
+
+
+def rolling_max(values, window: int) -> np.ndarray:
+    """滾動最大值（等同 Series.rolling(window).max()）"""
+    _check_window(window)
+    arr, squeeze = _prepare(values)
+    out = np.full(arr.shape, np.nan)
+    if arr.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(arr, window, axis=1).max(axis=-1)
+    return _finish(out, squeeze)
+
+
+def rolling_min(values, window: int) -> np.ndarray:
+    """滾動最小值（等同 Series.rolling(window).min()）"""
+    _check_window(window)
+    arr, squeeze = _prepare(values)
+    out = np.full(arr.shape, np.nan)
+    if arr.shape[1] >= window:
+        out[:, window - 1:] = sliding_window_view(arr, window, axis=1).min(axis=-1)
+    return _finish(out, squeeze)
+
+
+def _ewm_row(row: np.ndarray, alpha: float) -> np.ndarray:
+    """單一序列的遞迴 EWM（純 Python 浮點迴圈，單列時比逐欄向量運算快）"""
+    beta = 1.0 - alpha
+    out = np.empty(row.shape[0])
+    mean = np.nan
+    old_wt = 1.0
+    for t, cur in enumerate(row.tolist()):
+        if mean == mean:
+            old_wt *= beta
+            if cur == cur:
+                mean = (old_wt * mean + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif cur == cur:
+            mean = cur
+        out[t] = mean
+    return out
+
+
+def ewm_mean(values, alpha: float) -> np.ndarray:
+    """
+    指數加權平均（等同 Series.ewm(alpha=alpha, adjust=False).mean()）
+
+    開頭的 NaN 會被略過；中段 NaN 沿用前值，恢復後依缺口長度衰減舊權重
+    """
+    if not 0 < alpha <= 1:
+        raise ValueError(f"alpha 必須介於 (0, 1]，收到 {alpha}")
+    arr, squeeze = _prepare(values)
+    rows, n = arr.shape
+    if rows == 1:
+        return _finish(_ewm_row(arr[0], alpha).reshape(1, -1), squeeze)
+
+    beta = 1.0 - alpha
+    out = np.empty(arr.shape)
+    mean = np.full(rows, np.nan)
+    old_wt = np.ones(rows)
+    with np.errstate(invalid='ignore'):
+        for t in range(n):
+            cur = arr[:, t]
+            observed = ~np.isnan(cur)
+            started = ~np.isnan(mean)
+            old_wt = np.where(started, old_wt * beta, old_wt)
+            update = started & observed
+            mean = np.where(update, (old_wt * mean + alpha * cur) / (old_wt + alpha), mean)
+            old_wt = np.where(update, 1.0, old_wt)
+            mean = np.where(~started & observed, cur, mean)
+            out[:, t] = mean
+    return _finish(out, squeeze)
+
+
+def ema(values, span: int) -> np.ndarray:
+    """指數移動平均（等同 Series.ewm(span=span, adjust=False).mean()）"""
+    return ewm_mean(values, 2.0 / (span + 1.0))
+
+
+def _wilder_row(row: np.ndarray, period: int) -> np.ndarray:
+    """單一序列的 Wilder 平滑（純 Python 浮點迴圈）"""
+    out = np.full(row.shape[0], np.nan)
+    count = 0
+    acc = 0.0
+    mean = np.nan
+    for t, cur in enumerate(row.tolist()):
+        if cur == cur:
+            if count >= period:
+                mean += (cur - mean) / period
+            else:
+                acc += cur
+                count += 1
+                if count == period:
+                    mean = acc / period
+        out[t] = mean
+    return out
+
+
+def wilder_smooth(values, period: int) -> np.ndarray:
+    """
+    Wilder 平滑（RMA）：以前 period 筆有效值的簡單平均為種子，
+    之後 avg = 前avg + (x - 前avg) / period
+
+    與券商看盤軟體的 RSI / ATR / ADX 算法一致；中段 NaN 沿用前值
+    """
+    _check_window(period)
+    arr, squeeze = _prepare(values)
+    rows, n = arr.shape
+    if rows == 1:
+        return _finish(_wilder_row(arr[0], period).reshape(1, -1), squeeze)
+
+    out = np.full(arr.shape, np.nan)
+    count = np.zeros(rows, dtype=np.int64)
+    acc = np.zeros(rows)
+    mean = np.full(rows, np.nan)
+    for t in range(n):
+        cur = arr[:, t]
+        observed = ~np.isnan(cur)
+        seeded = count >= period
+        smoothing = seeded & observed
+        mean[smoothing] += (cur[smoothing] - mean[smoothing]) / period
+        seeding = ~seeded & observed
+        acc[seeding] += cur[seeding]
+        count[seeding] += 1
+        just_seeded = seeding & (count == period)
+        mean[just_seeded] = acc[just_seeded] / period
+        out[:, t] = mean
+    return _finish(out, squeeze)
+
+
+# ============================================
+# 技術指標
+# ============================================
+
+def sma(values, period: int = 20) -> np.ndarray:
+    """簡單移動平均 (MA)"""
+    return rolling_mean(values, period)
+
+
+def rsi(values, period: int = 14) -> np.ndarray:
+    """
+    相對強弱指標 (RSI)，漲跌幅以簡單移動平均計算
+
+    首筆差分視為 0（與既有 pandas 實作的 where(delta > 0, 0) 語意一致）
+    """
+    delta = diff(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        rs = rolling_mean(gain, period) / rolling_mean(loss, period)
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+def macd(values, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """
+    MACD 指標
+
+    Returns:
+        {'macd': MACD線, 'signal': 訊號線, 'histogram': 柱狀圖}
+    """
+    macd_line = ema(values, fast) - ema(values, slow)
+    signal_line = ema(macd_line, signal)
+    return {
+        'macd': macd_line,
+        'signal': signal_line,
+        'histogram': macd_line - signal_line
+    }
+
+
+def bollinger_bands(values, period: int = 20, std_dev: float = 2.0) -> Dict[str, np.ndarray]:
+    """
+    布林通道
+
+    Returns:
+        {'upper': 上軌, 'middle': 中軌, 'lower': 下軌}
+    """
+    middle = rolling_mean(values, period)
+    std = rolling_std(values, period)
+    return {
+        'upper': middle + std * std_dev,
+        'middle': middle,
+        'lower': middle - std * std_dev
+    }
+
+
+def kd(
+    high,
+    low,
+    close,
+    period: int = 9,
+    k_period: int = 3,
+    d_period: int = 3
+) -> Dict[str, np.ndarray]:
+    """
+    KD 隨機指標（台股慣用平滑：K = 前K × (n-1)/n + RSV / n）
+
+    Args:
+        period: RSV 計算週期
+        k_period: K 值平滑週期 n（預設 3，即 1/3 權重）
+        d_period: D 值平滑週期
+
+    Returns:
+        {'k': K值, 'd': D值}
+    """
+    lowest_low = rolling_min(low, period)
+    highest_high = rolling_max(high, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rsv = (np.asarray(close, dtype=np.float64) - lowest_low) / (highest_high - lowest_low) * 100.0
+    k = ewm_mean(rsv, 1.0 / k_period)
+    d = ewm_mean(k, 1.0 / d_period)
+    return {'k': k, 'd': d}
+
+
+def williams_r(high, low, close, period: int = 14) -> np.ndarray:
+    """威廉指標 (Williams %R)，範圍 -100 ~ 0"""
+    highest_high = rolling_max(high, period)
+    lowest_low = rolling_min(low, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (highest_high - np.asarray(close, dtype=np.float64)) / (highest_high - lowest_low) * -100.0
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """真實波幅 (TR)，首筆僅以當日高低差計算"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    prev_close = shift(close, 1)
+    tr = np.fmax(high - low, np.abs(high - prev_close))
+    return np.fmax(tr, np.abs(low - prev_close))
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """平均真實範圍 (ATR)，以簡單移動平均平滑"""
+    return rolling_mean(true_range(high, low, close), period)
+
+
+def rsi_wilder(values, period: int = 14) -> np.ndarray:
+    """相對強弱指標 (RSI)，漲跌幅以 Wilder 平滑計算（券商軟體標準算法）"""
+    delta = diff(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        gain[np.isnan(delta)] = np.nan
+        loss[np.isnan(delta)] = np.nan
+        rs = wilder_smooth(gain, period) / wilder_smooth(loss, period)
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+def atr_wilder(high, low, close, period: int = 14) -> np.ndarray:
+    """平均真實範圍 (ATR)，以 Wilder 平滑計算"""
+    return wilder_smooth(true_range(high, low, close), period)
+
+
+def _directional_movement(high, low) -> Tuple[np.ndarray, np.ndarray]:
+    """+DM / -DM（首筆為 NaN）"""
+    up = diff(high)
+    down = -diff(low)
+    with np.errstate(invalid='ignore'):
+        plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+        minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    plus_dm[np.isnan(up)] = np.nan
+    minus_dm[np.isnan(down)] = np.nan
+    return plus_dm, minus_dm
+
+
+def _dmi_from_parts(plus_dm, minus_dm, tr, period: int) -> Dict[str, np.ndarray]:
+    smoothed_tr = wilder_smooth(tr, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        plus_di = 100.0 * wilder_smooth(plus_dm, period) / smoothed_tr
+        minus_di = 100.0 * wilder_smooth(minus_dm, period) / smoothed_tr
+        dx = 100.0 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return {
+        'plus_di': plus_di,
+        'minus_di': minus_di,
+        'adx': wilder_smooth(dx, period)
+    }
+
+
+def dmi(high, low, close, period: int = 14) -> Dict[str, np.ndarray]:
+    """
+    趨向指標 DMI / ADX（Wilder）
+
+    Returns:
+        {'plus_di': +DI, 'minus_di': -DI, 'adx': ADX}
+    """
+    plus_dm, minus_dm = _directional_movement(high, low)
+    tr = true_range(high, low, close)
+    tr[..., 0] = np.nan  # 與 ±DM 對齊，首筆沒有前一日資料
+    return _dmi_from_parts(plus_dm, minus_dm, tr, period)
+
+
+def obv(close, volume) -> np.ndarray:
+    """能量潮 (OBV)，首筆為 0"""
+    direction = np.sign(np.nan_to_num(diff(close)))
+    flow = direction * np.nan_to_num(np.asarray(volume, dtype=np.float64))
+    return np.cumsum(flow, axis=-1)
+
+
+def vwap(high, low, close, volume, period: int = 20) -> np.ndarray:
+    """
+    滾動成交量加權平均價 (VWAP)
+
+    日線資料沒有盤中累積的意義，以最近 period 日的典型價格 (H+L+C)/3 加權
+    """
+    typical = (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64)
+               + np.asarray(close, dtype=np.float64)) / 3.0
+    return _vwap_from_typical(typical, volume, period)
+
+
+def _vwap_from_typical(typical, volume, period: int) -> np.ndarray:
+    volume = np.asarray(volume, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return rolling_mean(typical * volume, period) / rolling_mean(volume, period)
+
+
+def _rolling_mean_abs_dev(values, window: int, max_cells: int = 8_000_000) -> np.ndarray:
+    """滾動平均絕對離差（分塊處理，避免滑動窗口展開佔用過多記憶體）"""
+    _check_window(window)
+    arr, squeeze = _prepare(values)
+    rows, n = arr.shape
+    out = np.full(arr.shape, np.nan)
+    if n >= window:
+        chunk = max(1, max_cells // (n * window))
+        for start in range(0, rows, chunk):
+            windows = sliding_window_view(arr[start:start + chunk], window, axis=1)
+            centre = windows.mean(axis=-1, keepdims=True)
+            out[start:start + chunk, window - 1:] = np.abs(windows - centre).mean(axis=-1)
+    return _finish(out, squeeze)
+
+
+def cci(high, low, close, period: int = 20) -> np.ndarray:
+    """順勢指標 (CCI)"""
+    typical = (np.asarray(high, dtype=np.float64) + np.asarray(low, dtype=np.float64)
+               + np.asarray(close, dtype=np.float64)) / 3.0
+    return _cci_from_typical(typical, period)
+
+
+def _cci_from_typical(typical, period: int) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (typical - rolling_mean(typical, period)) / (0.015 * _rolling_mean_abs_dev(typical, period))
+
+
+def stoch_rsi(
+    values,
+    rsi_period: int = 14,
+    stoch_period: int = 14,
+    k_period: int = 3,
+    d_period: int = 3
+) -> Dict[str, np.ndarray]:
+    """
+    隨機 RSI（以 Wilder RSI 為基礎）
+
+    Returns:
+        {'k': %K, 'd': %D}，範圍 0-100
+    """
+    return _stoch_rsi_from_rsi(rsi_wilder(values, rsi_period), stoch_period, k_period, d_period)
+
+
+def _stoch_rsi_from_rsi(rsi_values, stoch_period: int, k_period: int, d_period: int) -> Dict[str, np.ndarray]:
+    lowest = rolling_min(rsi_values, stoch_period)
+    highest = rolling_max(rsi_values, stoch_period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stoch = (rsi_values - lowest) / (highest - lowest) * 100.0
+    k = rolling_mean(stoch, k_period)
+    return {'k': k, 'd': rolling_mean(k, d_period)}
+
+
+def ichimoku(
+    high,
+    low,
+    close,
+    tenkan: int = 9,
+    kijun: int = 26,
+    senkou: int = 52,
+    displacement: int = 26
+) -> Dict[str, np.ndarray]:
+    """
+    一目均衡表
+
+    先行帶 A/B 已向後平移 displacement 日（對應其繪製的交易日），
+    遲行線為收盤價向前平移，最近 displacement 日為 NaN
+
+    Returns:
+        {'tenkan': 轉換線, 'kijun': 基準線, 'senkou_a': 先行帶A, 'senkou_b': 先行帶B, 'chikou': 遲行線}
+    """
+    return _ichimoku_from_extremes(
+        lambda w: rolling_max(high, w), lambda w: rolling_min(low, w),
+        close, tenkan, kijun, senkou, displacement
+    )
+
+
+def _ichimoku_from_extremes(highest, lowest, close, tenkan, kijun, senkou, displacement):
+    tenkan_line = (highest(tenkan) + lowest(tenkan)) / 2.0
+    kijun_line = (highest(kijun) + lowest(kijun)) / 2.0
+    return {
+        'tenkan': tenkan_line,
+        'kijun': kijun_line,
+        'senkou_a': shift((tenkan_line + kijun_line) / 2.0, displacement),
+        'senkou_b': shift((highest(senkou) + lowest(senkou)) / 2.0, displacement),
+        'chikou': shift(close, -displacement)
+    }
+
+
+def calculate_extended(high, low, close, volume) -> Dict[str, np.ndarray]:
+    """
+    一次計算擴充指標（Wilder RSI/ATR、DMI/ADX、OBV、VWAP、CCI、隨機RSI、一目均衡表）
+
+    共用同一份價格矩陣與中間結果（差分、真實波幅、典型價格、區間高低點），
+    新增指標不需重新讀取或重算基礎序列
+
+    Returns:
+        扁平化的 {指標欄位: 陣列}，欄位名稱與 technical_indicators 表一致
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+
+    tr = true_range(high, low, close)
+    typical = (high + low + close) / 3.0
+    rsi_values = rsi_wilder(close, 14)
+
+    plus_dm, minus_dm = _directional_movement(high, low)
+    dmi_tr = tr.copy()
+    dmi_tr[..., 0] = np.nan
+    dmi_result = _dmi_from_parts(plus_dm, minus_dm, dmi_tr, 14)
+
+    stoch = _stoch_rsi_from_rsi(rsi_values, 14, 3, 3)
+
+    extremes = {}
+
+    def highest(window):
+        if ('high', window) not in extremes:
+            extremes[('high', window)] = rolling_max(high, window)
+        return extremes[('high', window)]
+
+    def lowest(window):
+        if ('low', window) not in extremes:
+            extremes[('low', window)] = rolling_min(low, window)
+        return extremes[('low', window)]
+
+    cloud = _ichimoku_from_extremes(highest, lowest, close, 9, 26, 52, 26)
+
+    return {
+        'rsi_14_wilder': rsi_values,
+        'atr_14_wilder': wilder_smooth(tr, 14),
+        'plus_di_14': dmi_result['plus_di'],
+        'minus_di_14': dmi_result['minus_di'],
+        'adx_14': dmi_result['adx'],
+        'obv': obv(close, volume),
+        'vwap_20': _vwap_from_typical(typical, volume, 20),
+        'cci_20': _cci_from_typical(typical, 20),
+        'stoch_rsi_k': stoch['k'],
+        'stoch_rsi_d': stoch['d'],
+        'ichimoku_tenkan': cloud['tenkan'],
+        'ichimoku_kijun': cloud['kijun'],
+        'ichimoku_senkou_a': cloud['senkou_a'],
+        'ichimoku_senkou_b': cloud['senkou_b'],
+    }
+
+
+def calculate_all(
+    close,
+    high: Optional[np.ndarray] = None,
+    low: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    一次計算常用指標（共用同一份價格矩陣）
+
+    Returns:
+        扁平化的 {指標欄位: 陣列}，欄位名稱與 technical_indicators 表一致
+    """
+    close = np.asarray(close, dtype=np.float64)
+    macd_result = macd(close)
+    bands = bollinger_bands(close)
+
+    result = {
+        'ma_5': sma(close, 5),
+        'ma_10': sma(close, 10),
+        'ma_20': bands['middle'],
+        'ma_60': sma(close, 60),
+        'rsi_14': rsi(close, 14),
+        'macd': macd_result['macd'],
+        'macd_signal': macd_result['signal'],
+        'macd_histogram': macd_result['histogram'],
+        'bb_upper': bands['upper'],
+        'bb_middle': bands['middle'],
+        'bb_lower': bands['lower'],
+    }
+
+    if high is not None and low is not None:
+        kd_result = kd(high, low, close)
+        result['k_value'] = kd_result['k']
+        result['d_value'] = kd_result['d']
+        result['atr_14'] = atr(high, low, close, 14)
+
+    return result
@@ -7,6 +7,9 @@ import numpy as np
 from typing import Dict, List
 from datetime import datetime, timedelta
 
+TRADE_COLUMNS = ['foreign_buy', 'foreign_sell', 'trust_buy', 'trust_sell', 'dealer_buy', 'dealer_sell']
+
+
 class InstitutionalAnalyzer:
     """三大法人籌碼分析器"""
     
@@ -28,77 +31,81 @@ class InstitutionalAnalyzer:
                 'summary': {...}
             }
         """
-        if len(trades_df) < days:
-            days = len(trades_df)
+        columns = {
+            column: trades_df[column].to_numpy(dtype=float)
+            for column in TRADE_COLUMNS + ['close_price']
+            if column in trades_df.columns
+        }
+        return InstitutionalAnalyzer.analyze_daily_trades_array(columns, days)
+    
+    @staticmethod
+    def analyze_daily_trades_array(columns: Dict[str, np.ndarray], days: int = 20) -> Dict:
+        """
+        analyze_daily_trades 的陣列版本（API 熱路徑使用，不建立 DataFrame）
         
-        recent_trades = trades_df.tail(days)
+        Args:
+            columns: {欄位名稱: 由舊到新的陣列}，欄位同 analyze_daily_trades
+            days: 分析天數
+        """
+        recent = {name: values[max(len(values) - days, 0):] for name, values in columns.items()}
+        
+        # 每日買賣超
+        foreign_daily = recent['foreign_buy'] - recent['foreign_sell']
+        trust_daily = recent['trust_buy'] - recent['trust_sell']
+        dealer_daily = recent['dealer_buy'] - recent['dealer_sell']
         
         # 計算買賣超
-        foreign_net = (recent_trades['foreign_buy'] - recent_trades['foreign_sell']).sum()
-        trust_net = (recent_trades['trust_buy'] - recent_trades['trust_sell']).sum()
-        dealer_net = (recent_trades['dealer_buy'] - recent_trades['dealer_sell']).sum()
+        foreign_net = np.nansum(foreign_daily)
+        trust_net = np.nansum(trust_daily)
+        dealer_net = np.nansum(dealer_daily)
         
         # 計算連續買賣超天數
-        foreign_days = InstitutionalAnalyzer._count_consecutive_days(
-            recent_trades['foreign_buy'] - recent_trades['foreign_sell']
-        )
-        trust_days = InstitutionalAnalyzer._count_consecutive_days(
-            recent_trades['trust_buy'] - recent_trades['trust_sell']
-        )
-        dealer_days = InstitutionalAnalyzer._count_consecutive_days(
-            recent_trades['dealer_buy'] - recent_trades['dealer_sell']
-        )
+        foreign_days = InstitutionalAnalyzer._count_consecutive_days(foreign_daily)
+        trust_days = InstitutionalAnalyzer._count_consecutive_days(trust_daily)
+        dealer_days = InstitutionalAnalyzer._count_consecutive_days(dealer_daily)
         
         # 判斷多空態勢
         total_net = foreign_net + trust_net + dealer_net
+        last_close = float(recent['close_price'][-1]) if 'close_price' in recent and len(recent['close_price']) else None
+        
+        def side(net, consecutive_days):
+            return {
+                'net_shares': int(net),
+                'net_value': float(net * last_close) if last_close is not None else 0,
+                'consecutive_days': consecutive_days,
+                'trend': '買超' if net > 0 else '賣超' if net < 0 else '中性'
+            }
         
         analysis = {
-            'foreign': {
-                'net_shares': int(foreign_net),
-                'net_value': foreign_net * recent_trades['close_price'].iloc[-1] if 'close_price' in recent_trades.columns else 0,
-                'consecutive_days': foreign_days,
-                'trend': '買超' if foreign_net > 0 else '賣超' if foreign_net < 0 else '中性'
-            },
-            'trust': {
-                'net_shares': int(trust_net),
-                'net_value': trust_net * recent_trades['close_price'].iloc[-1] if 'close_price' in recent_trades.columns else 0,
-                'consecutive_days': trust_days,
-                'trend': '買超' if trust_net > 0 else '賣超' if trust_net < 0 else '中性'
-            },
-            'dealer': {
-                'net_shares': int(dealer_net),
-                'net_value': dealer_net * recent_trades['close_price'].iloc[-1] if 'close_price' in recent_trades.columns else 0,
-                'consecutive_days': dealer_days,
-                'trend': '買超' if dealer_net > 0 else '賣超' if dealer_net < 0 else '中性'
-            },
+            'foreign': side(foreign_net, foreign_days),
+            'trust': side(trust_net, trust_days),
+            'dealer': side(dealer_net, dealer_days),
             'summary': {
                 'total_net_shares': int(total_net),
                 'dominant_force': InstitutionalAnalyzer._get_dominant_force(foreign_net, trust_net, dealer_net),
                 'overall_trend': '多頭' if total_net > 0 else '空頭' if total_net < 0 else '中性',
-                'signal_strength': min(abs(total_net) / 1000, 100)  # 簡化強度計算
+                'signal_strength': float(min(abs(total_net) / 1000, 100))  # 簡化強度計算
             }
         }
         
         return analysis
     
     @staticmethod
-    def _count_consecutive_days(net_series: pd.Series) -> int:
-        """計算連續買超/賣超天數"""
-        if len(net_series) == 0:
+    def _count_consecutive_days(net_values) -> int:
+        """計算連續買超/賣超天數（由最新一日往回數）"""
+        net_values = np.asarray(net_values, dtype=float)
+        if len(net_values) == 0:
             return 0
         
-        latest_value = net_series.iloc[-1]
-        if latest_value == 0:
+        latest_value = net_values[-1]
+        if latest_value == 0 or np.isnan(latest_value):
             return 0
         
         is_positive = latest_value > 0
-        count = 0
-        
-        for value in reversed(net_series.values):
-            if (is_positive and value > 0) or (not is_positive and value < 0):
-                count += 1
-            else:
-                break
+        same_side = net_values > 0 if is_positive else net_values < 0
+        # 由尾端往回找第一個不同方向的日子
+        breaks = np.flatnonzero(~same_side[::-1])
+        count = int(breaks[0]) if len(breaks) else len(net_values)
         
         return count if is_positive else -count
     
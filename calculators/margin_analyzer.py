@@ -6,6 +6,9 @@ import pandas as pd
 import numpy as np
 from typing import Dict
 
+MARGIN_COLUMNS = ['margin_balance', 'margin_quota', 'short_balance', 'short_quota']
+
+
 class MarginAnalyzer:
     """融資融券分析器"""
     
@@ -21,11 +24,25 @@ class MarginAnalyzer:
         Returns:
             融資融券分析結果
         """
-        if len(margin_df) < 20:
+        columns = {
+            column: margin_df[column].to_numpy(dtype=float)
+            for column in MARGIN_COLUMNS
+        }
+        return MarginAnalyzer.analyze_margin_trading_array(columns)
+    
+    @staticmethod
+    def analyze_margin_trading_array(columns: Dict[str, np.ndarray]) -> Dict:
+        """
+        analyze_margin_trading 的陣列版本（API 熱路徑使用，不建立 DataFrame）
+        
+        Args:
+            columns: {欄位名稱: 由舊到新的陣列}，欄位同 analyze_margin_trading
+        """
+        if len(columns['margin_balance']) < 20:
             return {'error': '數據不足'}
         
-        recent = margin_df.iloc[-1]
-        previous = margin_df.iloc[-20]
+        recent = {name: values[-1] for name, values in columns.items()}
+        previous = {name: values[-20] for name, values in columns.items()}
         
         # 融資使用率
         margin_usage = (recent['margin_balance'] / recent['margin_quota']) * 100 if recent['margin_quota'] > 0 else 0
@@ -53,21 +70,21 @@ class MarginAnalyzer:
             'margin': {
                 'balance': int(recent['margin_balance']),
                 'quota': int(recent['margin_quota']),
-                'usage_pct': round(margin_usage, 2),
+                'usage_pct': round(float(margin_usage), 2),
                 'change': int(margin_change),
-                'change_pct': round(margin_change_pct, 2),
+                'change_pct': round(float(margin_change_pct), 2),
                 'trend': '增加' if margin_change > 0 else '減少' if margin_change < 0 else '持平'
             },
             'short': {
                 'balance': int(recent['short_balance']),
                 'quota': int(recent['short_quota']),
-                'usage_pct': round(short_usage, 2),
+                'usage_pct': round(float(short_usage), 2),
                 'change': int(short_change),
-                'change_pct': round(short_change_pct, 2),
+                'change_pct': round(float(short_change_pct), 2),
                 'trend': '增加' if short_change > 0 else '減少' if short_change < 0 else '持平'
             },
             'ratio': {
-                'margin_short_ratio': round(margin_short_ratio, 2),
+                'margin_short_ratio': round(float(margin_short_ratio), 2),
                 'interpretation': '偏多' if margin_short_ratio > 5 else '偏空' if margin_short_ratio < 2 else '中性'
             },
             'signal': signal
@@ -15,6 +15,7 @@ from datetime import datetime, timedelta
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from calculators.factor_base import FactorCalculatorBase
+from calculators import indicator_kernels as kernels
 from loguru import logger
 
 
@@ -41,25 +42,10 @@ class MomentumFactorCalculator(FactorCalculatorBase):
             return np.nan
         
         close_col = 'adjusted_close' if 'adjusted_close' in prices.columns else 'close_price'
-        closes = prices[close_col]
-        
-        # 計算價格變動
-        delta = closes.diff()
-        
-        # 分離漲跌
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        # 計算平均漲跌
-        avg_gain = gain.rolling(window=period).mean()
-        avg_loss = loss.rolling(window=period).mean()
-        
-        # 計算 RS 和 RSI
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
+        closes = prices[close_col].to_numpy(dtype=np.float64, na_value=np.nan)
         
         # 返回最新值
-        return rsi.iloc[-1]
+        return float(kernels.rsi(closes, period)[-1])
     
     def calculate_relative_return(
         self,
@@ -28,17 +28,17 @@ class PositionAnalyzer:
                 'distance_from_low': 距離低點的百分比
             }
         """
-        if len(prices) < 252:
-            # 使用所有可用數據
-            high_52w = prices.max()
-            low_52w = prices.min()
-        else:
-            # 使用最近252個交易日（約1年）
-            recent_prices = prices.tail(252)
-            high_52w = recent_prices.max()
-            low_52w = recent_prices.min()
+        return PositionAnalyzer.calculate_position_level_array(np.asarray(prices, dtype=float))
+    
+    @staticmethod
+    def calculate_position_level_array(prices: np.ndarray) -> Dict:
+        """calculate_position_level 的陣列版本（API 熱路徑使用，不建立 Series）"""
+        # 使用最近252個交易日（約1年），不足時使用所有可用數據
+        recent_prices = prices[-252:]
+        high_52w = np.nanmax(recent_prices)
+        low_52w = np.nanmin(recent_prices)
         
-        current_price = prices.iloc[-1]
+        current_price = prices[-1]
         
         # 計算百分位
         if high_52w == low_52w:
@@ -62,10 +62,10 @@ class PositionAnalyzer:
             'current_price': float(current_price),
             'high_52w': float(high_52w),
             'low_52w': float(low_52w),
-            'percentile_52w': round(percentile, 2),
+            'percentile_52w': round(float(percentile), 2),
             'level': level,
-            'distance_from_high': round(distance_from_high, 2),
-            'distance_from_low': round(distance_from_low, 2)
+            'distance_from_high': round(float(distance_from_high), 2),
+            'distance_from_low': round(float(distance_from_low), 2)
         }
     
     @staticmethod
@@ -85,13 +85,18 @@ class PositionAnalyzer:
                 'strength': 趨勢強度 (0-100)
             }
         """
-        current_price = prices.iloc[-1]
+        return PositionAnalyzer.analyze_trend_array(np.asarray(prices, dtype=float), periods)
+    
+    @staticmethod
+    def analyze_trend_array(prices: np.ndarray, periods: List[int] = [5, 20, 60]) -> Dict:
+        """analyze_trend 的陣列版本"""
+        current_price = prices[-1]
         
         # 計算各週期MA
         mas = {}
         for period in periods:
             if len(prices) >= period:
-                mas[f'ma{period}'] = prices.tail(period).mean()
+                mas[f'ma{period}'] = np.nanmean(prices[-period:])
         
         # 判斷MA排列（多頭/空頭）
         if len(mas) >= 3:
@@ -110,10 +115,11 @@ class PositionAnalyzer:
         else:
             ma_alignment = '數據不足'
         
-        # 計算趨勢斜率（使用20日MA）
+        # 計算趨勢斜率（20日MA 與 9 日前的 20日MA 比較；不足 29 日時為 NaN）
         if len(prices) >= 20:
-            ma20 = prices.rolling(window=20).mean()
-            slope = (ma20.iloc[-1] - ma20.iloc[-10]) / ma20.iloc[-10] * 100
+            ma20_now = prices[-20:].mean()
+            ma20_prev = prices[-29:-9].mean() if len(prices) >= 29 else np.nan
+            slope = (ma20_now - ma20_prev) / ma20_prev * 100
         else:
             slope = 0
         
@@ -135,10 +141,10 @@ class PositionAnalyzer:
         return {
             'trend': trend,
             'ma_alignment': ma_alignment,
-            'slope': round(slope, 2),
-            'strength': round(strength, 2),
-            'current_vs_ma5': round((current_price / mas.get('ma5', current_price) - 1) * 100, 2) if 'ma5' in mas else 0,
-            'current_vs_ma20': round((current_price / mas.get('ma20', current_price) - 1) * 100, 2) if 'ma20' in mas else 0
+            'slope': round(float(slope), 2),
+            'strength': round(float(strength), 2),
+            'current_vs_ma5': round(float(current_price / mas['ma5'] - 1) * 100, 2) if 'ma5' in mas else 0,
+            'current_vs_ma20': round(float(current_price / mas['ma20'] - 1) * 100, 2) if 'ma20' in mas else 0
         }
     
     @staticmethod
@@ -158,6 +164,13 @@ class PositionAnalyzer:
                 'volume_vs_avg': 當前量與平均量的比較百分比
             }
         """
+        return PositionAnalyzer.analyze_volume_price_relation_array(
+            np.asarray(prices, dtype=float), np.asarray(volumes, dtype=float), window
+        )
+    
+    @staticmethod
+    def analyze_volume_price_relation_array(prices: np.ndarray, volumes: np.ndarray, window: int = 20) -> Dict:
+        """analyze_volume_price_relation 的陣列版本"""
         if len(prices) < window or len(volumes) < window:
             return {
                 'relation': '數據不足',
@@ -166,9 +179,9 @@ class PositionAnalyzer:
             }
         
         # 計算價格和成交量變化
-        price_change = (prices.iloc[-1] - prices.iloc[-2]) / prices.iloc[-2]
-        volume_avg = volumes.tail(window).mean()
-        current_volume = volumes.iloc[-1]
+        price_change = (prices[-1] - prices[-2]) / prices[-2]
+        volume_avg = np.nanmean(volumes[-window:])
+        current_volume = volumes[-1]
         volume_change = (current_volume - volume_avg) / volume_avg
         
         # 判斷量價關係
@@ -191,7 +204,7 @@ class PositionAnalyzer:
         return {
             'relation': relation,
             'signal': signal,
-            'volume_vs_avg': round(volume_change * 100, 2)
+            'volume_vs_avg': round(float(volume_change) * 100, 2)
         }
     
     @staticmethod
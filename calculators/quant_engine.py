@@ -6,7 +6,6 @@ import numpy as np
 import pandas as pd
 from typing import List, Dict, Optional, Tuple
 from loguru import logger
-from scipy.optimize import minimize
 from datetime import datetime
 
 class MonteCarloSimulator:
@@ -144,6 +143,9 @@ class EfficientFrontierOptimizer:
         
     def optimize(self, points: int = 50) -> Dict:
         """計算效率前緣曲線與關鍵點"""
+        # scipy.optimize 載入約需 1 秒，只在實際計算效率前緣時 import
+        from scipy.optimize import minimize
+
         logger.info("計算效率前緣...")
         
         args = ()
@@ -4,6 +4,7 @@
 """
 
 import sys
+from typing import Dict, Tuple
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -0,0 +1,414 @@
+"""
+量化分析背景任務
+
+蒙地卡羅、效率前緣與風險分析改以任務執行：
+- 請求參數正規化後與資料日期（as-of）一起計算指紋，相同持倉 / 權重 / 期間 / 模擬次數
+  在同一天內直接回傳已完成的結果（quant_jobs 表即結果快取）
+- 未命中時建立任務並送進 ProcessPoolExecutor，子程序自行連線資料庫、
+  更新進度階段（fetching → computing → done）並寫回結果
+- 相同指紋已有未完成任務時不重複計算（唯一索引合併並發請求）
+- 任務狀態存在資料庫，多個 API worker 皆可查詢；逾時未完成的任務標記為 failed
+"""
+import concurrent.futures
+import hashlib
+import json
+import threading
+import time
+from datetime import date
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
+
+import psycopg2
+from loguru import logger
+from psycopg2.extras import Json, RealDictCursor
+
+from calculators import quant_tasks
+from config.settings import DATABASE_CONFIG, QUANT_JOB_CONFIG
+from utils.fast_json import dumps_bytes
+from utils.metrics import record_cache
+
+JOB_TYPES = ('monte-carlo', 'efficient-frontier', 'risk-analysis')
+FINISHED_STATUSES = ('done', 'failed')
+
+# 風險分析的基準（以 ETF 作為大盤代理）
+BENCHMARKS = {'TW': '0050', 'US': 'SPY'}
+
+_JOB_COLUMNS = """
+    id, job_type, params, as_of_date, status, stage, error, error_type,
+    created_at, started_at, finished_at
+"""
+
+
+class QuantInputError(ValueError):
+    """請求參數不合法或歷史資料不足（API 回應 400）"""
+
+
+def connect():
+    """子程序使用的資料庫連線"""
+    return psycopg2.connect(**DATABASE_CONFIG)
+
+
+# ========== 參數與指紋 ==========
+
+def _int_param(data: Dict, key: str, default: int, upper: int) -> int:
+    try:
+        value = int(data.get(key, default))
+    except (TypeError, ValueError):
+        raise QuantInputError(f'Invalid {key}')
+    if not 0 < value <= upper:
+        raise QuantInputError(f'{key} must be between 1 and {upper}')
+    return value
+
+
+def _normalize_holdings(data: Dict, with_weight: bool) -> list:
+    holdings = data.get('holdings') or []
+    if not holdings:
+        raise QuantInputError('No holdings provided')
+
+    normalized = {}
+    for h in holdings:
+        if not h.get('code'):
+            raise QuantInputError('Holding without code')
+        market = str(h.get('market', 'TW')).upper()
+        if market not in quant_tasks.PRICE_TABLES:
+            raise QuantInputError(f'Unsupported market: {market}')
+        item = {'code': str(h['code']), 'market': market}
+        if with_weight:
+            try:
+                item['weight'] = round(float(h.get('weight', 0)), 6)
+            except (TypeError, ValueError):
+                raise QuantInputError(f"Invalid weight for {h['code']}")
+        normalized[(market, item['code'])] = item
+    # 持倉順序不影響結果，排序後相同組合得到相同指紋
+    return [normalized[key] for key in sorted(normalized)]
+
+
+def normalize_request(job_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    將請求 body 轉為標準化的任務參數
+
+    Raises:
+        QuantInputError: 不支援的任務類型或參數不合法
+    """
+    if job_type == 'monte-carlo':
+        return {
+            'holdings': _normalize_holdings(data, with_weight=True),
+            'simulations': _int_param(data, 'simulations', 1000, QUANT_JOB_CONFIG['max_simulations']),
+            'days': _int_param(data, 'days', 252, QUANT_JOB_CONFIG['max_horizon_days']),
+            'initial_capital': float(data.get('initial_capital', 1000000)),
+        }
+    if job_type == 'efficient-frontier':
+        holdings = _normalize_holdings(data, with_weight=False)
+        if len(holdings) < 2:
+            raise QuantInputError('Need at least 2 assets with valid data')
+        return {'holdings': holdings}
+    if job_type == 'risk-analysis':
+        if not data.get('code'):
+            raise QuantInputError('No code provided')
+        market = str(data.get('market', 'TW')).upper()
+        if market not in BENCHMARKS:
+            raise QuantInputError(f'Unsupported market: {market}')
+        return {'code': str(data['code']), 'market': market}
+    raise QuantInputError(f'Unknown job type: {job_type}')
+
+
+def job_fingerprint(job_type: str, params: Dict[str, Any], as_of: date) -> str:
+    """任務指紋：SHA-256(任務類型, 標準化參數, 資料日期)"""
+    payload = json.dumps(
+        {'job_type': job_type, 'params': params, 'as_of': as_of.isoformat()},
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# ========== 計算 ==========
+
+def run_job(job_type: str, params: Dict[str, Any], conn=None, progress=None) -> Dict[str, Any]:
+    """
+    取得歷史收益率並執行計算
+
+    Args:
+        job_type: JOB_TYPES 之一
+        params: normalize_request 的結果
+        conn: 資料庫連線（讀取歷史價格）；None 時以 API 抓取
+        progress: 進度回呼 progress(stage)
+
+    Raises:
+        QuantInputError: 歷史資料不足
+    """
+    report = progress or (lambda stage: None)
+    report('fetching')
+
+    if job_type == 'risk-analysis':
+        market = params['market']
+        target_df = quant_tasks.fetch_historical_returns([params], conn=conn)
+        bench_df = quant_tasks.fetch_historical_returns([{'code': BENCHMARKS[market], 'market': market}], conn=conn)
+        if target_df.empty or bench_df.empty:
+            raise QuantInputError('Insufficient data')
+        report('computing')
+        return quant_tasks.risk_analysis(target_df.iloc[:, 0], bench_df.iloc[:, 0])
+
+    returns_df = quant_tasks.fetch_historical_returns(params['holdings'], conn=conn)
+    if job_type == 'efficient-frontier':
+        if returns_df.empty or len(returns_df.columns) < 2:
+            raise QuantInputError('Need at least 2 assets with valid data')
+        report('computing')
+        return quant_tasks.efficient_frontier(returns_df)
+
+    if returns_df.empty:
+        raise QuantInputError('Insufficient historical data')
+    report('computing')
+    return quant_tasks.monte_carlo(
+        returns_df,
+        quant_tasks.ordered_weights(params['holdings'], returns_df.columns),
+        params['simulations'],
+        params['days'],
+        params['initial_capital']
+    )
+
+
+def _execute(job_id: int, job_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """子程序進入點：執行任務並寫回狀態與結果"""
+    conn = connect()
+    try:
+        set_stage(conn, job_id, 'fetching', started=True)
+        result = run_job(job_type, params, conn, progress=partial(set_stage, conn, job_id))
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE quant_jobs
+                SET status = 'done', stage = 'done', result = %s, finished_at = NOW()
+                WHERE id = %s
+            """, (Json(result, dumps=lambda obj: dumps_bytes(obj).decode('utf-8')), job_id))
+        conn.commit()
+        return result
+    except Exception as e:
+        conn.rollback()
+        mark_failed(conn, job_id, e)
+        raise
+    finally:
+        conn.close()
+
+
+# ========== 任務表 ==========
+
+def set_stage(conn, job_id: int, stage: str, started: bool = False):
+    """更新任務進度階段（立即 commit，供其他程序查詢）"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE quant_jobs
+            SET status = 'running', stage = %s,
+                started_at = CASE WHEN %s THEN NOW() ELSE started_at END
+            WHERE id = %s
+        """, (stage, started, job_id))
+    conn.commit()
+
+
+def mark_failed(conn, job_id: int, error: BaseException) -> bool:
+    """將未完成的任務標記為失敗（已結束的任務不變）"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE quant_jobs
+            SET status = 'failed', error = %s, error_type = %s, finished_at = NOW()
+            WHERE id = %s AND status IN ('pending', 'running')
+        """, (str(error)[:1000] or type(error).__name__, type(error).__name__, job_id))
+        updated = cursor.rowcount > 0
+    conn.commit()
+    return updated
+
+
+def expire_stale(conn, stale_minutes: Optional[int] = None) -> int:
+    """
+    將逾時未完成的任務標記為 failed（程序中斷），釋放指紋讓新請求重新計算
+
+    Returns:
+        標記的任務數
+    """
+    minutes = stale_minutes or QUANT_JOB_CONFIG['stale_minutes']
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE quant_jobs
+            SET status = 'failed', error = '任務逾時未完成', error_type = 'Timeout', finished_at = NOW()
+            WHERE status IN ('pending', 'running') AND created_at < NOW() - make_interval(mins => %s)
+        """, (minutes,))
+        expired = cursor.rowcount
+    conn.commit()
+    if expired:
+        logger.warning(f"標記 {expired} 個逾時的量化任務")
+    return expired
+
+
+def lookup_result(conn, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """指紋對應的已完成任務（含結果）"""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(f"""
+            SELECT {_JOB_COLUMNS}, result
+            FROM quant_jobs
+            WHERE fingerprint = %s AND status = 'done'
+            ORDER BY finished_at DESC
+            LIMIT 1
+        """, (fingerprint,))
+        row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def create_job(
+    conn, job_type: str, params: Dict[str, Any], fingerprint: str, as_of: date
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    建立任務；相同指紋已有未完成任務時回傳該任務
+
+    Returns:
+        (任務, 是否新建立)
+    """
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(f"""
+                INSERT INTO quant_jobs (job_type, params, fingerprint, as_of_date)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (fingerprint) WHERE status IN ('pending', 'running') DO NOTHING
+                RETURNING {_JOB_COLUMNS}
+            """, (job_type, Json(params), fingerprint, as_of))
+            row = cursor.fetchone()
+            created = row is not None
+            if not created:
+                cursor.execute(f"""
+                    SELECT {_JOB_COLUMNS}
+                    FROM quant_jobs
+                    WHERE fingerprint = %s AND status IN ('pending', 'running')
+                """, (fingerprint,))
+                row = cursor.fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    # 極少數情況：查詢前該任務剛好結束，改由呼叫端重新查快取
+    return (dict(row) if row else None), created
+
+
+def get_job(conn, job_id: int, with_result: bool = True) -> Optional[Dict[str, Any]]:
+    """讀取單一任務"""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(f"""
+            SELECT {_JOB_COLUMNS}{', result' if with_result else ''}
+            FROM quant_jobs WHERE id = %s
+        """, (job_id,))
+        row = cursor.fetchone()
+    conn.commit()
+    return dict(row) if row else None
+
+
+# ========== 執行器 ==========
+
+class QuantJobExecutor:
+    """以程序池執行量化任務（每個 API 程序一個，首次提交時建立程序池）"""
+
+    def __init__(self, max_workers: Optional[int] = None, connect_func=None):
+        """
+        Args:
+            max_workers: 程序數（預設 QUANT_JOB_CONFIG['processes']，0 表示 CPU 核心數）
+            connect_func: 主程序記錄程序池異常時使用的連線函式
+        """
+        self.max_workers = max_workers or QUANT_JOB_CONFIG['processes'] or None
+        self.connect = connect_func or connect
+        self._pool = None
+        self._futures: Dict[int, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def submit(
+        self, conn, job_type: str, params: Dict[str, Any], as_of: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """
+        提交任務（快取命中時不計算）
+
+        Returns:
+            任務資料；快取命中時 status 為 'done'、cached 為 True 並含 result
+        """
+        as_of = as_of or date.today()
+        fingerprint = job_fingerprint(job_type, params, as_of)
+
+        cached = lookup_result(conn, fingerprint)
+        record_cache('quant_result', cached is not None)
+        if cached:
+            return dict(cached, cached=True)
+
+        expire_stale(conn)
+        job, created = create_job(conn, job_type, params, fingerprint, as_of)
+        if job is None:
+            cached = lookup_result(conn, fingerprint)
+            if cached:
+                return dict(cached, cached=True)
+            raise RuntimeError('任務建立失敗')
+
+        if created:
+            future = self.pool.submit(_execute, job['id'], job_type, params)
+            with self._lock:
+                self._futures[job['id']] = future
+            future.add_done_callback(partial(self._on_done, job['id']))
+            logger.info(f"量化任務 #{job['id']} ({job_type}) 已提交")
+        return dict(job, cached=False)
+
+    def future(self, job_id: int) -> Optional[concurrent.futures.Future]:
+        """本程序提交且尚未結束的任務 Future"""
+        with self._lock:
+            return self._futures.get(job_id)
+
+    def _on_done(self, job_id: int, future: concurrent.futures.Future):
+        with self._lock:
+            self._futures.pop(job_id, None)
+        error = concurrent.futures.CancelledError('任務已取消') if future.cancelled() else future.exception()
+        if error is None:
+            return
+        # 子程序通常已寫回失敗狀態；程序池崩潰、取消或子程序無法連線時由此補記（已結束的任務不變）
+        try:
+            conn = self.connect()
+            try:
+                mark_failed(conn, job_id, error)
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"記錄量化任務 #{job_id} 失敗狀態時發生錯誤：{e}")
+
+    def wait(self, conn, job_id: int, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        等待任務結束（本程序提交的任務等待 Future，其他程序的任務輪詢資料表）
+
+        Returns:
+            任務資料（逾時時 status 仍為 pending / running）
+        """
+        deadline = time.monotonic() + timeout
+        future = self.future(job_id)
+        if future is not None:
+            concurrent.futures.wait([future], timeout=timeout)
+
+        while True:
+            job = get_job(conn, job_id)
+            if job is None or job['status'] in FINISHED_STATUSES or time.monotonic() >= deadline:
+                return job
+            time.sleep(QUANT_JOB_CONFIG['poll_interval'])
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_default_executor: Optional[QuantJobExecutor] = None
+_default_lock = threading.Lock()
+
+
+def default_executor() -> QuantJobExecutor:
+    """程序內共用的執行器（Flask 與 ASGI 端點共用同一個程序池）"""
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = QuantJobExecutor()
+        return _default_executor
@@ -0,0 +1,132 @@
+"""
+量化計算任務（可序列化的模組層級函式）
+
+蒙地卡羅、效率前緣與風險因子分析皆為 CPU 密集運算；
+由 calculators.quant_jobs 送進 ProcessPoolExecutor 執行，不佔用 API worker。
+
+歷史收益率優先讀取資料庫的日線價格（tw_stock_prices / us_stock_prices），
+資料庫缺少或資料不足的標的才以 API 客戶端即時抓取。
+"""
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from calculators.quant_engine import MonteCarloSimulator, EfficientFrontierOptimizer, RiskFactorAnalyzer
+from data_loader.sync_planner import SYNC_SOURCES
+from utils.typed_fetch import fetch_arrays, group_arrays
+
+# 價格表與標的欄位（tw_stock_prices.stock_code / us_stock_prices.symbol）
+PRICE_TABLES = {market: source['table'] for market, source in SYNC_SOURCES.items()}
+
+
+def ordered_weights(holdings: List[Dict], columns) -> List[float]:
+    """依收益率矩陣的欄位順序排列持倉權重（缺少的標的權重為 0）"""
+    weights_map = {h['code']: h['weight'] for h in holdings}
+    return [weights_map.get(col, 0) for col in columns]
+
+
+def _load_db_closes(conn, market: str, codes: List[str], start_date: date) -> Dict[str, pd.Series]:
+    """單一市場所有標的的收盤價（一次查詢）"""
+    source = SYNC_SOURCES[market]
+    with conn.cursor() as cursor:
+        columns = fetch_arrays(cursor, f"""
+            SELECT {source['key']} AS code, trade_date, close_price
+            FROM {source['table']}
+            WHERE {source['key']} = ANY(%s) AND trade_date >= %s
+            ORDER BY {source['key']}, trade_date
+        """, (codes, start_date), dtypes={'code': object, 'trade_date': 'datetime64[D]'})
+    return {
+        code: pd.Series(series['close_price'], index=pd.DatetimeIndex(series['trade_date']))
+        for code, series in group_arrays(columns, 'code').items()
+    }
+
+
+def _fetch_api_closes(code: str, market: str, start_date: date, end_date: date) -> pd.Series:
+    """以 API 客戶端抓取收盤價（資料庫缺少的標的）"""
+    if market == 'TW':
+        from api_clients.tw_stock_client import TWStockClient
+        df = TWStockClient().get_daily_price(code, start_date.isoformat(), end_date.isoformat())
+    else:
+        from api_clients.us_stock_client import USStockClient
+        df = USStockClient().get_daily_price(code, start_date.isoformat(), end_date.isoformat())
+    if df.empty:
+        return pd.Series(dtype=np.float64)
+    df['trade_date'] = pd.to_datetime(df['trade_date'])
+    return df.set_index('trade_date').sort_index()['close'].astype(np.float64)
+
+
+def fetch_historical_returns(holdings: List[Dict], days: int = 252, conn=None) -> pd.DataFrame:
+    """
+    持倉標的的日收益率矩陣（依日期對齊，欄位為標的代碼）
+
+    Args:
+        holdings: [{'code': '2330', 'market': 'TW'}, ...]
+        days: 需要的交易日數（往前多抓 1.5 倍日曆天）
+        conn: 資料庫連線；None 時全部以 API 抓取
+
+    Returns:
+        DataFrame；無任何資料時為空
+    """
+    end_date = date.today()
+    start_date = end_date - timedelta(days=int(days * 1.5))
+
+    closes = {}
+    if conn is not None:
+        by_market = {}
+        for h in holdings:
+            by_market.setdefault(h.get('market', 'TW'), []).append(h['code'])
+        for market, codes in by_market.items():
+            try:
+                loaded = _load_db_closes(conn, market, codes, start_date)
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"讀取 {market} 價格失敗，改用 API：{e}")
+                continue
+            # 資料不足一半的標的視為缺漏，交給 API 補抓
+            closes.update({code: series for code, series in loaded.items() if len(series) > days // 2})
+
+    for h in holdings:
+        code = h['code']
+        if code in closes:
+            continue
+        try:
+            series = _fetch_api_closes(code, h.get('market', 'TW'), start_date, end_date)
+        except Exception as e:
+            logger.warning(f"抓取 {code} 價格失敗：{e}")
+            continue
+        if not series.empty:
+            closes[code] = series
+
+    if not closes:
+        return pd.DataFrame()
+    returns = {code: series.pct_change().dropna() for code, series in closes.items()}
+    return pd.DataFrame(returns).dropna()
+
+
+def monte_carlo(
+    returns_df: pd.DataFrame,
+    weights: List[float],
+    num_simulations: int = 1000,
+    time_horizon: int = 252,
+    initial_capital: float = 1000000
+) -> Dict:
+    """蒙地卡羅模擬"""
+    return MonteCarloSimulator(returns_df).simulate(
+        weights,
+        num_simulations=num_simulations,
+        time_horizon=time_horizon,
+        initial_capital=initial_capital
+    )
+
+
+def efficient_frontier(returns_df: pd.DataFrame) -> Dict:
+    """效率前緣最佳化"""
+    return EfficientFrontierOptimizer(returns_df).optimize()
+
+
+def risk_analysis(target_returns: pd.Series, benchmark_returns: pd.Series) -> Dict:
+    """相對基準的風險因子分析"""
+    return RiskFactorAnalyzer(target_returns, benchmark_returns).analyze()
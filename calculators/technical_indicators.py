@@ -1,14 +1,58 @@
 """
 技術指標計算器 - Technical Indicators
 計算常用技術指標：RSI, MACD, KD, Williams %R, 布林通道等
+
+實際運算由 calculators.indicator_kernels 的 NumPy 核心執行，
+本類別負責 pandas Series 的輸入輸出包裝
 """
 import pandas as pd
 import numpy as np
 from typing import Dict, Tuple
 
+from calculators import indicator_kernels as kernels
+
+
+def _values(series: pd.Series) -> np.ndarray:
+    """取出 float64 陣列（相容 Decimal 等 object 欄位）"""
+    return series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _wrap(values: np.ndarray, like: pd.Series) -> pd.Series:
+    """以原序列的索引包裝計算結果"""
+    return pd.Series(values, index=like.index)
+
+
 class TechnicalIndicators:
     """技術指標計算器"""
     
+    @staticmethod
+    def calculate_ma(prices: pd.Series, period: int = 20) -> pd.Series:
+        """
+        計算移動平均線 (MA)
+        
+        Args:
+            prices: 價格序列
+            period: 計算週期
+            
+        Returns:
+            MA序列
+        """
+        return _wrap(kernels.sma(_values(prices), period), prices)
+    
+    @staticmethod
+    def calculate_ema(prices: pd.Series, period: int = 20) -> pd.Series:
+        """
+        計算指數移動平均線 (EMA)
+        
+        Args:
+            prices: 價格序列
+            period: 計算週期
+            
+        Returns:
+            EMA序列
+        """
+        return _wrap(kernels.ema(_values(prices), period), prices)
+    
     @staticmethod
     def calculate_rsi(prices: pd.Series, period: int = 14) -> pd.Series:
         """
@@ -21,13 +65,21 @@ class TechnicalIndicators:
         Returns:
             RSI序列 (0-100)
         """
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        return _wrap(kernels.rsi(_values(prices), period), prices)
+    
+    @staticmethod
+    def calculate_rsi_wilder(prices: pd.Series, period: int = 14) -> pd.Series:
+        """
+        計算RSI（Wilder 平滑，與券商看盤軟體一致）
         
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        Args:
+            prices: 價格序列
+            period: 計算週期（預設14）
+            
+        Returns:
+            RSI序列 (0-100)
+        """
+        return _wrap(kernels.rsi_wilder(_values(prices), period), prices)
     
     @staticmethod
     def calculate_macd(
@@ -48,14 +100,12 @@ class TechnicalIndicators:
         Returns:
             (MACD線, 訊號線, 柱狀圖)
         """
-        ema_fast = prices.ewm(span=fast, adjust=False).mean()
-        ema_slow = prices.ewm(span=slow, adjust=False).mean()
-        
-        macd_line = ema_fast - ema_slow
-        signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-        histogram = macd_line - signal_line
-        
-        return macd_line, signal_line, histogram
+        result = kernels.macd(_values(prices), fast, slow, signal)
+        return (
+            _wrap(result['macd'], prices),
+            _wrap(result['signal'], prices),
+            _wrap(result['histogram'], prices)
+        )
     
     @staticmethod
     def calculate_kd(
@@ -69,6 +119,8 @@ class TechnicalIndicators:
         """
         計算KD隨機指標
         
+        採台股慣用平滑：K = 前K × 2/3 + RSV × 1/3（k_period=3 時），D 值同理
+        
         Args:
             high: 最高價序列
             low: 最低價序列
@@ -80,18 +132,8 @@ class TechnicalIndicators:
         Returns:
             (K值, D值)
         """
-        # 計算RSV
-        lowest_low = low.rolling(window=period).min()
-        highest_high = high.rolling(window=period).max()
-        rsv = (close - lowest_low) / (highest_high - lowest_low) * 100
-        
-        # 計算K值（RSV的移動平均）
-        k = rsv.ewm(span=k_period, adjust=False).mean()
-        
-        # 計算D值（K值的移動平均）
-        d = k.ewm(span=d_period, adjust=False).mean()
-        
-        return k, d
+        result = kernels.kd(_values(high), _values(low), _values(close), period, k_period, d_period)
+        return _wrap(result['k'], close), _wrap(result['d'], close)
     
     @staticmethod
     def calculate_williams_r(
@@ -112,11 +154,7 @@ class TechnicalIndicators:
         Returns:
             Williams %R序列 (-100 to 0)
         """
-        highest_high = high.rolling(window=period).max()
-        lowest_low = low.rolling(window=period).min()
-        
-        wr = (highest_high - close) / (highest_high - lowest_low) * -100
-        return wr
+        return _wrap(kernels.williams_r(_values(high), _values(low), _values(close), period), close)
     
     @staticmethod
     def calculate_bollinger_bands(
@@ -135,13 +173,188 @@ class TechnicalIndicators:
         Returns:
             (上軌, 中軌, 下軌)
         """
-        middle = prices.rolling(window=period).mean()
-        std = prices.rolling(window=period).std()
+        bands = kernels.bollinger_bands(_values(prices), period, std_dev)
+        return (
+            _wrap(bands['upper'], prices),
+            _wrap(bands['middle'], prices),
+            _wrap(bands['lower'], prices)
+        )
+    
+    @staticmethod
+    def calculate_atr(
+        high: pd.Series,
+        low: pd.Series,
+        close: pd.Series,
+        period: int = 14,
+        wilder: bool = False
+    ) -> pd.Series:
+        """
+        計算平均真實範圍 (ATR)
+        
+        Args:
+            high: 最高價序列
+            low: 最低價序列
+            close: 收盤價序列
+            period: 計算週期
+            wilder: 是否使用 Wilder 平滑（預設為簡單移動平均）
+            
+        Returns:
+            ATR序列
+        """
+        atr = kernels.atr_wilder if wilder else kernels.atr
+        return _wrap(atr(_values(high), _values(low), _values(close), period), close)
+    
+    @staticmethod
+    def calculate_dmi(
+        high: pd.Series,
+        low: pd.Series,
+        close: pd.Series,
+        period: int = 14
+    ) -> Tuple[pd.Series, pd.Series, pd.Series]:
+        """
+        計算趨向指標 DMI / ADX（Wilder 平滑）
+        
+        Args:
+            high: 最高價序列
+            low: 最低價序列
+            close: 收盤價序列
+            period: 計算週期
+            
+        Returns:
+            (+DI, -DI, ADX)
+        """
+        result = kernels.dmi(_values(high), _values(low), _values(close), period)
+        return (
+            _wrap(result['plus_di'], close),
+            _wrap(result['minus_di'], close),
+            _wrap(result['adx'], close)
+        )
+    
+    @staticmethod
+    def calculate_obv(close: pd.Series, volume: pd.Series) -> pd.Series:
+        """
+        計算能量潮 (OBV)
+        
+        Args:
+            close: 收盤價序列
+            volume: 成交量序列
+            
+        Returns:
+            OBV序列
+        """
+        return _wrap(kernels.obv(_values(close), _values(volume)), close)
+    
+    @staticmethod
+    def calculate_vwap(
+        high: pd.Series,
+        low: pd.Series,
+        close: pd.Series,
+        volume: pd.Series,
+        period: int = 20
+    ) -> pd.Series:
+        """
+        計算滾動成交量加權平均價 (VWAP)
+        
+        Args:
+            high: 最高價序列
+            low: 最低價序列
+            close: 收盤價序列
+            volume: 成交量序列
+            period: 計算週期
+            
+        Returns:
+            VWAP序列
+        """
+        return _wrap(kernels.vwap(_values(high), _values(low), _values(close), _values(volume), period), close)
+    
+    @staticmethod
+    def calculate_cci(
+        high: pd.Series,
+        low: pd.Series,
+        close: pd.Series,
+        period: int = 20
+    ) -> pd.Series:
+        """
+        計算順勢指標 (CCI)
+        
+        Args:
+            high: 最高價序列
+            low: 最低價序列
+            close: 收盤價序列
+            period: 計算週期
+            
+        Returns:
+            CCI序列
+        """
+        return _wrap(kernels.cci(_values(high), _values(low), _values(close), period), close)
+    
+    @staticmethod
+    def calculate_stoch_rsi(
+        prices: pd.Series,
+        rsi_period: int = 14,
+        stoch_period: int = 14,
+        k_period: int = 3,
+        d_period: int = 3
+    ) -> Tuple[pd.Series, pd.Series]:
+        """
+        計算隨機RSI (Stochastic RSI)
+        
+        Args:
+            prices: 價格序列
+            rsi_period: Wilder RSI 週期
+            stoch_period: 隨機指標週期
+            k_period: %K 平滑週期
+            d_period: %D 平滑週期
+            
+        Returns:
+            (%K, %D)
+        """
+        result = kernels.stoch_rsi(_values(prices), rsi_period, stoch_period, k_period, d_period)
+        return _wrap(result['k'], prices), _wrap(result['d'], prices)
+    
+    @staticmethod
+    def calculate_ichimoku(
+        high: pd.Series,
+        low: pd.Series,
+        close: pd.Series,
+        tenkan: int = 9,
+        kijun: int = 26,
+        senkou: int = 52
+    ) -> Dict[str, pd.Series]:
+        """
+        計算一目均衡表
         
-        upper = middle + (std * std_dev)
-        lower = middle - (std * std_dev)
+        Args:
+            high: 最高價序列
+            low: 最低價序列
+            close: 收盤價序列
+            tenkan: 轉換線週期
+            kijun: 基準線週期（亦為先行帶平移天數）
+            senkou: 先行帶B週期
+            
+        Returns:
+            {'tenkan', 'kijun', 'senkou_a', 'senkou_b', 'chikou'}
+        """
+        result = kernels.ichimoku(_values(high), _values(low), _values(close),
+                                  tenkan, kijun, senkou, displacement=kijun)
+        return {key: _wrap(values, close) for key, values in result.items()}
+    
+    @staticmethod
+    def calculate_extended(ohlcv: pd.DataFrame) -> pd.DataFrame:
+        """
+        一次計算所有擴充指標（共用同一份價格資料）
         
-        return upper, middle, lower
+        Args:
+            ohlcv: DataFrame包含columns: high, low, close, volume
+            
+        Returns:
+            DataFrame，欄位與 technical_indicators 表的擴充欄位一致
+        """
+        result = kernels.calculate_extended(
+            _values(ohlcv['high']), _values(ohlcv['low']),
+            _values(ohlcv['close']), _values(ohlcv['volume'])
+        )
+        return pd.DataFrame(result, index=ohlcv.index)
     
     @staticmethod
     def calculate_moving_averages(
@@ -158,10 +371,11 @@ class TechnicalIndicators:
         Returns:
             {'ma5': Series, 'ma10': Series, ...}
         """
+        values = _values(prices)
         mas = {}
         for period in periods:
             if len(prices) >= period:
-                mas[f'ma{period}'] = prices.rolling(window=period).mean()
+                mas[f'ma{period}'] = _wrap(kernels.sma(values, period), prices)
         return mas
     
     @staticmethod
@@ -4,15 +4,14 @@
 """
 from flask import Blueprint, jsonify, request
 import psycopg2
-from psycopg2 import extras
 import os
-import pandas as pd
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from calculators.institutional_analyzer import InstitutionalAnalyzer
 from calculators.margin_analyzer import MarginAnalyzer
+from utils.typed_fetch import fetch_arrays
 
 chips_api = Blueprint('chips_api', __name__)
 
@@ -36,36 +35,31 @@ def get_institutional(stock_code):
     
     try:
         conn = get_db()
-        cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
+        cursor = conn.cursor()
         
-        # 獲取三大法人交易數據
-        cursor.execute("""
-            SELECT trade_date, foreign_buy, foreign_sell, trust_buy, trust_sell,
+        # 獲取三大法人交易數據（直接取為陣列，反轉為由舊到新）
+        columns = fetch_arrays(cursor, """
+            SELECT foreign_buy, foreign_sell, trust_buy, trust_sell,
                    dealer_buy, dealer_sell, close_price
             FROM institutional_trades
             WHERE stock_code = %s
             ORDER BY trade_date DESC
             LIMIT %s
-        """, (stock_code, days))
+        """, (stock_code, days), reverse=True)
         
-        data = cursor.fetchall()
         cursor.close()
         conn.close()
         
-        if not data:
+        data_points = len(columns['close_price'])
+        if not data_points:
             return jsonify({'error': f'找不到 {stock_code} 的三大法人數據'}), 404
         
-        # 轉換為DataFrame並分析
-        df = pd.DataFrame(data)
-        df = df.sort_values('trade_date')  # 由舊到新排序
-        
-        analyzer = InstitutionalAnalyzer()
-        analysis = analyzer.analyze_daily_trades(df, days=min(days, len(df)))
+        analysis = InstitutionalAnalyzer.analyze_daily_trades_array(columns, days=min(days, data_points))
         
         return jsonify({
             'stock_code': stock_code,
             'analysis_days': days,
-            'data_points': len(data),
+            'data_points': data_points,
             'analysis': analysis
         })
         
@@ -83,34 +77,29 @@ def get_margin(stock_code):
     """
     try:
         conn = get_db()
-        cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
+        cursor = conn.cursor()
         
-        # 獲取融資融券數據
-        cursor.execute("""
-            SELECT trade_date, margin_balance, margin_quota, short_balance, short_quota
+        # 獲取融資融券數據（直接取為陣列，反轉為由舊到新）
+        columns = fetch_arrays(cursor, """
+            SELECT margin_balance, margin_quota, short_balance, short_quota
             FROM margin_trading
             WHERE stock_code = %s
             ORDER BY trade_date DESC
             LIMIT 30
-        """, (stock_code,))
+        """, (stock_code,), reverse=True)
         
-        data = cursor.fetchall()
         cursor.close()
         conn.close()
         
-        if not data:
+        data_points = len(columns['margin_balance'])
+        if not data_points:
             return jsonify({'error': f'找不到 {stock_code} 的融資融券數據'}), 404
         
-        # 轉換為DataFrame並分析
-        df = pd.DataFrame(data)
-        df = df.sort_values('trade_date')  # 由舊到新排序
-        
-        analyzer = MarginAnalyzer()
-        analysis = analyzer.analyze_margin_trading(df)
+        analysis = MarginAnalyzer.analyze_margin_trading_array(columns)
         
         return jsonify({
             'stock_code': stock_code,
-            'data_points': len(data),
+            'data_points': data_points,
             'analysis': analysis
         })
         
@@ -55,6 +55,17 @@ API_RATE_LIMITS = {
     'tiingo': {'delay': 1.0, 'daily_limit': None},
     'finnhub': {'delay': 1.0, 'daily_limit': 60},          # 60 calls/minute (free tier)
     'fmp': {'delay': 0.3, 'daily_limit': 250},             # 250 calls/day (free tier)
+    'twse': {'delay': 3, 'daily_limit': None},
+    'tpex': {'delay': 3, 'daily_limit': None},
+    'tdcc': {'delay': 3, 'daily_limit': None},
+    'gemini': {'delay': 0, 'daily_limit': None},           # 以 AI_CONFIG 的 RPM / TPM 限流
+}
+
+# API 流量遙測（utils/api_telemetry.py）
+API_TELEMETRY_CONFIG = {
+    # 是否定期把各程序的統計寫入 api_call_stats（跨程序加總當日用量）
+    'persist': os.getenv('API_TELEMETRY_PERSIST', 'true').lower() == 'true',
+    'flush_seconds': int(os.getenv('API_TELEMETRY_FLUSH_SECONDS', 60)),
 }
 
 # ==========================================
@@ -161,6 +172,156 @@ LOG_DIR.mkdir(exist_ok=True)
 AI_CONFIG = {
     'report_cache_days': int(os.getenv('AI_REPORT_CACHE_DAYS', 7)),
     'model_version': 'gemini-2.5-pro',
+    # 'gemini' 或 'stub'（本地測試，不呼叫外部 API）
+    'model_provider': os.getenv('AI_MODEL_PROVIDER', 'gemini'),
+    # Gemini 配額（依使用的模型與方案調整）
+    'rpm': int(os.getenv('GEMINI_RPM', 15)),
+    'tpm': int(os.getenv('GEMINI_TPM', 1000000)),
+    # AI 任務佇列
+    'job_concurrency': int(os.getenv('AI_JOB_CONCURRENCY', 4)),
+    'job_max_attempts': int(os.getenv('AI_JOB_MAX_ATTEMPTS', 5)),
+    'job_stale_minutes': int(os.getenv('AI_JOB_STALE_MINUTES', 15)),
+    # 每次請求的資料上下文 token 預算（固定指示放在 system prefix，不計入）
+    'prompt_budget_tokens': int(os.getenv('AI_PROMPT_BUDGET_TOKENS', 1500)),
+    # system prefix 達此 token 數才建立顯式 context cache（Gemini 下限約 4096）
+    'context_cache_min_tokens': int(os.getenv('AI_CONTEXT_CACHE_MIN_TOKENS', 4096)),
+    'context_cache_ttl_minutes': int(os.getenv('AI_CONTEXT_CACHE_TTL_MINUTES', 60)),
+}
+
+# ==========================================
+# API 回應設定
+# ==========================================
+API_RESPONSE_CONFIG = {
+    # 回應本文達此大小才壓縮（小回應壓縮不划算）
+    'compress_min_bytes': int(os.getenv('API_COMPRESS_MIN_BYTES', 1024)),
+    'gzip_level': int(os.getenv('API_GZIP_LEVEL', 6)),
+    'brotli_quality': int(os.getenv('API_BROTLI_QUALITY', 4)),
+}
+
+# ==========================================
+# ASGI 服務設定（asgi_server.py）
+# ==========================================
+ASGI_CONFIG = {
+    # asyncpg 連線池大小（每個 worker 程序）
+    'db_pool_min_size': int(os.getenv('ASGI_DB_POOL_MIN', 2)),
+    'db_pool_max_size': int(os.getenv('ASGI_DB_POOL_MAX', 10)),
+}
+
+# ==========================================
+# 量化任務設定（calculators/quant_jobs.py）
+# ==========================================
+QUANT_JOB_CONFIG = {
+    # 蒙地卡羅、效率前緣、風險分析的程序池大小（每個 API 程序），0 表示 CPU 核心數
+    'processes': int(os.getenv('QUANT_JOB_PROCESSES', 0)),
+    # 同步端點等待任務完成的秒數，逾時改回傳任務 ID（202）
+    'wait_seconds': float(os.getenv('QUANT_JOB_WAIT_SECONDS', 60)),
+    'poll_interval': float(os.getenv('QUANT_JOB_POLL_INTERVAL', 0.5)),
+    # 超過此時間仍未完成的任務視為中斷
+    'stale_minutes': int(os.getenv('QUANT_JOB_STALE_MINUTES', 30)),
+    'max_simulations': int(os.getenv('QUANT_MAX_SIMULATIONS', 20000)),
+    'max_horizon_days': int(os.getenv('QUANT_MAX_HORIZON_DAYS', 2520)),
+}
+
+# ==========================================
+# 效能量測設定（utils/profiling.py）
+# ==========================================
+PROFILING_CONFIG = {
+    'enabled': os.getenv('PROFILING_ENABLED', 'true').lower() == 'true',
+    # X-Profile 標頭需等於此值才會分析該請求（未設定時僅 debug 模式可用）
+    'profile_token': os.getenv('PROFILE_TOKEN', ''),
+    # 'cprofile' 或 'pyinstrument'（取樣式，需另行安裝）
+    'profiler': os.getenv('PROFILER', 'cprofile'),
+    'profile_lines': int(os.getenv('PROFILE_LINES', 40)),
+    'profile_keep': int(os.getenv('PROFILE_KEEP', 20)),
+    # 超過此時間的請求記錄 warning（含 DB / 外部 API 時間拆分）
+    'slow_request_ms': int(os.getenv('SLOW_REQUEST_MS', 1000)),
+}
+
+# ==========================================
+# 壓力測試設定（scripts/seed_benchmark_data.py、scripts/load_test.py）
+# ==========================================
+LOADTEST_CONFIG = {
+    # 合成資料寫入的獨立資料庫（其餘連線參數同 DATABASE_CONFIG）
+    'database': os.getenv('BENCH_DB_NAME', 'quant_bench'),
+    'base_url': os.getenv('LOADTEST_BASE_URL', 'http://localhost:5000'),
+    'concurrency': int(os.getenv('LOADTEST_CONCURRENCY', 16)),
+    'duration': float(os.getenv('LOADTEST_DURATION', 60)),
+    'warmup': float(os.getenv('LOADTEST_WARMUP', 10)),
+    'timeout': float(os.getenv('LOADTEST_TIMEOUT', 30)),
+    # 標的熱度：第 k 熱門標的被選中的權重為 1 / k^skew（0 為均勻分布）
+    'symbol_skew': float(os.getenv('LOADTEST_SYMBOL_SKEW', 1.0)),
+    # 批次端點每次請求的標的數
+    'batch_size': int(os.getenv('LOADTEST_BATCH_SIZE', 20)),
+    'report_dir': BASE_DIR / 'logs' / 'loadtest',
+    # 端點組合：weight 為相對比例；路徑與參數中的 {tw} / {us} 代入單一標的，
+    # {tw_batch} / {us_batch} 代入逗號分隔的標的列表
+    'mix': [
+        {'name': 'health', 'weight': 2, 'method': 'GET', 'path': '/api/health'},
+        {'name': 'market_summary', 'weight': 5, 'method': 'GET', 'path': '/api/market/summary'},
+        {'name': 'prices_tw', 'weight': 20, 'method': 'GET', 'path': '/api/prices/{tw}',
+         'params': {'market': 'tw', 'limit': 250}},
+        {'name': 'prices_us', 'weight': 10, 'method': 'GET', 'path': '/api/prices/{us}',
+         'params': {'market': 'us', 'limit': 250}},
+        {'name': 'prices_history', 'weight': 3, 'method': 'GET', 'path': '/api/prices/{tw}',
+         'params': {'market': 'tw', 'limit': 1000}},
+        {'name': 'depth_tw', 'weight': 15, 'method': 'GET', 'path': '/api/analysis/depth/{tw}',
+         'params': {'market': 'tw'}},
+        {'name': 'indicators_ma', 'weight': 10, 'method': 'GET', 'path': '/api/indicators/{tw}/ma',
+         'params': {'market': 'tw', 'period': 20, 'limit': 250}},
+        {'name': 'signals', 'weight': 8, 'method': 'GET', 'path': '/api/signals/{tw}',
+         'params': {'market': 'tw', 'days': 100}},
+        {'name': 'chips', 'weight': 10, 'method': 'GET', 'path': '/api/chips/{tw}/all'},
+        {'name': 'bulk_prices', 'weight': 5, 'method': 'GET', 'path': '/api/bulk/prices',
+         'params': {'symbols': '{tw_batch}', 'limit': 60}},
+        {'name': 'bulk_prices_us', 'weight': 2, 'method': 'GET', 'path': '/api/bulk/prices',
+         'params': {'symbols': '{us_batch}', 'market': 'us', 'limit': 60}},
+        {'name': 'bulk_ma', 'weight': 3, 'method': 'GET', 'path': '/api/bulk/indicators/ma',
+         'params': {'symbols': '{tw_batch}', 'period': 20, 'limit': 60}},
+        {'name': 'bulk_chips', 'weight': 3, 'method': 'GET', 'path': '/api/bulk/chips',
+         'params': {'symbols': '{tw_batch}'}},
+        # CPU 密集的量化任務預設不納入（weight 0），需要時以 --weight risk_analysis=2 開啟
+        {'name': 'risk_analysis', 'weight': 0, 'method': 'POST', 'path': '/api/quant/risk-analysis',
+         'json': {'code': '{tw}', 'market': 'TW'}},
+    ],
+}
+
+# ==========================================
+# n8n 排程任務常駐執行器（n8n_worker.py）
+# ==========================================
+N8N_WORKER_CONFIG = {
+    # n8n 以 Docker 執行且主機為 Linux 時需改為 0.0.0.0 並設定 token
+    'host': os.getenv('N8N_WORKER_HOST', '127.0.0.1'),
+    'port': int(os.getenv('N8N_WORKER_PORT', 5100)),
+    # 請求需帶 X-Worker-Token 標頭（未設定時不檢查）
+    'token': os.getenv('N8N_WORKER_TOKEN', ''),
+    # 同時執行的任務數（同一任務同時只執行一個，其餘排隊）
+    'concurrency': int(os.getenv('N8N_WORKER_CONCURRENCY', 2)),
+    # ?wait= 同步等待的上限秒數
+    'max_wait_seconds': float(os.getenv('N8N_WORKER_MAX_WAIT', 3600)),
+    # 記憶體中保留的執行紀錄數；persist 時另寫入 n8n_job_runs
+    'history_size': int(os.getenv('N8N_WORKER_HISTORY', 200)),
+    'persist_history': os.getenv('N8N_WORKER_PERSIST', 'true').lower() == 'true',
+}
+
+# ==========================================
+# 增量同步（data_loader/sync_planner.py）
+# ==========================================
+INCREMENTAL_SYNC_CONFIG = {
+    # 尚無任何資料的標的往回抓取的日曆天數
+    'initial_history_days': int(os.getenv('SYNC_INITIAL_HISTORY_DAYS', 365)),
+    # 收盤後等待資料公布的分鐘數（之前只同步到前一交易日）
+    'settle_minutes': {
+        'TW': int(os.getenv('SYNC_TW_SETTLE_MINUTES', 60)),
+        'US': int(os.getenv('SYNC_US_SETTLE_MINUTES', 30)),
+    },
+    # 同一標的的缺漏區間相隔不超過此交易日數時合併為一次請求（多抓的既有資料不會重寫）
+    'merge_gap_days': int(os.getenv('SYNC_MERGE_GAP_DAYS', 5)),
+    # 請求間隔秒數
+    'request_delay': float(os.getenv('SYNC_REQUEST_DELAY', 0.5)),
+    # 缺漏偵測（data_loader/gap_detection.py）預設檢查的日曆天數
+    'gap_lookback_days': int(os.getenv('SYNC_GAP_LOOKBACK_DAYS', 365)),
+    # 同一缺漏補抓幾次仍無資料即視為停牌等真實缺漏，不再補抓
+    'gap_max_attempts': int(os.getenv('SYNC_GAP_MAX_ATTEMPTS', 3)),
 }
 
 # ==========================================
@@ -11,6 +11,9 @@ from loguru import logger
 from dotenv import load_dotenv
 from contextlib import contextmanager
 
+from .latest_quotes import refresh_latest_quotes
+from .partitions import ensure_yearly_partitions
+
 # 載入環境變數
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', 'config', '.env'))
 
@@ -39,9 +42,9 @@ class DatabaseConnector:
         self._initialize_pool()
     
     def _initialize_pool(self):
-        """初始化連接池"""
+        """初始化連接池（執行緒安全，常駐程序的多個任務可共用）"""
         try:
-            self.connection_pool = pool.SimpleConnectionPool(
+            self.connection_pool = pool.ThreadedConnectionPool(
                 minconn=1,
                 maxconn=10,
                 host=self.config['host'],
@@ -69,10 +72,44 @@ class DatabaseConnector:
             yield conn
         except Exception as e:
             logger.error(f"❌ 獲取連接失敗：{e}")
+            # 失敗的交易先回滾，避免中止狀態的連線回到連接池
+            if conn and not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass
             raise
         finally:
             if conn:
-                self.connection_pool.putconn(conn)
+                # 已斷線的連線不放回連接池（常駐程序在資料庫重啟後自動換新連線）
+                self.connection_pool.putconn(conn, close=bool(conn.closed))
+    
+    @contextmanager
+    def advisory_lock(self, name: str):
+        """
+        跨程序的具名互斥鎖（PostgreSQL session advisory lock，不等待）
+        
+        同一個排程任務由常駐執行器與命令列同時觸發時，只有一方會執行：
+        
+            with db.advisory_lock('n8n:update_tw_market_data') as acquired:
+                if not acquired:
+                    return
+        
+        Yields:
+            bool: 是否取得鎖（連線在區塊結束前保留，結束時釋放鎖）
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (name,))
+                acquired = cursor.fetchone()[0]
+            conn.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired and not conn.closed:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", (name,))
+                    conn.commit()
     
     def test_connection(self) -> bool:
         """
@@ -94,6 +131,62 @@ class DatabaseConnector:
             logger.error(f"❌ 連接測試失敗：{e}")
             return False
     
+    def execute_query(self, query: str, params: Tuple = None) -> List[Dict[str, Any]]:
+        """
+        執行查詢語句
+        
+        Args:
+            query: SQL語句
+            params: 參數
+        
+        Returns:
+            查詢結果（字典列表）；非查詢語句回傳空列表
+        """
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor(cursor_factory=extras.RealDictCursor) as cursor:
+                    cursor.execute(query, params)
+                    rows = [dict(row) for row in cursor.fetchall()] if cursor.description else []
+                    conn.commit()
+                    return rows
+        except Exception as e:
+            logger.error(f"❌ 查詢失敗：{e}\nQuery: {query}")
+            raise
+    
+    def ensure_partitions(self, table: str, dates) -> int:
+        """
+        確保寫入資料涵蓋的年度分區存在（非分區表直接略過）
+        
+        Args:
+            table: 表格名稱
+            dates: 即將寫入的日期
+        
+        Returns:
+            新建立的分區數
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                created = ensure_yearly_partitions(cursor, table, dates)
+                conn.commit()
+                return created
+    
+    def refresh_latest_quotes(self, market: str, symbols) -> int:
+        """
+        重算指定標的的最新報價（latest_quotes）
+        
+        Args:
+            market: 'tw' / 'us' / 'gold' / 'fx'
+            symbols: 受影響的標的代碼
+        
+        Returns:
+            更新的標的數
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                updated = refresh_latest_quotes(cursor, market, symbols)
+                conn.commit()
+                return updated
+    
     def insert(
         self,
         table: str,
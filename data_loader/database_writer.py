@@ -11,6 +11,11 @@ import pandas as pd
 from typing import List, Dict
 from loguru import logger
 
+from data_loader.latest_quotes import refresh_latest_quotes
+from data_loader.partitions import ensure_yearly_partitions
+from data_loader.report_invalidation import MARKET_REPORT_TYPES, mark_reports_outdated
+from data_loader.table_stats import count_inserted, increment_row_count
+
 
 class DatabaseWriter:
     """資料庫寫入類別"""
@@ -58,6 +63,7 @@ class DatabaseWriter:
                 close_price = EXCLUDED.close_price,
                 volume = EXCLUDED.volume,
                 adjusted_close = EXCLUDED.adjusted_close
+            RETURNING (xmax = 0), stock_code
         """
         
         # 準備資料
@@ -68,7 +74,12 @@ class DatabaseWriter:
         ]
        
         try:
-            execute_values(cursor, query, values)
+            ensure_yearly_partitions(cursor, 'tw_stock_prices', df['trade_date'])
+            rows = execute_values(cursor, query, values, fetch=True)
+            increment_row_count(cursor, 'tw_stock_prices', count_inserted(rows))
+            refresh_latest_quotes(cursor, 'tw', df['stock_code'].unique())
+            # 只有新增的交易日才讓既有報告過時（重複同步相同資料不影響快取）
+            mark_reports_outdated(cursor, {row[1] for row in rows if row[0]})
             self.conn.commit()
             logger.success(f"插入 {len(values)} 筆台股價格資料")
             return len(values)
@@ -89,6 +100,7 @@ class DatabaseWriter:
                 ON CONFLICT (stock_code) DO NOTHING
             """
             cursor.execute(query, (stock_code, stock_name))
+            increment_row_count(cursor, 'tw_stock_info', cursor.rowcount)
             self.conn.commit()
         except Exception as e:
             self.conn.rollback()
@@ -106,6 +118,7 @@ class DatabaseWriter:
                 ON CONFLICT (symbol) DO NOTHING
             """
             cursor.execute(query, (symbol, company_name))
+            increment_row_count(cursor, 'us_stock_info', cursor.rowcount)
             self.conn.commit()
         except Exception as e:
             self.conn.rollback()
@@ -131,6 +144,7 @@ class DatabaseWriter:
                 close_price = EXCLUDED.close_price,
                 volume = EXCLUDED.volume,
                 adjusted_close = EXCLUDED.adjusted_close
+            RETURNING (xmax = 0), symbol
         """
         
         values = [
@@ -140,7 +154,11 @@ class DatabaseWriter:
         ]
         
         try:
-            execute_values(cursor, query, values)
+            ensure_yearly_partitions(cursor, 'us_stock_prices', df['trade_date'])
+            rows = execute_values(cursor, query, values, fetch=True)
+            increment_row_count(cursor, 'us_stock_prices', count_inserted(rows))
+            refresh_latest_quotes(cursor, 'us', df['symbol'].unique())
+            mark_reports_outdated(cursor, {row[1] for row in rows if row[0]})
             self.conn.commit()
             logger.success(f"插入 {len(values)} 筆美股價格資料")
             return len(values)
@@ -168,6 +186,7 @@ class DatabaseWriter:
                 low_price = EXCLUDED.low_price,
                 close_price = EXCLUDED.close_price,
                 currency = EXCLUDED.currency
+            RETURNING (xmax = 0)
         """
         
         values = [
@@ -177,7 +196,9 @@ class DatabaseWriter:
         ]
         
         try:
-            execute_values(cursor, query, values)
+            inserted = count_inserted(execute_values(cursor, query, values, fetch=True))
+            increment_row_count(cursor, 'gold_prices', inserted)
+            refresh_latest_quotes(cursor, 'gold', ['GOLD'])
             self.conn.commit()
             logger.success(f"插入 {len(values)} 筆黃金價格資料")
             return len(values)
@@ -201,6 +222,7 @@ class DatabaseWriter:
             VALUES %s
             ON CONFLICT (trade_date, currency_pair) DO UPDATE SET
                 rate = EXCLUDED.rate
+            RETURNING (xmax = 0)
         """
         
         values = [
@@ -209,7 +231,9 @@ class DatabaseWriter:
         ]
         
         try:
-            execute_values(cursor, query, values)
+            inserted = count_inserted(execute_values(cursor, query, values, fetch=True))
+            increment_row_count(cursor, 'exchange_rates', inserted)
+            refresh_latest_quotes(cursor, 'fx', df['currency_pair'].unique())
             self.conn.commit()
             logger.success(f"插入 {len(values)} 筆匯率資料")
             return len(values)
@@ -237,6 +261,7 @@ class DatabaseWriter:
                 frequency = EXCLUDED.frequency,
                 unit = EXCLUDED.unit,
                 updated_at = NOW()
+            RETURNING (xmax = 0)
         """
         
         values = [
@@ -246,7 +271,10 @@ class DatabaseWriter:
         ]
         
         try:
-            execute_values(cursor, query, values)
+            inserted = count_inserted(execute_values(cursor, query, values, fetch=True))
+            increment_row_count(cursor, 'macro_indicators', inserted)
+            if inserted:
+                mark_reports_outdated(cursor, report_types=MARKET_REPORT_TYPES)
             self.conn.commit()
             logger.success(f"插入 {len(values)} 筆宏觀經濟資料")
             return len(values)
@@ -273,6 +301,7 @@ class DatabaseWriter:
                 description = EXCLUDED.description,
                 sentiment_score = EXCLUDED.sentiment_score,
                 sentiment_label = EXCLUDED.sentiment_label
+            RETURNING (xmax = 0)
         """
         
         values = [
@@ -283,7 +312,8 @@ class DatabaseWriter:
         ]
         
         try:
-            execute_values(cursor, query, values)
+            inserted = count_inserted(execute_values(cursor, query, values, fetch=True))
+            increment_row_count(cursor, 'financial_news', inserted)
             self.conn.commit()
             logger.success(f"插入 {len(values)} 則金融新聞")
             return len(values)
@@ -313,8 +343,31 @@ class DatabaseWriter:
             VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
             ON CONFLICT (data_source, source_identifier) DO UPDATE SET
                 sync_status = EXCLUDED.sync_status,
-        cursor.execute(query, (data_source, source_identifier, status, earliest_date, latest_date, total_records, error_message))
-        self.conn.commit()
+                earliest_date = COALESCE(EXCLUDED.earliest_date, sync_status.earliest_date),
+                latest_date = COALESCE(EXCLUDED.latest_date, sync_status.latest_date),
+                total_records = EXCLUDED.total_records,
+                error_message = EXCLUDED.error_message,
+                updated_at = NOW()
+        """
+        
+        try:
+            cursor.execute(query, (data_source, source_identifier, status, earliest_date, latest_date, total_records, error_message))
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"更新同步狀態失敗: {e}")
+            raise
+        finally:
+            cursor.close()
+    
+    def insert_shareholder_dispersion(self, df: pd.DataFrame) -> int:
+        """
+        插入集保股權分散資料
+        
+        Args:
+            df: 股權分散 DataFrame（stock_code, data_date, holders_* ...）
+        
+        Returns:
             插入的筆數
         """
         if df.empty:
@@ -354,6 +407,7 @@ class DatabaseWriter:
                 concentration_ratio = EXCLUDED.concentration_ratio,
                 synchronization_index = EXCLUDED.synchronization_index,
                 smart_money_flow = EXCLUDED.smart_money_flow
+            RETURNING (xmax = 0), stock_code
         """
         
         try:
@@ -393,7 +447,9 @@ class DatabaseWriter:
                     smart_money_flow
                 ))
             
-            execute_values(cursor, query, values)
+            rows = execute_values(cursor, query, values, fetch=True)
+            increment_row_count(cursor, 'shareholder_dispersion', count_inserted(rows))
+            mark_reports_outdated(cursor, {row[1] for row in rows if row[0]})
             self.conn.commit()
             logger.success(f"插入 {len(values)} 筆股權分散資料")
             return len(values)
@@ -0,0 +1,237 @@
+"""
+價格缺漏偵測模組
+
+以交易日曆列出每檔標的在「第一筆 ~ 最後一筆資料」之間應有的交易日，
+與價格表做一次集合比對（anti-join）找出缺少的日線：
+- 休市日、颱風休市不會被誤判為缺漏
+- 連續（或相隔不遠）的缺漏合併為單一補抓請求，格式與 sync_planner.plan_sync 相同
+- 補抓後仍缺少的日期記錄於 price_gaps，達上限（停牌等真實缺漏）後不再重複請求
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from config.settings import INCREMENTAL_SYNC_CONFIG
+from data_loader.sync_planner import SYNC_SOURCES, Fetcher, execute_plan
+from data_loader.trading_calendar import TradingCalendar, get_calendar
+
+
+def _gap_sql(source: Dict, by_symbols: bool) -> str:
+    symbols = ("unnest(%(symbols)s::text[]) AS s(symbol)" if by_symbols
+               else f"(SELECT {source['key']} FROM {source['info']}) AS s(symbol)")
+    return f"""
+        WITH sessions AS (
+            SELECT unnest(%(sessions)s::date[]) AS trade_date
+        ),
+        bounds AS (
+            SELECT s.symbol, GREATEST(b.first_date, %(since)s::date) AS first_date, b.last_date
+            FROM {symbols}
+            CROSS JOIN LATERAL (
+                SELECT MIN(trade_date) AS first_date, MAX(trade_date) AS last_date
+                FROM {source['table']}
+                WHERE {source['key']} = s.symbol AND trade_date <= %(until)s
+            ) b
+            WHERE b.last_date IS NOT NULL
+        )
+        SELECT b.symbol, x.trade_date
+        FROM bounds b
+        JOIN sessions x ON x.trade_date BETWEEN b.first_date AND b.last_date
+        WHERE NOT EXISTS (
+                SELECT 1 FROM {source['table']} p
+                WHERE p.{source['key']} = b.symbol AND p.trade_date = x.trade_date
+            )
+          AND NOT EXISTS (
+                SELECT 1 FROM price_gaps g
+                WHERE g.market = %(market)s AND g.symbol = b.symbol AND g.trade_date = x.trade_date
+                  AND g.attempts >= %(max_attempts)s
+            )
+        ORDER BY b.symbol, x.trade_date
+    """
+
+
+def detect_gaps(
+    cursor,
+    market: str,
+    since: date,
+    until: date,
+    symbols: Optional[Iterable[str]] = None,
+    max_attempts: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    找出各標的缺少的交易日
+
+    Args:
+        cursor: 資料庫游標
+        market: 'TW' / 'US'
+        since: 檢查起日（含），早於交易日曆涵蓋期間時裁切
+        until: 檢查迄日（含），晚於交易日曆涵蓋期間時裁切
+        symbols: 標的代碼；None 為基本資料表中的所有標的
+        max_attempts: 補抓達此次數的缺漏不再列出；None 使用設定值
+
+    Returns:
+        DataFrame[symbol, trade_date]（依標的、日期排序）
+    """
+    market = market.upper()
+    source = SYNC_SOURCES[market]
+    # 休市日資料涵蓋期間外會把休市日誤判為缺漏，只檢查涵蓋期間內
+    calendar = get_calendar(market)
+    since, until = calendar.clamp_to_coverage(since, until)
+    sessions = calendar.trading_days(since, until)
+    if not sessions:
+        return pd.DataFrame(columns=['symbol', 'trade_date'])
+    cursor.execute(_gap_sql(source, symbols is not None), {
+        'sessions': sessions,
+        'since': since,
+        'until': until,
+        'symbols': sorted(set(symbols)) if symbols is not None else None,
+        'market': market,
+        'max_attempts': INCREMENTAL_SYNC_CONFIG['gap_max_attempts'] if max_attempts is None else max_attempts,
+    })
+    return pd.DataFrame(cursor.fetchall(), columns=['symbol', 'trade_date'])
+
+
+def gaps_to_requests(gaps: pd.DataFrame, calendar: TradingCalendar, merge_gap_days: int = 0) -> List[Dict]:
+    """
+    把缺漏日合併為補抓請求
+
+    Args:
+        gaps: detect_gaps 的結果
+        calendar: 市場交易日曆
+        merge_gap_days: 同一標的兩段缺漏之間相隔的交易日數不超過此值時合併
+
+    Returns:
+        請求列表 [{'symbol', 'start', 'end', 'sessions', 'missing'}]
+    """
+    if gaps.empty:
+        return []
+    gaps = gaps.sort_values(['symbol', 'trade_date'], ignore_index=True)
+    symbols = gaps['symbol'].to_numpy()
+    index = calendar.session_index(gaps['trade_date'].to_numpy())
+    # 換標的、或與前一個缺漏相隔超過 merge_gap_days 個交易日時開始新的請求
+    new_run = np.ones(len(gaps), dtype=bool)
+    new_run[1:] = (symbols[1:] != symbols[:-1]) | (np.diff(index) > merge_gap_days + 1)
+    runs = gaps.groupby(np.cumsum(new_run)).agg(
+        symbol=('symbol', 'first'), start=('trade_date', 'min'), end=('trade_date', 'max'),
+        missing=('trade_date', 'size'),
+    )
+    sessions = calendar.count_sessions(runs['start'].to_numpy(), runs['end'].to_numpy())
+    return [
+        {'symbol': row.symbol, 'start': row.start, 'end': row.end, 'sessions': int(count), 'missing': int(row.missing)}
+        for row, count in zip(runs.itertuples(index=False), sessions)
+    ]
+
+
+def summarize_gaps(gaps: pd.DataFrame) -> pd.DataFrame:
+    """
+    各標的缺漏統計
+
+    Returns:
+        DataFrame[symbol, missing, first_missing, last_missing]（缺漏多的在前）
+    """
+    if gaps.empty:
+        return pd.DataFrame(columns=['symbol', 'missing', 'first_missing', 'last_missing'])
+    summary = gaps.groupby('symbol')['trade_date'].agg(missing='size', first_missing='min', last_missing='max')
+    return summary.reset_index().sort_values(['missing', 'symbol'], ascending=[False, True], ignore_index=True)
+
+
+_RECORD_ATTEMPTS_SQL = """
+    INSERT INTO price_gaps (market, symbol, trade_date, attempts, last_attempt)
+    SELECT %(market)s, g.symbol, g.trade_date, 1, NOW()
+    FROM unnest(%(symbols)s::text[], %(dates)s::date[]) AS g(symbol, trade_date)
+    ON CONFLICT (market, symbol, trade_date) DO UPDATE SET
+        attempts = price_gaps.attempts + 1,
+        last_attempt = NOW()
+"""
+
+
+def record_attempts(cursor, market: str, gaps: pd.DataFrame) -> int:
+    """
+    記錄補抓結果：累加嘗試次數，已補齊的日期自 price_gaps 移除（呼叫端負責 commit）
+
+    Returns:
+        已補齊的缺漏數
+    """
+    if gaps.empty:
+        return 0
+    source = SYNC_SOURCES[market]
+    symbols = gaps['symbol'].tolist()
+    cursor.execute(_RECORD_ATTEMPTS_SQL, {'market': market, 'symbols': symbols, 'dates': gaps['trade_date'].tolist()})
+    cursor.execute(f"""
+        DELETE FROM price_gaps g
+        USING {source['table']} p
+        WHERE g.market = %(market)s AND g.symbol = ANY(%(symbols)s)
+          AND p.{source['key']} = g.symbol AND p.trade_date = g.trade_date
+    """, {'market': market, 'symbols': sorted(set(symbols))})
+    return cursor.rowcount
+
+
+def refetch_gaps(
+    conn,
+    market: str,
+    fetch: Fetcher,
+    symbols: Optional[Iterable[str]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    dry_run: bool = False,
+    request_delay: Optional[float] = None
+) -> Dict:
+    """
+    偵測缺漏並補抓
+
+    Args:
+        conn: psycopg2 連線
+        market: 'TW' / 'US'
+        fetch: 取得價格的函式（sync_planner.tw_fetcher / us_fetcher）
+        symbols: 標的代碼；None 為所有標的
+        since: 檢查起日；None 為 until 往前 gap_lookback_days 天（皆裁切到交易日曆涵蓋期間內）
+        until: 檢查迄日；None 為最近一個已收盤的交易日
+        dry_run: 只偵測不補抓
+        request_delay: 請求間隔秒數，None 使用設定值
+
+    Returns:
+        統計 {'since', 'until', 'symbols', 'missing', 'requests', 'filled', ...execute_plan 的統計}；
+        dry_run 時另含 'plan'
+    """
+    market = market.upper()
+    config = INCREMENTAL_SYNC_CONFIG
+    calendar = get_calendar(market)
+    until = until or calendar.last_complete_session(settle_minutes=config['settle_minutes'].get(market, 0))
+    since = since or until - timedelta(days=config['gap_lookback_days'])
+    since, until = calendar.clamp_to_coverage(since, until)
+    if since > until:
+        logger.warning(f"⚠️ {market} 檢查期間不在交易日曆涵蓋範圍內，略過缺漏偵測")
+        return {'since': since.isoformat(), 'until': until.isoformat(),
+                'symbols': 0, 'missing': 0, 'requests': 0}
+
+    with conn.cursor() as cursor:
+        gaps = detect_gaps(cursor, market, since, until, symbols)
+    conn.commit()
+
+    plan = gaps_to_requests(gaps, calendar, config['merge_gap_days'])
+    stats = {
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        'symbols': int(gaps['symbol'].nunique()),
+        'missing': len(gaps),
+        'requests': len(plan),
+    }
+    logger.info(f"🔍 {market} {since} ~ {until}：{stats['symbols']} 檔共缺 {len(gaps)} 個交易日，{len(plan)} 個補抓請求")
+    if dry_run or not plan:
+        if dry_run:
+            stats['plan'] = plan
+        return stats
+
+    delay = config['request_delay'] if request_delay is None else request_delay
+    stats.update(execute_plan(conn, market, plan, fetch, request_delay=delay))
+    with conn.cursor() as cursor:
+        try:
+            stats['filled'] = record_attempts(cursor, market, gaps)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    logger.info(f"✅ {market} 缺漏補抓完成：補齊 {stats['filled']} / {len(gaps)} 個交易日，錯誤 {stats['errors']}")
+    return stats
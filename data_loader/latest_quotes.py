@@ -0,0 +1,166 @@
+"""
+最新報價表 (latest_quotes) 維護模組
+
+每個 (market, symbol) 一列：最新收盤、前一日收盤、漲跌、52週高低、20日均量。
+寫入價格資料後由 DatabaseWriter 在同一交易內重算受影響的標的，
+所有「目前價格」的查詢都改讀這張表，不必再對價格表做 ORDER BY ... LIMIT 1。
+"""
+from typing import Any, Dict, Iterable, List
+
+from psycopg2.extras import RealDictCursor
+
+# 各市場的價格來源：key 為標的欄位（可為常數運算式），volume 為 None 表示無成交量
+QUOTE_SOURCES = {
+    'tw': {
+        'table': 'tw_stock_prices', 'key': 'stock_code',
+        'close': 'close_price', 'high': 'high_price', 'low': 'low_price', 'volume': 'volume',
+        'universe': "SELECT stock_code FROM tw_stock_info",
+    },
+    'us': {
+        'table': 'us_stock_prices', 'key': 'symbol',
+        'close': 'close_price', 'high': 'high_price', 'low': 'low_price', 'volume': 'volume',
+        'universe': "SELECT symbol FROM us_stock_info",
+    },
+    'gold': {
+        'table': 'gold_prices', 'key': "'GOLD'",
+        'close': 'close_price', 'high': 'high_price', 'low': 'low_price', 'volume': None,
+        'universe': "SELECT 'GOLD'",
+    },
+    'fx': {
+        'table': 'exchange_rates', 'key': 'currency_pair',
+        'close': 'rate', 'high': 'rate', 'low': 'rate', 'volume': None,
+        'universe': "SELECT DISTINCT currency_pair FROM exchange_rates",
+    },
+}
+
+# 52 週約 252 個交易日；多取一些以涵蓋日曆上的 52 週
+LOOKBACK_ROWS = 260
+
+_REFRESH_SQL = """
+    INSERT INTO latest_quotes (
+        market, symbol, trade_date, close_price, prev_close, change, change_percent,
+        volume, high_52w, low_52w, avg_volume_20d, updated_at
+    )
+    SELECT
+        %(market)s, s.symbol, w.trade_date, w.close_price, w.prev_close,
+        w.close_price - w.prev_close,
+        (w.close_price - w.prev_close) / NULLIF(w.prev_close, 0) * 100,
+        w.volume, w.high_52w, w.low_52w, w.avg_volume_20d, NOW()
+    FROM unnest(%(symbols)s::text[]) AS s(symbol)
+    CROSS JOIN LATERAL (
+        SELECT
+            MAX(r.trade_date) AS trade_date,
+            MAX(r.close) FILTER (WHERE r.rn = 1) AS close_price,
+            MAX(r.close) FILTER (WHERE r.rn = 2) AS prev_close,
+            MAX(r.volume) FILTER (WHERE r.rn = 1) AS volume,
+            MAX(r.high) FILTER (WHERE r.trade_date > r.latest - 364) AS high_52w,
+            MIN(r.low) FILTER (WHERE r.trade_date > r.latest - 364) AS low_52w,
+            ROUND(AVG(r.volume) FILTER (WHERE r.rn <= 20)) AS avg_volume_20d
+        FROM (
+            SELECT
+                p.trade_date,
+                p.{close} AS close,
+                COALESCE(p.{high}, p.{close}) AS high,
+                COALESCE(p.{low}, p.{close}) AS low,
+                {volume}::BIGINT AS volume,
+                ROW_NUMBER() OVER (ORDER BY p.trade_date DESC) AS rn,
+                MAX(p.trade_date) OVER () AS latest
+            FROM (
+                SELECT *
+                FROM {table}
+                WHERE {key} = s.symbol AND {close} IS NOT NULL
+                ORDER BY trade_date DESC
+                LIMIT {lookback}
+            ) p
+        ) r
+    ) w
+    WHERE w.trade_date IS NOT NULL
+    ON CONFLICT (market, symbol) DO UPDATE SET
+        trade_date = EXCLUDED.trade_date,
+        close_price = EXCLUDED.close_price,
+        prev_close = EXCLUDED.prev_close,
+        change = EXCLUDED.change,
+        change_percent = EXCLUDED.change_percent,
+        volume = EXCLUDED.volume,
+        high_52w = EXCLUDED.high_52w,
+        low_52w = EXCLUDED.low_52w,
+        avg_volume_20d = EXCLUDED.avg_volume_20d,
+        updated_at = NOW()
+"""
+
+
+def refresh_sql(market: str) -> str:
+    """產生指定市場的重算語句"""
+    source = QUOTE_SOURCES[market]
+    return _REFRESH_SQL.format(
+        table=source['table'],
+        key=source['key'],
+        close=source['close'],
+        high=source['high'],
+        low=source['low'],
+        volume=f"p.{source['volume']}" if source['volume'] else 'NULL',
+        lookback=LOOKBACK_ROWS,
+    )
+
+
+def refresh_latest_quotes(cursor, market: str, symbols: Iterable) -> int:
+    """
+    重算指定標的的最新報價（呼叫端負責 commit，通常與價格寫入同一交易）
+
+    Args:
+        cursor: 資料庫游標
+        market: 'tw' / 'us' / 'gold' / 'fx'
+        symbols: 受影響的標的代碼
+
+    Returns:
+        更新的標的數
+    """
+    symbols = sorted({str(symbol) for symbol in symbols if symbol is not None})
+    if not symbols:
+        return 0
+    cursor.execute(refresh_sql(market), {'market': market, 'symbols': symbols})
+    return cursor.rowcount
+
+
+def rebuild_latest_quotes(cursor, market: str, batch_size: int = 200) -> int:
+    """
+    重建整個市場的最新報價（初次建置或校正用）
+
+    Args:
+        cursor: 資料庫游標
+        market: 市場代碼
+        batch_size: 每批標的數
+
+    Returns:
+        更新的標的數
+    """
+    cursor.execute(QUOTE_SOURCES[market]['universe'])
+    symbols = [row[0] for row in cursor.fetchall()]
+    updated = 0
+    for start in range(0, len(symbols), batch_size):
+        updated += refresh_latest_quotes(cursor, market, symbols[start:start + batch_size])
+    return updated
+
+
+def fetch_latest_quotes(conn, market: str, symbols: Iterable) -> Dict[str, Dict[str, Any]]:
+    """
+    讀取最新報價
+
+    Args:
+        conn: 資料庫連線
+        market: 市場代碼
+        symbols: 標的代碼
+
+    Returns:
+        {symbol: 報價字典}，表中沒有的標的不會出現
+    """
+    symbols: List[str] = [str(symbol) for symbol in symbols]
+    if not symbols:
+        return {}
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("""
+            SELECT *
+            FROM latest_quotes
+            WHERE market = %s AND symbol = ANY(%s)
+        """, (market, symbols))
+        return {row['symbol']: dict(row) for row in cursor.fetchall()}
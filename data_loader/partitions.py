@@ -0,0 +1,137 @@
+"""
+按年分區輔助模組
+
+配合 database/partitioning.sql：
+- apply_partitioning：建立函數後逐表執行遷移（每張表各自的交易，失敗只影響該表）
+- ensure_yearly_partitions：寫入前確保資料涵蓋的年度分區存在
+  （同一程序內已存在的年度分區不再檢查）
+"""
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+from loguru import logger
+
+# 已按年分區的表格與其分區欄位
+PARTITIONED_TABLES = {
+    'tw_stock_prices': 'trade_date',
+    'us_stock_prices': 'trade_date',
+    'institutional_trades': 'trade_date',
+    'technical_indicators': 'trade_date',
+}
+
+# partitioning.sql 建立的函數（to_regprocedure 簽章）
+_ENSURE_FUNCTION = 'ensure_yearly_partition(text,integer)'
+
+_ensured: Set[Tuple[str, int]] = set()
+
+# partitioning.sql 中各表的遷移區塊（獨立一行的 BEGIN; ... COMMIT;）
+_MIGRATION_BLOCK = re.compile(r'^BEGIN;\s*$.*?^COMMIT;\s*$', re.M | re.S)
+
+
+def partition_years(dates: Iterable) -> Set[int]:
+    """
+    取得日期集合涵蓋的年度
+
+    Args:
+        dates: date / datetime / 'YYYY-MM-DD' 字串 / pandas Timestamp
+
+    Returns:
+        年度集合
+    """
+    years = set()
+    for value in dates:
+        if value is None or value != value:  # None / NaN / NaT
+            continue
+        if isinstance(value, str):
+            years.add(int(value[:4]))
+        else:
+            years.add(value.year)
+    return years
+
+
+def _partitioning_installed(cursor, table: str) -> bool:
+    """partitioning.sql 已套用（函數存在）且 table 已轉為分區表"""
+    # 不可把函數呼叫包在 CASE 裡：函數名稱在解析時即檢查，未套用時整句查詢會失敗
+    cursor.execute("""
+        SELECT to_regprocedure(%s) IS NOT NULL
+           AND EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))
+    """, (_ENSURE_FUNCTION, table))
+    return bool(cursor.fetchone()[0])
+
+
+def ensure_yearly_partitions(cursor, table: str, dates: Iterable) -> int:
+    """
+    確保寫入資料所需的年度分區存在
+
+    只快取「呼叫前即已存在」的分區：本次建立的分區屬於呼叫端的交易，
+    交易回滾時分區也會消失，下次寫入會再檢查一次
+
+    Args:
+        cursor: 資料庫游標（呼叫端負責 commit）
+        table: 表格名稱，非分區表或未套用 partitioning.sql 時直接略過
+        dates: 即將寫入的日期
+
+    Returns:
+        新建立的分區數
+    """
+    if table not in PARTITIONED_TABLES:
+        return 0
+    years = [year for year in sorted(partition_years(dates)) if (table, year) not in _ensured]
+    if not years or not _partitioning_installed(cursor, table):
+        return 0
+
+    created = 0
+    for year in years:
+        cursor.execute("SELECT ensure_yearly_partition(%s, %s)", (table, year))
+        if cursor.fetchone()[0]:
+            created += 1
+            logger.info(f"📁 建立分區 {table}_y{year}")
+        else:
+            _ensured.add((table, year))
+    return created
+
+
+def split_migrations(sql: str) -> Tuple[str, List[str]]:
+    """
+    拆分 partitioning.sql
+
+    Returns:
+        (函數定義等前置 SQL, [各表的 BEGIN ... COMMIT 區塊])
+    """
+    blocks = _MIGRATION_BLOCK.findall(sql)
+    return _MIGRATION_BLOCK.sub('', sql), blocks
+
+
+def apply_partitioning(conn, sql: str) -> Dict[str, str]:
+    """
+    套用 partitioning.sql：前置 SQL 執行一次，各表遷移區塊分別執行
+
+    整份檔案若以單一 execute 送出，第一張表失敗後其餘表格都不會執行；
+    逐段執行時失敗的表格回滾並記錄，其餘表格照常遷移
+
+    Args:
+        conn: psycopg2 連線（會切換為 autocommit，區塊自行以 BEGIN/COMMIT 控制交易）
+        sql: partitioning.sql 內容
+
+    Returns:
+        {失敗的表格: 錯誤訊息}；全部成功時為空
+    """
+    preamble, blocks = split_migrations(sql)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(preamble)
+
+    failed = {}
+    for block in blocks:
+        match = re.search(r"migrate_to_yearly_partitions\('(\w+)'", block)
+        table = match.group(1) if match else block
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(block)
+            logger.info(f"📁 {table} 分區遷移完成")
+        except Exception as e:
+            failed[table] = str(e).strip()
+            logger.error(f"❌ {table} 分區遷移失敗：{failed[table]}")
+            with conn.cursor() as cursor:
+                cursor.execute("ROLLBACK")
+    return failed
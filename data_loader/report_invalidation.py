@@ -0,0 +1,45 @@
+"""
+AI 報告失效標記模組
+
+底層價格 / 籌碼 / 宏觀資料寫入後，由 DatabaseWriter 與同步規劃在同一交易內
+把受影響的 ai_reports 標記為過時，報告快取（ai.report_cache）不再回傳這些報告。
+"""
+from typing import Iterable, Optional
+
+# 依個股資料生成的報告類型（個股價格 / 籌碼更新時標記過時）
+STOCK_REPORT_TYPES = ('decision_template', 'stock_decision', 'stock_analysis')
+
+# 依大盤 / 宏觀資料生成的報告類型
+MARKET_REPORT_TYPES = ('daily_strategy',)
+
+
+def mark_reports_outdated(
+    cursor,
+    security_codes: Optional[Iterable[str]] = None,
+    report_types: Iterable[str] = STOCK_REPORT_TYPES
+) -> int:
+    """
+    標記報告為過時（呼叫端負責 commit，通常與資料寫入同一交易）
+
+    Args:
+        cursor: 資料庫游標
+        security_codes: 受影響的標的；None 表示不限標的
+        report_types: 受影響的報告類型
+
+    Returns:
+        標記的報告數
+    """
+    query = """
+        UPDATE ai_reports
+        SET is_outdated = TRUE
+        WHERE is_outdated = FALSE AND report_type = ANY(%s)
+    """
+    params = [list(report_types)]
+    if security_codes is not None:
+        codes = sorted({str(code) for code in security_codes})
+        if not codes:
+            return 0
+        query += " AND security_code = ANY(%s)"
+        params.append(codes)
+    cursor.execute(query, params)
+    return cursor.rowcount
@@ -0,0 +1,404 @@
+"""
+增量同步規劃模組
+
+依 sync_status 的每檔水位（earliest_date / latest_date）只抓缺少的交易日：
+- 水位讀取：一次查詢取得所有標的；sync_status 沒有紀錄的標的改以價格表 MIN / MAX(trade_date) 補上
+- 規劃：缺漏區間以交易日曆修剪頭尾，已是最新或只差休市日的標的不發出請求；同一標的相近的區間合併
+- 寫入：價格 upsert（內容相同的列不重寫）、最新報價與水位更新在同一交易內完成
+"""
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+from psycopg2.extras import execute_values
+
+from config.settings import INCREMENTAL_SYNC_CONFIG
+from data_loader.latest_quotes import refresh_latest_quotes
+from data_loader.partitions import ensure_yearly_partitions
+from data_loader.report_invalidation import mark_reports_outdated
+from data_loader.table_stats import count_inserted, increment_row_count
+from data_loader.trading_calendar import TradingCalendar, get_calendar
+
+# 各市場的價格表與 sync_status 資料來源名稱（與 scripts/run_backfill.py 一致）
+SYNC_SOURCES = {
+    'TW': {'table': 'tw_stock_prices', 'key': 'stock_code', 'data_source': 'taiwan_stock', 'quotes': 'tw',
+           'info': 'tw_stock_info'},
+    'US': {'table': 'us_stock_prices', 'key': 'symbol', 'data_source': 'us_stock', 'quotes': 'us',
+           'info': 'us_stock_info'},
+}
+
+# fetch(symbols, start, end) -> DataFrame[symbol, trade_date, open, high, low, close, volume, adjusted_close]
+Fetcher = Callable[[List[str], date, date], pd.DataFrame]
+
+Watermarks = Dict[str, Tuple[Optional[date], Optional[date]]]
+
+
+def _source(market: str) -> Dict:
+    try:
+        return SYNC_SOURCES[market.upper()]
+    except KeyError:
+        raise ValueError(f"不支援的市場: {market}")
+
+
+def load_watermarks(cursor, market: str, symbols: Iterable[str]) -> Watermarks:
+    """
+    讀取各標的已同步的日期範圍
+
+    Args:
+        cursor: 資料庫游標
+        market: 'TW' / 'US'
+        symbols: 標的代碼
+
+    Returns:
+        {symbol: (earliest_date, latest_date)}，完全沒有資料的標的為 (None, None)
+    """
+    source = _source(market)
+    # sync_status 有水位時不掃描價格表（LATERAL 內的條件在查詢前即可判定）
+    cursor.execute(f"""
+        SELECT s.symbol,
+               COALESCE(st.earliest_date, p.earliest) AS earliest_date,
+               COALESCE(st.latest_date, p.latest) AS latest_date
+        FROM unnest(%(symbols)s::text[]) AS s(symbol)
+        LEFT JOIN sync_status st
+               ON st.data_source = %(data_source)s AND st.source_identifier = s.symbol
+        LEFT JOIN LATERAL (
+            SELECT MIN(trade_date) AS earliest, MAX(trade_date) AS latest
+            FROM {source['table']}
+            WHERE {source['key']} = s.symbol AND st.latest_date IS NULL
+        ) p ON TRUE
+    """, {'symbols': list(symbols), 'data_source': source['data_source']})
+    return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+
+def plan_sync(
+    watermarks: Watermarks,
+    calendar: TradingCalendar,
+    end: date,
+    initial_start: date,
+    backfill_start: Optional[date] = None,
+    merge_gap_days: int = 0
+) -> List[Dict]:
+    """
+    計算每檔標的需要抓取的區間
+
+    Args:
+        watermarks: load_watermarks 的結果
+        calendar: 市場交易日曆
+        end: 同步到此日（含）
+        initial_start: 沒有任何資料的標的從此日開始
+        backfill_start: 指定時，已有資料但起點較晚的標的往前補到此日
+        merge_gap_days: 同一標的兩段缺漏之間的已存在交易日數不超過此值時合併為一次請求
+
+    Returns:
+        請求列表 [{'symbol', 'start', 'end', 'sessions'}]，依標的與起點排序
+    """
+    requests = []
+    for symbol in sorted(watermarks):
+        earliest, latest = watermarks[symbol]
+        if latest is None:
+            segments = [(initial_start, end)]
+        else:
+            segments = []
+            if backfill_start and earliest and backfill_start < earliest:
+                segments.append((backfill_start, earliest - timedelta(days=1)))
+            segments.append((latest + timedelta(days=1), end))
+
+        trimmed = []
+        for start, stop in segments:
+            if start > stop:
+                continue
+            # 頭尾落在週末或休市日時內縮到交易日，整段都不是交易日就不發請求
+            first = calendar.next_trading_day(start)
+            last = calendar.previous_trading_day(stop)
+            if first > last:
+                continue
+            if trimmed and calendar.count_trading_days(trimmed[-1][1] + timedelta(days=1),
+                                                       first - timedelta(days=1)) <= merge_gap_days:
+                trimmed[-1] = (trimmed[-1][0], last)
+            else:
+                trimmed.append((first, last))
+
+        for first, last in trimmed:
+            requests.append({
+                'symbol': symbol,
+                'start': first,
+                'end': last,
+                'sessions': calendar.count_trading_days(first, last),
+            })
+    return requests
+
+
+def _price_upsert_sql(source: Dict) -> str:
+    columns = ('open_price', 'high_price', 'low_price', 'close_price', 'volume', 'adjusted_close')
+    updates = ',\n                '.join(f"{col} = EXCLUDED.{col}" for col in columns)
+    current = ', '.join(f"p.{col}" for col in columns)
+    excluded = ', '.join(f"EXCLUDED.{col}" for col in columns)
+    # 內容相同的列不更新（不產生新版本列、不回傳），只回傳實際新增或變動的列
+    return f"""
+        INSERT INTO {source['table']} AS p
+            ({source['key']}, trade_date, {', '.join(columns)})
+        VALUES %s
+        ON CONFLICT ({source['key']}, trade_date) DO UPDATE SET
+                {updates}
+        WHERE ({current}) IS DISTINCT FROM ({excluded})
+        RETURNING (xmax = 0), {source['key']}
+    """
+
+
+_ADVANCE_WATERMARK_SQL = """
+    INSERT INTO sync_status (
+        data_source, source_identifier, last_sync_date, last_sync_timestamp, sync_status,
+        error_message, earliest_date, latest_date, total_records, updated_at
+    )
+    SELECT %(data_source)s, s.symbol, CURRENT_DATE, NOW(), 'success',
+           NULL, s.earliest, s.latest, s.inserted, NOW()
+    FROM unnest(%(symbols)s::text[], %(earliest)s::date[], %(latest)s::date[], %(inserted)s::bigint[])
+         AS s(symbol, earliest, latest, inserted)
+    ON CONFLICT (data_source, source_identifier) DO UPDATE SET
+        last_sync_date = EXCLUDED.last_sync_date,
+        last_sync_timestamp = EXCLUDED.last_sync_timestamp,
+        sync_status = 'success',
+        error_message = NULL,
+        earliest_date = LEAST(sync_status.earliest_date, EXCLUDED.earliest_date),
+        latest_date = GREATEST(sync_status.latest_date, EXCLUDED.latest_date),
+        total_records = COALESCE(sync_status.total_records, 0) + EXCLUDED.total_records,
+        updated_at = NOW()
+"""
+
+_MARK_FAILED_SQL = """
+    INSERT INTO sync_status (data_source, source_identifier, last_sync_timestamp, sync_status, error_message, updated_at)
+    VALUES (%(data_source)s, %(symbol)s, NOW(), 'failed', %(error)s, NOW())
+    ON CONFLICT (data_source, source_identifier) DO UPDATE SET
+        last_sync_timestamp = NOW(),
+        sync_status = 'failed',
+        error_message = EXCLUDED.error_message,
+        updated_at = NOW()
+"""
+
+
+def _price_rows(frame: pd.DataFrame) -> List[Tuple]:
+    adjusted = frame['adjusted_close'] if 'adjusted_close' in frame else frame['close']
+    frame = frame.assign(adjusted_close=adjusted)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [
+        (row.symbol, row.trade_date, row.open, row.high, row.low, row.close,
+         None if row.volume is None else int(row.volume), row.adjusted_close)
+        for row in frame.itertuples(index=False)
+    ]
+
+
+def write_prices(conn, market: str, request: Dict, df: pd.DataFrame, watermark: Tuple = (None, None)) -> Dict:
+    """
+    寫入單一請求取得的價格並推進水位（同一交易）
+
+    Args:
+        conn: psycopg2 連線
+        market: 'TW' / 'US'
+        request: plan_sync 產生的請求
+        df: 取得的價格（可含請求區間外的日期，寫入前會過濾）
+        watermark: 規劃時的 (earliest_date, latest_date)
+
+    Returns:
+        {'rows': 區間內筆數, 'written': 新增或變動筆數, 'inserted': 新增筆數, 'latest': 最新交易日}
+    """
+    source = _source(market)
+    symbol = request['symbol']
+    frame = pd.DataFrame()
+    if not df.empty:
+        frame = df.assign(trade_date=pd.to_datetime(df['trade_date']).dt.date)
+        frame = frame[
+            (frame['trade_date'] >= request['start']) & (frame['trade_date'] <= request['end'])
+        ].dropna(subset=['close'])
+        frame = frame.assign(symbol=symbol).drop_duplicates('trade_date', keep='last')
+
+    earliest, latest = watermark
+    # 成功抓取的區間視為已涵蓋（起點之前確實沒有資料的標的下次不再往前抓）；
+    # 終點只推進到實際取得的最後一天，資料源尚未公布的日期下次仍會補抓
+    new_earliest = min(d for d in (earliest, request['start']) if d is not None)
+    new_latest = max((d for d in (latest, frame['trade_date'].max() if not frame.empty else None) if d is not None),
+                     default=None)
+
+    written = inserted = 0
+    with conn.cursor() as cursor:
+        try:
+            if not frame.empty:
+                ensure_yearly_partitions(cursor, source['table'], frame['trade_date'])
+                rows = execute_values(cursor, _price_upsert_sql(source), _price_rows(frame), fetch=True)
+                written, inserted = len(rows), count_inserted(rows)
+                increment_row_count(cursor, source['table'], inserted)
+                if written:
+                    refresh_latest_quotes(cursor, source['quotes'], [symbol])
+                if inserted:
+                    mark_reports_outdated(cursor, [symbol])
+            cursor.execute(_ADVANCE_WATERMARK_SQL, {
+                'data_source': source['data_source'], 'symbols': [symbol],
+                'earliest': [new_earliest], 'latest': [new_latest], 'inserted': [inserted],
+            })
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return {'rows': len(frame), 'written': written, 'inserted': inserted, 'latest': new_latest}
+
+
+def mark_failed(conn, market: str, symbol: str, error: str):
+    """記錄同步失敗（水位不變）"""
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(_MARK_FAILED_SQL, {
+                'data_source': _source(market)['data_source'], 'symbol': symbol, 'error': error[:1000],
+            })
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def run_incremental_sync(
+    conn,
+    market: str,
+    symbols: Iterable[str],
+    fetch: Fetcher,
+    end: Optional[date] = None,
+    backfill_start: Optional[date] = None,
+    now: Optional[datetime] = None,
+    dry_run: bool = False,
+    request_delay: Optional[float] = None
+) -> Dict:
+    """
+    規劃並執行增量同步
+
+    Args:
+        conn: psycopg2 連線
+        market: 'TW' / 'US'
+        symbols: 標的代碼（重複的代碼只處理一次）
+        fetch: 取得價格的函式，見 tw_fetcher / us_fetcher
+        end: 同步到此日；None 為最近一個已收盤且資料已公布的交易日
+        backfill_start: 往前補資料的起點（None 只補最新缺漏）
+        now: 目前時間（測試用）
+        dry_run: 只規劃不抓取
+        request_delay: 請求間隔秒數，None 使用設定值
+
+    Returns:
+        統計 {'targets', 'up_to_date', 'requests', 'updated', 'written', 'unchanged', 'no_data', 'errors', 'end'}；
+        dry_run 時另含 'plan'
+    """
+    market = market.upper()
+    calendar = get_calendar(market)
+    config = INCREMENTAL_SYNC_CONFIG
+    if end is None:
+        end = calendar.last_complete_session(now, config['settle_minutes'].get(market, 0))
+    delay = config['request_delay'] if request_delay is None else request_delay
+    symbols = sorted(set(symbols))
+
+    with conn.cursor() as cursor:
+        watermarks = load_watermarks(cursor, market, symbols)
+    conn.commit()
+
+    plan = plan_sync(
+        watermarks, calendar, end,
+        initial_start=end - timedelta(days=config['initial_history_days']),
+        backfill_start=backfill_start,
+        merge_gap_days=config['merge_gap_days'],
+    )
+    pending = {request['symbol'] for request in plan}
+    stats = {
+        'targets': len(symbols),
+        'up_to_date': len(symbols) - len(pending),
+        'requests': len(plan),
+        'end': end.isoformat(),
+    }
+    logger.info(
+        f"📋 {market} 增量同步至 {end}：{len(symbols)} 檔，{stats['up_to_date']} 檔已是最新，"
+        f"{len(plan)} 個請求（{sum(r['sessions'] for r in plan)} 個交易日）"
+    )
+    if dry_run:
+        stats['plan'] = plan
+        return stats
+
+    stats.update(execute_plan(conn, market, plan, fetch, watermarks, delay))
+    logger.info(
+        f"✅ {market} 增量同步完成：更新 {stats['updated']} 檔（寫入 {stats['written']} 筆，"
+        f"略過未變動 {stats['unchanged']} 筆），無資料 {stats['no_data']}，錯誤 {stats['errors']}"
+    )
+    return stats
+
+
+def execute_plan(
+    conn,
+    market: str,
+    plan: List[Dict],
+    fetch: Fetcher,
+    watermarks: Optional[Watermarks] = None,
+    request_delay: float = 0
+) -> Dict:
+    """
+    依序抓取並寫入請求（每個請求一個交易；單一請求失敗不影響其他請求）
+
+    Args:
+        conn: psycopg2 連線
+        market: 'TW' / 'US'
+        plan: 請求列表 [{'symbol', 'start', 'end', ...}]
+        fetch: 取得價格的函式
+        watermarks: 規劃時的水位（None 表示不確定，由 sync_status 既有值決定）
+        request_delay: 請求間隔秒數
+
+    Returns:
+        {'updated', 'written', 'unchanged', 'no_data', 'errors'}
+    """
+    watermarks = {} if watermarks is None else watermarks
+    stats = {'updated': 0, 'written': 0, 'unchanged': 0, 'no_data': 0, 'errors': 0}
+    updated = set()
+    for index, request in enumerate(plan):
+        if index and request_delay:
+            time.sleep(request_delay)
+        symbol = request['symbol']
+        earliest, latest = watermarks.get(symbol, (None, None))
+        try:
+            df = fetch([symbol], request['start'], request['end'])
+            result = write_prices(conn, market, request, df, (earliest, latest))
+        except Exception as e:
+            logger.error(f"❌ {symbol} {request['start']} ~ {request['end']} 同步失敗: {e}")
+            stats['errors'] += 1
+            try:
+                mark_failed(conn, market, symbol, str(e))
+            except Exception as mark_error:
+                logger.warning(f"記錄 {symbol} 同步失敗狀態時發生錯誤: {mark_error}")
+            continue
+
+        if not result['rows']:
+            logger.warning(f"⚠️ {symbol} {request['start']} ~ {request['end']} 無資料")
+            stats['no_data'] += 1
+            continue
+        stats['written'] += result['written']
+        stats['unchanged'] += result['rows'] - result['written']
+        if result['written']:
+            updated.add(symbol)
+        # 同一標的的下一段請求以推進後的水位為準
+        watermarks[symbol] = (min(request['start'], earliest or request['start']), result['latest'])
+
+    stats['updated'] = len(updated)
+    return stats
+
+
+def _fetch_each(get_daily_price) -> Fetcher:
+    def fetch(symbols: List[str], start: date, end: date) -> pd.DataFrame:
+        frames = []
+        for symbol in symbols:
+            df = get_daily_price(symbol, start.isoformat(), end.isoformat())
+            if df is not None and not df.empty:
+                frames.append(df.assign(symbol=symbol))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return fetch
+
+
+def tw_fetcher(client) -> Fetcher:
+    """以 TWStockClient.get_daily_price 取得台股價格（TWSE → yfinance → twstock）"""
+    return _fetch_each(client.get_daily_price)
+
+
+def us_fetcher(client) -> Fetcher:
+    """以 USStockClient.get_daily_price 取得美股價格（yfinance → Tiingo）"""
+    return _fetch_each(client.get_daily_price)
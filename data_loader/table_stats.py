@@ -0,0 +1,157 @@
+"""
+資料表統計模組
+
+- 精確筆數：由 reconcile_row_counts 以 COUNT(*) 建立並定期校正（n8n 任務 reconcile-table-stats），
+  其間 DatabaseWriter 寫入時累加至 table_row_counts
+- 尚無計數的表格以 pg_class.reltuples（ANALYZE 估計值，含分區）代替
+- 各資料來源的新鮮度取自 sync_status
+
+儀表板查詢只讀計數表與系統目錄，不再對大表做 COUNT(*) 全表掃描
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+# 市場總覽需要的表格
+COUNTED_TABLES = [
+    'tw_stock_info', 'us_stock_info',
+    'tw_stock_prices', 'us_stock_prices',
+    'gold_prices', 'commodity_prices', 'exchange_rates',
+    'technical_indicators', 'institutional_trades',
+    'macro_indicators', 'financial_news', 'shareholder_dispersion',
+]
+
+
+def count_inserted(rows: Iterable) -> int:
+    """
+    由 RETURNING (xmax = 0) 的結果計算實際新增筆數（ON CONFLICT 更新不計）
+
+    Args:
+        rows: execute_values(..., fetch=True) 的回傳列
+
+    Returns:
+        新增筆數
+    """
+    return sum(1 for row in rows if row[0])
+
+
+def increment_row_count(cursor, table: str, delta: int):
+    """
+    累加表格筆數（呼叫端負責 commit，與資料寫入同一交易）
+
+    只更新已有計數的表格；尚無計數列的表格（新部署或升級後）不可用 delta 當作總數，
+    改由 reconcile_row_counts 以 COUNT(*) 建立，在此之前儀表板使用 reltuples 估計值
+
+    Args:
+        cursor: 資料庫游標
+        table: 表格名稱
+        delta: 增加的筆數（可為負）
+    """
+    if not delta:
+        return
+    cursor.execute("""
+        UPDATE table_row_counts
+        SET row_count = row_count + %s, updated_at = NOW()
+        WHERE table_name = %s
+    """, (delta, table))
+
+
+def reconcile_row_counts(cursor, tables: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    以 COUNT(*) 校正計數表（離峰時段排程執行）
+
+    Args:
+        cursor: 資料庫游標
+        tables: 要校正的表格，預設 COUNTED_TABLES
+
+    Returns:
+        {表格: 精確筆數}，不存在的表格略過
+    """
+    counts = {}
+    for table in tables or COUNTED_TABLES:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+        if not cursor.fetchone()[0]:
+            continue
+        # 計數與覆寫在同一語句完成；與並行寫入之間的少量誤差由下次校正修正
+        cursor.execute(f"""
+            INSERT INTO table_row_counts (table_name, row_count, reconciled_at, updated_at)
+            SELECT %s, COUNT(*), NOW(), NOW() FROM {table}
+            ON CONFLICT (table_name) DO UPDATE SET
+                row_count = EXCLUDED.row_count,
+                reconciled_at = EXCLUDED.reconciled_at,
+                updated_at = EXCLUDED.updated_at
+            RETURNING row_count
+        """, (table,))
+        counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+def get_table_stats(conn, tables: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    取得表格筆數（單一查詢，不掃描資料表）
+
+    Args:
+        conn: 資料庫連線
+        tables: 表格清單，預設 COUNTED_TABLES
+
+    Returns:
+        {表格: {'count': 筆數, 'exact': 是否為計數表數值, 'reconciled_at': 最近校正時間}}
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT
+                t.table_name,
+                c.row_count,
+                c.reconciled_at,
+                (
+                    SELECT COALESCE(SUM(GREATEST(cl.reltuples, 0)), 0)::BIGINT
+                    FROM pg_class cl
+                    WHERE cl.oid = to_regclass(t.table_name)
+                       OR cl.oid IN (SELECT inhrelid FROM pg_inherits
+                                     WHERE inhparent = to_regclass(t.table_name))
+                ) AS estimate
+            FROM unnest(%s::text[]) AS t(table_name)
+            LEFT JOIN table_row_counts c ON c.table_name = t.table_name
+        """, (list(tables or COUNTED_TABLES),))
+        rows = cursor.fetchall()
+
+    stats = {}
+    for table_name, row_count, reconciled_at, estimate in rows:
+        stats[table_name] = {
+            'count': int(row_count if row_count is not None else estimate),
+            'exact': row_count is not None,
+            'reconciled_at': reconciled_at.isoformat() if reconciled_at else None,
+        }
+    return stats
+
+
+def get_source_freshness(conn) -> Dict[str, Dict[str, Any]]:
+    """
+    取得各資料來源的新鮮度
+
+    Args:
+        conn: 資料庫連線
+
+    Returns:
+        {data_source: {'latest_date', 'last_sync', 'identifiers', 'failed'}}
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT
+                data_source,
+                MAX(latest_date) AS latest_date,
+                MAX(updated_at) AS last_sync,
+                COUNT(*) AS identifiers,
+                COUNT(*) FILTER (WHERE sync_status = 'failed') AS failed
+            FROM sync_status
+            GROUP BY data_source
+        """)
+        rows = cursor.fetchall()
+
+    return {
+        data_source: {
+            'latest_date': str(latest_date) if latest_date else None,
+            'last_sync': last_sync.isoformat() if last_sync else None,
+            'identifiers': identifiers,
+            'failed': failed,
+        }
+        for data_source, latest_date, last_sync, identifiers, failed in rows
+    }
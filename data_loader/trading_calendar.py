@@ -0,0 +1,265 @@
+"""
+交易所交易日曆模組
+
+- 交易所（TWSE / TPEX / NYSE）的休市日、臨時休市（颱風等）與半日交易見 config/trading_calendar.json，
+  新增颱風休市只需修改資料檔
+- 資料檔的 coverage 為休市日資料涵蓋的期間；期間外無法辨識休市日（每個平日都算交易日），
+  區間運算超出時記錄警告，缺漏偵測則裁切到涵蓋期間內
+- 以 numpy busdaycalendar 計算，日期陣列的判斷、位移與區間計數皆為向量化運算
+- 收盤後才視為當日資料完整，避免把盤中的不完整 K 線當成最新資料
+"""
+import json
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from loguru import logger
+
+CALENDAR_FILE = Path(__file__).parent.parent / 'config' / 'trading_calendar.json'
+
+# 市場代碼對應的交易所（上櫃股票與上市同一日曆）
+MARKET_EXCHANGES = {'TW': 'TWSE', 'US': 'NYSE'}
+
+# 交易日序號的基準日（session_index 以此起算）
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+DateLike = Union[date, datetime, str]
+
+
+def _to_date(value: DateLike) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def _to_days(values) -> np.ndarray:
+    """日期（單一值或陣列：date / 字串 / Timestamp / datetime64）轉為 datetime64[D] 陣列"""
+    if isinstance(values, (date, datetime, str, np.datetime64)):
+        values = [values]
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[D]')
+    return np.array(values, dtype='datetime64[D]')
+
+
+class TradingCalendar:
+    """單一交易所的交易日曆（週一至週五，扣除休市日與臨時休市）"""
+
+    def __init__(
+        self,
+        exchange: str,
+        holidays: Dict[str, str],
+        timezone: str = 'UTC',
+        close: str = '16:00',
+        closures: Optional[Dict[str, str]] = None,
+        half_days: Optional[Dict[str, str]] = None,
+        open: str = '09:00',
+        coverage: Optional[Dict[str, str]] = None
+    ):
+        """
+        Args:
+            exchange: 交易所代碼（'TWSE' / 'TPEX' / 'NYSE'）
+            holidays: {'YYYY-MM-DD': 名稱} 例行休市日
+            timezone: 交易所時區
+            close: 收盤時間 'HH:MM'（交易所當地時間）
+            closures: {'YYYY-MM-DD': 原因} 臨時休市（颱風、國喪等）
+            half_days: {'YYYY-MM-DD': 'HH:MM'} 提早收盤日與收盤時間
+            open: 開盤時間 'HH:MM'
+            coverage: {'start': 'YYYY-MM-DD', 'end': 'YYYY-MM-DD'} 休市日資料涵蓋期間；None 為不限
+        """
+        self.exchange = exchange
+        self.holidays = {_to_date(day): name for day, name in holidays.items()}
+        self.closures = {_to_date(day): name for day, name in (closures or {}).items()}
+        self.half_days = {_to_date(day): time.fromisoformat(t) for day, t in (half_days or {}).items()}
+        self.timezone = ZoneInfo(timezone)
+        self.open = time.fromisoformat(open)
+        self.close = time.fromisoformat(close)
+        coverage = coverage or {}
+        self.coverage_start = _to_date(coverage['start']) if coverage.get('start') else None
+        self.coverage_end = _to_date(coverage['end']) if coverage.get('end') else None
+        self._coverage_warned = False
+        closed = sorted(set(self.holidays) | set(self.closures))
+        self._busdays = np.busdaycalendar(weekmask='1111100', holidays=np.array(closed, dtype='datetime64[D]'))
+
+    # ---------- 單一日期 ----------
+
+    def is_trading_day(self, day: DateLike) -> bool:
+        return bool(np.is_busday(np.datetime64(_to_date(day), 'D'), busdaycal=self._busdays))
+
+    def closure_reason(self, day: DateLike) -> Optional[str]:
+        """非交易日的原因（週末、休市日名稱、臨時休市原因）；交易日回傳 None"""
+        day = _to_date(day)
+        if day in self.closures:
+            return self.closures[day]
+        if day in self.holidays:
+            return self.holidays[day]
+        if day.weekday() >= 5:
+            return '週末'
+        return None
+
+    def session_close(self, day: DateLike) -> Optional[time]:
+        """當日收盤時間（半日交易提早收盤）；非交易日回傳 None"""
+        day = _to_date(day)
+        if not self.is_trading_day(day):
+            return None
+        return self.half_days.get(day, self.close)
+
+    def next_trading_day(self, day: DateLike, inclusive: bool = True) -> date:
+        """day 當天或之後（inclusive=False 時為之後）的第一個交易日"""
+        day = _to_date(day) if inclusive else _to_date(day) + timedelta(days=1)
+        return np.busday_offset(np.datetime64(day, 'D'), 0, roll='forward', busdaycal=self._busdays).astype(object)
+
+    def previous_trading_day(self, day: DateLike, inclusive: bool = True) -> date:
+        """day 當天或之前（inclusive=False 時為之前）的最後一個交易日"""
+        day = _to_date(day) if inclusive else _to_date(day) - timedelta(days=1)
+        return np.busday_offset(np.datetime64(day, 'D'), 0, roll='backward', busdaycal=self._busdays).astype(object)
+
+    def last_complete_session(self, now: Optional[datetime] = None, settle_minutes: int = 0) -> date:
+        """
+        最近一個已收盤的交易日（半日交易以提早收盤時間判斷）
+
+        Args:
+            now: 時間點（naive 視為本機時間），None 為現在
+            settle_minutes: 收盤後資料公布所需的緩衝分鐘數
+
+        Returns:
+            交易日
+        """
+        now = (now or datetime.now()).astimezone(self.timezone)
+        today = now.date()
+        close = self.session_close(today)
+        if close is not None:
+            closed_at = datetime.combine(today, close, self.timezone) + timedelta(minutes=settle_minutes)
+            if now >= closed_at:
+                return today
+        return self.previous_trading_day(today, inclusive=False)
+
+    # ---------- 資料涵蓋期間 ----------
+
+    def covers(self, start: DateLike, end: Optional[DateLike] = None) -> bool:
+        """[start, end] 是否完全落在休市日資料涵蓋期間內"""
+        start = _to_date(start)
+        end = _to_date(end) if end is not None else start
+        return ((self.coverage_start is None or start >= self.coverage_start)
+                and (self.coverage_end is None or end <= self.coverage_end))
+
+    def clamp_to_coverage(self, start: DateLike, end: DateLike) -> Tuple[date, date]:
+        """
+        把區間裁切到休市日資料涵蓋期間內
+
+        Returns:
+            (start, end)；與涵蓋期間沒有交集時 start > end
+        """
+        start, end = _to_date(start), _to_date(end)
+        clamped = (max(start, self.coverage_start) if self.coverage_start else start,
+                   min(end, self.coverage_end) if self.coverage_end else end)
+        if clamped != (start, end):
+            logger.warning(f"⚠️ {self.exchange} 休市日資料只涵蓋 {self.coverage_start} ~ {self.coverage_end}，"
+                           f"{start} ~ {end} 裁切為 {clamped[0]} ~ {clamped[1]}")
+        return clamped
+
+    def _check_coverage(self, start: date, end: date):
+        # 期間外每個平日都算交易日；同一日曆只警告一次，避免回補時大量重複
+        if not self._coverage_warned and not self.covers(start, end):
+            self._coverage_warned = True
+            logger.warning(f"⚠️ {self.exchange} 休市日資料只涵蓋 {self.coverage_start} ~ {self.coverage_end}，"
+                           f"{start} ~ {end} 超出範圍的部分視所有平日為交易日，"
+                           f"請更新 config/trading_calendar.json")
+
+    # ---------- 區間 ----------
+
+    def sessions(self, start: DateLike, end: DateLike) -> np.ndarray:
+        """區間內的交易日（含頭尾），datetime64[D] 陣列"""
+        start, end = _to_date(start), _to_date(end)
+        if start > end:
+            return np.array([], dtype='datetime64[D]')
+        self._check_coverage(start, end)
+        days = np.arange(np.datetime64(start, 'D'), np.datetime64(end + timedelta(days=1), 'D'))
+        return days[np.is_busday(days, busdaycal=self._busdays)]
+
+    def trading_days(self, start: DateLike, end: DateLike) -> List[date]:
+        """
+        區間內的交易日（含頭尾）
+
+        Returns:
+            交易日列表（由舊到新）
+        """
+        return self.sessions(start, end).astype(object).tolist()
+
+    def count_trading_days(self, start: DateLike, end: DateLike) -> int:
+        """區間內的交易日數（含頭尾）"""
+        start, end = _to_date(start), _to_date(end)
+        if start > end:
+            return 0
+        self._check_coverage(start, end)
+        return int(np.busday_count(
+            np.datetime64(start, 'D'), np.datetime64(end + timedelta(days=1), 'D'), busdaycal=self._busdays
+        ))
+
+    # ---------- 向量化 ----------
+
+    def is_session(self, dates) -> np.ndarray:
+        """日期陣列逐一判斷是否為交易日"""
+        return np.is_busday(_to_days(dates), busdaycal=self._busdays)
+
+    def session_index(self, dates) -> np.ndarray:
+        """
+        交易日序號（相鄰交易日相差 1），非交易日取其後第一個交易日的序號
+
+        兩個日期的序號差即為其間的交易日數，可用來切分連續缺漏或計算落後的交易日數
+        """
+        return np.busday_count(_EPOCH, _to_days(dates), busdaycal=self._busdays)
+
+    def add_sessions(self, dates, n) -> np.ndarray:
+        """日期陣列各自位移 n 個交易日（非交易日先往後滾到交易日）"""
+        return np.busday_offset(_to_days(dates), n, roll='forward', busdaycal=self._busdays)
+
+    def count_sessions(self, starts, ends) -> np.ndarray:
+        """各區間 [start, end] 的交易日數（含頭尾，陣列逐一計算）"""
+        starts, ends = _to_days(starts), _to_days(ends)
+        counts = np.busday_count(starts, ends + np.timedelta64(1, 'D'), busdaycal=self._busdays)
+        return np.where(starts > ends, 0, counts)
+
+
+@lru_cache(maxsize=None)
+def _load_calendar_data(path: str) -> Dict:
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def get_calendar(name: str) -> TradingCalendar:
+    """
+    取得交易日曆（同一程序內共用）
+
+    Args:
+        name: 交易所（'TWSE' / 'TPEX' / 'NYSE'）或市場代碼（'TW' / 'US'），不分大小寫
+
+    Returns:
+        TradingCalendar
+    """
+    return _exchange_calendar(MARKET_EXCHANGES.get(name.upper(), name.upper()))
+
+
+@lru_cache(maxsize=None)
+def _exchange_calendar(exchange: str) -> TradingCalendar:
+    data = _load_calendar_data(str(CALENDAR_FILE))
+    if exchange not in data:
+        raise ValueError(f"不支援的市場或交易所: {exchange}")
+    spec = data[exchange]
+    if 'same_as' in spec:
+        spec = {**data[spec['same_as']], **{k: v for k, v in spec.items() if k != 'same_as'}}
+    return TradingCalendar(
+        exchange,
+        spec.get('holidays', {}),
+        timezone=spec.get('timezone', 'UTC'),
+        close=spec.get('close', '16:00'),
+        closures=spec.get('closures'),
+        half_days=spec.get('half_days'),
+        open=spec.get('open', '09:00'),
+        coverage=spec.get('coverage'),
+    )
@@ -0,0 +1,263 @@
+"""
+證券主檔與標的清單模組
+
+每個市場維護一份去重後的標準標的清單（securities_master）：
+- refresh_universe：交易所清單（台股 TWStockClient.get_stock_list）正規化、去重後批次 upsert 主檔與基本資料表，
+  完整清單中已不存在的標的標記為下市
+- SecurityUniverse：程序內快取，整個主檔只載入一次；ticker → id 批次解析，
+  取代每筆寫入 / 查詢內的 (SELECT id FROM securities_master WHERE ticker = %s) 子查詢
+- 批次任務以 get_universe().symbols() 取得標的，不再各自維護寫死的清單
+"""
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set
+
+from loguru import logger
+from psycopg2.extras import execute_values
+
+from data_loader.table_stats import count_inserted
+from utils.lazy_import import lazy_singleton
+
+MARKETS = ('TW', 'US')
+
+# 台股代碼在 yfinance 等來源帶有交易所後綴
+_TW_SUFFIXES = ('.TWO', '.TW')
+
+# 各市場基本資料表（價格表外鍵指向此表，主檔更新時一併補上）
+_INFO_UPSERT_SQL = {
+    'TW': """
+        INSERT INTO tw_stock_info (stock_code, stock_name, industry, market)
+        VALUES %s
+        ON CONFLICT (stock_code) DO UPDATE SET
+            stock_name = EXCLUDED.stock_name,
+            industry = COALESCE(EXCLUDED.industry, tw_stock_info.industry),
+            market = COALESCE(EXCLUDED.market, tw_stock_info.market)
+        WHERE (tw_stock_info.stock_name, tw_stock_info.market)
+              IS DISTINCT FROM (EXCLUDED.stock_name, COALESCE(EXCLUDED.market, tw_stock_info.market))
+    """,
+    'US': """
+        INSERT INTO us_stock_info (symbol, company_name, industry, exchange)
+        VALUES %s
+        ON CONFLICT (symbol) DO UPDATE SET
+            company_name = COALESCE(EXCLUDED.company_name, us_stock_info.company_name),
+            industry = COALESCE(EXCLUDED.industry, us_stock_info.industry),
+            exchange = COALESCE(EXCLUDED.exchange, us_stock_info.exchange)
+        WHERE (us_stock_info.company_name, us_stock_info.exchange)
+              IS DISTINCT FROM (COALESCE(EXCLUDED.company_name, us_stock_info.company_name),
+                                COALESCE(EXCLUDED.exchange, us_stock_info.exchange))
+    """,
+}
+
+_INFO_SYMBOLS_SQL = {
+    'TW': "SELECT stock_code FROM tw_stock_info ORDER BY stock_code",
+    'US': "SELECT symbol FROM us_stock_info ORDER BY symbol",
+}
+
+_UPSERT_MASTER_SQL = """
+    INSERT INTO securities_master (ticker, market, name, exchange, industry, listing_status, last_listed)
+    VALUES %s
+    ON CONFLICT (ticker) DO UPDATE SET
+        name = COALESCE(EXCLUDED.name, securities_master.name),
+        exchange = COALESCE(EXCLUDED.exchange, securities_master.exchange),
+        industry = COALESCE(EXCLUDED.industry, securities_master.industry),
+        listing_status = 'listed',
+        last_listed = EXCLUDED.last_listed
+    RETURNING (xmax = 0)
+"""
+
+_MARK_DELISTED_SQL = """
+    UPDATE securities_master
+    SET listing_status = 'delisted'
+    WHERE market = %(market)s AND listing_status = 'listed' AND NOT (ticker = ANY(%(tickers)s))
+"""
+
+
+def canonical_ticker(ticker: str) -> str:
+    """標準代碼：去除空白、轉大寫、移除台股的 .TW / .TWO 後綴"""
+    ticker = str(ticker).strip().upper()
+    for suffix in _TW_SUFFIXES:
+        if ticker.endswith(suffix):
+            return ticker[:-len(suffix)]
+    return ticker
+
+
+def canonical_symbols(tickers: Iterable[str]) -> List[str]:
+    """正規化並去重（保留第一次出現的順序），空字串略過"""
+    return list(dict.fromkeys(t for t in map(canonical_ticker, tickers) if t))
+
+
+def _blank_to_none(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value if value and value != 'Unknown' else None
+
+
+def tw_listings(client) -> List[Dict]:
+    """
+    台股上市 + 上櫃清單（TWStockClient.get_stock_list）
+
+    Returns:
+        [{'ticker', 'name', 'exchange', 'industry'}]；同一代碼重複出現時保留第一筆（上市優先）
+    """
+    listings = {}
+    for stock in client.get_stock_list('ALL'):
+        ticker = canonical_ticker(stock.get('code', ''))
+        if ticker and ticker not in listings:
+            listings[ticker] = {
+                'ticker': ticker,
+                'name': _blank_to_none(stock.get('name')),
+                'exchange': _blank_to_none(stock.get('market')),
+                'industry': _blank_to_none(stock.get('industry')),
+            }
+    return list(listings.values())
+
+
+def refresh_universe(conn, market: str, listings: Iterable[Dict], complete: bool = True) -> Dict:
+    """
+    以交易所清單更新證券主檔與基本資料表（單一交易）
+
+    Args:
+        conn: psycopg2 連線
+        market: 'TW' / 'US'
+        listings: [{'ticker', 'name', 'exchange', 'industry'}]，除 ticker 外皆可省略
+        complete: listings 是否為該市場的完整清單；是才把清單外的標的標記為下市
+
+    Returns:
+        {'listed': 清單標的數, 'added': 新增至主檔數, 'delisted': 本次標記下市數}
+    """
+    market = market.upper()
+    if market not in MARKETS:
+        raise ValueError(f"不支援的市場: {market}")
+    unique = {}
+    for item in listings:
+        ticker = canonical_ticker(item['ticker'])
+        if ticker and ticker not in unique:
+            unique[ticker] = {**item, 'ticker': ticker}
+    if not unique:
+        # 清單來源失敗時不可把整個市場標記為下市
+        logger.warning(f"⚠️ {market} 標的清單為空，略過證券主檔更新")
+        return {'listed': 0, 'added': 0, 'delisted': 0}
+
+    today = date.today()
+    items = sorted(unique.values(), key=lambda item: item['ticker'])
+    master_rows = [
+        (item['ticker'], market, _blank_to_none(item.get('name')), _blank_to_none(item.get('exchange')),
+         _blank_to_none(item.get('industry')), 'listed', today)
+        for item in items
+    ]
+    # tw_stock_info.stock_name 不可為空，沒有名稱時以代碼代替
+    info_rows = [
+        (row[0], row[2] or (row[0] if market == 'TW' else None), row[4], row[3])
+        for row in master_rows
+    ]
+
+    stats = {'listed': len(items), 'added': 0, 'delisted': 0}
+    with conn.cursor() as cursor:
+        try:
+            stats['added'] = count_inserted(execute_values(cursor, _UPSERT_MASTER_SQL, master_rows, fetch=True))
+            execute_values(cursor, _INFO_UPSERT_SQL[market], info_rows)
+            if complete:
+                cursor.execute(_MARK_DELISTED_SQL, {'market': market, 'tickers': list(unique)})
+                stats['delisted'] = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    get_universe().invalidate()
+    logger.info(f"📇 {market} 證券主檔：{stats['listed']} 檔上市，新增 {stats['added']}，下市 {stats['delisted']}")
+    return stats
+
+
+class SecurityUniverse:
+    """
+    證券主檔的程序內快取（執行緒安全）
+
+    第一次使用時以一次查詢載入整個主檔；主檔中沒有的代碼以一次 ANY() 查詢補查，
+    仍查不到的記為缺少，直到 invalidate()（refresh_universe 後自動呼叫）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Optional[Dict[str, int]] = None
+        self._missing: Set[str] = set()
+        self._listed: Dict[str, List[tuple]] = {}
+        self._delisted: Set[str] = set()
+
+    def load(self, cursor):
+        """重新載入整個主檔"""
+        cursor.execute("""
+            SELECT id, ticker, market, exchange, listing_status
+            FROM securities_master
+            ORDER BY market, ticker
+        """)
+        ids, listed, delisted = {}, {market: [] for market in MARKETS}, set()
+        for security_id, ticker, market, exchange, status in cursor.fetchall():
+            ids[ticker] = security_id
+            if status == 'listed':
+                listed.setdefault(market, []).append((ticker, exchange))
+            else:
+                delisted.add(ticker)
+        with self._lock:
+            self._ids, self._listed, self._delisted = ids, listed, delisted
+            self._missing = set()
+        logger.debug(f"證券主檔載入 {len(ids)} 檔")
+
+    def invalidate(self):
+        """清除快取，下次使用時重新載入"""
+        with self._lock:
+            self._ids = None
+
+    def _ensure_loaded(self, cursor):
+        if self._ids is None:
+            self.load(cursor)
+
+    def symbols(self, cursor, market: str, exchange: Optional[str] = None) -> List[str]:
+        """
+        市場中仍上市的標的（去重、依代碼排序）
+
+        Args:
+            cursor: 資料庫游標
+            market: 'TW' / 'US'
+            exchange: 只取此交易所（'TWSE' / 'TPEX' ...）；None 為全部
+
+        Returns:
+            代碼列表；主檔尚無此市場資料時退回基本資料表中的標的
+        """
+        market = market.upper()
+        self._ensure_loaded(cursor)
+        listed = self._listed.get(market, [])
+        if not listed:
+            cursor.execute(_INFO_SYMBOLS_SQL[market])
+            return canonical_symbols(row[0] for row in cursor.fetchall())
+        return [ticker for ticker, venue in listed if exchange is None or venue == exchange]
+
+    def filter_listed(self, cursor, tickers: Iterable[str]) -> List[str]:
+        """正規化、去重並排除已下市的代碼（主檔中沒有的代碼如 ETF 保留）"""
+        self._ensure_loaded(cursor)
+        return [ticker for ticker in canonical_symbols(tickers) if ticker not in self._delisted]
+
+    def resolve_ids(self, cursor, tickers: Iterable[str]) -> Dict[str, int]:
+        """
+        批次解析 security_id
+
+        Returns:
+            {標準代碼: id}；主檔中沒有的代碼不列出
+        """
+        self._ensure_loaded(cursor)
+        wanted = canonical_symbols(tickers)
+        unknown = [t for t in wanted if t not in self._ids and t not in self._missing]
+        if unknown:
+            cursor.execute("SELECT ticker, id FROM securities_master WHERE ticker = ANY(%s)", (unknown,))
+            found = dict(cursor.fetchall())
+            with self._lock:
+                self._ids.update(found)
+                self._missing.update(t for t in unknown if t not in found)
+        return {t: self._ids[t] for t in wanted if t in self._ids}
+
+    def security_id(self, cursor, ticker: str) -> Optional[int]:
+        """單一代碼的 security_id；主檔中沒有時回傳 None"""
+        return self.resolve_ids(cursor, [ticker]).get(canonical_ticker(ticker))
+
+
+get_universe = lazy_singleton(SecurityUniverse)
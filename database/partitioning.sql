@@ -0,0 +1,198 @@
+-- ================================================
+-- 時間序列大表按年分區（Range Partition by Year）
+-- ================================================
+-- 適用：tw_stock_prices、us_stock_prices、technical_indicators、institutional_trades
+-- 需求：PostgreSQL 12+
+--
+-- 使用方式：
+--   1. 先執行 schema.sql / chips_analysis_schema.sql 建立原始表格
+--   2. 執行本檔案（python scripts/init_database.py 或 psql -f）：將既有資料表轉為分區表（資料會搬移，建議於離峰時段執行）
+--   3. 確認資料無誤後，刪除保留的舊表：DROP TABLE tw_stock_prices_legacy; ...
+--
+-- 同步程式寫入前會呼叫 ensure_yearly_partition() 自動建立當年度分區；
+-- 若仍有未涵蓋的日期，資料會先落在 _default 分區，下次建立分區時自動搬移。
+-- ================================================
+
+
+-- 分區名稱：<表名>_y<年份>，例如 tw_stock_prices_y2024
+CREATE OR REPLACE FUNCTION yearly_partition_name(p_table TEXT, p_year INT)
+RETURNS TEXT AS $$
+    SELECT p_table || '_y' || p_year::TEXT;
+$$ LANGUAGE sql IMMUTABLE;
+
+
+-- 建立指定年度分區（已存在則略過）
+-- 若 _default 分區中有該年度資料，會在同一交易中搬移至新分區
+CREATE OR REPLACE FUNCTION ensure_yearly_partition(p_table TEXT, p_year INT)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_partition TEXT := yearly_partition_name(p_table, p_year);
+    v_default TEXT := p_table || '_default';
+    v_column TEXT;
+    v_from DATE := make_date(p_year, 1, 1);
+    v_to DATE := make_date(p_year + 1, 1, 1);
+BEGIN
+    IF to_regclass(v_partition) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    -- 同時有多個同步程序時，以父表鎖序列化分區建立
+    EXECUTE format('LOCK TABLE %I IN SHARE ROW EXCLUSIVE MODE', p_table);
+    IF to_regclass(v_partition) IS NOT NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    SELECT a.attname INTO v_column
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = p_table::regclass;
+
+    IF v_column IS NULL THEN
+        RAISE EXCEPTION '% 不是分區表', p_table;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)', v_partition, p_table);
+
+    IF to_regclass(v_default) IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            v_default, v_column, v_from, v_column, v_to, v_partition
+        );
+    END IF;
+
+    EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        p_table, v_partition, v_from, v_to
+    );
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- 將既有的一般表轉為按年分區表
+--   * 舊表更名為 <表名>_legacy 並保留（p_drop_legacy = TRUE 時直接刪除）
+--   * 主鍵改為 (id, 分區欄位)；唯一鍵 / 外鍵原樣複製（唯一鍵必須包含分區欄位）
+--   * 分區欄位的 B-tree 單欄索引改為 BRIN，其餘索引原樣重建
+--   * 建立資料涵蓋年度至明年的分區，以及 _default 分區
+CREATE OR REPLACE FUNCTION migrate_to_yearly_partitions(
+    p_table TEXT,
+    p_column TEXT,
+    p_drop_legacy BOOLEAN DEFAULT FALSE
+)
+RETURNS VOID AS $$
+DECLARE
+    v_legacy TEXT := p_table || '_legacy';
+    v_sequence TEXT;
+    v_first_year INT;
+    v_last_year INT;
+    v_year INT;
+    v_con RECORD;
+    v_idx RECORD;
+BEGIN
+    IF to_regclass(p_table) IS NULL THEN
+        RAISE NOTICE '略過 %：表格不存在', p_table;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = p_table::regclass) THEN
+        RAISE NOTICE '略過 %：已是分區表', p_table;
+        RETURN;
+    END IF;
+
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', p_table, v_legacy);
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CHECK INCLUDING COMMENTS) PARTITION BY RANGE (%I)',
+        p_table, v_legacy, p_column
+    );
+
+    -- 序號改由新表擁有，舊表刪除時不會連帶刪除
+    v_sequence := pg_get_serial_sequence(v_legacy, 'id');
+    IF v_sequence IS NOT NULL THEN
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', v_sequence, p_table);
+    END IF;
+
+    -- 約束：主鍵補上分區欄位，其餘照抄
+    FOR v_con IN
+        SELECT contype, pg_get_constraintdef(oid) AS def,
+               ARRAY(SELECT attname FROM pg_attribute
+                     WHERE attrelid = conrelid AND attnum = ANY(conkey)) AS columns
+        FROM pg_constraint
+        WHERE conrelid = v_legacy::regclass AND contype IN ('p', 'u', 'f')
+        ORDER BY contype DESC
+    LOOP
+        IF v_con.contype = 'p' AND NOT p_column = ANY(v_con.columns) THEN
+            EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (%s, %I)',
+                           p_table, array_to_string(v_con.columns, ', '), p_column);
+        ELSE
+            EXECUTE format('ALTER TABLE %I ADD %s', p_table, v_con.def);
+        END IF;
+    END LOOP;
+
+    -- 一般索引：分區欄位單欄索引改用 BRIN
+    FOR v_idx IN
+        SELECT pg_get_indexdef(i.indexrelid) AS def,
+               i.indnatts = 1 AND a.attname = p_column AS date_only
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = v_legacy::regclass
+          AND NOT i.indisprimary
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+    LOOP
+        IF NOT v_idx.date_only THEN
+            EXECUTE regexp_replace(v_idx.def, '^CREATE (UNIQUE )?INDEX \S+ ON \S+',
+                                   format('CREATE \1INDEX ON %I', p_table));
+        END IF;
+    END LOOP;
+    EXECUTE format('CREATE INDEX ON %I USING BRIN (%I) WITH (pages_per_range = 32)', p_table, p_column);
+
+    -- 分區：資料涵蓋年度 ~ 明年，並建立 default 分區承接範圍外資料
+    EXECUTE format('SELECT EXTRACT(YEAR FROM MIN(%I))::INT, EXTRACT(YEAR FROM MAX(%I))::INT FROM %I',
+                   p_column, p_column, v_legacy)
+        INTO v_first_year, v_last_year;
+    v_first_year := COALESCE(v_first_year, EXTRACT(YEAR FROM CURRENT_DATE)::INT);
+    v_last_year := GREATEST(COALESCE(v_last_year, 0), EXTRACT(YEAR FROM CURRENT_DATE)::INT + 1);
+
+    FOR v_year IN v_first_year..v_last_year LOOP
+        PERFORM ensure_yearly_partition(p_table, v_year);
+    END LOOP;
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', p_table || '_default', p_table);
+
+    EXECUTE format('INSERT INTO %I SELECT * FROM %I', p_table, v_legacy);
+    EXECUTE format('ANALYZE %I', p_table);
+
+    IF p_drop_legacy THEN
+        EXECUTE format('DROP TABLE %I', v_legacy);
+    END IF;
+
+    RAISE NOTICE '% 已轉為分區表（% ~ %）', p_table, v_first_year, v_last_year;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- 執行遷移（每張表在各自的交易中完成）
+-- 單表失敗不影響其他表的前提是逐段送出：psql -f 逐句執行，或由
+-- data_loader.partitions.apply_partitioning()（init_database.py 使用）逐個區塊執行；
+-- 以單一 execute 送出整份檔案時，第一個失敗會中止其後所有表格
+BEGIN;
+SELECT migrate_to_yearly_partitions('tw_stock_prices', 'trade_date');
+COMMIT;
+
+BEGIN;
+SELECT migrate_to_yearly_partitions('us_stock_prices', 'trade_date');
+COMMIT;
+
+BEGIN;
+SELECT migrate_to_yearly_partitions('institutional_trades', 'trade_date');
+COMMIT;
+
+-- technical_indicators 依部署版本不同，日期欄位為 trade_date 或 calculation_date
+BEGIN;
+SELECT migrate_to_yearly_partitions('technical_indicators', column_name)
+FROM information_schema.columns
+WHERE table_schema = 'public'
+  AND table_name = 'technical_indicators'
+  AND column_name IN ('trade_date', 'calculation_date')
+ORDER BY column_name = 'trade_date' DESC
+LIMIT 1;
+COMMIT;
@@ -151,6 +151,24 @@ CREATE INDEX idx_news_sentiment ON financial_news(sentiment_score) WHERE sentime
 
 COMMENT ON TABLE financial_news IS '金融新聞與情緒分析';
 
+-- 1.9 證券主檔（data_loader.universe 維護；批次任務的標的清單與 security_id 來源）
+CREATE TABLE IF NOT EXISTS securities_master (
+    id SERIAL PRIMARY KEY,
+    ticker VARCHAR(10) NOT NULL UNIQUE,              -- 台股代碼為數字、美股為英文，不會重複
+    market VARCHAR(5) NOT NULL,                      -- 'TW' / 'US'
+    name VARCHAR(200),
+    exchange VARCHAR(20),                            -- TWSE / TPEX / NYSE / NASDAQ
+    industry VARCHAR(100),
+    listing_status VARCHAR(10) NOT NULL DEFAULT 'listed',  -- listed / delisted
+    last_listed DATE,                                -- 最近一次出現在交易所清單的日期
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_securities_market_status ON securities_master(market, listing_status);
+
+COMMENT ON TABLE securities_master IS '證券主檔：每個市場去重後的標準標的清單與上市狀態';
+
 -- ============================================
 -- 第二層：預計算表（效能優化核心）
 -- ============================================
@@ -200,10 +218,47 @@ CREATE TABLE IF NOT EXISTS technical_indicators (
     -- 相對強弱
     relative_strength_score DECIMAL(8,4),
     
+    -- 擴充指標（Wilder 平滑）
+    rsi_14_wilder DECIMAL(5,2),
+    atr_14_wilder DECIMAL(12,4),
+    plus_di_14 DECIMAL(6,2),
+    minus_di_14 DECIMAL(6,2),
+    adx_14 DECIMAL(6,2),
+    
+    -- 擴充指標（量價）
+    obv BIGINT,
+    vwap_20 DECIMAL(12,4),
+    cci_20 DECIMAL(10,2),
+    stoch_rsi_k DECIMAL(6,2),
+    stoch_rsi_d DECIMAL(6,2),
+    
+    -- 一目均衡表（先行帶已平移至繪製日）
+    ichimoku_tenkan DECIMAL(12,4),
+    ichimoku_kijun DECIMAL(12,4),
+    ichimoku_senkou_a DECIMAL(12,4),
+    ichimoku_senkou_b DECIMAL(12,4),
+    
     created_at TIMESTAMPTZ DEFAULT NOW(),
     UNIQUE(security_type, security_code, trade_date)
 );
 
+-- 既有資料庫補上擴充指標欄位
+ALTER TABLE technical_indicators
+    ADD COLUMN IF NOT EXISTS rsi_14_wilder DECIMAL(5,2),
+    ADD COLUMN IF NOT EXISTS atr_14_wilder DECIMAL(12,4),
+    ADD COLUMN IF NOT EXISTS plus_di_14 DECIMAL(6,2),
+    ADD COLUMN IF NOT EXISTS minus_di_14 DECIMAL(6,2),
+    ADD COLUMN IF NOT EXISTS adx_14 DECIMAL(6,2),
+    ADD COLUMN IF NOT EXISTS obv BIGINT,
+    ADD COLUMN IF NOT EXISTS vwap_20 DECIMAL(12,4),
+    ADD COLUMN IF NOT EXISTS cci_20 DECIMAL(10,2),
+    ADD COLUMN IF NOT EXISTS stoch_rsi_k DECIMAL(6,2),
+    ADD COLUMN IF NOT EXISTS stoch_rsi_d DECIMAL(6,2),
+    ADD COLUMN IF NOT EXISTS ichimoku_tenkan DECIMAL(12,4),
+    ADD COLUMN IF NOT EXISTS ichimoku_kijun DECIMAL(12,4),
+    ADD COLUMN IF NOT EXISTS ichimoku_senkou_a DECIMAL(12,4),
+    ADD COLUMN IF NOT EXISTS ichimoku_senkou_b DECIMAL(12,4);
+
 CREATE INDEX idx_tech_ind_security_date ON technical_indicators(security_type, security_code, trade_date DESC);
 CREATE INDEX idx_tech_ind_date ON technical_indicators(trade_date DESC);
 
@@ -264,6 +319,52 @@ CREATE INDEX idx_quant_total_score ON quant_scores(total_score DESC, calculation
 
 COMMENT ON TABLE quant_scores IS '量化六大因子分數表';
 
+-- 2.3 最新報價表（每個標的一列，由 DatabaseWriter 於寫入價格時同步更新）
+CREATE TABLE IF NOT EXISTS latest_quotes (
+    market VARCHAR(10) NOT NULL,  -- 'tw', 'us', 'gold', 'fx'
+    symbol VARCHAR(20) NOT NULL,
+    trade_date DATE NOT NULL,
+    close_price DECIMAL(18,6) NOT NULL,
+    prev_close DECIMAL(18,6),
+    change DECIMAL(18,6),
+    change_percent DECIMAL(10,4),
+    volume BIGINT,
+    high_52w DECIMAL(18,6),
+    low_52w DECIMAL(18,6),
+    avg_volume_20d BIGINT,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (market, symbol)
+);
+
+COMMENT ON TABLE latest_quotes IS '最新報價（收盤、漲跌、52週高低、20日均量）';
+
+-- 2.4 決策六維評分表（calculators.decision_scores 每日批次計算，供 AI 報告引用）
+CREATE TABLE IF NOT EXISTS decision_scores (
+    security_type VARCHAR(5) NOT NULL,  -- 'TW' or 'US'
+    security_code VARCHAR(10) NOT NULL,
+    score_date DATE NOT NULL,
+    
+    -- 六維評分（0-100）
+    macro_score DECIMAL(5,2),
+    technical_score DECIMAL(5,2),
+    chips_score DECIMAL(5,2),
+    fundamental_score DECIMAL(5,2),
+    sentiment_score DECIMAL(5,2),
+    valuation_score DECIMAL(5,2),
+    overall_score DECIMAL(5,2),
+    
+    recommendation VARCHAR(10),  -- '買入', '持有', '賣出'
+    confidence VARCHAR(5),  -- '高', '中', '低'（依有資料的維度數）
+    missing_dimensions TEXT[],  -- 缺資料、以中性分數 50 代替的維度
+    
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (security_type, security_code, score_date)
+);
+
+CREATE INDEX idx_decision_scores_date ON decision_scores(score_date DESC, overall_score DESC);
+
+COMMENT ON TABLE decision_scores IS '決策六維評分（宏觀/技術/籌碼/基本面/情緒/估值）';
+
 -- ============================================
 -- 第三層：AI 快取層
 -- ============================================
@@ -298,10 +399,20 @@ CREATE TABLE IF NOT EXISTS ai_reports (
     stop_loss DECIMAL(12,2),
     
     -- 時效性管理
-    analysis_date DATE NOT NULL,
+    analysis_date DATE NOT NULL DEFAULT CURRENT_DATE,
     valid_until DATE,
     is_outdated BOOLEAN DEFAULT FALSE,
     
+    -- 快取定址（輸入指紋 = 因子分數、資料日期、模板版本、模型的 SHA-256）
+    input_fingerprint CHAR(64),
+    template_version VARCHAR(20),
+    
+    -- 報告腳本寫入的欄位（generate_ai_reports.py / generate_unified_decision.py）
+    report_title VARCHAR(200),
+    report_content TEXT,
+    market_data JSONB,
+    generated_by VARCHAR(50),
+    
     -- 準確度追蹤
     prediction_outcome VARCHAR(20),
     accuracy_score DECIMAL(5,2),
@@ -310,9 +421,28 @@ CREATE TABLE IF NOT EXISTS ai_reports (
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- 既有資料庫（generate_ai_reports.py 建立的精簡版 ai_reports）補上快取欄位
+ALTER TABLE ai_reports
+    ADD COLUMN IF NOT EXISTS security_type VARCHAR(5),
+    ADD COLUMN IF NOT EXISTS security_code VARCHAR(10),
+    ADD COLUMN IF NOT EXISTS model_version VARCHAR(50),
+    ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER,
+    ADD COLUMN IF NOT EXISTS completion_tokens INTEGER,
+    ADD COLUMN IF NOT EXISTS analysis_date DATE DEFAULT CURRENT_DATE,
+    ADD COLUMN IF NOT EXISTS valid_until DATE,
+    ADD COLUMN IF NOT EXISTS is_outdated BOOLEAN DEFAULT FALSE,
+    ADD COLUMN IF NOT EXISTS input_fingerprint CHAR(64),
+    ADD COLUMN IF NOT EXISTS template_version VARCHAR(20),
+    ADD COLUMN IF NOT EXISTS report_title VARCHAR(200),
+    ADD COLUMN IF NOT EXISTS report_content TEXT,
+    ADD COLUMN IF NOT EXISTS market_data JSONB,
+    ADD COLUMN IF NOT EXISTS generated_by VARCHAR(50),
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
 CREATE INDEX idx_ai_reports_type_date ON ai_reports(report_type, analysis_date DESC);
 CREATE INDEX idx_ai_reports_security ON ai_reports(security_type, security_code, analysis_date DESC);
 CREATE INDEX idx_ai_reports_validity ON ai_reports(is_outdated, valid_until) WHERE is_outdated = FALSE;
+CREATE INDEX IF NOT EXISTS idx_ai_reports_fingerprint ON ai_reports(input_fingerprint, created_at DESC) WHERE is_outdated = FALSE;
 
 COMMENT ON TABLE ai_reports IS 'AI 分析報告快取（減少 70-80% API 使用）';
 
@@ -340,6 +470,49 @@ CREATE INDEX idx_similarity_source_rank ON similarity_matrix(source_type, source
 
 COMMENT ON TABLE similarity_matrix IS '因子相似度矩陣（相似資產發現）';
 
+-- 3.3 AI 任務佇列表（ai.job_queue.AIJobQueue 以 FOR UPDATE SKIP LOCKED 領取）
+CREATE TABLE IF NOT EXISTS ai_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    batch_id VARCHAR(50),
+    report_type VARCHAR(50) NOT NULL,
+    report_title VARCHAR(200),
+    security_type VARCHAR(5),
+    security_code VARCHAR(10),
+    
+    -- 生成輸入
+    prompt TEXT NOT NULL,
+    inputs JSONB,
+    generation_config JSONB,
+    template_version VARCHAR(20),
+    model_version VARCHAR(50),
+    input_fingerprint CHAR(64) NOT NULL,
+    
+    -- 排程與重試
+    priority SMALLINT DEFAULT 100,  -- 數字越小越優先
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- 'pending', 'running', 'done', 'failed'
+    attempts SMALLINT DEFAULT 0,
+    max_attempts SMALLINT DEFAULT 5,
+    run_after TIMESTAMPTZ DEFAULT NOW(),
+    last_error TEXT,
+    worker_id VARCHAR(100),
+    
+    -- 結果與用量
+    report_id BIGINT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX idx_ai_jobs_claim ON ai_jobs(priority, id) WHERE status = 'pending';
+CREATE INDEX idx_ai_jobs_batch ON ai_jobs(batch_id, status);
+-- 相同輸入只保留一個未完成任務
+CREATE UNIQUE INDEX idx_ai_jobs_active_fingerprint ON ai_jobs(input_fingerprint) WHERE status IN ('pending', 'running');
+
+COMMENT ON TABLE ai_jobs IS 'AI 報告生成任務佇列（可續跑、含重試與 token 用量）';
+
 -- ============================================
 -- 第四層：進階分析表
 -- ============================================
@@ -556,6 +729,32 @@ CREATE INDEX idx_stress_test_user ON stress_test_results(user_id, test_date DESC
 
 COMMENT ON TABLE stress_test_results IS '壓力測試結果';
 
+-- 4.7 量化分析任務表（calculators.quant_jobs；已完成的任務即結果快取）
+CREATE TABLE IF NOT EXISTS quant_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    job_type VARCHAR(30) NOT NULL,  -- 'monte-carlo', 'efficient-frontier', 'risk-analysis'
+    params JSONB NOT NULL,
+    as_of_date DATE NOT NULL,
+    -- SHA-256(任務類型, 標準化參數, 資料日期)
+    fingerprint CHAR(64) NOT NULL,
+    
+    status VARCHAR(10) NOT NULL DEFAULT 'pending',  -- pending / running / done / failed
+    stage VARCHAR(20) NOT NULL DEFAULT 'queued',    -- queued / fetching / computing / done
+    result JSONB,
+    error TEXT,
+    error_type VARCHAR(50),
+    
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX idx_quant_jobs_result ON quant_jobs(fingerprint, finished_at DESC) WHERE status = 'done';
+-- 相同輸入只保留一個未完成任務
+CREATE UNIQUE INDEX idx_quant_jobs_active_fingerprint ON quant_jobs(fingerprint) WHERE status IN ('pending', 'running');
+
+COMMENT ON TABLE quant_jobs IS '量化分析背景任務與結果快取（蒙地卡羅、效率前緣、風險分析）';
+
 -- ============================================
 -- 第五層：系統管理表
 -- ============================================
@@ -603,6 +802,73 @@ INSERT INTO system_config (config_key, config_value, config_type, description) V
 ('ai_report_cache_days', '7', 'number', 'AI 報告快取天數')
 ON CONFLICT (config_key) DO NOTHING;
 
+-- 5.3 資料表筆數計數表（DatabaseWriter 寫入時累加，定期以 COUNT(*) 校正）
+CREATE TABLE IF NOT EXISTS table_row_counts (
+    table_name VARCHAR(100) PRIMARY KEY,
+    row_count BIGINT NOT NULL DEFAULT 0,
+    reconciled_at TIMESTAMPTZ,  -- 最近一次 COUNT(*) 校正時間
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+COMMENT ON TABLE table_row_counts IS '資料表精確筆數（儀表板統計用）';
+
+-- 5.4 外部 API 流量統計表（utils.api_telemetry 各程序定期累加增量）
+CREATE TABLE IF NOT EXISTS api_call_stats (
+    source VARCHAR(50) NOT NULL,  -- API_RATE_LIMITS 的鍵，例如 'yfinance'、'alpha_vantage'
+    stat_date DATE NOT NULL,
+    
+    requests INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    cache_hits INTEGER NOT NULL DEFAULT 0,
+    rate_limit_waits INTEGER NOT NULL DEFAULT 0,
+    
+    -- 延遲直方圖（秒；區間同 utils.metrics.BUCKETS，最後一格為超過上限）
+    latency_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    latency_buckets INTEGER[],
+    
+    last_success_at TIMESTAMPTZ,
+    last_error_at TIMESTAMPTZ,
+    last_error TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (source, stat_date)
+);
+
+COMMENT ON TABLE api_call_stats IS '外部 API 每日實際流量（延遲、錯誤、重試、快取命中；計算剩餘配額）';
+
+-- 5.5 n8n 排程任務執行紀錄（n8n_worker.py）
+CREATE TABLE IF NOT EXISTS n8n_job_runs (
+    run_id VARCHAR(40) PRIMARY KEY,
+    job VARCHAR(50) NOT NULL,        -- 'update-tw-market', 'update-us-market', 'update-news', 'daily-report'
+    params JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(10) NOT NULL,     -- queued / running / done / failed / skipped
+    trigger_source VARCHAR(50),      -- 觸發來源（n8n 工作流名稱等）
+    worker VARCHAR(100),             -- 主機:PID
+    result JSONB,
+    error TEXT,
+
+    queued_at TIMESTAMPTZ NOT NULL,
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX idx_n8n_job_runs_job ON n8n_job_runs(job, queued_at DESC);
+
+COMMENT ON TABLE n8n_job_runs IS 'n8n 排程任務的執行紀錄（觸發、排隊、執行時間與結果）';
+
+-- 5.6 價格缺漏補抓紀錄（data_loader/gap_detection.py）
+CREATE TABLE IF NOT EXISTS price_gaps (
+    market VARCHAR(5) NOT NULL,      -- 'TW' / 'US'
+    symbol VARCHAR(20) NOT NULL,
+    trade_date DATE NOT NULL,        -- 交易日曆上應有、價格表中缺少的交易日
+    attempts INTEGER NOT NULL DEFAULT 0,
+    first_detected TIMESTAMPTZ DEFAULT NOW(),
+    last_attempt TIMESTAMPTZ,
+    PRIMARY KEY (market, symbol, trade_date)
+);
+
+COMMENT ON TABLE price_gaps IS '補抓後仍缺少的交易日（停牌等）；達補抓上限後不再重複請求';
+
 -- ============================================
 -- 建立觸發器函數
 -- ============================================
@@ -627,6 +893,11 @@ CREATE TRIGGER update_us_stock_info_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_securities_master_updated_at
+    BEFORE UPDATE ON securities_master
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
 CREATE TRIGGER update_ai_reports_updated_at
     BEFORE UPDATE ON ai_reports
     FOR EACH ROW
@@ -687,12 +958,12 @@ DO $$
 BEGIN
     RAISE NOTICE '=================================';
     RAISE NOTICE '資料庫架構建立完成！';
-    RAISE NOTICE '總計 23 個核心表格';
+    RAISE NOTICE '總計 29 個核心表格';
     RAISE NOTICE '- 原始資料層：8 個表格';
-    RAISE NOTICE '- 預計算層：2 個表格';
-    RAISE NOTICE '- AI 快取層：2 個表格';
-    RAISE NOTICE '- 進階分析層：6 個表格';
-    RAISE NOTICE '- 系統管理層：2 個表格';
+    RAISE NOTICE '- 預計算層：4 個表格';
+    RAISE NOTICE '- AI 快取層：3 個表格';
+    RAISE NOTICE '- 進階分析層：7 個表格';
+    RAISE NOTICE '- 系統管理層：4 個表格';
     RAISE NOTICE '- 視圖：2 個';
     RAISE NOTICE '=================================';
 END $$;
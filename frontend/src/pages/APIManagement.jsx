@@ -39,13 +39,15 @@ export default function APIManagement() {
     }
 
     // 整體狀態統計
+    // uptime 為 null 表示統計期間內無流量，不列入平均
+    const withUptime = apiStatus.filter(api => api.uptime !== null && api.uptime !== undefined)
     const stats = {
         total: apiStatus.length,
         healthy: apiStatus.filter(api => api.status === 'healthy').length,
         warning: apiStatus.filter(api => api.status === 'warning').length,
         error: apiStatus.filter(api => api.status === 'error').length,
-        avgUptime: apiStatus.length > 0
-            ? (apiStatus.reduce((sum, api) => sum + api.uptime, 0) / apiStatus.length).toFixed(1)
+        avgUptime: withUptime.length > 0
+            ? (withUptime.reduce((sum, api) => sum + api.uptime, 0) / withUptime.length).toFixed(1)
             : 0
     }
 
@@ -209,12 +211,12 @@ function APICard({ api }) {
             <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
                 <MetricItem
                     label="可用率"
-                    value={`${api.uptime}%`}
+                    value={api.uptime === null ? 'N/A' : `${api.uptime}%`}
                     good={api.uptime >= 99}
                 />
                 <MetricItem
                     label="延遲"
-                    value={api.status === 'error' ? 'N/A' : `${api.latency}ms`}
+                    value={api.latency === null || api.status === 'error' ? 'N/A' : `${api.latency}ms`}
                     good={api.latency < 500}
                 />
                 <MetricItem
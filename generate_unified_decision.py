@@ -7,9 +7,17 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 import sys
-import json
 sys.path.append(os.path.dirname(__file__))
 
+from ai.job_queue import create_ai_client
+from ai.prompt_context import PromptContext
+from ai.report_cache import ReportCache
+from calculators.decision_scores import get_decision_scores, neutral_scores
+from config.settings import AI_CONFIG
+
+# 模板版本（納入快取指紋）
+TEMPLATE_VERSION = 'V8.1-s3'
+
 # 載入環境變數
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'))
 
@@ -22,283 +30,209 @@ def get_db():
         password=os.getenv('DB_PASSWORD', 'postgres')
     )
 
-def load_template_v8():
-    """載入V8.1模板"""
-    template_path = os.path.join(os.path.dirname(__file__), '統合究極版決策模板 V8.1 (全資產戰略家版).txt')
-    try:
-        with open(template_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except:
-        return None
-
-def generate_stock_decision_report(stock_code='2330', market='tw'):
-    """生成個股決策報告（基於V8.1模板）"""
-    from ai_clients.gemini_client import get_gemini_client
-    
+def generate_stock_decision_report(stock_code='2330', market='tw', client=None):
+    """生成個股決策報告（基於V8.1模板；client 為共用的模型客戶端，None 時自行建立）"""
     conn = get_db()
     cursor = conn.cursor()
     
-    # 獲取股票最新數據
-    table_name = 'tw_stock_prices' if market == 'tw' else 'us_stock_prices'
-    cursor.execute(f"""
-        SELECT close_price, high_price, low_price, volume, trade_date
-        FROM {table_name}
-        WHERE stock_code = %s
-        ORDER BY trade_date DESC LIMIT 20
-    """, (stock_code,))
-    
-    recent_data = cursor.fetchall()
-    
-    if not recent_data:
+    # 獲取股票最新數據（latest_quotes 已含52週高低點）
+    cursor.execute("""
+        SELECT close_price, volume, trade_date, high_52w, low_52w
+        FROM latest_quotes
+        WHERE market = %s AND symbol = %s
+    """, (market, stock_code))
+    quote = cursor.fetchone()
+    
+    if not quote:
+        # latest_quotes 尚未建立該標的時，回查價格表近一年資料
+        table_name, key_column = ('tw_stock_prices', 'stock_code') if market == 'tw' else ('us_stock_prices', 'symbol')
+        cursor.execute(f"""
+            SELECT close_price, volume, trade_date, MAX(high_price) OVER (), MIN(low_price) OVER ()
+            FROM {table_name}
+            WHERE {key_column} = %s AND trade_date > CURRENT_DATE - 365
+            ORDER BY trade_date DESC LIMIT 1
+        """, (stock_code,))
+        quote = cursor.fetchone()
+    
+    if not quote:
         print(f"❌ 找不到 {stock_code} 的數據")
         cursor.close()
         conn.close()
         return None, None
     
     # 組織數據
-    latest = recent_data[0]
     data = {
         'stock_code': stock_code,
         'market': market,
-        'price': float(latest[0]) if latest[0] else 0,
-        'high': float(latest[1]) if latest[1] else 0,
-        'low': float(latest[2]) if latest[2] else 0,
-        'volume': int(latest[3]) if latest[3] else 0,
-        'date': str(latest[4]) if latest[4] else '',
+        'price': float(quote[0]) if quote[0] else 0,
+        'volume': int(quote[1]) if quote[1] else 0,
+        'date': str(quote[2]) if quote[2] else '',
     }
+    high_52w = float(quote[3]) if quote[3] else data['price']
+    low_52w = float(quote[4]) if quote[4] else data['price']
     
-    # 計算52週高低點
-    prices = [float(row[0]) for row in recent_data if row[0]]
-    high_52w = max(prices) if prices else data['high']
-    low_52w = min(prices) if prices else data['low']
-    
-    client = get_gemini_client()
-    
-    # 載入V8.0模板
-    template_v8 = load_template_v8()
-    
-    # 第一步：生成六因子評分
-    score_prompt = f"""
-你是專業的投資分析師。請針對{stock_code}進行六因子評估，並以JSON格式輸出評分（0-100分）：
-
-當前數據：
-- 股票代碼: {data['stock_code']}
-- 最新價格: ${data['price']:.2f}
-- 52週高點: ${high_52w:.2f}
-- 52週低點: ${low_52w:.2f}
-- 日期: {data['date']}
-
-請評估以下六個因子並給出0-100的評分：
-1. Macro（宏觀環境）：全球經濟、產業趨勢
-2. Technical（技術面）：價格動能、趨勢強度
-3. Chips（籌碼面）：大戶持股、成交量
-4. Fundamental（基本面）：財務狀況、獲利能力
-5. Sentiment（市場情緒）：投資人樂觀/悲觀程度
-6. Valuation（估值水平）：是否高估或低估
-
-請以以下JSON格式回應（純JSON，不要markdown格式）：
-{{
-  "macro": 75,
-  "technical": 82,
-  "chips": 68,
-  "fundamental": 88,
-  "sentiment": 72,
-  "valuation": 65,
-  "overall_score": 75,
-  "recommendation": "買入",
-  "confidence": "高"
-}}
-"""
+    # 快取指紋：價格日期與52週高低點、TDCC 日期、模板版本、模型
+    cursor.execute("""
+        SELECT MAX(data_date) FROM shareholder_dispersion WHERE stock_code = %s
+    """, (stock_code,))
+    tdcc_date = cursor.fetchone()[0]
+    conn.commit()
+    cursor.close()
     
-    score_response = client.model.generate_content(score_prompt)
-    score_text = score_response.text.strip()
+    # 六維評分由本地評分引擎預先計算，模型只負責撰寫論述
+    six_factor_scores = get_decision_scores(conn, market, stock_code) or neutral_scores()
     
-    # 解析 JSON
-    if '```json' in score_text:
-        score_text = score_text.split('```json')[1].split('```')[0].strip()
-    elif '```' in score_text:
-        score_text = score_text.split('```')[1].split('```')[0].strip()
+    inputs = {
+        **data,
+        'high_52w': high_52w,
+        'low_52w': low_52w,
+        'tdcc_date': str(tdcc_date) if tdcc_date else None,
+        'six_factors': six_factor_scores,
+    }
     
+    client = client or create_ai_client()
+    cache = ReportCache(conn)
     try:
-        six_factor_scores = json.loads(score_text)
-    except:
-        six_factor_scores = {
-            'macro': 70, 'technical': 70, 'chips': 70,
-            'fundamental': 70, 'sentiment': 70, 'valuation': 70,
-            'overall_score': 70, 'recommendation': '持有', 'confidence': '中'
-        }
+        report, cache_hit = cache.get_or_generate(
+            'stock_decision',
+            inputs,
+            lambda: _generate_v81_report(client, market, data, high_52w, low_52w, six_factor_scores),
+            title=f'{stock_code} 統合究極版決策分析 V8.1 - {data["date"]}',
+            model=client.model_name,
+            template_version=TEMPLATE_VERSION,
+            security_type=market.upper(),
+            security_code=stock_code
+        )
+    finally:
+        conn.close()
     
-    # 第二步：基於V8.1模板生成完整報告
-    asset_type = '台股個股' if market == 'tw' else '美股個股'
-    report_prompt = f"""
-你是專業的全資產投資策略師。請基於「統合究極版決策模板 V8.1」為{stock_code}生成完整的投資決策報告。
+    report_id = report['id']
+    if cache_hit:
+        print(f"♻️ 沿用既有決策報告 (ID: {report_id})")
+    else:
+        print(f"✅ 個股決策報告已生成 (ID: {report_id})")
+        print(f"六因子評分: {report['market_data'].get('six_factors')}")
+    return report_id, report['report_content']
 
-### 當前資訊：
-- 股票代碼: {stock_code}
-- 資產類型: {asset_type}
-- 最新價格: ${data['price']:.2f}
-- 52週高點: ${high_52w:.2f}
-- 52週低點: ${low_52w:.2f}
-- 日期: {data['date']}
+_system_prompts = {}
 
-### 六因子評分（已完成）：
-- 宏觀環境: {six_factor_scores.get('macro', 70)}/100
-- 技術面: {six_factor_scores.get('technical', 70)}/100
-- 籌碼面: {six_factor_scores.get('chips', 70)}/100
-- 基本面: {six_factor_scores.get('fundamental', 70)}/100
-- 市場情緒: {six_factor_scores.get('sentiment', 70)}/100
-- 估值水平: {six_factor_scores.get('valuation', 70)}/100
-- 綜合評分: {six_factor_scores.get('overall_score', 70)}/100
 
-### 請按照以下結構生成報告（完整Markdown格式）：
+def build_v81_system_prompt(market):
+    """
+    V8.1 固定指示（報告骨架與寫作要求），依市場各一份
 
-# 📊 {stock_code} 統合究極版決策分析 V8.1
+    內容不含個股資料，作為 system prefix 跨標的共用
+    """
+    if market in _system_prompts:
+        return _system_prompts[market]
 
-**報告生成時間**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+    asset_type = '台股個股' if market == 'tw' else '美股個股'
+    prompt = f"""
+你是專業的全資產投資策略師，依「統合究極版決策模板 V8.1」為{asset_type}撰寫投資決策報告（完整 Markdown）。
+使用者會提供精簡資料，格式為「[區塊] 欄位=值 | 欄位=值」；缺少的欄位代表無資料，請勿捏造數字。
+[六維評分] 已由量化模型計算完成（0-100），請直接引用、不要重新評分；
+missing_dimensions 列出的維度缺乏資料（以中性 50 分計），請在報告中註明。
 
----
+報告依下列結構撰寫：
 
-## Part 0: 持倉現況與績效儀表板
+# 📊 <股票代碼> 統合究極版決策分析 V8.1
 
-| 項目 | 數值 |
-|:---|---:|
-| 當前市價 | ${data['price']:.2f} |
-| 究極版綜合評分 | {six_factor_scores.get('overall_score', 70)}/100 |
-| AI 投資評級 | {six_factor_scores.get('recommendation', '持有')} |
-| AI 模型信賴度 | {six_factor_scores.get('confidence', '中')} |
+**報告生成時間**: <資料中的 generated_at>
 
 ---
 
-## Part 1: 決策摘要與數據駕駛艙
+## Part 0: 持倉現況與績效儀表板
+表格列出：當前市價、究極版綜合評分、AI 投資評級、AI 模型信賴度
 
+## Part 1: 決策摘要與數據駕駛艙
 ### 六因子雷達圖數據
-- 🌍 宏觀環境: {six_factor_scores.get('macro', 70)}/100
-- 📈 技術面: {six_factor_scores.get('technical', 70)}/100
-- 💰 籌碼面: {six_factor_scores.get('chips', 70)}/100
-- 📊 基本面: {six_factor_scores.get('fundamental', 70)}/100
-- 😊 市場情緒: {six_factor_scores.get('sentiment', 70)}/100
-- 💵 估值水平: {six_factor_scores.get('valuation', 70)}/100
-
----
+- 🌍 宏觀環境 / 📈 技術面 / 💰 籌碼面 / 📊 基本面 / 😊 市場情緒 / 💵 估值水平（各 x/100）
 
 ## Part 2: 核心投資論證 (Bull vs. Bear)
-
 ### ✅ 正方論點 (The Bull Case)
-[請基於六因子評分，提出看多的核心論點與關鍵催化劑]
-
+看多的核心論點與關鍵催化劑
 ### ⚠️ 反方論點 (The Bear Case)
-[請提出看空的核心反對論點與主要風險點]
-
+看空的核心反對論點與主要風險點
 ### 🎯 綜合裁決
-[比較Bull/Bear論點，解釋當前哪方更具說服力]
-
----
+比較 Bull/Bear 論點，解釋當前哪方更具說服力
 
 ## Part 3: 市場宏觀背景
-
 ### {'台灣市場' if market == 'tw' else '美國市場'}宏觀環境
-[請分析當前宏觀經濟情況對該股的影響]
-
----
+當前宏觀經濟情況對該股的影響
 
 ## Part 4: 投資組合協同性
-
 ### 與核心持倉之關聯性
-[分析該股票與主要指數的相關性]
-
 ### 在投資組合中的角色定位
-**角色**: [核心 (Core) / 戰術衛星 (Satellite) / 收益基石 (Income)]
-
----
+**角色**: 核心 (Core) / 戰術衛星 (Satellite) / 收益基石 (Income)
 
 ## Part 5: 前瞻性分析
-
 ### 情境模擬
-
-| 情境 | 觸發條件 | 預估機率 | 目標價位 |
-|:---|:---|:---:|---:|
-| 🟢 樂觀情境 | [條件] | [機率]% | 上看 $[價格] |
-| 🟡 基礎情境 | [條件] | [機率]% | $[區間] |
-| 🔴 悲觀情境 | [條件] | [機率]% | 回測 $[價格] |
-
----
+表格欄位：情境（🟢 樂觀 / 🟡 基礎 / 🔴 悲觀）| 觸發條件 | 預估機率 | 目標價位
 
 ## Part 6: 戰術規劃與風險控制
-
 ### 當前技術面訊號
-[K線型態、移動平均線、成交量、技術指標分析]
-
+K線型態、移動平均線、成交量、技術指標分析
 ### 行動與出場策略
-
-| 價格區間 | 操作建議 |
-|:---|:---|
-| **強力買進** | $[區間] |
-| **適度買進** | $[區間] |
-| **觀望持有** | $[區間] |
-| **減碼賣出** | $[區間] |
-
+表格列出強力買進、適度買進、觀望持有、減碼賣出的價格區間
 ### 停損條件
-- **技術面停損**: [條件]
-- **基本面停損**: [條件]
-
----
+技術面停損與基本面停損
 
 ## {'Part 7: 台股個股深度剖析' if market == 'tw' else 'Part 9: 美股個股深度剖析'}
-
 ### 市場資金流向
-[分析三大法人、融資融券情況]
-
+三大法人、融資融券情況
 ### 企業深度剖析
-[量化多因子分析、大戶籌碼分析]
-
----
+量化多因子分析、大戶籌碼分析
 
 ## Part 14: 最終檢核
-
 ### 行為金融學檢核
 - ✅ 確認偏誤檢查
 - ✅ 近期偏誤檢查
-
 ### 今日操作要點總結
-**{six_factor_scores.get('recommendation', '持有')}** - [一句話總結操作策略]
+**<六維評分的 recommendation>** - 一句話總結操作策略
 
 ---
 
 *本報告基於統合究極版決策模板 V8.1 (全資產戰略家版) 生成*
-"""
-    
-    report_content = client.model.generate_content(report_prompt).text
-    
-    # 整合市場數據（包含六因子評分）
-    market_data_with_scores = {
-        **data,
-        'six_factors': six_factor_scores,
+""".strip()
+    _system_prompts[market] = prompt
+    return prompt
+
+
+def build_v81_context(data, high_52w, low_52w, scores):
+    """個股資料與六維評分的精簡上下文（依 token 預算裁切）"""
+    context = PromptContext(AI_CONFIG['prompt_budget_tokens'])
+    context.add('六維評分', scores, priority=5)
+    context.add('報價', {
+        'code': data['stock_code'],
+        'date': data['date'],
+        'price': data['price'],
+        'volume': data['volume'],
         'high_52w': high_52w,
         'low_52w': low_52w,
-        'generation_timestamp': datetime.now().isoformat()
+    }, priority=10)
+    context.add('meta', {'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}, priority=90)
+    text, _ = context.build()
+    return text
+
+
+def _generate_v81_report(client, market, data, high_52w, low_52w, scores):
+    """依預先計算的六維評分生成 V8.1 報告（單次呼叫）"""
+    result = client.generate_with_usage(
+        build_v81_context(data, high_52w, low_52w, scores),
+        temperature=0.6,
+        system_instruction=build_v81_system_prompt(market)
+    )
+    if not result['content']:
+        raise ValueError(f"{data['stock_code']} 模型回傳空內容")
+
+    return {
+        'content': result['content'],
+        'prompt_tokens': result.get('prompt_tokens'),
+        'completion_tokens': result.get('completion_tokens'),
+        'market_data': {
+            'generation_timestamp': datetime.now().isoformat()
+        }
     }
-    
-    # 儲存到資料庫
-    cursor.execute("""
-        INSERT INTO ai_reports (report_type, report_title, report_content, market_data, generated_by)
-        VALUES (%s, %s, %s, %s::jsonb, %s)
-        RETURNING id
-    """, (
-        'stock_decision',  # 新的報告類型
-        f'{stock_code} 統合究極版決策分析 V8.1 - {data["date"]}',
-        report_content,
-        json.dumps(market_data_with_scores),
-        'gemini-2.5-flash'
-    ))
-    
-    report_id = cursor.fetchone()[0]
-    conn.commit()
-    cursor.close()
-    conn.close()
-    
-    print(f"✅ 個股決策報告已生成 (ID: {report_id})")
-    print(f"六因子評分: {six_factor_scores}")
-    return report_id, report_content
 
 if __name__ == '__main__':
     print("="*60)
@@ -0,0 +1,542 @@
+"""
+n8n 排程任務常駐執行器
+
+n8n 改以 HTTP 觸發，不再每次啟動新的 Python 程序：
+- 資料庫連接池、API 客戶端（含記憶體快取）與模型客戶端在程序內共用，啟動時預先建立
+- 相同任務與參數已在排隊或執行中時，觸發請求直接回傳該次執行（不重複執行）
+- 最多同時執行 concurrency 個任務，同一任務同時只執行一個，其餘依序排隊；
+  任務本身另以 PostgreSQL advisory lock 與命令列執行互斥
+- 執行紀錄保留於記憶體並寫入 n8n_job_runs（資料庫無法連線時以記憶體紀錄回應）
+
+啟動方式：
+    python n8n_worker.py [--host 0.0.0.0] [--port 5100] [--concurrency 2]
+
+n8n HTTP Request 節點：
+    POST /api/jobs/update-tw-market?wait=3600        觸發並等待完成（逾時回傳 202 與 run_id）
+    POST /api/jobs/daily-report  {"market": "US"}    帶參數觸發
+    GET  /api/jobs                                   已註冊任務與目前排隊 / 執行數
+    GET  /api/jobs/runs?job=daily-report&limit=20    執行紀錄
+    GET  /api/jobs/runs/<run_id>                     單次執行狀態與結果
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Blueprint, Flask, current_app, jsonify, request
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).parent))
+from config.settings import N8N_WORKER_CONFIG
+from utils.lazy_import import lazy_singleton
+
+FINISHED_STATUSES = ('done', 'failed', 'skipped')
+
+_RUN_COLUMNS = """
+    run_id, job, params, status, trigger_source, worker, result, error,
+    queued_at, started_at, finished_at
+"""
+
+
+# ========== 共用資源 ==========
+
+class WorkerResources:
+    """程序內共用的連接池與客戶端（第一次使用時建立，失敗時下次重試）"""
+
+    def __init__(self):
+        from data_loader import DatabaseConnector
+        from api_clients import NewsClient, TWStockClient, USStockClient
+        from ai.job_queue import create_ai_client
+
+        self.db = lazy_singleton(DatabaseConnector)
+        self.tw_client = lazy_singleton(TWStockClient)
+        self.us_client = lazy_singleton(USStockClient)
+        self.news_client = lazy_singleton(NewsClient)
+        self.ai_client = lazy_singleton(create_ai_client)
+
+    def warm_up(self):
+        """預先建立連接池、客戶端與新聞表（個別失敗只記錄，執行任務時再重試）"""
+        from scripts.n8n.update_news_data import ensure_news_table
+
+        steps = [
+            ('資料庫連接池', self.db),
+            ('新聞表', lambda: ensure_news_table(self.db())),
+            ('台股客戶端', self.tw_client),
+            ('美股客戶端', self.us_client),
+            ('新聞客戶端', self.news_client),
+            ('模型客戶端', self.ai_client),
+        ]
+        for name, step in steps:
+            try:
+                step()
+            except Exception as e:
+                logger.warning(f"預先建立{name}失敗（執行任務時重試）：{e}")
+
+
+# ========== 任務 ==========
+
+def _market_param(params: Dict[str, Any]) -> Dict[str, Any]:
+    market = str(params.get('market', 'TW')).upper()
+    if market not in ('TW', 'US'):
+        raise ValueError('market 必須為 TW 或 US')
+    return {'market': market}
+
+
+def _no_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    if params:
+        raise ValueError(f"此任務不接受參數：{', '.join(sorted(params))}")
+    return {}
+
+
+def _update_tw_market(resources: WorkerResources, params: Dict[str, Any]) -> Dict:
+    from scripts.n8n.update_tw_market_data import update_tw_market_data
+    return update_tw_market_data(db=resources.db(), client=resources.tw_client())
+
+
+def _update_us_market(resources: WorkerResources, params: Dict[str, Any]) -> Dict:
+    from scripts.n8n.update_us_market_data import update_us_market_data
+    return update_us_market_data(db=resources.db(), client=resources.us_client())
+
+
+def _update_news(resources: WorkerResources, params: Dict[str, Any]) -> Dict:
+    from scripts.n8n.update_news_data import update_news_data
+    return update_news_data(db=resources.db(), client=resources.news_client())
+
+
+def _daily_report(resources: WorkerResources, params: Dict[str, Any]) -> Dict:
+    from scripts.n8n.trigger_daily_report import trigger_daily_report
+    return trigger_daily_report(params['market'], db=resources.db(), ai_client=resources.ai_client())
+
+
+def _update_securities_master(resources: WorkerResources, params: Dict[str, Any]) -> Dict:
+    from scripts.n8n.update_securities_master import update_securities_master
+    return update_securities_master(db=resources.db(), client=resources.tw_client())
+
+
+def _refetch_price_gaps(resources: WorkerResources, params: Dict[str, Any]) -> Dict:
+    from scripts.n8n.refetch_price_gaps import refetch_price_gaps
+    client = resources.tw_client() if params['market'] == 'TW' else resources.us_client()
+    return refetch_price_gaps(params['market'], db=resources.db(), client=client)
+
+
+def _reconcile_table_stats(resources: WorkerResources, params: Dict[str, Any]) -> Dict:
+    from scripts.n8n.reconcile_table_stats import reconcile_table_stats
+    return reconcile_table_stats(db=resources.db())
+
+
+# 任務名稱 → run(resources, params)、參數正規化、說明
+JOBS = {
+    'update-tw-market': {'run': _update_tw_market, 'params': _no_params, 'description': '台股盤後數據更新'},
+    'update-us-market': {'run': _update_us_market, 'params': _no_params, 'description': '美股收盤數據更新'},
+    'update-news': {'run': _update_news, 'params': _no_params, 'description': '金融新聞更新'},
+    'daily-report': {'run': _daily_report, 'params': _market_param, 'description': '每日 AI 決策報告（market: TW / US）'},
+    'update-securities-master': {'run': _update_securities_master, 'params': _no_params, 'description': '證券主檔更新'},
+    'refetch-price-gaps': {'run': _refetch_price_gaps, 'params': _market_param, 'description': '價格缺漏偵測與補抓（market: TW / US）'},
+    'reconcile-table-stats': {'run': _reconcile_table_stats, 'params': _no_params, 'description': '資料表筆數校正（COUNT(*)）'},
+}
+
+
+# ========== 執行紀錄 ==========
+
+class RunStore:
+    """n8n_job_runs 資料表"""
+
+    def __init__(self, db: Callable):
+        """
+        Args:
+            db: 回傳 DatabaseConnector 的函式
+        """
+        self.db = db
+
+    def save(self, run: Dict[str, Any]):
+        self.db().execute_query("""
+            INSERT INTO n8n_job_runs (
+                run_id, job, params, status, trigger_source, worker, result, error,
+                queued_at, started_at, finished_at
+            )
+            VALUES (%(run_id)s, %(job)s, %(params)s, %(status)s, %(trigger_source)s, %(worker)s,
+                    %(result)s, %(error)s, %(queued_at)s, %(started_at)s, %(finished_at)s)
+            ON CONFLICT (run_id) DO UPDATE SET
+                status = EXCLUDED.status, result = EXCLUDED.result, error = EXCLUDED.error,
+                started_at = EXCLUDED.started_at, finished_at = EXCLUDED.finished_at
+        """, {
+            **run,
+            'params': json.dumps(run['params'], ensure_ascii=False),
+            'result': json.dumps(run['result'], ensure_ascii=False, default=str) if run['result'] is not None else None,
+        })
+
+    def mark_interrupted(self, worker_prefix: str, current_worker: str) -> int:
+        """同一主機先前程序留下的未完成紀錄標記為 failed（執行器重新啟動）"""
+        rows = self.db().execute_query("""
+            UPDATE n8n_job_runs
+            SET status = 'failed', error = '執行器重新啟動，任務中斷', finished_at = NOW()
+            WHERE status IN ('queued', 'running') AND worker LIKE %s AND worker <> %s
+            RETURNING run_id
+        """, (f'{worker_prefix}:%', current_worker))
+        return len(rows)
+
+    def recent(self, job: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        return self.db().execute_query(f"""
+            SELECT {_RUN_COLUMNS}
+            FROM n8n_job_runs
+            WHERE %s::text IS NULL OR job = %s
+            ORDER BY queued_at DESC
+            LIMIT %s
+        """, (job, job, limit))
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        rows = self.db().execute_query(f"SELECT {_RUN_COLUMNS} FROM n8n_job_runs WHERE run_id = %s", (run_id,))
+        return rows[0] if rows else None
+
+
+# ========== 執行器 ==========
+
+def dedup_key(job: str, params: Dict[str, Any]) -> str:
+    """任務與標準化參數相同即視為同一次執行"""
+    return f"{job}:{json.dumps(params, sort_keys=True, separators=(',', ':'))}"
+
+
+class JobRunner:
+    """常駐任務執行器（排隊、去重、並行上限、執行紀錄）"""
+
+    def __init__(
+        self,
+        jobs: Optional[Dict[str, Dict]] = None,
+        resources: Optional[WorkerResources] = None,
+        concurrency: Optional[int] = None,
+        history_size: Optional[int] = None,
+        store: Optional[RunStore] = None
+    ):
+        """
+        Args:
+            jobs: 任務註冊表（預設 JOBS）
+            resources: 傳給任務的共用資源
+            concurrency: 同時執行的任務數
+            history_size: 記憶體中保留的已結束紀錄數
+            store: 執行紀錄資料表（None 時只保留於記憶體）
+        """
+        self.jobs = jobs if jobs is not None else JOBS
+        self.resources = resources
+        self.concurrency = concurrency or N8N_WORKER_CONFIG['concurrency']
+        self.history_size = history_size or N8N_WORKER_CONFIG['history_size']
+        self.store = store
+        self.hostname = socket.gethostname()
+        self.worker_id = f"{self.hostname}:{os.getpid()}"
+        self.started_at = datetime.now()
+
+        self._cond = threading.Condition()
+        self._runs: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._pending: deque = deque()
+        self._running = Counter()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='n8n-job')
+        # 紀錄依狀態變化順序寫入資料庫（單一執行緒，資料庫緩慢時不阻塞任務）
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='n8n-history')
+
+    # ---------- 觸發 ----------
+
+    def normalize(self, job: str, params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Raises:
+            KeyError: 未註冊的任務
+            ValueError: 參數不合法
+        """
+        if job not in self.jobs:
+            raise KeyError(job)
+        if params is not None and not isinstance(params, dict):
+            raise ValueError('參數必須為 JSON 物件')
+        return self.jobs[job]['params'](params or {})
+
+    def submit(
+        self, job: str, params: Optional[Dict[str, Any]] = None, source: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        排入一次執行；相同任務與參數已在排隊或執行中時回傳該次執行
+
+        Returns:
+            (執行紀錄快照, 是否新建立)
+
+        Raises:
+            KeyError / ValueError: 見 normalize
+            RuntimeError: 執行器已關閉
+        """
+        params = self.normalize(job, params)
+        key = dedup_key(job, params)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('執行器已關閉')
+            existing = self._active.get(key)
+            if existing is not None:
+                logger.info(f"任務 {job} 已在{'執行' if existing['status'] == 'running' else '排隊'}中，沿用 {existing['run_id']}")
+                return dict(existing), False
+
+            run = {
+                'run_id': f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}",
+                'job': job, 'params': params, 'status': 'queued',
+                'trigger_source': source, 'worker': self.worker_id,
+                'result': None, 'error': None,
+                'queued_at': datetime.now(), 'started_at': None, 'finished_at': None,
+            }
+            self._runs[run['run_id']] = run
+            self._active[key] = run
+            self._pending.append(run)
+            self._persist_locked(run)
+            self._dispatch_locked()
+            logger.info(f"任務 {job} 已排入（{run['run_id']}，來源：{source or '-'}）")
+            return dict(run), True
+
+    def _dispatch_locked(self):
+        """啟動可執行的排隊任務（總數不超過 concurrency，同一任務一次一個）"""
+        for run in list(self._pending):
+            if sum(self._running.values()) >= self.concurrency:
+                break
+            if self._running[run['job']]:
+                continue
+            self._pending.remove(run)
+            self._running[run['job']] += 1
+            run['status'] = 'running'
+            run['started_at'] = datetime.now()
+            self._persist_locked(run)
+            self._executor.submit(self._execute, run)
+
+    def _execute(self, run: Dict[str, Any]):
+        started = time.perf_counter()
+        status, result, error = 'done', None, None
+        try:
+            result = self.jobs[run['job']]['run'](self.resources, run['params'])
+            if isinstance(result, dict) and result.get('skipped') is True:
+                status = 'skipped'
+        except Exception as e:
+            status, error = 'failed', f'{type(e).__name__}: {e}'
+            logger.exception(f"任務 {run['job']} 執行失敗（{run['run_id']}）")
+
+        with self._cond:
+            run.update(status=status, result=result, error=error, finished_at=datetime.now())
+            self._running[run['job']] -= 1
+            self._active.pop(dedup_key(run['job'], run['params']), None)
+            self._persist_locked(run)
+            self._trim_locked()
+            self._dispatch_locked()
+            self._cond.notify_all()
+        logger.info(f"任務 {run['job']} {status}（{run['run_id']}，{time.perf_counter() - started:.1f} 秒）")
+
+    def _trim_locked(self):
+        finished = [run_id for run_id, run in self._runs.items() if run['status'] in FINISHED_STATUSES]
+        for run_id in finished[:max(len(finished) - self.history_size, 0)]:
+            del self._runs[run_id]
+
+    def _persist_locked(self, run: Dict[str, Any]):
+        if self.store is not None:
+            self._writer.submit(self._save, dict(run))
+
+    def _save(self, snapshot: Dict[str, Any]):
+        try:
+            self.store.save(snapshot)
+        except Exception as e:
+            logger.warning(f"寫入執行紀錄失敗（{snapshot['run_id']}）：{e}")
+
+    # ---------- 查詢 ----------
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """本程序的執行紀錄；不在記憶體時查資料表"""
+        with self._cond:
+            run = self._runs.get(run_id)
+            if run is not None:
+                return dict(run)
+        if self.store is not None:
+            try:
+                return self.store.get(run_id)
+            except Exception as e:
+                logger.warning(f"讀取執行紀錄失敗：{e}")
+        return None
+
+    def wait(self, run_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """等待執行結束（逾時時回傳目前狀態）"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: run_id not in self._runs or self._runs[run_id]['status'] in FINISHED_STATUSES,
+                timeout=timeout
+            )
+        return self.get(run_id)
+
+    def history(self, job: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        最近的執行紀錄（優先讀取資料表，含其他程序與重新啟動前的紀錄）
+
+        Returns:
+            (紀錄列表, 來源 'database' / 'memory')
+        """
+        if self.store is not None:
+            try:
+                return self.store.recent(job, limit), 'database'
+            except Exception as e:
+                logger.warning(f"讀取執行紀錄失敗，改用本程序紀錄：{e}")
+        with self._cond:
+            runs = [dict(run) for run in reversed(self._runs.values()) if job is None or run['job'] == job]
+        return runs[:limit], 'memory'
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = Counter(run['job'] for run in self._pending)
+            return {
+                'worker': self.worker_id,
+                'started_at': self.started_at,
+                'concurrency': self.concurrency,
+                'jobs': {
+                    name: {
+                        'description': spec['description'],
+                        'running': self._running[name],
+                        'queued': queued[name],
+                    }
+                    for name, spec in self.jobs.items()
+                },
+            }
+
+    # ---------- 生命週期 ----------
+
+    def recover(self):
+        """將本主機先前程序中斷的紀錄標記為失敗"""
+        if self.store is None:
+            return
+        try:
+            interrupted = self.store.mark_interrupted(self.hostname, self.worker_id)
+            if interrupted:
+                logger.warning(f"標記 {interrupted} 筆中斷的執行紀錄")
+        except Exception as e:
+            logger.warning(f"檢查中斷的執行紀錄失敗：{e}")
+
+    def shutdown(self, wait: bool = True):
+        """停止接受新任務；排隊中的任務標記為失敗，執行中的任務等待完成"""
+        with self._cond:
+            self._closed = True
+            for run in self._pending:
+                run.update(status='failed', error='執行器關閉', finished_at=datetime.now())
+                self._active.pop(dedup_key(run['job'], run['params']), None)
+                self._persist_locked(run)
+            self._pending.clear()
+            self._cond.notify_all()
+        self._executor.shutdown(wait=wait)
+        self._writer.shutdown(wait=wait)
+
+
+# ========== HTTP 介面 ==========
+
+n8n_worker_bp = Blueprint('n8n_worker', __name__)
+
+
+def _runner() -> JobRunner:
+    return current_app.config['JOB_RUNNER']
+
+
+@n8n_worker_bp.before_request
+def check_token():
+    token = current_app.config.get('WORKER_TOKEN')
+    if token and request.headers.get('X-Worker-Token') != token and request.endpoint != 'n8n_worker.health':
+        return jsonify({'error': 'Unauthorized'}), 401
+
+
+@n8n_worker_bp.route('/api/health', methods=['GET'])
+def health():
+    runner = _runner()
+    return jsonify({'status': 'ok', 'worker': runner.worker_id, 'started_at': runner.started_at.isoformat()})
+
+
+@n8n_worker_bp.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify(_runner().status())
+
+
+@n8n_worker_bp.route('/api/jobs/<job>', methods=['POST'])
+def trigger_job(job):
+    """
+    觸發任務
+
+    body: 任務參數（JSON 物件，可省略）
+    ?wait=秒數：等待執行結束；完成回傳 200、失敗回傳 500（n8n 節點會標示錯誤）、逾時回傳 202
+    ?source= 或 X-Trigger-Source：觸發來源（記錄用）
+    """
+    runner = _runner()
+    params = request.get_json(force=True, silent=True) if request.data else None
+    if request.data and params is None:
+        return jsonify({'error': 'Invalid JSON body'}), 400
+    source = request.args.get('source') or request.headers.get('X-Trigger-Source')
+    try:
+        wait = min(float(request.args.get('wait', 0)), N8N_WORKER_CONFIG['max_wait_seconds'])
+        run, created = runner.submit(job, params, source)
+    except KeyError:
+        return jsonify({'error': f'Unknown job: {job}', 'jobs': list(runner.jobs)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
+
+    if wait > 0:
+        run = runner.wait(run['run_id'], wait) or run
+    code = 202
+    if run['status'] in ('done', 'skipped'):
+        code = 200
+    elif run['status'] == 'failed':
+        code = 500
+    return jsonify({'run': run, 'deduplicated': not created}), code
+
+
+@n8n_worker_bp.route('/api/jobs/runs', methods=['GET'])
+def list_runs():
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    runs, source = _runner().history(request.args.get('job'), limit)
+    return jsonify({'runs': runs, 'source': source})
+
+
+@n8n_worker_bp.route('/api/jobs/runs/<run_id>', methods=['GET'])
+def get_run(run_id):
+    run = _runner().get(run_id)
+    if run is None:
+        return jsonify({'error': 'Run not found'}), 404
+    return jsonify(run)
+
+
+def create_app(runner: JobRunner, token: Optional[str] = None) -> Flask:
+    app = Flask(__name__)
+    app.config['JOB_RUNNER'] = runner
+    app.config['WORKER_TOKEN'] = N8N_WORKER_CONFIG['token'] if token is None else token
+    app.register_blueprint(n8n_worker_bp)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='n8n 排程任務常駐執行器')
+    parser.add_argument('--host', default=N8N_WORKER_CONFIG['host'])
+    parser.add_argument('--port', type=int, default=N8N_WORKER_CONFIG['port'])
+    parser.add_argument('--concurrency', type=int, help='同時執行的任務數（預設 N8N_WORKER_CONCURRENCY）')
+    parser.add_argument('--no-warmup', action='store_true', help='不預先建立連接池與客戶端')
+    args = parser.parse_args()
+
+    resources = WorkerResources()
+    store = RunStore(resources.db) if N8N_WORKER_CONFIG['persist_history'] else None
+    runner = JobRunner(resources=resources, concurrency=args.concurrency, store=store)
+    if not args.no_warmup:
+        resources.warm_up()
+    runner.recover()
+
+    app = create_app(runner)
+    if not app.config['WORKER_TOKEN'] and args.host not in ('127.0.0.1', 'localhost'):
+        logger.warning("⚠️ 未設定 N8N_WORKER_TOKEN 且對外監聽，任何人皆可觸發任務")
+    logger.info(f"🚀 n8n 任務執行器啟動：http://{args.host}:{args.port}（任務：{', '.join(runner.jobs)}）")
+    try:
+        app.run(host=args.host, port=args.port, threaded=True)
+    finally:
+        runner.shutdown()
+
+
+if __name__ == '__main__':
+    main()
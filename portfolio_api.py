@@ -6,7 +6,7 @@ def get_portfolio():
         conn = get_db()
         cursor = conn.cursor(cursor_factory=extras.RealDictCursor)
         
-        # 獲取持倉數據
+        # 獲取持倉數據（現價讀 latest_quotes，尚未建立的標的才回查價格表）
         cursor.execute("""
             SELECT 
                 up.id,
@@ -16,7 +16,7 @@ def get_portfolio():
                 up.avg_cost,
                 up.purchase_date,
                 up.notes,
-                CASE 
+                COALESCE(lq.close_price, CASE 
                     WHEN up.market = 'tw' THEN (
                         SELECT close_price 
                         FROM tw_stock_prices 
@@ -27,12 +27,14 @@ def get_portfolio():
                     WHEN up.market = 'us' THEN (
                         SELECT close_price 
                         FROM us_stock_prices 
-                        WHERE stock_code = up.stock_code 
+                        WHERE symbol = up.stock_code 
                         ORDER BY trade_date DESC 
                         LIMIT 1
                     )
-                END as current_price
+                END) as current_price
             FROM user_portfolios up
+            LEFT JOIN latest_quotes lq
+                ON lq.market = up.market AND lq.symbol = up.stock_code
             WHERE up.user_id = 1
             ORDER BY up.created_at DESC
         """)
@@ -1,6 +1,6 @@
 """
 階段3：計算技術指標
-為所有股票計算MA, RSI, MACD等指標
+為所有股票計算MA, RSI, MACD等指標，以及 Wilder RSI/ATR、DMI/ADX、OBV、VWAP、CCI、隨機RSI、一目均衡表
 """
 import sys
 from pathlib import Path
@@ -9,27 +9,23 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 import pandas as pd
 import numpy as np
 from data_loader import DatabaseConnector
+from calculators import indicator_kernels as kernels
 from loguru import logger
 
-def calculate_ma(prices, period):
-    """計算移動平均"""
-    return prices.rolling(window=period).mean()
+INDICATOR_COLUMNS = [
+    'ma_5', 'ma_20', 'ma_60', 'rsi_14', 'macd', 'macd_signal',
+    'rsi_14_wilder', 'atr_14_wilder', 'plus_di_14', 'minus_di_14', 'adx_14',
+    'obv', 'vwap_20', 'cci_20', 'stoch_rsi_k', 'stoch_rsi_d',
+    'ichimoku_tenkan', 'ichimoku_kijun', 'ichimoku_senkou_a', 'ichimoku_senkou_b',
+]
 
-def calculate_rsi(prices, period=14):
-    """計算RSI"""
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def calculate_macd(prices):
-    """計算MACD"""
-    exp1 = prices.ewm(span=12, adjust=False).mean()
-    exp2 = prices.ewm(span=26, adjust=False).mean()
-    macd = exp1 - exp2
-    signal = macd.ewm(span=9, adjust=False).mean()
-    return macd, signal
+UPSERT_SQL = f"""
+    INSERT INTO technical_indicators 
+    (stock_code, calculation_date, {', '.join(INDICATOR_COLUMNS)})
+    VALUES (%s, %s, {', '.join(['%s'] * len(INDICATOR_COLUMNS))})
+    ON CONFLICT (stock_code, calculation_date) DO UPDATE
+    SET {', '.join(f'{col} = EXCLUDED.{col}' for col in INDICATOR_COLUMNS)}
+"""
 
 db = DatabaseConnector()
 
@@ -54,7 +50,7 @@ try:
         try:
             # 獲取價格數據
             prices_data = db.execute_query("""
-                SELECT trade_date, close_price 
+                SELECT trade_date, high_price, low_price, close_price, volume
                 FROM tw_stock_prices 
                 WHERE stock_code = %s 
                 ORDER BY trade_date
@@ -64,36 +60,25 @@ try:
                 continue
             
             df = pd.DataFrame(prices_data)
-            df['close_price'] = df['close_price'].astype(float)
+            high, low, closes, volume = (
+                df[col].astype(float).to_numpy()
+                for col in ('high_price', 'low_price', 'close_price', 'volume')
+            )
+            
+            # 一次計算基本與擴充指標（共用同一份價格序列）
+            indicators = kernels.calculate_all(closes, high, low)
+            indicators.update(kernels.calculate_extended(high, low, closes, volume))
             
-            # 計算指標
-            df['ma5'] = calculate_ma(df['close_price'], 5)
-            df['ma20'] = calculate_ma(df['close_price'], 20)
-            df['ma60'] = calculate_ma(df['close_price'], 60)
-            df['rsi'] = calculate_rsi(df['close_price'])
-            df['macd'], df['signal'] = calculate_macd(df['close_price'])
+            valid = ~np.isnan(indicators['ma_5'])  # 只寫入有效數據
+            columns = [indicators[name][valid] for name in INDICATOR_COLUMNS]
+            rows = [
+                (code, trade_date) + tuple(None if v != v else float(v) for v in values)
+                for trade_date, *values in zip(df['trade_date'][valid], *columns)
+            ]
             
-            # 寫入資料庫
-            for _, row in df.iterrows():
-                if pd.notna(row['ma5']):  # 只寫入有效數據
-                    db.execute_query("""
-                        INSERT INTO technical_indicators 
-                        (stock_code, calculation_date, ma_5, ma_20, ma_60, rsi_14, macd, macd_signal)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (stock_code, calculation_date) DO UPDATE
-                        SET ma_5 = EXCLUDED.ma_5,
-                            ma_20 = EXCLUDED.ma_20,
-                            ma_60 = EXCLUDED.ma_60,
-                            rsi_14 = EXCLUDED.rsi_14,
-                            macd = EXCLUDED.macd,
-                            macd_signal = EXCLUDED.macd_signal
-                    """, (code, row['trade_date'],
-                          float(row['ma5']) if pd.notna(row['ma5']) else None,
-                          float(row['ma20']) if pd.notna(row['ma20']) else None,
-                          float(row['ma60']) if pd.notna(row['ma60']) else None,
-                          float(row['rsi']) if pd.notna(row['rsi']) else None,
-                          float(row['macd']) if pd.notna(row['macd']) else None,
-                          float(row['signal']) if pd.notna(row['signal']) else None))
+            # 寫入資料庫（批次）
+            db.ensure_partitions('technical_indicators', [row[1] for row in rows])
+            db.execute_batch(UPSERT_SQL, rows)
         
         except Exception as e:
             logger.error(f"{code}: {str(e)[:50]}")
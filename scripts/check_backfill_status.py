@@ -1,9 +1,12 @@
 import sys
+from datetime import timedelta
 from pathlib import Path
 import psycopg2
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from config.settings import DATABASE_CONFIG
+from config.settings import DATABASE_CONFIG, INCREMENTAL_SYNC_CONFIG
+from data_loader.gap_detection import detect_gaps, summarize_gaps
+from data_loader.trading_calendar import get_calendar
 
 def get_backfill_status():
     """查詢當前資料庫回溯狀態"""
@@ -64,6 +67,19 @@ def get_backfill_status():
             print(f"  日期範圍: {row[3]} ~ {row[4]}")
             print(f"  更新時間: {row[6]}")
         
+        print()
+        print("=" * 80)
+        print(f"價格缺漏（近 {INCREMENTAL_SYNC_CONFIG['gap_lookback_days']} 天，依交易日曆）")
+        print("=" * 80)
+        
+        for market in ('TW', 'US'):
+            until = get_calendar(market).last_complete_session()
+            since = until - timedelta(days=INCREMENTAL_SYNC_CONFIG['gap_lookback_days'])
+            summary = summarize_gaps(detect_gaps(cur, market, since, until))
+            print(f"\n{market}: {len(summary)} 檔缺漏，共 {int(summary['missing'].sum())} 個交易日")
+            for row in summary.head(10).itertuples(index=False):
+                print(f"  {row.symbol:10} | 缺 {row.missing:>4} 天 | {row.first_missing} ~ {row.last_missing}")
+        
         conn.close()
         
     except Exception as e:
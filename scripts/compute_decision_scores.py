@@ -0,0 +1,41 @@
+"""
+決策六維評分每日批次
+
+用法（建議於每日收盤資料、技術指標、法人資料更新後執行）：
+    python scripts/compute_decision_scores.py
+    python scripts/compute_decision_scores.py --date 2025-01-02
+    python scripts/compute_decision_scores.py 2330 AAPL
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psycopg2
+from loguru import logger
+
+from calculators.decision_scores import DecisionScoreEngine
+from config.settings import DATABASE_CONFIG
+
+
+def main():
+    parser = argparse.ArgumentParser(description='決策六維評分批次計算')
+    parser.add_argument('codes', nargs='*', help='限定股票代碼（預設全部）')
+    parser.add_argument('--date', type=date.fromisoformat, help='評分日期（預設今日）')
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        DecisionScoreEngine(conn).run(args.date, args.codes or None)
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"決策六維評分失敗：{e}")
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+啟動時間稽核：以 `python -X importtime` 量測 API 伺服器與 n8n 排程腳本的 import 成本
+
+    python scripts/import_audit.py                       # 所有入口的總 import 時間與禁止提早載入的模組
+    python scripts/import_audit.py api_server_v5 -n 20    # 單一入口，列出累計時間最高的 20 個模組
+
+每個入口在獨立的子程序中量測（冷啟動，不受目前程序已載入的模組影響）。
+tests/test_import_time.py 以相同的量測設有啟動時間上限。
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# 入口名稱 → 子程序執行的程式碼（n8n 腳本以 runpy 載入，不執行 __main__ 區塊）
+ENTRY_POINTS = {
+    'api_server_v5': 'import api_server_v5',
+    'asgi_server': 'import asgi_server',
+    **{
+        f'n8n/{path.stem}': f"import runpy; runpy.run_path({str(path)!r}, run_name='import_audit')"
+        for path in sorted((PROJECT_ROOT / 'scripts' / 'n8n').glob('*.py'))
+    },
+}
+
+# 啟動時不應載入、只在第一次使用時才 import 的重量級模組
+DEFERRED_MODULES = ['google.generativeai', 'scipy.optimize', 'yfinance', 'twstock', 'IPython']
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """解析 -X importtime 輸出為 [{'module', 'self_us', 'cumulative_us', 'depth'}]"""
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            entries.append({
+                'module': match.group(4),
+                'self_us': int(match.group(1)),
+                'cumulative_us': int(match.group(2)),
+                'depth': len(match.group(3)) // 2,
+            })
+    return entries
+
+
+def measure(code: str, timeout: float = 120) -> Dict:
+    """
+    在子程序執行 code 並回傳 import 統計
+
+    total_ms 為所有頂層 import 的累計時間總和（不含直譯器本身的啟動）
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=timeout
+    )
+    entries = parse_importtime(proc.stderr)
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not _LINE.match(line)]
+        raise RuntimeError(f'執行失敗（{code}）：\n' + '\n'.join(errors[-20:]))
+    loaded = {entry['module'] for entry in entries}
+    return {
+        'total_ms': sum(e['cumulative_us'] for e in entries if e['depth'] == 0) / 1000,
+        'modules': len(entries),
+        'deferred_loaded': [name for name in DEFERRED_MODULES if name in loaded],
+        'entries': entries,
+    }
+
+
+def top_imports(entries: List[Dict], limit: int = 15) -> List[Dict]:
+    """累計時間最高的模組"""
+    return sorted(entries, key=lambda e: e['cumulative_us'], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API 伺服器與 n8n 腳本的 import 時間稽核')
+    parser.add_argument('targets', nargs='*', help=f"入口名稱（預設全部：{', '.join(ENTRY_POINTS)}）")
+    parser.add_argument('-n', '--top', type=int, default=10, help='列出累計時間最高的模組數')
+    args = parser.parse_args()
+
+    unknown = set(args.targets) - set(ENTRY_POINTS)
+    if unknown:
+        parser.error(f"未知的入口：{', '.join(sorted(unknown))}")
+
+    failed = False
+    for name in args.targets or ENTRY_POINTS:
+        try:
+            result = measure(ENTRY_POINTS[name])
+        except RuntimeError as e:
+            failed = True
+            print(f"\n{name}: ❌ {e}")
+            continue
+        print(f"\n{name}: {result['total_ms']:.0f} ms（{result['modules']} 個模組）")
+        if result['deferred_loaded']:
+            failed = True
+            print(f"  ⚠️ 啟動時載入了應延遲的模組：{', '.join(result['deferred_loaded'])}")
+        for entry in top_imports(result['entries'], args.top):
+            print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {'  ' * entry['depth']}{entry['module']}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
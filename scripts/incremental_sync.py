@@ -0,0 +1,73 @@
+"""
+價格增量同步
+依 sync_status 水位只抓缺少的交易日；--dry-run 只列出將發出的請求
+
+用法：
+    python scripts/incremental_sync.py --market tw 2330 2317 --dry-run
+    python scripts/incremental_sync.py --market us --all
+    python scripts/incremental_sync.py --market tw --all --backfill-from 2015-01-01
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psycopg2
+from loguru import logger
+
+from config.settings import DATABASE_CONFIG
+from data_loader.sync_planner import run_incremental_sync, tw_fetcher, us_fetcher
+from data_loader.universe import canonical_symbols, get_universe
+
+
+def _all_symbols(conn, market: str):
+    with conn.cursor() as cursor:
+        return get_universe().symbols(cursor, market)
+
+
+def _date(value: str):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='價格增量同步')
+    parser.add_argument('symbols', nargs='*', help='標的代碼')
+    parser.add_argument('--market', choices=['tw', 'us'], default='tw')
+    parser.add_argument('--all', action='store_true', help='同步證券主檔中所有上市標的')
+    parser.add_argument('--end', type=_date, help='同步到此日（預設為最近一個已收盤的交易日）')
+    parser.add_argument('--backfill-from', type=_date, help='已有資料的標的往前補到此日')
+    parser.add_argument('--dry-run', action='store_true', help='只列出請求，不抓取')
+    args = parser.parse_args(argv)
+
+    market = args.market.upper()
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        symbols = args.symbols or []
+        if args.all:
+            symbols += _all_symbols(conn, market)
+        symbols = canonical_symbols(symbols)
+        if not symbols:
+            parser.error('請指定標的或 --all')
+
+        if market == 'TW':
+            from api_clients.tw_stock_client import TWStockClient
+            fetch = tw_fetcher(TWStockClient())
+        else:
+            from api_clients.us_stock_client import USStockClient
+            fetch = us_fetcher(USStockClient())
+
+        stats = run_incremental_sync(
+            conn, market, symbols, fetch,
+            end=args.end, backfill_start=args.backfill_from, dry_run=args.dry_run,
+        )
+        for request in stats.pop('plan', []):
+            logger.info(f"   {request['symbol']}: {request['start']} ~ {request['end']}（{request['sessions']} 個交易日）")
+        logger.info(f"📊 {stats}")
+        return 1 if stats['errors'] else 0
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,6 +18,7 @@ from loguru import logger
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from config.settings import DATABASE_CONFIG
+from data_loader.partitions import apply_partitioning
 
 # 配置日誌
 logger.remove()
@@ -78,6 +79,34 @@ def execute_schema():
         return False
 
 
+def execute_partitioning():
+    """執行 partitioning.sql 將時間序列大表轉為按年分區"""
+    logger.info("📝 執行 partitioning.sql...")
+    
+    partition_file = Path(__file__).parent.parent / 'database' / 'partitioning.sql'
+    
+    try:
+        with open(partition_file, 'r', encoding='utf-8') as f:
+            partition_sql = f.read()
+        
+        # 各表遷移區塊逐段執行，單表失敗不影響其他表
+        conn = psycopg2.connect(**DATABASE_CONFIG)
+        try:
+            failed = apply_partitioning(conn, partition_sql)
+        finally:
+            conn.close()
+        
+        if failed:
+            logger.error(f"❌ 分區設定部分失敗：{', '.join(failed)}")
+            return False
+        logger.success("✅ 分區設定完成！")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ 分區設定失敗: {e}")
+        return False
+
+
 def verify_tables():
     """驗證表格建立成功"""
     logger.info("🔎 驗證表格建立狀態...")
@@ -89,15 +118,15 @@ def verify_tables():
         'gold_prices', 'exchange_rates',
         'macro_indicators', 'financial_news',
         # 預計算層
-        'technical_indicators', 'quant_scores',
+        'technical_indicators', 'quant_scores', 'latest_quotes', 'decision_scores',
         # AI 快取層
-        'ai_reports', 'similarity_matrix',
+        'ai_reports', 'similarity_matrix', 'ai_jobs',
         # 進階分析層
         'shareholder_dispersion', 'institutional_holdings_13f',
         'portfolio_performance', 'backtest_results',
-        'behavioral_metrics', 'stress_test_results',
+        'behavioral_metrics', 'stress_test_results', 'quant_jobs',
         # 系統管理層
-        'sync_status', 'system_config'
+        'sync_status', 'system_config', 'table_row_counts', 'api_call_stats'
     ]
     
     try:
@@ -141,12 +170,12 @@ def verify_tables():
             categories = {
                 '原始資料層': ['tw_stock_info', 'tw_stock_prices', 'us_stock_info', 'us_stock_prices', 
                               'gold_prices', 'exchange_rates', 'macro_indicators', 'financial_news'],
-                '預計算層': ['technical_indicators', 'quant_scores'],
-                'AI 快取層': ['ai_reports', 'similarity_matrix'],
+                '預計算層': ['technical_indicators', 'quant_scores', 'latest_quotes', 'decision_scores'],
+                'AI 快取層': ['ai_reports', 'similarity_matrix', 'ai_jobs'],
                 '進階分析層': ['shareholder_dispersion', 'institutional_holdings_13f', 
                               'portfolio_performance', 'backtest_results', 
-                              'behavioral_metrics', 'stress_test_results'],
-                '系統管理層': ['sync_status', 'system_config']
+                              'behavioral_metrics', 'stress_test_results', 'quant_jobs'],
+                '系統管理層': ['sync_status', 'system_config', 'table_row_counts', 'api_call_stats']
             }
             
             for category, tables in categories.items():
@@ -264,6 +293,10 @@ def main():
         logger.error("❌ 初始化失敗：無法執行 schema.sql")
         return False
     
+    # 步驟 2.1: 時間序列大表按年分區
+    if not execute_partitioning():
+        logger.warning("⚠️  分區設定失敗，表格維持一般表，但繼續執行...")
+    
     # 步驟 3: 驗證表格
     if not verify_tables():
         logger.warning("⚠️  部分表格建立失敗，但繼續執行...")
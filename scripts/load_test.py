@@ -0,0 +1,470 @@
+"""
+API 壓力測試
+
+以固定並行數對 API 送出加權組合的請求（LOADTEST_CONFIG['mix']），統計各端點與整體的
+延遲百分位數（p50 / p95 / p99）、吞吐量與錯誤率，輸出可互相比較的 JSON 報告。
+
+- 標的取自 scripts/seed_benchmark_data.py 輸出的資料集描述檔，依熱度（1 / k^skew）抽樣
+- 預熱期間的請求不計入統計
+- 指定 --rate 時以固定速率排程（開放式負載），延遲自預定送出時間起算，
+  伺服器變慢造成的排隊時間也會反映在百分位數中
+- --baseline 與先前的報告比較，--max-regression 超過門檻（p95 增幅 %）時以非零狀態結束
+
+用法：
+    python scripts/load_test.py -c 32 -d 120 --label before
+    python scripts/load_test.py -c 32 -d 120 --label after --baseline logs/loadtest/loadtest_before_*.json
+    python scripts/load_test.py --only prices_tw,depth_tw --weight risk_analysis=2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import requests
+from loguru import logger
+
+from config.settings import LOADTEST_CONFIG
+
+DEFAULT_MANIFEST = LOADTEST_CONFIG['report_dir'] / 'dataset.json'
+# 無資料集描述檔時（例如直接對正式資料庫測試）使用的標的
+FALLBACK_SYMBOLS = {'tw': ['2330', '2317', '2454', '1101', '2412'], 'us': ['AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL']}
+PERCENTILES = (50, 90, 95, 99)
+REPORT_VERSION = 1
+
+
+# ========== 請求組合與標的抽樣 ==========
+
+class EndpointMix:
+    """依 weight 抽選端點（weight 為 0 的端點不送出）"""
+
+    def __init__(self, entries):
+        self.entries = [entry for entry in entries if entry.get('weight', 0) > 0]
+        if not self.entries:
+            raise ValueError('端點組合沒有 weight > 0 的端點')
+        weights = np.array([entry['weight'] for entry in self.entries], dtype=float)
+        self.cumulative = np.cumsum(weights / weights.sum())
+
+    def choose(self, rng):
+        index = int(np.searchsorted(self.cumulative, rng.random(), side='right'))
+        return self.entries[min(index, len(self.entries) - 1)]
+
+
+class SymbolPicker:
+    """依熱度抽樣標的：第 k 個標的的權重為 1 / k^skew"""
+
+    def __init__(self, symbols, skew: float = 1.0, batch_size: int = 20):
+        self.symbols = {market: list(codes) for market, codes in symbols.items() if codes}
+        self.weights = {
+            market: self._weights(len(codes), skew) for market, codes in self.symbols.items()
+        }
+        self.batch_size = batch_size
+
+    @staticmethod
+    def _weights(count, skew):
+        weights = 1.0 / np.arange(1, count + 1) ** skew
+        return weights / weights.sum()
+
+    def one(self, rng, market):
+        codes = self.symbols[market]
+        return codes[rng.choice(len(codes), p=self.weights[market])]
+
+    def batch(self, rng, market):
+        codes = self.symbols[market]
+        size = min(self.batch_size, len(codes))
+        return ','.join(codes[i] for i in rng.choice(len(codes), size, replace=False, p=self.weights[market]))
+
+
+class _Placeholders(dict):
+    """format_map 用：{tw} / {us} / {tw_batch} / {us_batch} 於首次使用時抽樣，同一請求內一致"""
+
+    def __init__(self, picker, rng):
+        super().__init__()
+        self.picker, self.rng = picker, rng
+
+    def __missing__(self, key):
+        market, _, kind = key.partition('_')
+        value = self.picker.batch(self.rng, market) if kind == 'batch' else self.picker.one(self.rng, market)
+        self[key] = value
+        return value
+
+
+def render(value, placeholders):
+    """代入路徑、查詢參數與 JSON 內容中的標的佔位符"""
+    if isinstance(value, str):
+        return value.format_map(placeholders) if '{' in value else value
+    if isinstance(value, dict):
+        return {key: render(item, placeholders) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render(item, placeholders) for item in value]
+    return value
+
+
+def build_mix(entries, weights=None, only=None):
+    """套用 --weight / --only 覆寫後的端點組合"""
+    weights = weights or {}
+    unknown = (set(weights) | set(only or [])) - {entry['name'] for entry in entries}
+    if unknown:
+        raise ValueError(f"未知的端點：{', '.join(sorted(unknown))}")
+    mix = []
+    for entry in entries:
+        weight = weights.get(entry['name'], entry.get('weight', 0))
+        if only is not None and entry['name'] not in only:
+            weight = 0
+        mix.append({**entry, 'weight': weight})
+    return mix
+
+
+# ========== 執行與統計 ==========
+
+class Samples:
+    """單一端點的原始量測（每個 worker 各自一份，結束後合併）"""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.bytes = 0
+
+    def add(self, latency, status, size=0, error=None):
+        self.latencies.append(latency)
+        self.statuses[str(status) if status is not None else 'exception'] += 1
+        if error:
+            self.errors[error] += 1
+        self.bytes += size
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.statuses.update(other.statuses)
+        self.errors.update(other.errors)
+        self.bytes += other.bytes
+
+    def summary(self, elapsed):
+        count = len(self.latencies)
+        errors = sum(self.errors.values())
+        latencies = np.asarray(self.latencies) * 1000
+        latency = {'mean': None, 'max': None, **{f'p{p}': None for p in PERCENTILES}}
+        if count:
+            latency.update(
+                mean=round(float(latencies.mean()), 2),
+                max=round(float(latencies.max()), 2),
+                **{f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(latencies, PERCENTILES))}
+            )
+        return {
+            'requests': count,
+            'errors': errors,
+            'error_rate': round(errors / count * 100, 2) if count else 0.0,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+            'bytes_per_request': round(self.bytes / count) if count else 0,
+            'latency_ms': latency,
+            'status_codes': dict(self.statuses),
+            'error_types': dict(self.errors.most_common(10)),
+        }
+
+
+def _worker(index, base_url, mix, picker, options, clock, results):
+    rng = np.random.default_rng(options['seed'] + index)
+    session = requests.Session()
+    samples = {}
+    interval = options['concurrency'] / options['rate'] if options['rate'] else None
+    sent = 0
+    try:
+        while True:
+            now = time.perf_counter()
+            if interval:
+                # 各 worker 錯開起點，依預定時間送出；延遲自預定時間起算
+                scheduled = clock['start'] + (sent + index / options['concurrency']) * interval
+                if scheduled >= clock['end']:
+                    break
+                if scheduled > now:
+                    time.sleep(scheduled - now)
+            else:
+                scheduled = now
+                if now >= clock['end']:
+                    break
+            sent += 1
+
+            entry = mix.choose(rng)
+            placeholders = _Placeholders(picker, rng)
+            status, size, error = None, 0, None
+            try:
+                response = session.request(
+                    entry.get('method', 'GET'),
+                    base_url + render(entry['path'], placeholders),
+                    params=render(entry.get('params'), placeholders),
+                    json=render(entry.get('json'), placeholders),
+                    timeout=options['timeout'],
+                )
+                status, size = response.status_code, len(response.content)
+                if status >= 400:
+                    error = f'HTTP {status}'
+            except requests.RequestException as e:
+                error = type(e).__name__
+            finished = time.perf_counter()
+
+            if scheduled >= clock['measure_from']:
+                samples.setdefault(entry['name'], Samples()).add(finished - scheduled, status, size, error)
+    finally:
+        session.close()
+        results[index] = samples
+
+
+def run_load_test(base_url, mix_entries, symbols, concurrency=16, duration=60.0, warmup=0.0,
+                  rate=None, seed=0, timeout=30.0, skew=1.0, batch_size=20):
+    """
+    執行壓力測試並回傳統計（不含報告中繼資料）
+
+    Returns:
+        {'elapsed': 量測秒數, 'summary': 整體統計, 'endpoints': {端點: 統計}}
+    """
+    mix = EndpointMix(mix_entries)
+    picker = SymbolPicker(symbols, skew, batch_size)
+    options = {'seed': seed, 'concurrency': concurrency, 'rate': rate, 'timeout': timeout}
+    start = time.perf_counter()
+    clock = {'start': start, 'measure_from': start + warmup, 'end': start + warmup + duration}
+    results = [None] * concurrency
+
+    threads = [
+        threading.Thread(target=_worker, args=(i, base_url.rstrip('/'), mix, picker, options, clock, results),
+                         name=f'loadtest-{i}', daemon=True)
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 量測期間以最後一個請求完成時間為準（逾時中的請求會延長）
+    elapsed = max(time.perf_counter(), clock['end']) - clock['measure_from']
+
+    endpoints, overall = {}, Samples()
+    for worker_samples in results:
+        for name, samples in (worker_samples or {}).items():
+            endpoints.setdefault(name, Samples()).merge(samples)
+            overall.merge(samples)
+    return {
+        'elapsed': round(elapsed, 3),
+        'summary': overall.summary(elapsed),
+        'endpoints': {name: endpoints[name].summary(elapsed) for name in sorted(endpoints)},
+    }
+
+
+# ========== 報告 ==========
+
+def git_revision():
+    root = Path(__file__).parent.parent
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               cwd=root, capture_output=True, text=True, timeout=30)
+        return {'commit': commit.stdout.strip() or None, 'dirty': bool(dirty.stdout.strip())}
+    except (OSError, subprocess.SubprocessError):
+        return {'commit': None, 'dirty': None}
+
+
+def load_manifest(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def fetch_server_metrics(base_url, timeout=5.0):
+    """伺服器端的 /api/system/metrics（自伺服器啟動起累計；未啟用時回傳 None）"""
+    try:
+        response = requests.get(base_url.rstrip('/') + '/api/system/metrics', timeout=timeout)
+        if response.ok:
+            return response.json().get('data')
+    except (requests.RequestException, ValueError):
+        pass
+    return None
+
+
+def build_report(result, config, manifest=None, label=None, server=None):
+    dataset = None
+    if manifest:
+        dataset = {key: value for key, value in manifest.items() if key != 'symbols'}
+    return {
+        'version': REPORT_VERSION,
+        'label': label,
+        'created_at': datetime.now().astimezone().isoformat(),
+        'git': git_revision(),
+        'host': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'config': config,
+        'dataset': dataset,
+        **result,
+        'server': server,
+    }
+
+
+def comparable_reasons(current, baseline):
+    """兩份報告無法直接比較的原因（空列表表示條件相同）"""
+    reasons = []
+    fingerprint = lambda report: (report.get('dataset') or {}).get('fingerprint')
+    if fingerprint(current) != fingerprint(baseline):
+        reasons.append(f'資料集不同（{fingerprint(baseline)} → {fingerprint(current)}）')
+    for key in ('concurrency', 'rate', 'mix', 'symbol_skew', 'batch_size'):
+        if current['config'].get(key) != baseline['config'].get(key):
+            reasons.append(f'{key} 設定不同')
+    return reasons
+
+
+def _change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return round((after - before) / before * 100, 1)
+
+
+def compare_reports(current, baseline):
+    """
+    與基準報告比較各端點的 p50 / p95 / p99 與吞吐量
+
+    Returns:
+        {'comparable', 'reasons', 'overall': {...}, 'endpoints': {端點: {指標: {'baseline', 'current', 'change_pct'}}}}
+    """
+    def diff(now, before):
+        metrics = {
+            f'p{p}_ms': (before['latency_ms'][f'p{p}'], now['latency_ms'][f'p{p}']) for p in (50, 95, 99)
+        }
+        metrics['throughput_rps'] = (before['throughput_rps'], now['throughput_rps'])
+        metrics['error_rate'] = (before['error_rate'], now['error_rate'])
+        return {
+            name: {'baseline': old, 'current': new, 'change_pct': _change(old, new)}
+            for name, (old, new) in metrics.items()
+        }
+
+    reasons = comparable_reasons(current, baseline)
+    return {
+        'comparable': not reasons,
+        'reasons': reasons,
+        'baseline': {'label': baseline.get('label'), 'created_at': baseline.get('created_at'),
+                     'commit': (baseline.get('git') or {}).get('commit')},
+        'overall': diff(current['summary'], baseline['summary']),
+        'endpoints': {
+            name: diff(stats, baseline['endpoints'][name])
+            for name, stats in current['endpoints'].items() if name in baseline['endpoints']
+        },
+    }
+
+
+def regressions(comparison, threshold_pct):
+    """p95 增幅超過門檻的端點（含 'overall'）"""
+    rows = {'overall': comparison['overall'], **comparison['endpoints']}
+    return sorted(
+        name for name, metrics in rows.items()
+        if metrics['p95_ms']['change_pct'] is not None and metrics['p95_ms']['change_pct'] > threshold_pct
+    )
+
+
+def log_report(report, comparison=None):
+    changes = (comparison or {}).get('endpoints', {})
+    logger.info(f"{'端點':<18}{'請求數':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'錯誤%':>8}{'Δp95%':>8}")
+    rows = list(report['endpoints'].items()) + [('[overall]', report['summary'])]
+    for name, stats in rows:
+        latency = stats['latency_ms']
+        change = (comparison or {}).get('overall') if name == '[overall]' else changes.get(name)
+        delta = change['p95_ms']['change_pct'] if change else None
+        logger.info(
+            f"{name:<18}{stats['requests']:>8}{stats['throughput_rps']:>9.1f}"
+            f"{latency['p50'] or 0:>9.1f}{latency['p95'] or 0:>9.1f}{latency['p99'] or 0:>9.1f}"
+            f"{stats['error_rate']:>8.1f}{'' if delta is None else f'{delta:+.1f}':>8}"
+        )
+
+
+def _parse_weights(values):
+    weights = {}
+    for value in values or []:
+        name, _, weight = value.partition('=')
+        weights[name] = float(weight)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API 壓力測試')
+    parser.add_argument('--base-url', default=LOADTEST_CONFIG['base_url'])
+    parser.add_argument('-c', '--concurrency', type=int, default=LOADTEST_CONFIG['concurrency'])
+    parser.add_argument('-d', '--duration', type=float, default=LOADTEST_CONFIG['duration'], help='量測秒數')
+    parser.add_argument('--warmup', type=float, default=LOADTEST_CONFIG['warmup'], help='預熱秒數（不計入）')
+    parser.add_argument('--rate', type=float, help='固定總速率（請求/秒）；未指定時各 worker 連續送出')
+    parser.add_argument('--timeout', type=float, default=LOADTEST_CONFIG['timeout'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--weight', action='append', metavar='NAME=W', help='覆寫端點權重（可重複）')
+    parser.add_argument('--only', help='只測試指定端點（逗號分隔）')
+    parser.add_argument('--manifest', type=Path, default=DEFAULT_MANIFEST, help='資料集描述檔')
+    parser.add_argument('--label', help='報告標籤（例如 before / after）')
+    parser.add_argument('--output', type=Path, help='報告路徑（預設 logs/loadtest/loadtest_<label>_<時間>.json）')
+    parser.add_argument('--baseline', type=Path, help='比較用的基準報告')
+    parser.add_argument('--max-regression', type=float, help='p95 增幅超過此百分比時以狀態碼 1 結束')
+    args = parser.parse_args()
+
+    try:
+        mix = build_mix(LOADTEST_CONFIG['mix'], _parse_weights(args.weight),
+                        args.only.split(',') if args.only else None)
+    except ValueError as e:
+        parser.error(str(e))
+
+    manifest = load_manifest(args.manifest)
+    if manifest is None:
+        logger.warning(f"找不到資料集描述檔 {args.manifest}，改用預設標的，報告無法與其他資料集比較")
+    symbols = manifest['symbols'] if manifest else FALLBACK_SYMBOLS
+
+    config = {
+        'base_url': args.base_url,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'rate': args.rate,
+        'timeout': args.timeout,
+        'seed': args.seed,
+        'symbol_skew': LOADTEST_CONFIG['symbol_skew'],
+        'batch_size': LOADTEST_CONFIG['batch_size'],
+        'mix': [entry for entry in mix if entry['weight'] > 0],
+    }
+    logger.info(
+        f"🚀 {args.base_url}：並行 {args.concurrency}，預熱 {args.warmup:.0f} 秒 + 量測 {args.duration:.0f} 秒"
+        + (f"，固定速率 {args.rate:g} rps" if args.rate else '')
+    )
+    result = run_load_test(
+        args.base_url, mix, symbols,
+        concurrency=args.concurrency, duration=args.duration, warmup=args.warmup, rate=args.rate,
+        seed=args.seed, timeout=args.timeout, skew=config['symbol_skew'], batch_size=config['batch_size'],
+    )
+    report = build_report(result, config, manifest, args.label, fetch_server_metrics(args.base_url))
+
+    comparison = None
+    if args.baseline:
+        comparison = compare_reports(report, json.loads(args.baseline.read_text(encoding='utf-8')))
+        report['comparison'] = comparison
+        for reason in comparison['reasons']:
+            logger.warning(f"⚠️ 與基準報告條件不同：{reason}")
+
+    output = args.output or LOADTEST_CONFIG['report_dir'] / (
+        f"loadtest_{args.label or 'run'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    log_report(report, comparison)
+    logger.success(f"✅ 報告：{output}")
+
+    if comparison and args.max_regression is not None:
+        regressed = regressions(comparison, args.max_regression)
+        if regressed:
+            logger.error(f"❌ p95 增幅超過 {args.max_regression:g}%：{', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,26 @@
 """
 大規模數據擴張腳本 - 充分利用yfinance免費API
-目標：台股200支、美股100支、完整歷史數據
+目標：證券主檔中所有上市台股、美股種子清單、完整歷史數據
 """
+import sys
 import yfinance as yf
+import pandas as pd
 import psycopg2
 from datetime import datetime, timedelta
+from pathlib import Path
 from dotenv import load_dotenv
 import os
 import time
 
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', 'config', '.env'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
-# 台股前200支代碼（市值排序）
-TW_STOCKS_200 = [
-    # 前100支（已有102支）
-    '2330', '2317', '2454', '2308', '2881', '2882', '2891', '2892', '2886', '2884',
-    '2412', '2382', '1301', '1303', '1326', '2357', '2303', '3008', '2002', '6505',
-    '2887', '2880', '2885', '2890', '1216', '2379', '2377', '2327', '3711', '2345',
-    '6415', '6669', '5880', '2912', '2408', '3045', '2301', '2353', '1101', '2395',
-    '3231', '5871', '2883', '2603', '1102', '2609', '2324', '2344', '2371', '2409',
-    '1605', '3481', '6176', '2888', '2356', '5483', '9910', '2049', '3037', '6269',
-    '2207', '2618', '2201', '2809', '2834', '2610', '3034', '1402', '1590', '4904',
-    '2915', '1314', '2474', '2841', '3532', '2383', '4938', '4958', '5347', '2204',
-    '6781', '3552', '2352', '1476', '5388', '6278', '6409', '2832', '2385', '2027',
-    '3443', '2458', '2347', '3653', '4966', '5269', '6446', '8046', '2354', '2851',
-    
-    # 新增100支（101-200）
-    '2498', '6116', '2368', '2377', '3017', '2434', '2376', '2059', '8299', '6488',
-    '2923', '2888', '2834', '1590', '2449', '2448', '1718', '2542', '1907', '1723',
-    '2801', '2439', '5388', '2006', '3406', '6415', '2204', '3450', '2441', '5483',
-    '2206', '3711', '8150', '3702', '2027', '3034', '8358', '6239', '6176', '2428',
-    '9921', '3037', '2313', '8341', '2912', '2356', '3008', '2371', '5434', '2888',
-    '1476', '2610', '1477', '1504', '2809', '2201', '5871', '2535', '1802', '5388',
-    '2385', '3481', '9910', '2458', '6269', '2383', '6278', '2352', '4938', '3532',
-    '2841', '2915', '1314', '4904', '1590', '2474', '3034', '2834', '2409', '2603',
-    '2324', '2344', '2609', '1102', '2371', '5871', '2883', '3231', '2395', '1101',
-    '2353', '2301', '3045', '2408', '2912', '5880', '6669', '6415', '2345', '3711'
-]
+from api_clients.tw_stock_client import TWStockClient
+from data_loader.sync_planner import run_incremental_sync
+from data_loader.universe import get_universe, refresh_universe, tw_listings
 
-# 美股前100支代碼
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', 'config', '.env'))
+
+# 美股種子清單（沒有交易所清單來源，加入證券主檔後與既有美股標的一起同步）
 US_STOCKS_100 = [
     # 已有30支
     'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'NVDA', 'META', 'TSLA', 'JPM', 'V', 'WMT',
@@ -55,11 +37,34 @@ US_STOCKS_100 = [
     'ADI', 'AMAT', 'KLAC', 'NXPI', 'MRVL', 'SNPS', 'CDNS', 'FTNT', 'PANW', 'WDAY'
 ]
 
+def yf_fetcher(suffix: str = ''):
+    """以 yfinance 逐檔取得日線（end 含當日），供增量同步使用"""
+    def fetch(symbols, start, end):
+        frames = []
+        for symbol in symbols:
+            hist = yf.Ticker(f"{symbol}{suffix}").history(
+                start=start.isoformat(), end=(end + timedelta(days=1)).isoformat()
+            )
+            if hist.empty:
+                continue
+            frames.append(pd.DataFrame({
+                'symbol': symbol,
+                'trade_date': hist.index.date,
+                'open': hist['Open'].values,
+                'high': hist['High'].values,
+                'low': hist['Low'].values,
+                'close': hist['Close'].values,
+                'volume': hist['Volume'].values,
+            }))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return fetch
+
+
 def sync_massive_data():
     print("=" * 80)
     print("🚀 大規模數據擴張 - 充分利用yfinance免費API")
     print("=" * 80)
-    print("目標：台股200支、美股100支、完整歷史數據")
+    print("目標：證券主檔中所有上市台股、美股種子清單、完整歷史數據")
     print("=" * 80)
     
     conn = psycopg2.connect(
@@ -73,66 +78,32 @@ def sync_massive_data():
     cursor = conn.cursor()
     
     tw_stock_count = 0
-    tw_price_count = 0
     us_stock_count = 0
-    us_price_count = 0
     
     # ========== 1. 台股數據擴張 ==========
-    print("\n【階段1】台股數據擴張（200支目標）")
+    print("\n【階段1】台股數據擴張（證券主檔上市標的）")
     print("-" * 80)
     
-    for idx, code in enumerate(TW_STOCKS_200, 1):
-        try:
-            print(f"[{idx}/200] 處理台股 {code}...", end=' ')
-            
-            # 插入股票資訊
-            cursor.execute("""
-                INSERT INTO tw_stock_info (stock_code, stock_name, market)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (stock_code) DO NOTHING
-            """, (code, f"股票{code}", '上市'))
-            
-            if cursor.rowcount > 0:
-                tw_stock_count += 1
-            
-            # 獲取1年歷史價格
-            ticker = yf.Ticker(f"{code}.TW")
-            hist = ticker.history(period="1y")
-            
-            price_inserted = 0
-            for date, row in hist.iterrows():
-                try:
-                    cursor.execute("""
-                        INSERT INTO tw_stock_prices 
-                        (stock_code, trade_date, open_price, high_price, low_price, close_price, volume)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (stock_code, trade_date) DO UPDATE
-                        SET close_price = EXCLUDED.close_price
-                    """, (code, date.date(), float(row['Open']), float(row['High']), 
-                          float(row['Low']), float(row['Close']), int(row['Volume'])))
-                    price_inserted += 1
-                except:
-                    continue
-            
-            tw_price_count += price_inserted
-            conn.commit()
-            print(f"✅ {price_inserted}筆")
-            
-            if idx % 10 == 0:
-                time.sleep(1)  # 每10支休息1秒
-                
-        except Exception as e:
-            print(f"❌ {str(e)[:40]}")
-            conn.rollback()
-            continue
+    # 標的：TWSE + TPEX 清單去重後更新證券主檔（同時補上 tw_stock_info），再取仍上市的上市股
+    # yfinance 的 .TW 後綴只適用上市股，上櫃股由 n8n 盤後更新以 TWSE / TPEX API 同步
+    tw_stock_count = refresh_universe(conn, 'TW', tw_listings(TWStockClient()))['added']
+    tw_symbols = get_universe().symbols(cursor, 'TW', exchange='TWSE')
+    print(f"台股上市標的 {len(tw_symbols)} 支（主檔新增 {tw_stock_count} 支）")
+    
+    # 價格：依 sync_status 水位只抓缺少的交易日（沒有資料的標的抓最近 1 年）
+    tw_price_count = run_incremental_sync(conn, 'TW', tw_symbols, yf_fetcher('.TW'))['written']
     
     # ========== 2. 美股數據擴張 ==========
-    print("\n【階段2】美股數據擴張（100支目標）")
+    print("\n【階段2】美股數據擴張（證券主檔標的）")
     print("-" * 80)
     
-    for idx, symbol in enumerate(US_STOCKS_100, 1):
+    # 種子清單去重後加入證券主檔（非完整清單，不標記下市），再取主檔中所有美股
+    refresh_universe(conn, 'US', [{'ticker': symbol} for symbol in US_STOCKS_100], complete=False)
+    us_symbols = get_universe().symbols(cursor, 'US')
+    
+    for idx, symbol in enumerate(us_symbols, 1):
         try:
-            print(f"[{idx}/100] 處理美股 {symbol}...", end=' ')
+            print(f"[{idx}/{len(us_symbols)}] 處理美股 {symbol}...", end=' ')
             
             ticker = yf.Ticker(symbol)
             info = ticker.info
@@ -151,27 +122,8 @@ def sync_massive_data():
             if cursor.rowcount > 0:
                 us_stock_count += 1
             
-            # 獲取1年歷史價格
-            hist = ticker.history(period="1y")
-            
-            price_inserted = 0
-            for date, row in hist.iterrows():
-                try:
-                    cursor.execute("""
-                        INSERT INTO us_stock_prices 
-                        (symbol, trade_date, open_price, high_price, low_price, close_price, volume)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (symbol, trade_date) DO UPDATE
-                        SET close_price = EXCLUDED.close_price
-                    """, (symbol, date.date(), float(row['Open']), float(row['High']), 
-                          float(row['Low']), float(row['Close']), int(row['Volume'])))
-                    price_inserted += 1
-                except:
-                    continue
-            
-            us_price_count += price_inserted
             conn.commit()
-            print(f"✅ {price_inserted}筆")
+            print("✅")
             
             if idx % 10 == 0:
                 time.sleep(1)  # 每10支休息1秒
@@ -180,7 +132,9 @@ def sync_massive_data():
             print(f"❌ {str(e)[:40]}")
             conn.rollback()
             continue
-    
+
+    us_price_count = run_incremental_sync(conn, 'US', us_symbols, yf_fetcher())['written']
+
     # ========== 3. 更多商品數據 ==========
     print("\n【階段3】商品數據擴張")
     print("-" * 80)
@@ -0,0 +1,61 @@
+"""
+N8N 自動化腳本 - 資料表筆數校正
+以 COUNT(*) 重算 table_row_counts（尚無計數列的表格在此建立），建議每日離峰時段執行（例如凌晨 3:00）
+
+可單獨執行，或由常駐執行器 n8n_worker.py 以共用的連接池呼叫
+
+用法：
+    python scripts/n8n/reconcile_table_stats.py [表格 ...]
+"""
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+# 添加專案根目錄到路徑
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from data_loader import DatabaseConnector
+from data_loader.table_stats import reconcile_row_counts
+
+LOCK_NAME = 'n8n:reconcile_table_stats'
+
+
+def reconcile_table_stats(db: DatabaseConnector = None, tables: Optional[List[str]] = None) -> Dict:
+    """
+    校正資料表筆數
+
+    Args:
+        db: 資料庫連接器（None 時自行建立並於結束時關閉）
+        tables: 要校正的表格（None 為 table_stats.COUNTED_TABLES）
+
+    Returns:
+        {表格: 精確筆數}；其他程序正在執行時回傳 {'skipped': True, 'reason': 原因}
+    """
+    own_db = db is None
+    db = db or DatabaseConnector()
+    try:
+        with db.advisory_lock(LOCK_NAME) as acquired:
+            if not acquired:
+                logger.warning("⏭️ 資料表筆數校正已在其他程序執行中，略過")
+                return {'skipped': True, 'reason': 'already running'}
+            with db.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    counts = reconcile_row_counts(cursor, tables)
+                conn.commit()
+            for table, count in counts.items():
+                logger.info(f"   {table}: {count:,} 筆")
+            logger.success(f"✅ 已校正 {len(counts)} 張表")
+            return counts
+    finally:
+        if own_db:
+            db.close()
+
+
+if __name__ == '__main__':
+    try:
+        reconcile_table_stats(tables=sys.argv[1:] or None)
+    except Exception as e:
+        logger.error(f"❌ 腳本執行失敗: {e}")
+        sys.exit(1)
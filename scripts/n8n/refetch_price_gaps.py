@@ -0,0 +1,89 @@
+"""
+N8N 自動化腳本 - 價格缺漏偵測與補抓
+建議每週離峰時段執行（例如週六 03:00），依交易日曆找出歷史資料中缺少的交易日並補抓
+
+可單獨執行，或由常駐執行器 n8n_worker.py 以共用的連接池與客戶端呼叫
+
+用法：
+    python scripts/n8n/refetch_price_gaps.py TW
+    python scripts/n8n/refetch_price_gaps.py US --since 2020-01-01 --dry-run
+"""
+import argparse
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Optional
+from loguru import logger
+
+# 添加專案根目錄到路徑
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from data_loader import DatabaseConnector
+from data_loader.gap_detection import refetch_gaps
+from data_loader.sync_planner import tw_fetcher, us_fetcher
+
+MARKETS = ('TW', 'US')
+
+
+def refetch_price_gaps(
+    market: str = 'TW',
+    db: DatabaseConnector = None,
+    client=None,
+    since: Optional[date] = None,
+    dry_run: bool = False
+) -> Dict:
+    """
+    偵測並補抓價格缺漏
+
+    Args:
+        market: 'TW' or 'US'
+        db: 資料庫連接器（None 時自行建立並於結束時關閉）
+        client: 台股 / 美股客戶端（None 時自行建立）
+        since: 檢查起日（None 使用設定的回溯天數）
+        dry_run: 只偵測不補抓
+
+    Returns:
+        補抓統計；同市場已在其他程序執行時回傳 {'skipped': True, 'reason': 原因}
+    """
+    if market not in MARKETS:
+        raise ValueError(f"market 必須為 {' / '.join(MARKETS)}")
+    if client is None:
+        if market == 'TW':
+            from api_clients.tw_stock_client import TWStockClient
+            client = TWStockClient()
+        else:
+            from api_clients.us_stock_client import USStockClient
+            client = USStockClient()
+    fetch = tw_fetcher(client) if market == 'TW' else us_fetcher(client)
+
+    own_db = db is None
+    db = db or DatabaseConnector()
+    try:
+        with db.advisory_lock(f'n8n:refetch_price_gaps:{market}') as acquired:
+            if not acquired:
+                logger.warning(f"⏭️ {market} 價格缺漏補抓已在其他程序執行中，略過")
+                return {'skipped': True, 'reason': 'already running'}
+            with db.get_connection() as conn:
+                stats = refetch_gaps(conn, market, fetch, since=since, dry_run=dry_run)
+            for request in stats.pop('plan', []):
+                logger.info(f"   {request['symbol']}: {request['start']} ~ {request['end']}（缺 {request['missing']} 個交易日）")
+            return stats
+    finally:
+        if own_db:
+            db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='價格缺漏偵測與補抓')
+    parser.add_argument('market', nargs='?', default='TW', type=str.upper, choices=MARKETS)
+    parser.add_argument('--since', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                        help='檢查起日 YYYY-MM-DD')
+    parser.add_argument('--dry-run', action='store_true', help='只列出缺漏，不補抓')
+    args = parser.parse_args()
+
+    try:
+        refetch_price_gaps(args.market, since=args.since, dry_run=args.dry_run)
+    except Exception as e:
+        logger.error(f"❌ 腳本執行失敗: {e}")
+        sys.exit(1)
@@ -1,6 +1,8 @@
 """
 N8N 自動化腳本 - 每日 AI 報告生成
 用於每日市場數據更新後執行 (例如 15:00 for TW, 06:00 for US)
+
+可單獨執行，或由常駐執行器 n8n_worker.py 以共用的連接池與模型客戶端呼叫
 """
 import sys
 import os
@@ -8,30 +10,50 @@ from pathlib import Path
 from loguru import logger
 import time
 from datetime import datetime
+from typing import Dict
 
 # 添加專案根目錄到路徑
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
 from data_loader import DatabaseConnector
-# 嘗試導入報告生成函數
-try:
-    from generate_unified_decision import generate_unified_decision_report
-except ImportError:
-    logger.error("❌ 無法導入 generate_unified_decision_report，請確保 generate_unified_decision.py 在專案根目錄")
-    sys.exit(1)
+from generate_unified_decision import generate_stock_decision_report
+
+MARKETS = ('TW', 'US')
 
-def trigger_daily_report(market='TW'):
+
+def trigger_daily_report(market='TW', db: DatabaseConnector = None, ai_client=None) -> Dict:
     """
     觸發 AI 報告生成
-    market: 'TW' or 'US'
+    
+    Args:
+        market: 'TW' or 'US'
+        db: 資料庫連接器（None 時自行建立並於結束時關閉）
+        ai_client: 模型客戶端（None 時每檔報告各自建立）
+    
+    Returns:
+        生成統計；同市場的報告已在其他程序生成中時回傳 {'skipped': True, 'reason': 原因}
     """
+    if market not in MARKETS:
+        raise ValueError(f"market 必須為 {' / '.join(MARKETS)}")
+    own_db = db is None
+    db = db or DatabaseConnector()
+    try:
+        with db.advisory_lock(f'n8n:trigger_daily_report:{market}') as acquired:
+            if not acquired:
+                logger.warning(f"⏭️ {market} 市場 AI 報告已在其他程序生成中，略過")
+                return {'skipped': True, 'reason': 'already running'}
+            return _generate(market, db, ai_client)
+    finally:
+        if own_db:
+            db.close()
+
+
+def _generate(market: str, db: DatabaseConnector, ai_client) -> Dict:
     logger.info("=" * 60)
     logger.info(f"🚀 [N8N] 開始生成 {market} 市場 AI 報告")
     logger.info("=" * 60)
     
-    db = DatabaseConnector()
-    
     try:
         # 1. 獲取需要生成報告的股票清單
         # 策略：
@@ -42,11 +64,11 @@ def trigger_daily_report(market='TW'):
         logger.info("🔍 獲取目標股票清單...")
         
         # 持倉
-        holdings = db.execute_query(f"""
+        holdings = db.execute_query("""
             SELECT DISTINCT stock_code 
             FROM portfolio_holdings 
-            WHERE market = '{market}'
-        """)
+            WHERE market = %s
+        """, (market,))
         
         # 系統核心關注 (Demo用)
         if market == 'TW':
@@ -70,9 +92,11 @@ def trigger_daily_report(market='TW'):
                 logger.info(f"🤖 正在為 {code} 生成 AI 決策報告...")
                 
                 # 呼叫生成函數
-                result = generate_unified_decision_report(stock_code=code, market=market.lower())
+                report_id, _ = generate_stock_decision_report(
+                    stock_code=code, market=market.lower(), client=ai_client
+                )
                 
-                if result:
+                if report_id:
                     logger.success(f"✅ {code} 報告生成成功")
                     success_count += 1
                 else:
@@ -93,19 +117,21 @@ def trigger_daily_report(market='TW'):
         logger.info(f"   成功生成: {success_count}")
         logger.info(f"   失敗: {error_count}")
         logger.info("=" * 60)
+        return {'targets': len(target_codes), 'generated': success_count, 'errors': error_count}
         
     except Exception as e:
         logger.error(f"❌ 腳本執行失敗: {e}")
-        sys.exit(1)
-    finally:
-        db.close()
+        raise
 
 if __name__ == '__main__':
     # 從命令行參數獲取市場，預設 TW
     target_market = 'TW'
     if len(sys.argv) > 1:
         arg = sys.argv[1].upper()
-        if arg in ['TW', 'US']:
+        if arg in MARKETS:
             target_market = arg
     
-    trigger_daily_report(target_market)
+    try:
+        trigger_daily_report(target_market)
+    except Exception:
+        sys.exit(1)
@@ -1,12 +1,14 @@
 """
 N8N 自動化腳本 - 金融新聞爬蟲與摘要
 用於每日定期執行 (例如每 4 小時)，更新最新市場新聞
+
+可單獨執行，或由常駐執行器 n8n_worker.py 以共用的連接池與客戶端呼叫
 """
 import sys
 import os
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
+from typing import Dict
 from loguru import logger
 import time
 
@@ -17,36 +19,71 @@ sys.path.insert(0, str(project_root))
 from api_clients.news_client import NewsClient
 from data_loader import DatabaseConnector
 
-def update_news_data():
-    """更新金融新聞數據"""
+LOCK_NAME = 'n8n:update_news_data'
+
+# 新聞表每個程序只檢查一次（常駐執行器不必每次執行 DDL）
+_news_table_ready = False
+
+
+def ensure_news_table(db: DatabaseConnector):
+    """確保新聞表存在"""
+    global _news_table_ready
+    if _news_table_ready:
+        return
+    db.execute_query("""
+        CREATE TABLE IF NOT EXISTS financial_news (
+            id SERIAL PRIMARY KEY,
+            news_id VARCHAR(255) UNIQUE,
+            title TEXT,
+            content TEXT,
+            source VARCHAR(100),
+            url TEXT,
+            published_at TIMESTAMP,
+            sentiment_score FLOAT,
+            related_symbols TEXT[],
+            categories TEXT[],
+            market VARCHAR(10) DEFAULT 'GLOBAL',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_news_published_at ON financial_news(published_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_news_related_symbols ON financial_news USING GIN (related_symbols);
+    """)
+    _news_table_ready = True
+
+
+def update_news_data(db: DatabaseConnector = None, client: NewsClient = None) -> Dict:
+    """
+    更新金融新聞數據
     
+    Args:
+        db: 資料庫連接器（None 時自行建立並於結束時關閉）
+        client: 新聞客戶端（None 時自行建立）
+    
+    Returns:
+        更新統計；其他程序正在執行時回傳 {'skipped': True, 'reason': 原因}
+    """
+    own_db = db is None
+    db = db or DatabaseConnector()
+    client = client or NewsClient()
+    try:
+        with db.advisory_lock(LOCK_NAME) as acquired:
+            if not acquired:
+                logger.warning("⏭️ 金融新聞更新已在其他程序執行中，略過")
+                return {'skipped': True, 'reason': 'already running'}
+            return _update(db, client)
+    finally:
+        if own_db:
+            db.close()
+
+
+def _update(db: DatabaseConnector, client: NewsClient) -> Dict:
     logger.info("=" * 60)
     logger.info("🚀 [N8N] 開始執行金融新聞更新")
     logger.info("=" * 60)
     
-    db = DatabaseConnector()
-    client = NewsClient()
-    
     try:
         # 0. 確保新聞表存在
-        db.execute_query("""
-            CREATE TABLE IF NOT EXISTS financial_news (
-                id SERIAL PRIMARY KEY,
-                news_id VARCHAR(255) UNIQUE,
-                title TEXT,
-                content TEXT,
-                source VARCHAR(100),
-                url TEXT,
-                published_at TIMESTAMP,
-                sentiment_score FLOAT,
-                related_symbols TEXT[],
-                categories TEXT[],
-                market VARCHAR(10) DEFAULT 'GLOBAL',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            CREATE INDEX IF NOT EXISTS idx_news_published_at ON financial_news(published_at DESC);
-            CREATE INDEX IF NOT EXISTS idx_news_related_symbols ON financial_news USING GIN (related_symbols);
-        """)
+        ensure_news_table(db)
         
         # 1. 獲取市場焦點新聞
         logger.info("📰 獲取市場焦點新聞...")
@@ -131,12 +168,14 @@ def update_news_data():
         logger.info(f"   獲取總數: {len(all_news)}")
         logger.info(f"   成功處理: {inserted_count}") # 注意：這裡其實不算真正的 'inserted' 數量，因為 execute_query 不回傳受影響行數
         logger.info("=" * 60)
+        return {'fetched': len(all_news), 'processed': inserted_count, 'errors': skipped_count}
         
     except Exception as e:
         logger.error(f"❌ 腳本執行失敗: {e}")
-        sys.exit(1)
-    finally:
-        db.close()
+        raise
 
 if __name__ == '__main__':
-    update_news_data()
+    try:
+        update_news_data()
+    except Exception:
+        sys.exit(1)
@@ -0,0 +1,66 @@
+"""
+N8N 自動化腳本 - 證券主檔更新
+用於每個交易日早上 8:00 執行，以 TWSE + TPEX 清單更新台股證券主檔（新上市加入、下市標記）
+
+美股沒有交易所清單來源，主檔以基本資料表中的標的補齊（不標記下市）
+
+可單獨執行，或由常駐執行器 n8n_worker.py 以共用的連接池與客戶端呼叫
+"""
+import sys
+from pathlib import Path
+from typing import Dict
+from loguru import logger
+
+# 添加專案根目錄到路徑
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from data_loader import DatabaseConnector
+from data_loader.universe import refresh_universe, tw_listings
+
+LOCK_NAME = 'n8n:update_securities_master'
+
+
+def update_securities_master(db: DatabaseConnector = None, client=None) -> Dict:
+    """
+    更新證券主檔
+
+    Args:
+        db: 資料庫連接器（None 時自行建立並於結束時關閉）
+        client: 台股客戶端（None 時自行建立）
+
+    Returns:
+        各市場更新統計；其他程序正在執行時回傳 {'skipped': True, 'reason': 原因}
+    """
+    if client is None:
+        from api_clients.tw_stock_client import TWStockClient
+        client = TWStockClient()
+
+    own_db = db is None
+    db = db or DatabaseConnector()
+    try:
+        with db.advisory_lock(LOCK_NAME) as acquired:
+            if not acquired:
+                logger.warning("⏭️ 證券主檔更新已在其他程序執行中，略過")
+                return {'skipped': True, 'reason': 'already running'}
+            with db.get_connection() as conn:
+                stats = {'TW': refresh_universe(conn, 'TW', tw_listings(client))}
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT symbol, company_name, exchange FROM us_stock_info")
+                    us_listings = [
+                        {'ticker': symbol, 'name': name, 'exchange': exchange}
+                        for symbol, name, exchange in cursor.fetchall()
+                    ]
+                stats['US'] = refresh_universe(conn, 'US', us_listings, complete=False)
+            return stats
+    finally:
+        if own_db:
+            db.close()
+
+
+if __name__ == '__main__':
+    try:
+        update_securities_master()
+    except Exception as e:
+        logger.error(f"❌ 腳本執行失敗: {e}")
+        sys.exit(1)
@@ -1,14 +1,14 @@
 """
 N8N 自動化腳本 - 台股盤後數據更新
 用於每日下午 2:30 (14:30) 執行，更新當日收盤數據
+
+可單獨執行，或由常駐執行器 n8n_worker.py 以共用的連接池與客戶端呼叫
 """
 import sys
 import os
 from pathlib import Path
-from datetime import datetime, timedelta
-import pandas as pd
+from typing import Dict
 from loguru import logger
-import time
 
 # 添加專案根目錄到路徑
 project_root = Path(__file__).parent.parent.parent
@@ -16,17 +16,42 @@ sys.path.insert(0, str(project_root))
 
 from api_clients.tw_stock_client import TWStockClient
 from data_loader import DatabaseConnector
+from data_loader.sync_planner import run_incremental_sync, tw_fetcher
+from data_loader.universe import get_universe
+
+LOCK_NAME = 'n8n:update_tw_market_data'
 
-def update_tw_market_data():
-    """更新台股市場數據（針對關注列表和持倉）"""
+
+def update_tw_market_data(db: DatabaseConnector = None, client: TWStockClient = None) -> Dict:
+    """
+    更新台股市場數據（針對關注列表和持倉）
+    
+    Args:
+        db: 資料庫連接器（None 時自行建立並於結束時關閉）
+        client: 台股客戶端（None 時自行建立）
     
+    Returns:
+        更新統計；其他程序正在執行時回傳 {'skipped': True, 'reason': 原因}
+    """
+    own_db = db is None
+    db = db or DatabaseConnector()
+    client = client or TWStockClient()
+    try:
+        with db.advisory_lock(LOCK_NAME) as acquired:
+            if not acquired:
+                logger.warning("⏭️ 台股盤後數據更新已在其他程序執行中，略過")
+                return {'skipped': True, 'reason': 'already running'}
+            return _update(db, client)
+    finally:
+        if own_db:
+            db.close()
+
+
+def _update(db: DatabaseConnector, client: TWStockClient) -> Dict:
     logger.info("=" * 60)
     logger.info("🚀 [N8N] 開始執行台股盤後數據更新")
     logger.info("=" * 60)
     
-    db = DatabaseConnector()
-    client = TWStockClient()
-    
     try:
         # 1. 獲取需要更新的股票清單
         # 包括：
@@ -59,89 +84,30 @@ def update_tw_market_data():
         # 如果沒有，先同步基本資料
         logger.info(f"📋 目標股票共 {len(target_codes)} 支")
         
-        # 2. 定義更新範圍 (今天)
-        today = datetime.now().date()
-        date_str = today.strftime('%Y-%m-%d')
-        start_date = (today - timedelta(days=5)).strftime('%Y-%m-%d') # 多抓幾天以防漏失或週末
-        
-        # 3. 逐一更新價格
-        updated_count = 0
-        skipped_count = 0
-        error_count = 0
-        
-        for code in target_codes:
-            try:
-                logger.info(f"🔄 更新 {code} 價格數據...")
-                
-                # 獲取價格
-                df = client.get_daily_price(code, start_date, date_str)
-                
-                if df.empty:
-                    logger.warning(f"⚠️ {code} 無法獲取價格數據")
-                    skipped_count += 1
-                    continue
-                
-                # 準備寫入資料庫
-                # 需要轉換 DataFrame 為 list of dicts
-                data_to_insert = []
-                for _, row in df.iterrows():
-                    data_to_insert.append({
-                        'stock_code': code,
-                        'trade_date': row['trade_date'],
-                        'open_price': row['open'],
-                        'high_price': row['high'],
-                        'low_price': row['low'],
-                        'close_price': row['close'],
-                        'volume': int(row['volume']),
-                        'market': 'TW' # 假設都是上市/櫃
-                    })
-                
-                # 寫入 tw_stock_prices 表
-                # 使用 upsert (INSERT ... ON CONFLICT DO UPDATE)
-                # DatabaseConnector 可能沒有直接支援 upsert，這裡假設 bulk_insert 有處理 conflict
-                # 檢查 DatabaseConnector.bulk_insert 的實現
-                
-                # 這裡直接用 execute_batch 進行 UPSERT
-                query = """
-                    INSERT INTO tw_stock_prices 
-                    (stock_code, trade_date, open_price, high_price, low_price, close_price, volume)
-                    VALUES (%(stock_code)s, %(trade_date)s, %(open_price)s, %(high_price)s, %(low_price)s, %(close_price)s, %(volume)s)
-                    ON CONFLICT (stock_code, trade_date) 
-                    DO UPDATE SET
-                        open_price = EXCLUDED.open_price,
-                        high_price = EXCLUDED.high_price,
-                        low_price = EXCLUDED.low_price,
-                        close_price = EXCLUDED.close_price,
-                        volume = EXCLUDED.volume,
-                        updated_at = CURRENT_TIMESTAMP
-                """
-                
-                db.execute_batch(query, data_to_insert)
-                updated_count += 1
-                
-                time.sleep(0.5) # 避免太快
-                
-            except Exception as e:
-                logger.error(f"❌ 更新 {code} 失敗: {e}")
-                error_count += 1
-        
-        # 4. 更新大盤指數 (加權指數, 櫃買指數)
-        # 用戶端可能沒有直接支援指數，這裡略過或使用 yfinance '^TWII'
+        # 2. 依 sync_status 水位只抓缺少的交易日（已是最新的標的不發請求）
+        with db.get_connection() as conn:
+            # 代碼正規化、去重，並排除證券主檔中已下市的標的
+            with conn.cursor() as cursor:
+                target_codes = get_universe().filter_listed(cursor, sorted(target_codes))
+            stats = run_incremental_sync(conn, 'TW', target_codes, tw_fetcher(client))
         
         logger.info("=" * 60)
         logger.info("📊 更新統計")
-        logger.info(f"   目標股票: {len(target_codes)}")
-        logger.info(f"   成功更新: {updated_count}")
-        logger.info(f"   跳過/無資料: {skipped_count}")
-        logger.info(f"   錯誤: {error_count}")
+        logger.info(f"   目標股票: {stats['targets']}（已是最新 {stats['up_to_date']}）")
+        logger.info(f"   請求數: {stats['requests']}")
+        logger.info(f"   成功更新: {stats['updated']}")
+        logger.info(f"   跳過/無資料: {stats['no_data']}")
+        logger.info(f"   錯誤: {stats['errors']}")
         logger.info("=" * 60)
         logger.info("✅ 台股盤後數據更新完成")
+        return stats
         
     except Exception as e:
         logger.error(f"❌ 腳本執行失敗: {e}")
-        sys.exit(1)
-    finally:
-        db.close()
+        raise
 
 if __name__ == '__main__':
-    update_tw_market_data()
+    try:
+        update_tw_market_data()
+    except Exception:
+        sys.exit(1)
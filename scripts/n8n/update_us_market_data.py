@@ -1,14 +1,14 @@
 """
 N8N 自動化腳本 - 美股收盤數據更新
 用於每日清晨 5:30 (05:30) 執行，更新前一日收盤數據
+
+可單獨執行，或由常駐執行器 n8n_worker.py 以共用的連接池與客戶端呼叫
 """
 import sys
 import os
 from pathlib import Path
-from datetime import datetime, timedelta
-import pandas as pd
+from typing import Dict
 from loguru import logger
-import time
 
 # 添加專案根目錄到路徑
 project_root = Path(__file__).parent.parent.parent
@@ -16,17 +16,42 @@ sys.path.insert(0, str(project_root))
 
 from api_clients.us_stock_client import USStockClient
 from data_loader import DatabaseConnector
+from data_loader.sync_planner import run_incremental_sync, us_fetcher
+from data_loader.universe import get_universe
+
+LOCK_NAME = 'n8n:update_us_market_data'
 
-def update_us_market_data():
-    """更新美股市場數據（針對關注列表和持倉）"""
+
+def update_us_market_data(db: DatabaseConnector = None, client: USStockClient = None) -> Dict:
+    """
+    更新美股市場數據（針對關注列表和持倉）
+    
+    Args:
+        db: 資料庫連接器（None 時自行建立並於結束時關閉）
+        client: 美股客戶端（None 時自行建立）
     
+    Returns:
+        更新統計；其他程序正在執行時回傳 {'skipped': True, 'reason': 原因}
+    """
+    own_db = db is None
+    db = db or DatabaseConnector()
+    client = client or USStockClient()
+    try:
+        with db.advisory_lock(LOCK_NAME) as acquired:
+            if not acquired:
+                logger.warning("⏭️ 美股收盤數據更新已在其他程序執行中，略過")
+                return {'skipped': True, 'reason': 'already running'}
+            return _update(db, client)
+    finally:
+        if own_db:
+            db.close()
+
+
+def _update(db: DatabaseConnector, client: USStockClient) -> Dict:
     logger.info("=" * 60)
     logger.info("🚀 [N8N] 開始執行美股收盤數據更新")
     logger.info("=" * 60)
     
-    db = DatabaseConnector()
-    client = USStockClient()
-    
     try:
         # 1. 獲取需要更新的股票清單
         logger.info("🔍 獲取目標股票清單...")
@@ -53,82 +78,30 @@ def update_us_market_data():
         
         logger.info(f"📋 目標股票共 {len(target_codes)} 支")
         
-        # 2. 定義更新範圍
-        # 美股收盤時間是清晨，其實是抓「昨天」的 K 線
-        # yfinance 的 end date 是 exclusive
-        today = datetime.now().date()
-        date_str = today.strftime('%Y-%m-%d')
-        start_date = (today - timedelta(days=5)).strftime('%Y-%m-%d')
-        
-        # 3. 逐一更新價格
-        updated_count = 0
-        skipped_count = 0
-        error_count = 0
-        
-        for code in target_codes:
-            try:
-                logger.info(f"🔄 更新 {code} 價格數據...")
-                
-                # 獲取價格
-                df = client.get_daily_price(code, start_date, date_str)
-                
-                if df.empty:
-                    logger.warning(f"⚠️ {code} 無法獲取價格數據")
-                    skipped_count += 1
-                    continue
-                
-                # 準備寫入資料庫
-                data_to_insert = []
-                for _, row in df.iterrows():
-                    data_to_insert.append({
-                        'stock_code': code,
-                        'trade_date': row['trade_date'],
-                        'open_price': row['open'],
-                        'high_price': row['high'],
-                        'low_price': row['low'],
-                        'close_price': row['close'],
-                        'volume': int(row['volume']),
-                        'market': 'US'
-                    })
-                
-                # 寫入 us_stock_prices 表
-                query = """
-                    INSERT INTO us_stock_prices 
-                    (stock_code, trade_date, open_price, high_price, low_price, close_price, volume)
-                    VALUES (%(stock_code)s, %(trade_date)s, %(open_price)s, %(high_price)s, %(low_price)s, %(close_price)s, %(volume)s)
-                    ON CONFLICT (stock_code, trade_date) 
-                    DO UPDATE SET
-                        open_price = EXCLUDED.open_price,
-                        high_price = EXCLUDED.high_price,
-                        low_price = EXCLUDED.low_price,
-                        close_price = EXCLUDED.close_price,
-                        volume = EXCLUDED.volume,
-                        updated_at = CURRENT_TIMESTAMP
-                """
-                
-                db.execute_batch(query, data_to_insert)
-                updated_count += 1
-                
-                time.sleep(1.0) # 美股 API 限制可能較嚴格 (Tiingo)
-                
-            except Exception as e:
-                logger.error(f"❌ 更新 {code} 失敗: {e}")
-                error_count += 1
+        # 2. 依 sync_status 水位只抓缺少的交易日（已是最新的標的不發請求）
+        with db.get_connection() as conn:
+            # 代碼正規化、去重，並排除證券主檔中已下市的標的
+            with conn.cursor() as cursor:
+                target_codes = get_universe().filter_listed(cursor, sorted(target_codes))
+            stats = run_incremental_sync(conn, 'US', target_codes, us_fetcher(client))
         
         logger.info("=" * 60)
         logger.info("📊 更新統計")
-        logger.info(f"   目標股票: {len(target_codes)}")
-        logger.info(f"   成功更新: {updated_count}")
-        logger.info(f"   跳過/無資料: {skipped_count}")
-        logger.info(f"   錯誤: {error_count}")
+        logger.info(f"   目標股票: {stats['targets']}（已是最新 {stats['up_to_date']}）")
+        logger.info(f"   請求數: {stats['requests']}")
+        logger.info(f"   成功更新: {stats['updated']}")
+        logger.info(f"   跳過/無資料: {stats['no_data']}")
+        logger.info(f"   錯誤: {stats['errors']}")
         logger.info("=" * 60)
         logger.info("✅ 美股收盤數據更新完成")
+        return stats
         
     except Exception as e:
         logger.error(f"❌ 腳本執行失敗: {e}")
-        sys.exit(1)
-    finally:
-        db.close()
+        raise
 
 if __name__ == '__main__':
-    update_us_market_data()
+    try:
+        update_us_market_data()
+    except Exception:
+        sys.exit(1)
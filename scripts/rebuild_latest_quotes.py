@@ -0,0 +1,33 @@
+"""
+重建最新報價表 (latest_quotes)
+初次建置或資料修正後執行；日常由 DatabaseWriter 寫入價格時自動維護
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psycopg2
+from loguru import logger
+
+from config.settings import DATABASE_CONFIG
+from data_loader.latest_quotes import QUOTE_SOURCES, rebuild_latest_quotes
+
+
+def main(markets=None):
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        for market in markets or QUOTE_SOURCES:
+            with conn.cursor() as cursor:
+                try:
+                    updated = rebuild_latest_quotes(cursor, market)
+                    conn.commit()
+                    logger.success(f"✅ {market}: 更新 {updated} 個標的")
+                except Exception as e:
+                    conn.rollback()
+                    logger.error(f"❌ {market}: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or None)
@@ -0,0 +1,105 @@
+"""
+AI 任務佇列執行腳本
+
+用法：
+    # 排入決策模板（代碼可加 :us 指定市場；未指定代碼時取台股成交量前 N 名）
+    python scripts/run_ai_jobs.py enqueue 2330 2317 AAPL:us
+    python scripts/run_ai_jobs.py enqueue --top 200
+
+    # 執行佇列（中斷後重新執行即可續跑）
+    python scripts/run_ai_jobs.py work --concurrency 8
+
+    # 查看進度
+    python scripts/run_ai_jobs.py status [--batch BATCH_ID]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import psycopg2
+from loguru import logger
+
+from ai.job_queue import AIJobQueue, get_queue_status, new_batch_id
+from ai.report_generator import DecisionTemplateGenerator
+from config.settings import DATABASE_CONFIG
+
+
+def parse_targets(codes, top, conn):
+    """解析標的清單；未指定時取 latest_quotes 中 20 日均量最大的台股"""
+    if codes:
+        targets = []
+        for code in codes:
+            symbol, _, market = code.partition(':')
+            targets.append((symbol, market or 'tw'))
+        return targets
+
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT symbol FROM latest_quotes
+            WHERE market = 'tw'
+            ORDER BY avg_volume_20d DESC NULLS LAST
+            LIMIT %s
+        """, (top,))
+        return [(row[0], 'tw') for row in cursor.fetchall()]
+
+
+def enqueue(args):
+    queue = AIJobQueue()
+    generator = DecisionTemplateGenerator(ai_client=queue.client)
+    batch_id = args.batch or new_batch_id('decision')
+    try:
+        targets = parse_targets(args.codes, args.top, generator.conn)
+        queued = 0
+        for stock_code, market in targets:
+            try:
+                if generator.enqueue_decision_template(queue, stock_code, market, batch_id, args.priority):
+                    queued += 1
+            except Exception as e:
+                logger.error(f"❌ {stock_code} 排入失敗: {e}")
+        logger.success(f"✅ 批次 {batch_id}：排入 {queued}/{len(targets)} 個任務（其餘已有有效報告或已在佇列中）")
+    finally:
+        generator.close()
+
+
+def work(args):
+    queue = AIJobQueue(concurrency=args.concurrency)
+    queue.run(batch_id=args.batch)
+
+
+def status(args):
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        print(json.dumps(get_queue_status(conn, args.batch), ensure_ascii=False, indent=2, default=str))
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='AI 任務佇列')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p_enqueue = subparsers.add_parser('enqueue', help='排入決策模板任務')
+    p_enqueue.add_argument('codes', nargs='*', help='股票代碼（CODE 或 CODE:us）')
+    p_enqueue.add_argument('--top', type=int, default=200, help='未指定代碼時取前 N 檔')
+    p_enqueue.add_argument('--batch', help='批次 ID（預設自動產生）')
+    p_enqueue.add_argument('--priority', type=int, default=100)
+    p_enqueue.set_defaults(func=enqueue)
+
+    p_work = subparsers.add_parser('work', help='執行佇列')
+    p_work.add_argument('--concurrency', type=int, help='並行數（預設 AI_JOB_CONCURRENCY）')
+    p_work.add_argument('--batch', help='只處理指定批次')
+    p_work.set_defaults(func=work)
+
+    p_status = subparsers.add_parser('status', help='查看進度')
+    p_status.add_argument('--batch', help='批次 ID')
+    p_status.set_defaults(func=status)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,431 @@
+"""
+壓力測試用合成資料
+
+在獨立的資料庫（預設 LOADTEST_CONFIG['database'] = quant_bench）依序套用
+database/schema.sql、chips_analysis_schema.sql 與 partitioning.sql（與正式環境相同的表格與按年分區），
+並以固定亂數種子產生可重現的資料：
+- 台股 / 美股日線 OHLCV（幾何布朗運動 + 波動叢聚，部分標的中途上市）
+- 均線（technical_indicators 的 ma_5/10/20/60 欄位）與 RSI(14)
+- 三大法人買賣超、融資融券（台股每日）、TDCC 股權分散（台股每週）
+寫入後校正 table_row_counts、重建 latest_quotes、ANALYZE，並輸出資料集描述檔
+（標的列表、筆數與指紋），供 scripts/load_test.py 選取標的並寫入報告。
+
+用法：
+    python scripts/seed_benchmark_data.py                      # 1800 檔台股 + 600 檔美股 × 20 年
+    python scripts/seed_benchmark_data.py --tw 200 --us 50 --years 5 --reset
+啟動 API 時以 DB_NAME=quant_bench 指向此資料庫。
+"""
+import argparse
+import hashlib
+import io
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from loguru import logger
+
+from calculators import indicator_kernels as kernels
+from config.settings import DATABASE_CONFIG, LOADTEST_CONFIG
+from data_loader.latest_quotes import rebuild_latest_quotes
+from data_loader.partitions import PARTITIONED_TABLES, apply_partitioning, ensure_yearly_partitions
+from data_loader.sync_planner import SYNC_SOURCES
+from data_loader.table_stats import reconcile_row_counts
+
+DATABASE_DIR = Path(__file__).parent.parent / 'database'
+SCHEMA_FILES = [DATABASE_DIR / 'schema.sql', DATABASE_DIR / 'chips_analysis_schema.sql']
+PARTITION_FILE = DATABASE_DIR / 'partitioning.sql'
+MANIFEST_FILE = LOADTEST_CONFIG['report_dir'] / 'dataset.json'
+
+MA_PERIODS = (5, 10, 20, 60)
+RSI_PERIOD = 14
+# 上市日隨機的標的比例（其餘自資料起始日即有價格）
+LATE_LISTING_RATIO = 0.3
+BATCH_SYMBOLS = 100
+
+# 寫入資料的表格（完成後以 COUNT(*) 校正 table_row_counts）
+TABLES = [
+    'tw_stock_info', 'us_stock_info', 'tw_stock_prices', 'us_stock_prices',
+    'technical_indicators', 'institutional_trades', 'margin_trading',
+    'shareholder_dispersion', 'latest_quotes',
+]
+TDCC_BUCKETS = [
+    'holders_1_999', 'holders_1k_5k', 'holders_5k_10k', 'holders_10k_15k', 'holders_15k_20k',
+    'holders_20k_30k', 'holders_30k_40k', 'holders_40k_50k', 'holders_50k_100k',
+    'holders_100k_200k', 'holders_200k_400k', 'holders_400k_600k', 'holders_600k_800k',
+    'holders_800k_1m', 'holders_over_1m',
+]
+INDUSTRIES = ['半導體', '電子零組件', '電腦週邊', '金融保險', '航運', '鋼鐵', '塑膠', '生技醫療', '食品', '營建']
+SECTORS = ['Technology', 'Financials', 'Health Care', 'Energy', 'Industrials', 'Consumer', 'Utilities']
+
+
+# ========== 資料產生（純函式，依亂數種子可重現） ==========
+
+def synthetic_symbols(market: str, count: int) -> list:
+    """台股為 1101 起的四位數代碼，美股為四碼英文代號"""
+    if market == 'tw':
+        if count > 8899:
+            raise ValueError('台股代碼最多 8899 檔')
+        return [str(1101 + i) for i in range(count)]
+    letters = []
+    for i in range(count):
+        code = ''
+        for _ in range(4):
+            i, r = divmod(i, 26)
+            code = chr(ord('A') + r) + code
+        letters.append(code)
+    return letters
+
+
+def trading_days(years: int, end: date = None) -> np.ndarray:
+    """最近 years 年的平日（datetime64[D]）"""
+    end = pd.Timestamp(end or date.today() - timedelta(days=1))
+    return pd.bdate_range(end - pd.DateOffset(years=years), end).values.astype('datetime64[D]')
+
+
+def generate_prices(rng, count: int, days: int, decimals: int = 2) -> dict:
+    """
+    產生 count × days 的日線 OHLCV
+
+    對數價格 = 長期趨勢 + 均值回歸的偏離（AR(1)），避免 20 年後價格發散；
+    波動度為 AR(1) 的對數波動率（波動叢聚），成交量與當日漲跌幅絕對值正相關。
+    上市前的位置為 NaN
+    """
+    drift = rng.normal(0.0002, 0.0002, count)[:, None]
+    base_vol = rng.uniform(0.01, 0.025, count)[:, None]
+
+    vol_shocks = rng.normal(0, 0.08, (count, days))
+    price_shocks = rng.standard_normal((count, days))
+    log_vol = np.zeros((count, days))
+    deviation = np.zeros((count, days))
+    for t in range(1, days):
+        log_vol[:, t] = 0.97 * log_vol[:, t - 1] + vol_shocks[:, t]
+        deviation[:, t] = 0.998 * deviation[:, t - 1] + base_vol[:, 0] * np.exp(log_vol[:, t]) * price_shocks[:, t]
+    sigma = base_vol * np.exp(log_vol)
+
+    start_price = np.clip(rng.lognormal(np.log(50), 1.0, count), 5, 2000)[:, None]
+    log_price = np.log(start_price) + drift * np.arange(days)[None, :] + deviation
+    close = np.exp(log_price)
+    returns = np.diff(log_price, axis=1, prepend=log_price[:, :1])
+    prev_close = np.concatenate([start_price, close[:, :-1]], axis=1)
+    open_ = prev_close * np.exp(rng.normal(0, 0.3, (count, days)) * sigma)
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.5, (count, days))) * sigma)
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.5, (count, days))) * sigma)
+    base_volume = rng.lognormal(np.log(2_000_000), 1.0, count)[:, None]
+    volume = base_volume * rng.lognormal(0, 0.4, (count, days)) * (1 + 20 * np.abs(returns))
+
+    listing = np.where(
+        rng.random(count) < LATE_LISTING_RATIO,
+        rng.integers(0, max(days - 260, 1), count),
+        0
+    )
+    listed = np.arange(days)[None, :] >= listing[:, None]
+
+    prices = {
+        'open_price': np.round(open_, decimals),
+        'high_price': np.round(high, decimals),
+        'low_price': np.round(low, decimals),
+        'close_price': np.round(close, decimals),
+    }
+    for values in prices.values():
+        values[~listed] = np.nan
+    prices['volume'] = np.where(listed, np.round(volume), np.nan)
+    return prices
+
+
+def generate_indicators(close: np.ndarray) -> dict:
+    """technical_indicators 欄位：各週期均線 ma_<週期> 與 rsi_14"""
+    indicators = {f'ma_{period}': np.round(kernels.sma(close, period), 4) for period in MA_PERIODS}
+    indicators[f'rsi_{RSI_PERIOD}'] = np.round(kernels.rsi(close, RSI_PERIOD), 2)
+    return indicators
+
+
+def generate_chips(rng, prices: dict) -> tuple:
+    """三大法人（張）與融資融券餘額；法人買賣超方向與當日漲跌相關"""
+    close, volume = prices['close_price'], prices['volume']
+    count, days = close.shape
+    listed = ~np.isnan(close)
+    lots = np.nan_to_num(volume / 1000)
+    move = np.sign(np.nan_to_num(np.diff(close, axis=1, prepend=close[:, :1])))
+
+    trades = {}
+    for name, share, bias in (('foreign', 0.25, 0.08), ('trust', 0.05, 0.05), ('dealer', 0.08, 0.03)):
+        gross = lots * share * rng.uniform(0.5, 1.5, (count, days))
+        tilt = np.clip(0.5 + bias * move + rng.normal(0, 0.1, (count, days)), 0.05, 0.95)
+        trades[f'{name}_buy'] = np.round(gross * tilt)
+        trades[f'{name}_sell'] = np.round(gross * (1 - tilt))
+        trades[f'{name}_net'] = trades[f'{name}_buy'] - trades[f'{name}_sell']
+    trades['close_price'] = close
+
+    average_lots = np.nanmean(np.where(listed, lots, np.nan), axis=1)[:, None]
+    margin_balance = np.abs(average_lots * (1 + np.cumsum(rng.normal(0, 0.02, (count, days)), axis=1)))
+    short_balance = margin_balance * np.clip(rng.normal(0.15, 0.05, (count, 1)), 0.01, 0.5)
+    margins = {
+        'margin_balance': np.round(margin_balance),
+        'margin_quota': np.round(np.repeat(margin_balance.max(axis=1, keepdims=True) * 1.5, days, axis=1)),
+        'short_balance': np.round(short_balance),
+        'short_quota': np.round(np.repeat(short_balance.max(axis=1, keepdims=True) * 1.5, days, axis=1)),
+    }
+    for table in (trades, margins):
+        for key, values in table.items():
+            if key != 'close_price':
+                table[key] = np.where(listed, values, np.nan)
+    return trades, margins
+
+
+def generate_tdcc(rng, count: int, weeks: int) -> dict:
+    """每週股權分散：各級距人數以 Dirichlet 比例分配，大戶持股比例緩慢漂移"""
+    totals = rng.lognormal(np.log(30000), 1.0, count)[:, None] * (
+        1 + np.cumsum(rng.normal(0, 0.01, (count, weeks)), axis=1)
+    )
+    shares = rng.dirichlet(np.linspace(6, 0.3, len(TDCC_BUCKETS)), count)
+    data = {
+        bucket: np.round(np.abs(totals) * shares[:, i:i + 1])
+        for i, bucket in enumerate(TDCC_BUCKETS)
+    }
+    data['total_shareholders'] = sum(data[bucket] for bucket in TDCC_BUCKETS)
+    large = np.clip(rng.uniform(0.3, 0.8, (count, 1)) + np.cumsum(rng.normal(0, 0.002, (count, weeks)), axis=1), 0, 1)
+    data['large_holders_percentage'] = np.round(large, 4)
+    data['shares_over_1m'] = np.round(large * rng.lognormal(np.log(5e8), 1.0, (count, 1)))
+    return data
+
+
+# ========== 寫入 ==========
+
+def connect(database: str, autocommit: bool = False):
+    conn = psycopg2.connect(**{**DATABASE_CONFIG, 'database': database})
+    conn.autocommit = autocommit
+    return conn
+
+
+def ensure_database(database: str):
+    """資料庫不存在時建立"""
+    conn = connect('postgres', autocommit=True)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (database,))
+            if cursor.fetchone() is None:
+                cursor.execute(f'CREATE DATABASE "{database}"')
+                logger.info(f"建立資料庫 {database}")
+    finally:
+        conn.close()
+
+
+def apply_schema(conn):
+    """套用正式環境的 schema 與按年分區"""
+    with conn.cursor() as cursor:
+        for schema_file in SCHEMA_FILES:
+            cursor.execute(schema_file.read_text(encoding='utf-8'))
+    conn.commit()
+
+    failed = apply_partitioning(conn, PARTITION_FILE.read_text(encoding='utf-8'))
+    conn.autocommit = False
+    if failed:
+        raise RuntimeError(f"分區遷移失敗：{', '.join(failed)}")
+    logger.info(f"已套用 {', '.join(f.name for f in SCHEMA_FILES + [PARTITION_FILE])}")
+
+
+def ensure_partitions(conn, dates: np.ndarray):
+    """預先建立資料涵蓋年度的分區（避免歷史資料全部落在 _default 分區）"""
+    years = [date(int(year), 1, 1) for year in np.unique(pd.DatetimeIndex(dates).year)]
+    with conn.cursor() as cursor:
+        created = sum(ensure_yearly_partitions(cursor, table, years) for table in PARTITIONED_TABLES)
+    conn.commit()
+    logger.info(f"建立 {created} 個年度分區")
+
+
+def long_frame(codes: list, dates: np.ndarray, columns: dict, keys: dict = None,
+               key: str = 'stock_code') -> pd.DataFrame:
+    """count × days 的欄位陣列 → 長表格式（略過第一個欄位為 NaN 的位置；key 為標的欄位名稱）"""
+    first = next(iter(columns.values()))
+    mask = ~np.isnan(first).ravel()
+    frame = {
+        key: np.repeat(np.asarray(codes, dtype=object), len(dates))[mask],
+        **(keys or {}),
+        'trade_date': np.tile(np.datetime_as_string(dates), len(codes))[mask],
+    }
+    for name, values in columns.items():
+        frame[name] = values.ravel()[mask]
+    return pd.DataFrame(frame)
+
+
+def copy_frame(cursor, table: str, frame: pd.DataFrame, int_columns=()) -> int:
+    """以 COPY 寫入（NaN 寫為 NULL）"""
+    if frame.empty:
+        return 0
+    for column in int_columns:
+        frame[column] = frame[column].astype('Int64')
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, na_rep='')
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return len(frame)
+
+
+def seed_market(conn, rng, market: str, codes: list, dates: np.ndarray, weekly: np.ndarray) -> dict:
+    """分批產生並寫入單一市場的價格、指標與籌碼"""
+    rows = {}
+    decimals = 2 if market == 'tw' else 4
+    source = SYNC_SOURCES[market.upper()]
+
+    def add(table, count):
+        rows[table] = rows.get(table, 0) + count
+
+    for start in range(0, len(codes), BATCH_SYMBOLS):
+        batch = codes[start:start + BATCH_SYMBOLS]
+        prices = generate_prices(rng, len(batch), len(dates), decimals)
+        with conn.cursor() as cursor:
+            add(source['table'], copy_frame(
+                cursor, source['table'],
+                long_frame(batch, dates, prices, key=source['key']),
+                int_columns=('volume',)
+            ))
+            indicators = long_frame(
+                batch, dates, generate_indicators(prices['close_price']),
+                {'security_type': market.upper()}, key='security_code'
+            )
+            add('technical_indicators', copy_frame(cursor, 'technical_indicators', indicators))
+
+            if market == 'tw':
+                trades, margins = generate_chips(rng, prices)
+                add('institutional_trades', copy_frame(
+                    cursor, 'institutional_trades', long_frame(batch, dates, trades),
+                    int_columns=[name for name in trades if name != 'close_price']
+                ))
+                add('margin_trading', copy_frame(
+                    cursor, 'margin_trading', long_frame(batch, dates, margins), int_columns=list(margins)
+                ))
+                tdcc = long_frame(batch, weekly, generate_tdcc(rng, len(batch), len(weekly)))
+                add('shareholder_dispersion', copy_frame(
+                    cursor, 'shareholder_dispersion', tdcc.rename(columns={'trade_date': 'data_date'}),
+                    int_columns=TDCC_BUCKETS + ['total_shareholders', 'shares_over_1m']
+                ))
+        conn.commit()
+        logger.info(f"{market}: {min(start + BATCH_SYMBOLS, len(codes))}/{len(codes)} 檔")
+    return rows
+
+
+def seed_info(conn, rng, tw_codes: list, us_codes: list):
+    with conn.cursor() as cursor:
+        copy_frame(cursor, 'tw_stock_info', pd.DataFrame({
+            'stock_code': tw_codes,
+            'stock_name': [f'合成{code}' for code in tw_codes],
+            'industry': rng.choice(INDUSTRIES, len(tw_codes)),
+            'market': rng.choice(['TWSE', 'TPEX'], len(tw_codes), p=[0.55, 0.45]),
+        }))
+        copy_frame(cursor, 'us_stock_info', pd.DataFrame({
+            'symbol': us_codes,
+            'company_name': [f'Synthetic {code} Inc.' for code in us_codes],
+            'sector': rng.choice(SECTORS, len(us_codes)),
+            'exchange': rng.choice(['NYSE', 'NASDAQ'], len(us_codes)),
+            'market_cap': np.round(rng.lognormal(np.log(5e9), 1.5, len(us_codes))).astype(np.int64),
+        }))
+    conn.commit()
+
+
+def finalize(conn, dates: np.ndarray):
+    """計數校正、最新報價、同步狀態與統計資訊"""
+    latest = str(dates[-1])
+    with conn.cursor() as cursor:
+        for market in ('tw', 'us'):
+            rebuild_latest_quotes(cursor, market)
+        counts = reconcile_row_counts(cursor, TABLES)
+        for source in ('taiwan_stock', 'us_stock', 'institutional', 'tdcc'):
+            cursor.execute("""
+                INSERT INTO sync_status (data_source, source_identifier, last_sync_date, last_sync_timestamp,
+                                         sync_status, earliest_date, latest_date)
+                VALUES (%s, 'benchmark', %s, NOW(), 'success', %s, %s)
+                ON CONFLICT (data_source, source_identifier) DO UPDATE SET
+                    last_sync_date = EXCLUDED.last_sync_date, latest_date = EXCLUDED.latest_date, updated_at = NOW()
+            """, (source, latest, str(dates[0]), latest))
+    conn.commit()
+
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    conn.autocommit = False
+    return counts
+
+
+def dataset_fingerprint(manifest: dict) -> str:
+    """資料集參數的指紋（相同指紋的報告才可直接比較）"""
+    keys = ('seed', 'start_date', 'end_date', 'markets', 'ma_periods')
+    payload = json.dumps({key: manifest[key] for key in keys}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='產生壓力測試用合成資料')
+    parser.add_argument('--database', default=LOADTEST_CONFIG['database'], help='目標資料庫')
+    parser.add_argument('--tw', type=int, default=1800, help='台股檔數')
+    parser.add_argument('--us', type=int, default=600, help='美股檔數')
+    parser.add_argument('--years', type=int, default=20, help='歷史年數')
+    parser.add_argument('--end', type=date.fromisoformat, help='資料最後日期（預設昨日）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='先清空測試資料庫（重建 public schema）')
+    parser.add_argument('--manifest', type=Path, default=MANIFEST_FILE, help='資料集描述檔輸出路徑')
+    parser.add_argument('--allow-main-db', action='store_true', help='允許寫入 DATABASE_CONFIG 的正式資料庫')
+    args = parser.parse_args()
+
+    if args.database == DATABASE_CONFIG['database'] and not args.allow_main_db:
+        parser.error(f'{args.database} 為正式資料庫，請改用獨立資料庫或加上 --allow-main-db')
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(args.seed)
+    dates = trading_days(args.years, args.end)
+    weekly = dates[pd.DatetimeIndex(dates).weekday == 4]
+    tw_codes, us_codes = synthetic_symbols('tw', args.tw), synthetic_symbols('us', args.us)
+
+    ensure_database(args.database)
+    conn = connect(args.database)
+    try:
+        with conn.cursor() as cursor:
+            if args.reset:
+                cursor.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+            cursor.execute("SELECT to_regclass('tw_stock_prices') IS NULL")
+            fresh = cursor.fetchone()[0]
+        conn.commit()
+        # schema.sql 的 CREATE INDEX 不可重複執行，已建立過的資料庫沿用既有表格
+        if fresh:
+            apply_schema(conn)
+        ensure_partitions(conn, dates)
+
+        seed_info(conn, rng, tw_codes, us_codes)
+        rows = {}
+        for market, codes in (('tw', tw_codes), ('us', us_codes)):
+            for table, count in seed_market(conn, rng, market, codes, dates, weekly).items():
+                rows[table] = rows.get(table, 0) + count
+        counts = finalize(conn, dates)
+    finally:
+        conn.close()
+
+    manifest = {
+        'database': args.database,
+        'seed': args.seed,
+        'generated_at': datetime.now().isoformat(),
+        'start_date': str(dates[0]),
+        'end_date': str(dates[-1]),
+        'trading_days': len(dates),
+        'markets': {'tw': len(tw_codes), 'us': len(us_codes)},
+        'ma_periods': list(MA_PERIODS),
+        'rows': counts or rows,
+        'symbols': {'tw': tw_codes, 'us': us_codes},
+    }
+    manifest['fingerprint'] = dataset_fingerprint(manifest)
+    args.manifest.parent.mkdir(parents=True, exist_ok=True)
+    args.manifest.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    logger.success(
+        f"✅ {args.database}: {sum(rows.values()):,} 筆，耗時 {time.perf_counter() - started:.0f} 秒，"
+        f"描述檔 {args.manifest}（指紋 {manifest['fingerprint']}）"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+系統 API 狀態端點
+/api/system/api-status 以實際流量回報各資料來源的健康度與配額：
+- 各 API 客戶端（BaseAPIClient、Gemini）寫入 api_call_stats 的統計，加上本程序尚未寫入的增量
+- uptime 為近 N 日成功率，latency 為今日 p50（另附 p95 / p99）
+- requestsToday / quotaRemaining 為所有程序今日的實際請求數與剩餘每日配額
+"""
+from flask import Blueprint, jsonify, request
+import psycopg2
+import os
+import time
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from utils import api_telemetry
+from utils.metrics import metrics
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), 'config', '.env'))
+
+system_status_bp = Blueprint('system_status_api', __name__)
+
+# 來源 → (顯示名稱, 分類)
+SOURCE_INFO = {
+    'twse': ('TWSE OpenAPI', '台股資料'),
+    'tpex': ('TPEX OpenAPI', '台股資料'),
+    'twstock': ('twstock', '台股資料'),
+    'tdcc': ('TDCC 集保', '籌碼資料'),
+    'yfinance': ('Yahoo Finance', '市場資料'),
+    'tiingo': ('Tiingo', '美股資料'),
+    'alpha_vantage': ('Alpha Vantage', '金融新聞'),
+    'marketaux': ('Marketaux', '金融新聞'),
+    'gold_api': ('GoldAPI', '黃金價格'),
+    'exchange_rate_api': ('ExchangeRate-API', '匯率'),
+    'fred': ('FRED', '宏觀經濟'),
+    'finnhub': ('Finnhub', '市場資料'),
+    'fmp': ('Financial Modeling Prep', '基本面'),
+    'gemini': ('Gemini AI', 'AI服務'),
+}
+
+# 錯誤率（%）門檻與配額警示比例
+ERROR_RATE_CRITICAL = 50
+ERROR_RATE_WARNING = 10
+QUOTA_WARNING_RATIO = 0.1
+
+def get_db():
+    return psycopg2.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '15432')),
+        database=os.getenv('DB_NAME', 'quant_db'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'postgres')
+    )
+
+def source_status(summary):
+    """依今日錯誤率、最近一次呼叫結果與剩餘配額判斷狀態"""
+    if not summary['requests']:
+        return 'unknown'
+    last_failed = summary['last_error_at'] and (
+        not summary['last_success_at'] or summary['last_error_at'] > summary['last_success_at']
+    )
+    if summary['error_rate'] >= ERROR_RATE_CRITICAL or (last_failed and summary['error_rate'] >= ERROR_RATE_WARNING):
+        return 'error'
+    limit, remaining = summary['daily_limit'], summary['quota_remaining']
+    if summary['error_rate'] >= ERROR_RATE_WARNING or last_failed or (limit and remaining <= limit * QUOTA_WARNING_RATIO):
+        return 'warning'
+    return 'healthy'
+
+def source_entry(source, today, history):
+    """單一來源的狀態（欄位與前端 APIManagement 頁面相同，另附遙測明細）"""
+    summary = api_telemetry.summarize(source, today)
+    recent = history or api_telemetry.SourceStats()
+    name, category = SOURCE_INFO.get(source, (source, '其他'))
+    limit = summary['daily_limit']
+    last_success = summary['last_success_at'] or recent.last_success_at
+    return {
+        'name': name,
+        'source': source,
+        'category': category,
+        'status': source_status(summary),
+        'uptime': round((1 - recent.errors / recent.requests) * 100, 1) if recent.requests else None,
+        'latency': summary['latency_p50_ms'],
+        'latencyP95': summary['latency_p95_ms'],
+        'latencyP99': summary['latency_p99_ms'],
+        'lastUpdate': last_success.isoformat() if last_success else '無成功紀錄',
+        'requestsToday': summary['requests'],
+        'errorRate': summary['error_rate'],
+        'retries': summary['retries'],
+        'cacheHits': summary['cache_hits'],
+        'rateLimitWaits': summary['rate_limit_waits'],
+        'dailyLimit': limit,
+        'quotaRemaining': summary['quota_remaining'],
+        'rateLimit': f"{limit}次/日（剩餘 {summary['quota_remaining']}）" if limit else '無每日上限',
+        'lastError': summary['last_error'],
+    }
+
+def database_entry():
+    """資料庫：實測連線延遲，查詢統計取自本程序的效能量測"""
+    db = metrics.snapshot()['db']
+    entry = {
+        'name': 'PostgreSQL Database',
+        'source': 'database',
+        'category': '資料庫',
+        'status': 'healthy',
+        'uptime': None,
+        'latency': None,
+        'latencyP95': db['p95_ms'],
+        'lastUpdate': datetime.now().isoformat(),
+        'requestsToday': db['count'],
+        'errorRate': 0,
+        'rateLimit': '無限制',
+    }
+    try:
+        started = time.perf_counter()
+        conn = get_db()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            conn.close()
+        entry['latency'] = round((time.perf_counter() - started) * 1000, 1)
+        entry['uptime'] = 100.0
+    except Exception as e:
+        entry.update(status='error', errorRate=100, uptime=0.0, lastError=str(e))
+    return entry
+
+@system_status_bp.route('/api/system/api-status', methods=['GET'])
+def get_api_status():
+    """
+    各資料來源的實際狀態（?days= 指定 uptime 統計天數，預設 7）
+
+    只列出統計期間內有流量或設定了每日上限的來源
+    """
+    try:
+        days = max(1, min(int(request.args.get('days', 7)), 90))
+    except ValueError:
+        return jsonify({'error': 'days 必須為整數'}), 400
+
+    today_date = date.today()
+    conn = None
+    try:
+        conn = get_db()
+        today = api_telemetry.collect_stats(conn)
+        history = api_telemetry.collect_stats(conn, today_date - timedelta(days=days - 1))
+        persisted = True
+    except Exception:
+        # 資料庫無法連線時只回報本程序的統計
+        today = history = api_telemetry.collect_stats()
+        persisted = False
+    finally:
+        if conn:
+            conn.close()
+
+    sources = [
+        source for source in list(SOURCE_INFO) + sorted(set(history) - set(SOURCE_INFO))
+        if source in history or api_telemetry.quota_remaining(None, source) is not None
+    ]
+    return jsonify({
+        'apis': [database_entry()] + [source_entry(s, today.get(s), history.get(s)) for s in sources],
+        'uptimeDays': days,
+        'aggregated': persisted,
+        'timestamp': datetime.now().isoformat()
+    })
@@ -0,0 +1,282 @@
+"""
+計算模組效能基準的共用設定：合成資料、資料規模分級、峰值記憶體與基準比較
+
+資料規模為「標的數 × 年數」（每年 252 個交易日），依 BENCH_TIER 選擇：
+    small（預設）: 1×1、1×10、1×30、100×1、100×10
+    medium:       另加 100×30、2000×1、2000×10
+    full:         另加 2000×30（向量化指標約需 3 GB 記憶體）
+
+效能基準不隨一般測試執行（`pytest tests` 會略過本目錄）；以下任一方式啟用：
+    pytest tests/benchmarks                       # 明確指定本目錄或其中的檔案
+    pytest tests --benchmark-only
+    BENCH_TIER=small pytest tests                 # 設定任一 BENCH_* 環境變數
+
+基準比較（不需資料庫）：
+    BENCH_SAVE_BASELINE=1 pytest tests/benchmarks/test_calculator_benchmarks.py   # 儲存基準
+    pytest tests/benchmarks/test_calculator_benchmarks.py                         # 與基準比較
+
+時間（中位數）增幅超過 BENCH_MAX_TIME_REGRESSION%（預設 25）或峰值記憶體增幅超過
+BENCH_MAX_MEMORY_REGRESSION%（預設 10）時該測試失敗。基準檔預設為
+.benchmarks/calculator_baseline.json（BENCH_BASELINE 可指定），記錄機器資訊；
+與目前機器不同時只提示不比較（BENCH_COMPARE_ANY_MACHINE=1 強制比較）。
+"""
+
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+TRADING_DAYS_PER_YEAR = 252
+# 逐檔計算的案例輪流使用的獨立價格序列數（避免 2000 檔 × 30 年的輸入佔用過多記憶體）
+POOL_SIZE = 100
+
+SIZES = [(1, 1), (1, 10), (1, 30), (100, 1), (100, 10), (100, 30), (2000, 1), (2000, 10), (2000, 30)]
+TIER_MAX_CELLS = {'small': 100 * 10 * TRADING_DAYS_PER_YEAR, 'medium': 2000 * 10 * TRADING_DAYS_PER_YEAR,
+                  'full': float('inf')}
+TIER = os.getenv('BENCH_TIER', 'small')
+
+BASELINE_PATH = Path(os.getenv(
+    'BENCH_BASELINE', Path(__file__).parent.parent.parent / '.benchmarks' / 'calculator_baseline.json'
+))
+SAVE_BASELINE = os.getenv('BENCH_SAVE_BASELINE', '') == '1'
+COMPARE_ANY_MACHINE = os.getenv('BENCH_COMPARE_ANY_MACHINE', '') == '1'
+MAX_TIME_REGRESSION = float(os.getenv('BENCH_MAX_TIME_REGRESSION', 25))
+MAX_MEMORY_REGRESSION = float(os.getenv('BENCH_MAX_MEMORY_REGRESSION', 10))
+# 低於此絕對差距的變化視為量測雜訊
+MIN_TIME_DELTA = 0.0005
+MIN_MEMORY_DELTA_MB = 1.0
+# 每輪至少量測的時間（過快的函式在同一輪內重複呼叫）
+MIN_ROUND_TIME = 0.02
+
+if TIER not in TIER_MAX_CELLS:
+    raise pytest.UsageError(f"BENCH_TIER 必須為 {', '.join(TIER_MAX_CELLS)}")
+
+BENCHMARK_DIR = Path(__file__).parent
+
+
+def benchmarks_enabled(config) -> bool:
+    """是否執行效能基準：--benchmark-only、任一 BENCH_* 環境變數，或命令列明確指定本目錄"""
+    if config.getoption('benchmark_only', False):
+        return True
+    if any(name.startswith('BENCH_') for name in os.environ):
+        return True
+    for arg in config.args:
+        path = Path(arg.split('::', 1)[0]).resolve()
+        if path == BENCHMARK_DIR or BENCHMARK_DIR in path.parents:
+            return True
+    return False
+
+
+def pytest_collection_modifyitems(config, items):
+    # 一般測試（pytest / pytest tests）不跑效能基準，整組約需數分鐘
+    if benchmarks_enabled(config):
+        return
+    selected, deselected = [], []
+    for item in items:
+        (deselected if BENCHMARK_DIR in Path(str(item.fspath)).parents else selected).append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+def size_params(symbols_only=False):
+    """目前分級的資料規模參數（symbols_only 時只依標的數變化，年數固定為 1）"""
+    params = []
+    for symbols, years in SIZES:
+        if symbols_only and years != 1:
+            continue
+        cells = symbols * (1 if symbols_only else years) * TRADING_DAYS_PER_YEAR
+        if cells <= TIER_MAX_CELLS[TIER]:
+            params.append(pytest.param((symbols, years), id=f'{symbols}x{years}y'))
+    return params
+
+
+class MarketFixture:
+    """
+    合成市場資料（標的 × 交易日），各欄位以獨立的亂數種子延遲產生
+
+    matrix_*: 完整的 symbols × days 矩陣（向量化指標用）
+    pool_*:   最多 POOL_SIZE 檔的獨立序列，逐檔計算的案例以 series(i) 輪流取用
+    """
+
+    def __init__(self, symbols, years, seed=42):
+        self.symbols, self.years, self.seed = symbols, years, seed
+        self.days = years * TRADING_DAYS_PER_YEAR
+        self.dates = pd.bdate_range('2000-01-03', periods=self.days)
+
+    def _rng(self, name):
+        return np.random.default_rng([self.seed, sum(map(ord, name)), self.symbols, self.days])
+
+    def _ohlcv(self, name, rows):
+        rng = self._rng(name)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (rows, self.days)), axis=1))
+        spread = close * rng.uniform(0, 0.02, (rows, self.days))
+        volume = rng.lognormal(np.log(2_000_000), 0.5, (rows, self.days)).round()
+        return {'high': close + spread, 'low': close - spread, 'close': close, 'volume': volume}
+
+    @cached_property
+    def matrix(self):
+        return self._ohlcv('matrix', self.symbols)
+
+    @cached_property
+    def pool(self):
+        return self._ohlcv('pool', min(self.symbols, POOL_SIZE))
+
+    @cached_property
+    def chips_pool(self):
+        rng = self._rng('chips')
+        shape = (min(self.symbols, POOL_SIZE), self.days)
+        trades = {
+            f'{name}_{side}': rng.integers(0, scale, shape).astype(np.float64)
+            for name, scale in (('foreign', 20000), ('trust', 3000), ('dealer', 5000))
+            for side in ('buy', 'sell')
+        }
+        trades['close_price'] = self.pool['close']
+        margin = np.abs(60000 + np.cumsum(rng.normal(0, 500, shape), axis=1))
+        short = margin * 0.15
+        margins = {
+            'margin_balance': margin, 'margin_quota': np.full(shape, margin.max() * 1.5),
+            'short_balance': short, 'short_quota': np.full(shape, short.max() * 1.5),
+        }
+        return trades, margins
+
+    def series(self, i):
+        """第 i 檔（輪流取自 pool）的 {欄位: 一維陣列}"""
+        row = i % len(self.pool['close'])
+        return {name: values[row] for name, values in self.pool.items()}
+
+    def chips(self, i):
+        row = i % len(self.pool['close'])
+        trades, margins = self.chips_pool
+        return {k: v[row] for k, v in trades.items()}, {k: v[row] for k, v in margins.items()}
+
+    def returns_frame(self, assets):
+        """前 assets 檔的日報酬率 DataFrame（量化引擎用）"""
+        close = self.pool['close'][:assets]
+        returns = close[:, 1:] / close[:, :-1] - 1
+        return pd.DataFrame(returns.T, index=self.dates[1:], columns=[f'S{i:04d}' for i in range(assets)])
+
+
+@pytest.fixture(scope='module')
+def market(request):
+    """依參數 (symbols, years) 建立的合成資料；同一規模在模組內共用"""
+    symbols, years = request.param
+    return MarketFixture(symbols, years)
+
+
+# ========== 基準儲存與比較 ==========
+
+def machine_info():
+    return {
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+class BaselineStore:
+    """各案例的時間中位數與峰值記憶體基準"""
+
+    def __init__(self, path):
+        self.path = path
+        self.machine = machine_info()
+        self.baseline = json.loads(path.read_text(encoding='utf-8')) if path.exists() else None
+        self.results = {}
+        self.comparable = bool(self.baseline) and (
+            COMPARE_ANY_MACHINE or self.baseline.get('machine') == self.machine
+        )
+        if self.baseline and not self.comparable:
+            warnings.warn(f'{path} 為其他機器的基準（{self.baseline.get("machine")}），不進行比較')
+
+    def regressions(self, key, record):
+        """與基準相比超過門檻的項目說明（無基準或不可比較時為空）"""
+        if not self.comparable or SAVE_BASELINE:
+            return []
+        previous = self.baseline['results'].get(key)
+        if not previous:
+            return []
+        problems = []
+        old, new = previous.get('time_s'), record['time_s']
+        if old and new and new - old > MIN_TIME_DELTA and (new - old) / old * 100 > MAX_TIME_REGRESSION:
+            problems.append(f'時間 {old * 1000:.2f} → {new * 1000:.2f} ms（+{(new - old) / old * 100:.0f}%）')
+        old, new = previous.get('peak_mb'), record['peak_mb']
+        if old is not None and new - old > MIN_MEMORY_DELTA_MB and (new - old) / max(old, 1e-9) * 100 > MAX_MEMORY_REGRESSION:
+            problems.append(f'峰值記憶體 {old:.1f} → {new:.1f} MB（+{(new - old) / max(old, 1e-9) * 100:.0f}%）')
+        return problems
+
+    def save(self):
+        # 與既有基準合併，只跑部分案例時不會清掉其他案例
+        results = dict((self.baseline or {}).get('results', {})) if self.comparable else {}
+        results.update(self.results)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({
+            'machine': self.machine,
+            'updated_at': datetime.now().isoformat(),
+            'results': dict(sorted(results.items())),
+        }, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+@pytest.fixture(scope='session')
+def calculator_baseline():
+    store = BaselineStore(BASELINE_PATH)
+    yield store
+    if SAVE_BASELINE and store.results:
+        store.save()
+
+
+def peak_memory_mb(func, *args):
+    """單次呼叫期間新配置記憶體的峰值（tracemalloc，含 NumPy 陣列）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+@pytest.fixture
+def measure(benchmark, calculator_baseline, request):
+    """
+    量測 func(*args) 的時間與峰值記憶體，記錄並與基準比較
+
+    時間由 pytest-benchmark 量測（--benchmark-disable 時只量記憶體）
+    """
+    def run(group, func, *args):
+        started = time.perf_counter()
+        func(*args)
+        single = time.perf_counter() - started
+        iterations = int(min(max(MIN_ROUND_TIME // max(single, 1e-9), 1), 1000))
+
+        benchmark.group = group
+        result = benchmark.pedantic(func, args=args, rounds=5 if single < 1 else 3,
+                                    iterations=iterations, warmup_rounds=0)
+        record = {
+            'time_s': benchmark.stats.stats.median if benchmark.stats is not None else None,
+            'peak_mb': round(peak_memory_mb(func, *args), 3),
+        }
+        benchmark.extra_info['peak_memory_mb'] = record['peak_mb']
+
+        key = f'{request.node.module.__name__.rsplit(".", 1)[-1]}::{request.node.name}'
+        calculator_baseline.results[key] = record
+        problems = calculator_baseline.regressions(key, record)
+        if problems:
+            pytest.fail(f"{key} 效能退步：{'；'.join(problems)}")
+        return result
+
+    return run
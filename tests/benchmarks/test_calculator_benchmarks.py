@@ -0,0 +1,197 @@
+"""
+計算模組效能基準（pytest-benchmark + tracemalloc 峰值記憶體，不需資料庫）
+
+每個公開計算入口在 1 / 100 / 2000 檔 × 1 / 10 / 30 年的合成資料上量測：
+- 向量化指標核心一次處理整個 標的 × 交易日 矩陣
+- 逐檔計算的入口（pandas 指標包裝、因子、位階、籌碼）依標的數逐檔呼叫
+- 橫斷面評分只隨標的數變化；量化引擎的資產數上限為 QUANT_MAX_ASSETS
+- 稅務試算的交易筆數為 標的數 × 每年 12 筆
+
+資料規模分級、基準儲存與退步門檻見 conftest.py。
+
+執行方式：
+    pytest tests/benchmarks/test_calculator_benchmarks.py --benchmark-only
+    BENCH_TIER=medium BENCH_SAVE_BASELINE=1 pytest tests/benchmarks/test_calculator_benchmarks.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from calculators import indicator_kernels as kernels
+from calculators.factors import FactorCalculator
+from calculators.indicators import TechnicalIndicators as LegacyIndicators
+from calculators.institutional_analyzer import InstitutionalAnalyzer
+from calculators.margin_analyzer import MarginAnalyzer
+from calculators.position_analyzer import PositionAnalyzer
+from calculators.quant_engine import EfficientFrontierOptimizer, MonteCarloSimulator, RiskFactorAnalyzer
+from calculators.quant_factors import QuantFactorCalculator
+from calculators.tax_engine import TaxCalculatorTW, TaxCalculatorUS
+from calculators.technical_indicators import TechnicalIndicators
+from tests.benchmarks.conftest import size_params
+
+QUANT_MAX_ASSETS = 20
+MONTE_CARLO_SIMULATIONS = 500
+FRONTIER_POINTS = 20
+TRADES_PER_YEAR = 12
+
+sized = pytest.mark.parametrize('market', size_params(), indirect=True)
+by_symbols = pytest.mark.parametrize('market', size_params(symbols_only=True), indirect=True)
+
+
+def for_each_symbol(market, func):
+    """逐檔呼叫 func(第 i 檔資料)"""
+    def run():
+        return [func(market.series(i)) for i in range(market.symbols)]
+    return run
+
+
+# ========== 技術指標 ==========
+
+@sized
+@pytest.mark.parametrize('name', ['calculate_all', 'calculate_extended'])
+def test_indicator_kernels(measure, market, name):
+    m = market.matrix
+    funcs = {
+        'calculate_all': lambda: kernels.calculate_all(m['close'], m['high'], m['low']),
+        'calculate_extended': lambda: kernels.calculate_extended(m['high'], m['low'], m['close'], m['volume']),
+    }
+    measure(f'indicator_kernels.{name}', funcs[name])
+
+
+@sized
+def test_technical_indicators_extended(measure, market):
+    frames = [
+        pd.DataFrame(market.series(i), index=market.dates)
+        for i in range(min(market.symbols, len(market.pool['close'])))
+    ]
+    measure('TechnicalIndicators.calculate_extended',
+            lambda: [TechnicalIndicators.calculate_extended(frames[i % len(frames)]) for i in range(market.symbols)])
+
+
+@sized
+def test_legacy_indicators_calculate_all(measure, market):
+    series = [
+        {name: pd.Series(values, index=market.dates) for name, values in market.series(i).items()}
+        for i in range(min(market.symbols, len(market.pool['close'])))
+    ]
+    measure('indicators.TechnicalIndicators.calculate_all', lambda: [
+        LegacyIndicators.calculate_all(s['close'], s['high'], s['low'])
+        for s in (series[i % len(series)] for i in range(market.symbols))
+    ])
+
+
+# ========== 因子 ==========
+
+@sized
+@pytest.mark.parametrize('name', ['momentum', 'volatility'])
+def test_factor_calculator(measure, market, name):
+    closes = [pd.Series(market.series(i)['close'], index=market.dates)
+              for i in range(min(market.symbols, len(market.pool['close'])))]
+    func = {
+        'momentum': FactorCalculator.calculate_momentum_factors,
+        'volatility': FactorCalculator.calculate_volatility_factor,
+    }[name]
+    measure(f'FactorCalculator.{name}', lambda: [func(closes[i % len(closes)]) for i in range(market.symbols)])
+
+
+@by_symbols
+def test_quant_factor_total_score(measure, market):
+    rng = np.random.default_rng(7)
+    n = market.symbols
+    frame = pd.DataFrame({
+        'pe_ratio': rng.lognormal(2.7, 0.5, n), 'pb_ratio': rng.lognormal(0.5, 0.5, n),
+        'dividend_yield': rng.uniform(0, 8, n), 'ev_ebitda': rng.lognormal(2.3, 0.4, n),
+        'roe': rng.normal(12, 8, n), 'roa': rng.normal(6, 4, n),
+        'debt_to_equity': rng.lognormal(0, 0.6, n), 'gross_margin': rng.uniform(5, 60, n),
+        'rsi_14': rng.uniform(20, 80, n), 'relative_return_1m': rng.normal(0, 5, n),
+        'relative_return_3m': rng.normal(0, 10, n), 'distance_from_52w_high': rng.uniform(-60, 0, n),
+        'market_cap': rng.lognormal(23, 1.5, n), 'volatility_1y': rng.uniform(10, 60, n),
+        'beta': rng.normal(1, 0.3, n), 'revenue_cagr_3y': rng.normal(8, 10, n), 'eps_cagr_3y': rng.normal(8, 15, n),
+    }, index=[f'S{i:04d}' for i in range(n)])
+    measure('QuantFactorCalculator.calculate_total_score', QuantFactorCalculator.calculate_total_score, frame)
+
+
+# ========== 量化引擎 ==========
+
+@sized
+def test_monte_carlo(measure, market):
+    assets = min(market.symbols, QUANT_MAX_ASSETS)
+    simulator = MonteCarloSimulator(market.returns_frame(assets))
+    measure('MonteCarloSimulator.simulate', lambda: simulator.simulate(
+        [1 / assets] * assets, num_simulations=MONTE_CARLO_SIMULATIONS, time_horizon=252
+    ))
+
+
+@sized
+def test_efficient_frontier(measure, market):
+    if market.symbols < 2:
+        pytest.skip('效率前緣至少需要 2 檔資產')
+    optimizer = EfficientFrontierOptimizer(market.returns_frame(min(market.symbols, QUANT_MAX_ASSETS)))
+    measure('EfficientFrontierOptimizer.optimize', optimizer.optimize, FRONTIER_POINTS)
+
+
+@sized
+def test_risk_analysis(measure, market):
+    returns = market.returns_frame(min(market.symbols, 2))
+    portfolio, benchmark = returns.iloc[:, 0], returns.iloc[:, -1]
+    measure('RiskFactorAnalyzer.analyze', lambda: RiskFactorAnalyzer(portfolio, benchmark).analyze())
+
+
+# ========== 位階與籌碼 ==========
+
+def _depth_analysis(series):
+    prices, volumes = series['close'], series['volume']
+    return PositionAnalyzer.comprehensive_judgment(
+        PositionAnalyzer.calculate_position_level_array(prices),
+        PositionAnalyzer.analyze_trend_array(prices),
+        PositionAnalyzer.analyze_volume_price_relation_array(prices, volumes),
+    )
+
+
+@sized
+def test_position_analyzer(measure, market):
+    measure('PositionAnalyzer (depth)', for_each_symbol(market, _depth_analysis))
+
+
+@sized
+def test_institutional_analyzer(measure, market):
+    chips = [market.chips(i)[0] for i in range(min(market.symbols, len(market.pool['close'])))]
+    measure('InstitutionalAnalyzer.analyze_daily_trades_array', lambda: [
+        InstitutionalAnalyzer.analyze_daily_trades_array(chips[i % len(chips)], days=20)
+        for i in range(market.symbols)
+    ])
+
+
+@sized
+def test_margin_analyzer(measure, market):
+    chips = [market.chips(i)[1] for i in range(min(market.symbols, len(market.pool['close'])))]
+    measure('MarginAnalyzer.analyze_margin_trading_array', lambda: [
+        MarginAnalyzer.analyze_margin_trading_array(chips[i % len(chips)]) for i in range(market.symbols)
+    ])
+
+
+# ========== 稅務 ==========
+
+@sized
+def test_tax_engine(measure, market):
+    rng = np.random.default_rng(11)
+    count = market.symbols * market.years * TRADES_PER_YEAR
+    prices = rng.uniform(10, 1000, count).round(2).tolist()
+    quantities = (rng.integers(1, 20, count) * 1000).tolist()
+    dividends = rng.integers(1000, 200000, count).tolist()
+
+    def run():
+        for price, qty, dividend in zip(prices, quantities, dividends):
+            TaxCalculatorTW.calculate_transaction_cost(price, qty, is_sell=qty % 2000 == 0)
+            TaxCalculatorTW.calculate_dividend_tax(dividend, 0.12)
+            TaxCalculatorUS.calculate_withholding_tax(dividend / 30)
+
+    measure('tax_engine', run)
@@ -0,0 +1,99 @@
+"""
+API 熱路徑效能基準測試（pytest-benchmark）
+
+比較 depth_analysis / 籌碼端點在「查詢結果 → 分析結果」這段的兩種寫法：
+    dataframe: RealDictCursor 字典列 → DataFrame → pandas 介面分析器
+    arrays:    tuple 列 → np.fromiter 型別陣列 → 陣列版分析器
+資料庫往返不計入，僅量測 Python 端的轉換與計算。列數可用 BENCH_ROWS 調整。
+
+執行方式：
+    pytest tests/benchmarks/test_hot_path_benchmarks.py --benchmark-only
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from calculators.institutional_analyzer import InstitutionalAnalyzer, TRADE_COLUMNS
+from calculators.position_analyzer import PositionAnalyzer
+from utils.typed_fetch import _column
+
+ROWS = int(os.getenv('BENCH_ROWS', 300))
+PRICE_COLUMNS = ['trade_date', 'high_price', 'low_price', 'close_price', 'volume']
+
+
+@pytest.fixture(scope='module')
+def price_rows():
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1, ROWS))
+    start = date(2024, 1, 1)
+    return [
+        (start + timedelta(days=i), float(c) + 1, float(c) - 1, float(c), int(v))
+        for i, (c, v) in enumerate(zip(close, rng.integers(1000, 10000, ROWS)))
+    ]
+
+
+@pytest.fixture(scope='module')
+def trade_rows():
+    rng = np.random.default_rng(7)
+    values = rng.integers(0, 10000, size=(ROWS, len(TRADE_COLUMNS))).tolist()
+    return [tuple(row) + (100.0,) for row in values]
+
+
+def position_with_dataframe(rows):
+    df = pd.DataFrame([dict(zip(PRICE_COLUMNS, row)) for row in rows])
+    prices, volumes = df['close_price'], df['volume']
+    return (
+        PositionAnalyzer.calculate_position_level(prices),
+        PositionAnalyzer.analyze_trend(prices),
+        PositionAnalyzer.analyze_volume_price_relation(prices, volumes),
+    )
+
+
+def position_with_arrays(rows):
+    prices = _column(rows, 3, np.float64)
+    volumes = _column(rows, 4, np.float64)
+    return (
+        PositionAnalyzer.calculate_position_level_array(prices),
+        PositionAnalyzer.analyze_trend_array(prices),
+        PositionAnalyzer.analyze_volume_price_relation_array(prices, volumes),
+    )
+
+
+def institutional_with_dataframe(rows):
+    df = pd.DataFrame([dict(zip(TRADE_COLUMNS + ['close_price'], row)) for row in rows])
+    return InstitutionalAnalyzer.analyze_daily_trades(df, days=20)
+
+
+def institutional_with_arrays(rows):
+    columns = {
+        name: _column(rows, index, np.float64)
+        for index, name in enumerate(TRADE_COLUMNS + ['close_price'])
+    }
+    return InstitutionalAnalyzer.analyze_daily_trades_array(columns, days=20)
+
+
+@pytest.mark.parametrize('path', [position_with_dataframe, position_with_arrays], ids=['dataframe', 'arrays'])
+def test_position_hot_path(benchmark, price_rows, path):
+    benchmark.group = 'depth_analysis'
+    benchmark(path, price_rows)
+
+
+@pytest.mark.parametrize('path', [institutional_with_dataframe, institutional_with_arrays], ids=['dataframe', 'arrays'])
+def test_institutional_hot_path(benchmark, trade_rows, path):
+    benchmark.group = 'chips_institutional'
+    benchmark(path, trade_rows)
+
+
+def test_paths_agree(price_rows, trade_rows):
+    assert position_with_dataframe(price_rows) == position_with_arrays(price_rows)
+    assert institutional_with_dataframe(trade_rows) == institutional_with_arrays(trade_rows)
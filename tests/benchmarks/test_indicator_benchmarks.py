@@ -0,0 +1,68 @@
+"""
+技術指標效能基準測試（pytest-benchmark）
+
+以 1,000 檔 × 5,000 交易日的合成價格矩陣，量測各指標核心的吞吐量。
+矩陣大小可用環境變數 BENCH_SYMBOLS / BENCH_DAYS 調整。
+
+執行方式：
+    pytest tests/benchmarks --benchmark-only
+    pytest tests/benchmarks --benchmark-autosave --benchmark-compare
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from calculators import indicator_kernels as kernels
+
+SYMBOLS = int(os.getenv('BENCH_SYMBOLS', 1000))
+DAYS = int(os.getenv('BENCH_DAYS', 5000))
+
+
+@pytest.fixture(scope='module')
+def ohlc():
+    """合成 OHLC 矩陣（標的 × 交易日）"""
+    rng = np.random.default_rng(42)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(SYMBOLS, DAYS)), axis=1))
+    spread = close * rng.uniform(0, 0.03, size=(SYMBOLS, DAYS))
+    return close + spread, close - spread, close
+
+
+INDICATORS = {
+    'sma_20': lambda h, l, c: kernels.sma(c, 20),
+    'ema_12': lambda h, l, c: kernels.ema(c, 12),
+    'rsi_14': lambda h, l, c: kernels.rsi(c, 14),
+    'macd': lambda h, l, c: kernels.macd(c),
+    'bollinger_20': lambda h, l, c: kernels.bollinger_bands(c, 20),
+    'kd_9': lambda h, l, c: kernels.kd(h, l, c),
+    'williams_r_14': lambda h, l, c: kernels.williams_r(h, l, c),
+    'atr_14': lambda h, l, c: kernels.atr(h, l, c),
+    'calculate_all': lambda h, l, c: kernels.calculate_all(c, h, l),
+    'rsi_14_wilder': lambda h, l, c: kernels.rsi_wilder(c, 14),
+    'dmi_14': lambda h, l, c: kernels.dmi(h, l, c),
+    'cci_20': lambda h, l, c: kernels.cci(h, l, c),
+    'ichimoku': lambda h, l, c: kernels.ichimoku(h, l, c),
+    'calculate_extended': lambda h, l, c: kernels.calculate_extended(h, l, c, c),
+}
+
+
+@pytest.mark.parametrize('name', list(INDICATORS))
+def test_indicator_throughput(benchmark, ohlc, name):
+    """單一指標在整個價格矩陣上的吞吐量"""
+    high, low, close = ohlc
+    func = INDICATORS[name]
+
+    benchmark.group = f'indicators {SYMBOLS}x{DAYS}'
+    benchmark.extra_info['cells'] = close.size
+    result = benchmark.pedantic(func, args=(high, low, close), rounds=3, iterations=1, warmup_rounds=1)
+
+    if benchmark.stats is not None:  # --benchmark-disable 時沒有統計資料
+        benchmark.extra_info['cells_per_second'] = close.size / benchmark.stats.stats.mean
+    assert result is not None
@@ -0,0 +1,141 @@
+"""
+AI 任務佇列與限流器測試（使用 Stub 模型，不需連線資料庫）
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai import job_queue
+from ai.job_queue import AIJobQueue, backoff_seconds
+from ai.rate_limiter import TokenBucket, TokenRateLimiter, estimate_tokens
+from ai.stub_client import StubGeminiClient
+
+
+class RecordingConnection:
+    """記錄 ai_jobs 更新語句的連線"""
+
+    def __init__(self):
+        self.calls = []
+        self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        return RecordingCursor(self.calls)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class RecordingCursor:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def execute(self, query, params=None):
+        self.calls.append((' '.join(query.split()), params))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class MemoryCache:
+    reports = {}
+
+    def __init__(self, conn):
+        pass
+
+    def lookup(self, fingerprint):
+        return self.reports.get(fingerprint)
+
+    def store(self, fingerprint, report_type, title, content, market_data, model, template_version,
+              security_type=None, security_code=None, prompt_tokens=None, completion_tokens=None):
+        report = {'id': 42, 'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens}
+        self.reports[fingerprint] = report
+        return report
+
+
+def make_job(**overrides):
+    job = {
+        'id': 7, 'report_type': 'decision_template', 'report_title': '2330 決策模板',
+        'security_type': 'TW', 'security_code': '2330', 'prompt': '請分析 2330',
+        'inputs': {'price_date': '2025-01-02'}, 'generation_config': {'temperature': 0.6},
+        'template_version': 'decision-v1', 'input_fingerprint': 'a' * 64,
+        'attempts': 1, 'max_attempts': 3,
+    }
+    job.update(overrides)
+    return job
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens('台積電') == 3
+    assert estimate_tokens('abcdefgh') == 2
+
+
+def test_token_bucket_reports_wait_after_burst():
+    bucket = TokenBucket(60)
+    assert all(bucket.reserve(1) == 0 for _ in range(60))
+    assert 0.9 < bucket.reserve(1) <= 1.01
+
+
+def test_token_bucket_caps_oversized_requests():
+    bucket = TokenBucket(1000)
+    assert bucket.reserve(5000) == 0
+    assert bucket.reserve(100) > 0
+
+
+def test_rate_limiter_records_actual_usage():
+    limiter = TokenRateLimiter(rpm=1000, tpm=1000)
+    assert limiter.wait(100) == 0
+    limiter.record(100, 1000)
+    assert limiter.tokens.reserve(1) > 0
+
+
+def test_backoff_grows_and_is_capped():
+    assert 24 <= backoff_seconds(1) <= 36
+    assert 48 <= backoff_seconds(2) <= 72
+    assert backoff_seconds(20) <= job_queue.MAX_BACKOFF * 1.2
+
+
+def test_process_stores_report_with_token_usage(monkeypatch):
+    monkeypatch.setattr(job_queue, 'ReportCache', MemoryCache)
+    MemoryCache.reports = {}
+    conn = RecordingConnection()
+    queue = AIJobQueue(client=StubGeminiClient(), concurrency=1, connect=lambda: conn)
+
+    assert queue.process(conn, make_job())
+    query, params = conn.calls[-1]
+    assert "status = 'done'" in query
+    assert params[0] == 42
+    assert params[1] > 0 and params[2] > 0
+
+
+def test_process_reuses_cached_report_without_calling_model(monkeypatch):
+    monkeypatch.setattr(job_queue, 'ReportCache', MemoryCache)
+    MemoryCache.reports = {'a' * 64: {'id': 9, 'prompt_tokens': 1, 'completion_tokens': 2}}
+    client = StubGeminiClient()
+    conn = RecordingConnection()
+
+    assert AIJobQueue(client=client, connect=lambda: conn).process(conn, make_job())
+    assert client.calls == 0
+    assert conn.calls[-1][1][0] == 9
+
+
+def test_process_failure_schedules_retry_then_fails(monkeypatch):
+    monkeypatch.setattr(job_queue, 'ReportCache', MemoryCache)
+    MemoryCache.reports = {}
+    conn = RecordingConnection()
+    queue = AIJobQueue(client=StubGeminiClient(fail_times=5), connect=lambda: conn)
+
+    assert not queue.process(conn, make_job(attempts=1))
+    assert conn.calls[-1][1][0] == 'pending'
+
+    assert not queue.process(conn, make_job(attempts=3))
+    assert conn.calls[-1][1][0] == 'failed'
+    assert conn.rollbacks == 2
@@ -0,0 +1,83 @@
+"""
+AI 串流生成測試（使用 Stub 模型，不需連線資料庫）
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai.streaming import GenerationStream, format_sse, stream_report
+from ai.stub_client import StubGeminiClient
+
+
+class MemoryCache:
+    def __init__(self, reports=None):
+        self.reports = reports or {}
+        self.stored = []
+
+    def lookup(self, fingerprint):
+        return self.reports.get(fingerprint)
+
+    def store(self, fingerprint, report_type, title, content, market_data, model, template_version,
+              security_type=None, security_code=None, prompt_tokens=None, completion_tokens=None):
+        report = {'id': 1, 'report_content': content,
+                  'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens}
+        self.stored.append(report)
+        self.reports[fingerprint] = report
+        return report
+
+
+def run_stream(cache, start_stream):
+    return list(stream_report(cache, 'daily_strategy', {'date': '2025-01-02'}, start_stream,
+                              title='t', model='stub-model', template_version='daily-v1'))
+
+
+def test_generation_stream_collects_text_and_usage():
+    stream = GenerationStream(iter(['a', '', 'b']), lambda: (10, 2))
+    assert list(stream) == ['a', 'b']
+    assert stream.text == 'ab'
+    assert (stream.prompt_tokens, stream.completion_tokens) == (10, 2)
+
+
+def test_stream_forwards_chunks_and_persists_on_completion():
+    cache = MemoryCache()
+    client = StubGeminiClient()
+    events = run_stream(cache, lambda: client.generate_stream('請撰寫每日報告' * 20, chunk_size=16))
+
+    assert events[0] == ('meta', {'cached': False, 'fingerprint': events[0][1]['fingerprint']})
+    chunks = [data for event, data in events if event == 'chunk']
+    assert len(chunks) > 1
+    assert events[-1][0] == 'done'
+    assert cache.stored[0]['report_content'] == ''.join(chunks)
+    assert events[-1][1]['prompt_tokens'] > 0
+
+
+def test_stream_replays_cached_report_without_calling_model():
+    cache = MemoryCache()
+    client = StubGeminiClient()
+    first = run_stream(cache, lambda: client.generate_stream('prompt'))
+    second = run_stream(cache, lambda: client.generate_stream('prompt'))
+
+    assert client.calls == 1
+    assert second[0][1]['cached'] is True
+    assert second[1] == ('chunk', cache.stored[0]['report_content'])
+    assert second[-1][1]['report_id'] == first[-1][1]['report_id']
+
+
+def test_stream_reports_error_and_does_not_persist():
+    cache = MemoryCache()
+    client = StubGeminiClient(fail_times=1)
+    events = run_stream(cache, lambda: client.generate_stream('prompt'))
+
+    assert events[-1][0] == 'error'
+    assert cache.stored == []
+
+
+def test_format_sse_keeps_multiline_text_in_one_data_field():
+    message = format_sse('chunk', '第一行\n第二行')
+    assert message.startswith('event: chunk\ndata: ')
+    assert message.endswith('\n\n')
+    assert message.count('\n') == 3
+    assert json.loads(message.split('data: ', 1)[1]) == '第一行\n第二行'
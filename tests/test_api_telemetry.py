@@ -0,0 +1,163 @@
+"""
+API 流量遙測測試（客戶端記錄、增量寫入、配額與狀態端點；不需連線資料庫或外部 API）
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import system_status_api
+from api_clients import base_client
+from api_clients.base_client import BaseAPIClient
+from utils import api_telemetry
+from utils.api_telemetry import TelemetryStore
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Error')
+
+
+class RecordingCursor:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def execute(self, query, params=None):
+        self.calls.append((' '.join(query.split()), params))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.calls = []
+
+    def cursor(self):
+        return RecordingCursor(self.calls)
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = TelemetryStore()
+    monkeypatch.setitem(api_telemetry.API_TELEMETRY_CONFIG, 'persist', False)
+    monkeypatch.setattr(api_telemetry, 'telemetry', store)
+    monkeypatch.setattr(base_client, 'telemetry', store)
+    monkeypatch.setattr(base_client.time, 'sleep', lambda seconds: None)
+    return store
+
+
+def make_client():
+    return BaseAPIClient('測試', rate_limit_delay=0, daily_limit=500, source='alpha_vantage')
+
+
+def test_http_errors_and_cache_hits_are_recorded(store, monkeypatch):
+    client = make_client()
+    responses = iter([FakeResponse(200, {'ok': 1}), FakeResponse(503)])
+    monkeypatch.setattr(client.session, 'request', lambda **kwargs: next(responses))
+
+    assert client.get('https://example.com/a') == {'ok': 1}
+    assert client.get('https://example.com/a') == {'ok': 1}  # 快取命中，不送出請求
+
+    monkeypatch.setattr(base_client.requests, 'get', lambda url, **kwargs: FakeResponse(404))
+    assert client._http_get('twse', 'https://example.com/b').status_code == 404
+
+    stats = store.local_stats()
+    assert stats['alpha_vantage'].requests == 1 and stats['alpha_vantage'].cache_hits == 1
+    assert stats['twse'].errors == 1 and stats['twse'].last_error == 'HTTP 404'
+
+
+def test_retries_count_every_attempt(store, monkeypatch):
+    client = make_client()
+    attempts = iter([FakeResponse(500), FakeResponse(500), FakeResponse(200, {'ok': 2})])
+    monkeypatch.setattr(client.session, 'request', lambda **kwargs: next(attempts))
+
+    assert client.get('https://example.com/c', use_cache=False) == {'ok': 2}
+    summary = api_telemetry.summarize('alpha_vantage', store.local_stats()['alpha_vantage'])
+    assert summary['requests'] == 3 and summary['errors'] == 2 and summary['retries'] == 2
+    assert summary['error_rate'] == pytest.approx(66.67)
+    assert summary['daily_limit'] == 500 and summary['quota_remaining'] == 497
+    assert summary['latency_p50_ms'] is not None
+
+
+def test_flush_writes_deltas_and_keeps_them_on_failure(store):
+    store.record_call('fred', 0.2)
+    store.record_call('fred', 0.4, error='timeout')
+    store.record_retry('fred')
+
+    conn = RecordingConnection()
+    assert store.flush(conn) == 1
+    query, params = conn.calls[0]
+    assert query.startswith('INSERT INTO api_call_stats')
+    assert params[:7][0] == 'fred' and params[2:5] == (2, 1, 1)
+    assert sum(params[8]) == 2
+    # 已寫入的增量不重複寫入，程序累計值保留
+    assert store.flush(conn) == 0
+    assert store.local_stats()['fred'].requests == 2
+
+    class BrokenConnection(RecordingConnection):
+        def cursor(self):
+            raise RuntimeError('db down')
+
+    store.record_call('fred', 0.1)
+    assert store.flush(BrokenConnection()) == 0
+    assert store.local_stats(pending_only=True)['fred'].requests == 1
+
+
+def test_exit_flush_only_when_database_was_reachable(store, monkeypatch):
+    flushed = []
+    monkeypatch.setattr(store, 'flush', lambda conn=None: flushed.append(conn))
+    store._flush_at_exit()            # 尚未成功寫入過：不在程序結束時連線
+    store._persist_ok = False
+    store._flush_at_exit()
+    assert flushed == []
+    store._persist_ok = True
+    store._flush_at_exit()
+    assert flushed == [None]
+
+
+def test_status_endpoint_serves_real_numbers_without_database(store, monkeypatch):
+    def no_db():
+        raise RuntimeError('db down')
+
+    monkeypatch.setattr(system_status_api, 'get_db', no_db)
+    for _ in range(9):
+        store.record_call('yfinance', 0.05)
+    store.record_call('yfinance', 0.05, error='HTTPError: 429')
+    for _ in range(460):
+        store.record_call('alpha_vantage', 0.3)
+
+    app = Flask(__name__)
+    app.register_blueprint(system_status_api.system_status_bp)
+    data = app.test_client().get('/api/system/api-status').get_json()
+    apis = {api['source']: api for api in data['apis']}
+
+    assert data['aggregated'] is False
+    assert apis['database']['status'] == 'error'
+    # 最後一次呼叫失敗且錯誤率達 10%
+    assert apis['yfinance']['status'] == 'error'
+    assert apis['yfinance']['requestsToday'] == 10 and apis['yfinance']['uptime'] == 90.0
+    # 剩餘配額低於 10%
+    assert apis['alpha_vantage']['status'] == 'warning' and apis['alpha_vantage']['quotaRemaining'] == 40
+    # 有每日上限但今日無流量的來源仍列出（配額完整）
+    assert apis['gold_api']['status'] == 'unknown' and apis['gold_api']['quotaRemaining'] == 100
+    assert 'finnhub' in apis and 'twstock' not in apis
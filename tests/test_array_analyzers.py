@@ -0,0 +1,122 @@
+"""
+陣列版分析器測試（API 熱路徑不建立 DataFrame，結果須與 pandas 介面一致）
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from calculators.institutional_analyzer import InstitutionalAnalyzer, TRADE_COLUMNS
+from calculators.margin_analyzer import MarginAnalyzer, MARGIN_COLUMNS
+from calculators.position_analyzer import PositionAnalyzer
+from utils.typed_fetch import _column, dates_to_iso
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(7)
+    return 100 + np.cumsum(rng.normal(0, 1, 300))
+
+
+def test_position_level_matches_series_input(prices):
+    result = PositionAnalyzer.calculate_position_level_array(prices)
+
+    assert result == PositionAnalyzer.calculate_position_level(pd.Series(prices))
+    recent = prices[-252:]
+    expected = (prices[-1] - recent.min()) / (recent.max() - recent.min()) * 100
+    assert result['percentile_52w'] == round(expected, 2)
+    assert isinstance(result['current_price'], float)
+
+
+def test_trend_slope_uses_ma20_nine_days_back(prices):
+    result = PositionAnalyzer.analyze_trend_array(prices)
+
+    ma20 = pd.Series(prices).rolling(20).mean()
+    expected = (ma20.iloc[-1] - ma20.iloc[-10]) / ma20.iloc[-10] * 100
+    assert result['slope'] == round(expected, 2)
+    assert result == PositionAnalyzer.analyze_trend(pd.Series(prices))
+
+
+def test_trend_slope_is_nan_without_enough_history(prices):
+    result = PositionAnalyzer.analyze_trend_array(prices[:25])
+
+    # 與 rolling(20).mean().iloc[-10] 在資料不足時相同，斜率為 NaN
+    assert np.isnan(result['slope'])
+    assert PositionAnalyzer.analyze_trend_array(prices[:10])['slope'] == 0
+
+
+def test_volume_price_relation(prices):
+    volumes = np.full(len(prices), 1000.0)
+    volumes[-1] = 1500.0
+    rising = prices.copy()
+    rising[-1] = rising[-2] + 1
+
+    result = PositionAnalyzer.analyze_volume_price_relation_array(rising, volumes)
+
+    assert result['relation'] == '價漲量增'
+    assert result['volume_vs_avg'] == round((1500 / 1025 - 1) * 100, 2)
+    assert PositionAnalyzer.analyze_volume_price_relation_array(rising[:5], volumes[:5])['relation'] == '數據不足'
+
+
+def make_trades(days=30):
+    rng = np.random.default_rng(3)
+    columns = {name: rng.integers(0, 10_000, days).astype(float) for name in TRADE_COLUMNS}
+    # 外資最後 4 天連續買超
+    columns['foreign_buy'][-4:] = columns['foreign_sell'][-4:] + 100
+    columns['foreign_buy'][-5] = columns['foreign_sell'][-5] - 100
+    columns['close_price'] = np.linspace(50, 60, days)
+    return columns
+
+
+def test_institutional_array_matches_dataframe():
+    columns = make_trades()
+    result = InstitutionalAnalyzer.analyze_daily_trades_array(columns, days=20)
+
+    assert result == InstitutionalAnalyzer.analyze_daily_trades(pd.DataFrame(columns), days=20)
+    foreign_net = (columns['foreign_buy'][-20:] - columns['foreign_sell'][-20:]).sum()
+    assert result['foreign']['net_shares'] == int(foreign_net)
+    assert result['foreign']['net_value'] == pytest.approx(foreign_net * 60)
+    assert result['foreign']['consecutive_days'] == 4
+
+
+def test_institutional_ignores_missing_values():
+    columns = make_trades()
+    columns['trust_buy'][-1] = np.nan
+
+    result = InstitutionalAnalyzer.analyze_daily_trades_array(columns, days=20)
+
+    trust = columns['trust_buy'][-20:-1] - columns['trust_sell'][-20:-1]
+    assert result['trust']['net_shares'] == int(trust.sum())
+    assert result['trust']['consecutive_days'] == 0
+
+
+def test_margin_array_matches_dataframe():
+    days = 30
+    columns = {
+        'margin_balance': np.linspace(1000, 1300, days),
+        'margin_quota': np.full(days, 5000.0),
+        'short_balance': np.linspace(200, 100, days),
+        'short_quota': np.full(days, 1000.0),
+    }
+
+    result = MarginAnalyzer.analyze_margin_trading_array(columns)
+
+    assert result == MarginAnalyzer.analyze_margin_trading(pd.DataFrame(columns))
+    assert result['margin']['trend'] == '增加'
+    assert result['margin']['usage_pct'] == 26.0
+    assert MarginAnalyzer.analyze_margin_trading_array(
+        {name: columns[name][:10] for name in MARGIN_COLUMNS}
+    ) == {'error': '數據不足'}
+
+
+def test_typed_columns():
+    rows = [(1.5, None, np.datetime64('2024-01-02')), (2.0, 3.0, np.datetime64('2024-01-03'))]
+
+    values = _column(rows, 1, np.float64)
+    assert np.isnan(values[0]) and values[1] == 3.0
+    assert dates_to_iso(_column(rows, 2, 'datetime64[D]')) == ['2024-01-02', '2024-01-03']
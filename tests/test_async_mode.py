@@ -0,0 +1,80 @@
+"""
+ASGI 模式相關元件測試（佔位符轉換、非同步限流與模型呼叫、量化任務）
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai.rate_limiter import TokenRateLimiter
+from ai.stub_client import StubGeminiClient
+from calculators import quant_tasks
+from utils import pagination
+from utils.async_db import to_asyncpg
+
+
+def test_to_asyncpg_numbers_placeholders():
+    assert to_asyncpg("SELECT * FROM t WHERE a = %s AND b LIKE 'x%%' LIMIT %s") == \
+        "SELECT * FROM t WHERE a = $1 AND b LIKE 'x%' LIMIT $2"
+
+    page = pagination.parse_page_args({'before': '2024-01-10'})
+    query, params = pagination.keyset_query('tw_stock_prices', 'trade_date', {'stock_code': '2330'}, page)
+    assert '$3' in to_asyncpg(query) and '%s' not in to_asyncpg(query)
+    assert len(params) == 3
+
+
+def test_concurrent_stub_calls_share_the_event_loop():
+    client = StubGeminiClient(latency=0.2)
+
+    async def generate_all():
+        return await asyncio.gather(*[client.generate_text_async(f'prompt {i}') for i in range(10)])
+
+    started = time.monotonic()
+    results = asyncio.run(generate_all())
+    # 10 個呼叫同時等待，總時間接近單次延遲
+    assert time.monotonic() - started < 1.0
+    assert len(set(results)) == 10
+
+
+def test_wait_async_respects_rpm():
+    limiter = TokenRateLimiter(rpm=60, tpm=1_000_000)
+    limiter.requests.tokens = 1
+
+    async def two_requests():
+        return [await limiter.wait_async(10), await limiter.wait_async(10)]
+
+    first, second = asyncio.run(two_requests())
+    assert first == 0
+    assert 0.5 < second <= 1.1
+
+
+def test_quant_tasks_are_picklable_module_functions():
+    import pickle
+
+    rng = np.random.default_rng(0)
+    returns = pd.DataFrame(rng.normal(0.0005, 0.01, size=(300, 2)), columns=['2330', '2317'])
+    weights = quant_tasks.ordered_weights([{'code': '2317', 'weight': 0.3}, {'code': '2330', 'weight': 0.7}],
+                                          returns.columns)
+    assert weights == [0.7, 0.3]
+
+    func = pickle.loads(pickle.dumps(quant_tasks.monte_carlo))
+    result = func(returns, weights, 50, 20, 1000)
+    assert len(result['paths']) == 20
+    assert len(result['paths'][0]['data']) == 20
+
+
+def test_asgi_app_routes():
+    pytest.importorskip('starlette')
+    pytest.importorskip('a2wsgi')
+    import asgi_server
+
+    paths = {getattr(route, 'path', None) for route in asgi_server.app.routes}
+    assert '/api/prices/{code}' in paths
+    assert '/api/quant/efficient-frontier' in paths
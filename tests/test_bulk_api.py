@@ -0,0 +1,75 @@
+"""
+多標的批次查詢 API 測試（純邏輯，不需連線資料庫）
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import bulk_api
+from utils import pagination
+from utils.typed_fetch import group_arrays
+
+
+def test_parse_symbols_groups_by_market():
+    symbols = bulk_api.parse_symbols('2330, us:AAPL,2317,2330,US:MSFT')
+    assert symbols == {'tw': ['2330', '2317'], 'us': ['AAPL', 'MSFT']}
+    assert bulk_api.parse_symbols(['AAPL'], default_market='us') == {'us': ['AAPL']}
+
+
+@pytest.mark.parametrize('values', [None, '', 'jp:7203', ','.join(str(i) for i in range(bulk_api.MAX_SYMBOLS + 1))])
+def test_parse_symbols_rejects_invalid_input(values):
+    with pytest.raises(ValueError):
+        bulk_api.parse_symbols(values)
+
+
+def test_latest_rows_query_placeholders_match_params():
+    for args in [{}, {'since': '2024-01-01'}, {'before': '2024-01-01'}]:
+        page = pagination.parse_page_args(args)
+        query = bulk_api.latest_rows_query('technical_indicators', 'trade_date, ma_20 AS ma', page,
+                                           filters='AND security_type = %s', key='security_code')
+        params = (['2330'], 'TW') + bulk_api.cursor_params(page)
+        assert query.count('%s') == len(params)
+        assert 'CROSS JOIN LATERAL' in query
+
+
+def test_price_rows_query_uses_market_key_column():
+    page = pagination.parse_page_args({})
+    assert 'WHERE stock_code = s.code' in bulk_api.price_rows_query('tw', 'trade_date, close_price', page)
+    # us_stock_prices 以 symbol 為標的欄位（沒有 stock_code）
+    query = bulk_api.price_rows_query('us', 'trade_date, close_price', page)
+    assert 'FROM us_stock_prices' in query
+    assert 'WHERE symbol = s.code' in query
+    assert 'SELECT s.code AS stock_code' in query
+
+
+def test_ma_column_matches_indicator_table():
+    assert bulk_api.ma_column(20) == 'ma_20'
+    with pytest.raises(ValueError):
+        bulk_api.ma_column(7)
+
+
+def test_group_arrays_splits_sorted_rows():
+    columns = {
+        'stock_code': np.array(['2317', '2317', '2330'], dtype=object),
+        'close_price': np.array([100.0, 101.0, 600.0]),
+    }
+    grouped = group_arrays(columns, 'stock_code')
+    assert list(grouped) == ['2317', '2330']
+    assert grouped['2317']['close_price'].tolist() == [100.0, 101.0]
+    assert group_arrays({'stock_code': np.array([], dtype=object)}, 'stock_code') == {}
+
+
+def test_bad_request_is_rejected_before_querying():
+    app = Flask(__name__)
+    app.register_blueprint(bulk_api.bulk_api)
+    client = app.test_client()
+
+    assert client.get('/api/bulk/prices').status_code == 400
+    assert client.post('/api/bulk/indicators/ma', json={'symbols': ['2330'], 'since': 'bad'}).status_code == 400
+    assert client.get('/api/bulk/indicators/ma?symbols=2330&period=7').status_code == 400
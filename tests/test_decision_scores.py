@@ -0,0 +1,94 @@
+"""
+決策六維評分引擎測試（純計算，不需連線資料庫）
+"""
+
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from calculators.decision_scores import (
+    DIMENSIONS, DecisionScoreEngine, combine_scores, score_macro,
+)
+
+
+def make_frames():
+    universe = pd.DataFrame([
+        ('TW', '2330', Decimal('600'), 30_000_000),
+        ('TW', '2317', Decimal('100'), 20_000_000),
+        ('US', 'AAPL', Decimal('190'), 50_000_000),
+    ], columns=['security_type', 'security_code', 'close_price', 'avg_volume_20d'])
+    quant = pd.DataFrame([
+        ('TW', '2330', Decimal('40'), Decimal('90'), Decimal('80'), Decimal('70')),
+        ('TW', '2317', Decimal('70'), Decimal('50'), Decimal('40'), Decimal('30')),
+    ], columns=['security_type', 'security_code', 'value_score', 'quality_score',
+                'momentum_score', 'growth_score'])
+    technical = pd.DataFrame([
+        ('TW', '2330', 65, 580, 550, 5, 30, 28, 12),
+        ('TW', '2317', 25, 110, 120, -2, 35, 10, 30),
+    ], columns=['security_type', 'security_code', 'rsi_14', 'ma_20', 'ma_60',
+                'macd_histogram', 'adx_14', 'plus_di_14', 'minus_di_14'])
+    institutional = pd.DataFrame([
+        ('TW', '2330', 50_000),
+        ('TW', '2317', -40_000),
+    ], columns=['security_type', 'security_code', 'net_lots'])
+    holders = pd.DataFrame([
+        ('TW', '2330', 0.8, 120, 'INFLOW'),
+        ('TW', '2317', 0.4, -50, 'OUTFLOW'),
+    ], columns=['security_type', 'security_code', 'large_holders_percentage',
+                'large_holders_change', 'smart_money_flow'])
+    news = pd.DataFrame([('2330', 0.6)], columns=['security_code', 'news_sentiment'])
+    macro = pd.DataFrame([
+        ('INTEREST_RATE', date(2024, month, 1), value)
+        for month, value in zip(range(1, 5), [5.5, 5.25, 5.0, 4.75])
+    ], columns=['indicator_type', 'release_date', 'value'])
+    return {
+        'universe': universe, 'quant': quant, 'technical': technical,
+        'institutional': institutional, 'holders': holders, 'news': news, 'macro': macro,
+    }
+
+
+def test_compute_scores_whole_universe_in_one_pass():
+    scores = DecisionScoreEngine.compute(make_frames())
+
+    assert list(scores.index) == [('TW', '2330'), ('TW', '2317'), ('US', 'AAPL')]
+    assert scores[DIMENSIONS].apply(lambda column: column.between(0, 100)).all().all()
+
+    strong, weak = scores.loc[('TW', '2330')], scores.loc[('TW', '2317')]
+    for dimension in ['technical', 'chips', 'fundamental', 'sentiment']:
+        assert strong[dimension] > weak[dimension]
+    assert strong['valuation'] < weak['valuation']
+    assert strong['missing_dimensions'] == []
+    assert strong['confidence'] == '高'
+
+
+def test_missing_dimensions_fall_back_to_neutral_with_low_confidence():
+    scores = DecisionScoreEngine.compute(make_frames())
+    apple = scores.loc[('US', 'AAPL')]
+
+    assert set(apple['missing_dimensions']) == {'technical', 'chips', 'fundamental', 'sentiment', 'valuation'}
+    assert apple['technical'] == 50
+    assert apple['confidence'] == '低'
+    # 宏觀為全市場共用，美股同樣取得
+    assert apple['macro'] == scores.loc[('TW', '2330')]['macro']
+
+
+def test_combine_scores_weights_and_recommendation():
+    scores = combine_scores(pd.DataFrame(
+        [[80] * 6, [30] * 6, [55] * 6],
+        columns=DIMENSIONS, index=['buy', 'sell', 'hold'],
+    ))
+    assert scores.loc['buy', 'overall_score'] == 80
+    assert list(scores['recommendation']) == ['買入', '賣出', '持有']
+
+
+def test_score_macro_rewards_rate_cuts_and_handles_no_data():
+    cuts = make_frames()['macro']
+    hikes = cuts.assign(value=cuts['value'][::-1].to_numpy())
+
+    assert score_macro(cuts) > score_macro(hikes)
+    assert score_macro(pd.DataFrame(columns=['indicator_type', 'release_date', 'value'])) is None
@@ -0,0 +1,90 @@
+"""
+API 回應編碼層測試（orjson provider、欄式格式、ETag、壓縮）
+"""
+
+import gzip
+import json
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+from flask import Flask, jsonify
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import fast_json
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    fast_json.init_app(app)
+
+    @app.route('/prices')
+    def prices():
+        return jsonify({'data': fast_json.tabular({
+            'trade_date': ['2024-01-02', '2024-01-03'],
+            'close_price': np.array([100.5, 101.0]),
+        })})
+
+    @app.route('/mixed')
+    def mixed():
+        return jsonify({
+            'price': Decimal('12.50'),
+            'day': date(2024, 1, 2),
+            'path': np.arange(3, dtype=np.float64),
+            'count': np.int64(7),
+            'missing': float('nan'),
+        })
+
+    @app.route('/large')
+    def large():
+        return jsonify({'paths': [np.linspace(0, 1, 252) for _ in range(20)]})
+
+    return app.test_client()
+
+
+def test_native_types_are_serialized(client):
+    body = client.get('/mixed').get_json()
+    assert body == {'price': 12.5, 'day': '2024-01-02', 'path': [0.0, 1.0, 2.0], 'count': 7, 'missing': None}
+
+
+def test_rows_by_default_and_columns_on_request(client):
+    rows = client.get('/prices').get_json()['data']
+    assert rows == [
+        {'trade_date': '2024-01-02', 'close_price': 100.5},
+        {'trade_date': '2024-01-03', 'close_price': 101.0},
+    ]
+
+    columns = client.get('/prices?format=columnar').get_json()['data']
+    assert columns == {'trade_date': ['2024-01-02', '2024-01-03'], 'close_price': [100.5, 101.0]}
+
+
+def test_if_none_match_returns_304(client):
+    first = client.get('/prices')
+    etag = first.headers['ETag']
+
+    again = client.get('/prices', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    # 欄式與列式是不同內容，ETag 不同
+    assert client.get('/prices?format=columnar').headers['ETag'] != etag
+
+
+def test_large_responses_are_gzipped(client):
+    plain = client.get('/large')
+    assert 'Content-Encoding' not in plain.headers
+
+    compressed = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['ETag'] == plain.headers['ETag']
+    assert len(compressed.data) < len(plain.data)
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get('/mixed', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
@@ -0,0 +1,107 @@
+"""
+價格缺漏偵測測試（交易所日曆、向量化交易日運算、缺漏合併；不需連線資料庫）
+"""
+
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data_loader.gap_detection import detect_gaps, gaps_to_requests, summarize_gaps
+from data_loader.trading_calendar import get_calendar
+
+TW = get_calendar('TW')
+US = get_calendar('US')
+
+
+def _gaps(rows):
+    return pd.DataFrame(
+        [(symbol, date.fromisoformat(day)) for symbol, day in rows], columns=['symbol', 'trade_date']
+    )
+
+
+def test_exchange_aliases_and_closure_reasons():
+    assert get_calendar('TPEX').trading_days('2024-02-02', '2024-02-16') == TW.trading_days('2024-02-02', '2024-02-16')
+    assert get_calendar('nyse') is US
+    assert TW.closure_reason('2024-07-24')          # 颱風停市屬臨時休市
+    assert TW.closure_reason('2024-03-09') == '週末'
+    assert TW.closure_reason('2024-03-08') is None
+    assert not US.is_trading_day('2025-01-09')      # 國殤日臨時休市
+
+
+def test_half_day_closes_early():
+    tz = US.timezone
+    assert US.session_close('2024-11-29').hour == 13
+    assert US.session_close('2024-11-28') is None   # 感恩節
+    assert US.last_complete_session(datetime(2024, 11, 29, 13, 30, tzinfo=tz)) == date(2024, 11, 29)
+    assert US.last_complete_session(datetime(2024, 11, 27, 13, 30, tzinfo=tz)) == date(2024, 11, 26)
+
+
+def test_vectorized_session_arithmetic():
+    days = np.array(['2024-02-05', '2024-02-06', '2024-02-15'], dtype='datetime64[D]')
+    assert TW.is_session(days).tolist() == [True, False, True]
+    index = TW.session_index(days)
+    assert int(index[2] - index[0]) == 1          # 春節期間沒有交易日
+    assert TW.add_sessions(days[:1], 1).astype(object).tolist() == [date(2024, 2, 15)]
+    counts = TW.count_sessions(['2024-02-02', '2024-03-08'], ['2024-02-16', '2024-03-01'])
+    assert counts.tolist() == [4, 0]
+
+
+def test_gaps_are_merged_per_symbol_across_holidays():
+    gaps = _gaps([
+        ('2330', '2024-02-05'), ('2330', '2024-02-15'),   # 中間是春節，視為連續
+        ('2330', '2024-03-04'),
+        ('2317', '2024-03-05'), ('2317', '2024-03-07'),   # 相隔 1 個交易日
+    ])
+    assert gaps_to_requests(gaps, TW) == [
+        {'symbol': '2317', 'start': date(2024, 3, 5), 'end': date(2024, 3, 5), 'sessions': 1, 'missing': 1},
+        {'symbol': '2317', 'start': date(2024, 3, 7), 'end': date(2024, 3, 7), 'sessions': 1, 'missing': 1},
+        {'symbol': '2330', 'start': date(2024, 2, 5), 'end': date(2024, 2, 15), 'sessions': 2, 'missing': 2},
+        {'symbol': '2330', 'start': date(2024, 3, 4), 'end': date(2024, 3, 4), 'sessions': 1, 'missing': 1},
+    ]
+
+    merged = gaps_to_requests(gaps, TW, merge_gap_days=1)
+    assert merged[0] == {'symbol': '2317', 'start': date(2024, 3, 5), 'end': date(2024, 3, 7), 'sessions': 3, 'missing': 2}
+    assert len(merged) == 3
+    assert gaps_to_requests(_gaps([]), TW) == []
+
+
+def test_summarize_gaps_orders_by_missing_count():
+    summary = summarize_gaps(_gaps([('A', '2024-03-04'), ('B', '2024-03-04'), ('B', '2024-03-06')]))
+    assert summary['symbol'].tolist() == ['B', 'A']
+    assert summary.iloc[0]['first_missing'] == date(2024, 3, 4)
+    assert summary.iloc[0]['last_missing'] == date(2024, 3, 6)
+
+
+class GapCursor:
+    """記錄 detect_gaps 查詢參數的游標（不回傳任何缺漏）"""
+
+    def __init__(self):
+        self.params = None
+
+    def execute(self, sql, params):
+        self.params = params
+
+    def fetchall(self):
+        return []
+
+
+def test_gap_detection_is_clamped_to_calendar_coverage():
+    assert TW.covers('2024-01-02', '2026-12-31')
+    assert not TW.covers('2027-01-04') and not US.covers('2023-12-29')
+    assert TW.clamp_to_coverage('2023-06-01', '2027-06-30') == (date(2024, 1, 1), date(2026, 12, 31))
+
+    cursor = GapCursor()
+    detect_gaps(cursor, 'TW', date(2023, 6, 1), date(2027, 6, 30))
+    assert cursor.params['since'] == date(2024, 1, 1) and cursor.params['until'] == date(2026, 12, 31)
+    assert min(cursor.params['sessions']) >= date(2024, 1, 1)
+    assert max(cursor.params['sessions']) <= date(2026, 12, 31)
+
+    # 完全在涵蓋期間外（休市日未知）不查詢
+    cursor = GapCursor()
+    assert detect_gaps(cursor, 'US', date(2027, 1, 1), date(2027, 3, 31)).empty
+    assert cursor.params is None
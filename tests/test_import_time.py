@@ -0,0 +1,75 @@
+"""
+啟動時間測試（python -X importtime 冷啟動量測，不需連線資料庫）
+
+- API 伺服器與 n8n 腳本啟動時不載入 google.generativeai、scipy.optimize、yfinance 等重量級模組
+- 頂層 import 累計時間不超過上限（較慢的機器可用 IMPORT_BUDGET_SCALE 放寬，例如 2）
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts import import_audit
+from utils.lazy_import import lazy_exports, lazy_module, lazy_singleton, module_available
+
+BUDGET_SCALE = float(os.getenv('IMPORT_BUDGET_SCALE', 1))
+# 入口 → 上限（毫秒）；未列出的入口使用 DEFAULT_BUDGET_MS
+BUDGET_MS = {'api_server_v5': 1500}
+DEFAULT_BUDGET_MS = 1200
+
+
+@pytest.fixture
+def fake_package(tmp_path, monkeypatch):
+    package = tmp_path / 'lazy_pkg'
+    package.mkdir()
+    (package / '__init__.py').write_text(
+        "from utils.lazy_import import lazy_exports\n"
+        "__getattr__, __dir__ = lazy_exports(__name__, {'Heavy': '.heavy'})\n"
+    )
+    (package / 'heavy.py').write_text("class Heavy:\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield 'lazy_pkg'
+    for name in [name for name in sys.modules if name.startswith('lazy_pkg')]:
+        del sys.modules[name]
+
+
+def test_lazy_exports_load_submodule_on_first_use(fake_package):
+    package = __import__(fake_package)
+    assert 'lazy_pkg.heavy' not in sys.modules and 'Heavy' in dir(package)
+
+    from lazy_pkg import Heavy
+    assert 'lazy_pkg.heavy' in sys.modules and package.Heavy is Heavy
+    with pytest.raises(AttributeError, match='Missing'):
+        package.Missing
+
+
+def test_lazy_module_and_singleton(fake_package):
+    heavy = lazy_module('lazy_pkg.heavy')
+    assert 'lazy_pkg.heavy' not in sys.modules and 'not loaded' in repr(heavy)
+    assert heavy.Heavy.__name__ == 'Heavy' and 'lazy_pkg.heavy' in sys.modules
+
+    assert module_available('lazy_pkg.heavy') and not module_available('no_such_module_xyz')
+
+    created = []
+    get_instance = lazy_singleton(lambda: created.append(1) or object())
+    assert created == []
+    assert get_instance() is get_instance() and created == [1]
+
+
+@pytest.mark.parametrize('entry', list(import_audit.ENTRY_POINTS))
+def test_entry_point_import_budget(entry):
+    try:
+        result = import_audit.measure(import_audit.ENTRY_POINTS[entry])
+    except RuntimeError as e:
+        pytest.skip(f'{entry} 在此環境無法載入（缺少套件或既有錯誤）：{str(e).splitlines()[-1]}')
+
+    assert result['deferred_loaded'] == [], f"{entry} 啟動時載入了 {result['deferred_loaded']}"
+
+    budget = BUDGET_MS.get(entry, DEFAULT_BUDGET_MS) * BUDGET_SCALE
+    top = ', '.join(f"{e['module']} {e['cumulative_us'] / 1000:.0f}ms"
+                    for e in import_audit.top_imports(result['entries'], 5))
+    assert result['total_ms'] <= budget, f"{entry} import {result['total_ms']:.0f} ms > {budget:.0f} ms（{top}）"
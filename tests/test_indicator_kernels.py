@@ -0,0 +1,243 @@
+"""
+技術指標核心運算測試
+以原本的 pandas 實作為基準，驗證 indicator_kernels 的 1-D / 2-D 輸出一致
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from calculators import indicator_kernels as kernels
+from calculators.technical_indicators import TechnicalIndicators
+from calculators.indicators import TechnicalIndicators as LegacyIndicators
+
+
+def make_ohlc(rows: int = 4, days: int = 300, seed: int = 7):
+    """產生隨機漫步的 OHLC 矩陣（標的 × 交易日）"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, size=(rows, days)), axis=1)
+    high = close + rng.uniform(0, 2, size=(rows, days))
+    low = close - rng.uniform(0, 2, size=(rows, days))
+    return high, low, close
+
+
+def reference_rsi(prices: pd.Series, period: int = 14) -> pd.Series:
+    delta = prices.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+def reference_kd(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 9):
+    lowest_low = low.rolling(window=period).min()
+    highest_high = high.rolling(window=period).max()
+    rsv = (close - lowest_low) / (highest_high - lowest_low) * 100
+    k = rsv.ewm(com=2, adjust=False).mean()
+    return k, k.ewm(com=2, adjust=False).mean()
+
+
+def assert_close(actual, expected):
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float),
+                               rtol=1e-9, atol=1e-8, equal_nan=True)
+
+
+@pytest.mark.parametrize('window', [1, 5, 20, 60])
+def test_rolling_mean_and_std_match_pandas(window):
+    _, _, close = make_ohlc()
+    frame = pd.DataFrame(close.T)
+    assert_close(kernels.rolling_mean(close, window), frame.rolling(window).mean().T)
+    if window > 1:
+        assert_close(kernels.rolling_std(close, window), frame.rolling(window).std().T)
+
+
+def test_rolling_windows_propagate_nan_like_pandas():
+    _, _, close = make_ohlc(rows=1)
+    series = pd.Series(close[0])
+    series.iloc[[0, 50, 51, 120]] = np.nan
+    values = series.to_numpy()
+    assert_close(kernels.rolling_mean(values, 10), series.rolling(10).mean())
+    assert_close(kernels.rolling_std(values, 10), series.rolling(10).std())
+    assert_close(kernels.rolling_max(values, 10), series.rolling(10).max())
+    assert_close(kernels.rolling_min(values, 10), series.rolling(10).min())
+
+
+@pytest.mark.parametrize('rows', [1, 3])
+def test_ewm_matches_pandas_with_gaps(rows):
+    _, _, close = make_ohlc(rows=rows)
+    frame = pd.DataFrame(close.T)
+    frame.iloc[:5, 0] = np.nan
+    frame.iloc[100:104, 0] = np.nan
+    expected = frame.ewm(alpha=0.2, adjust=False).mean().T
+    actual = kernels.ewm_mean(frame.to_numpy().T, 0.2)
+    assert_close(actual, expected)
+
+
+def test_one_dimensional_input_matches_matrix_rows():
+    high, low, close = make_ohlc()
+    matrix = kernels.kd(high, low, close)
+    single = kernels.kd(high[2], low[2], close[2])
+    assert single['k'].ndim == 1
+    assert_close(single['k'], matrix['k'][2])
+    assert_close(single['d'], matrix['d'][2])
+
+
+def test_rsi_matches_previous_implementation():
+    _, _, close = make_ohlc()
+    expected = np.vstack([reference_rsi(pd.Series(row)) for row in close])
+    assert_close(kernels.rsi(close), expected)
+
+
+def test_macd_matches_previous_implementation():
+    _, _, close = make_ohlc(rows=1)
+    prices = pd.Series(close[0])
+    line = prices.ewm(span=12, adjust=False).mean() - prices.ewm(span=26, adjust=False).mean()
+    signal = line.ewm(span=9, adjust=False).mean()
+
+    macd_line, signal_line, histogram = TechnicalIndicators.calculate_macd(prices)
+    assert_close(macd_line, line)
+    assert_close(signal_line, signal)
+    assert_close(histogram, line - signal)
+
+
+def test_kd_uses_taiwan_smoothing():
+    high, low, close = make_ohlc(rows=1)
+    h, l, c = (pd.Series(x[0]) for x in (high, low, close))
+    expected_k, expected_d = reference_kd(h, l, c)
+
+    k, d = TechnicalIndicators.calculate_kd(h, l, c)
+    assert_close(k, expected_k)
+    assert_close(d, expected_d)
+
+    legacy = LegacyIndicators.calculate_kd(h, l, c)
+    assert_close(legacy['k'], expected_k)
+    assert_close(legacy['d'], expected_d)
+
+
+def test_bollinger_williams_and_atr_match_previous_implementation():
+    high, low, close = make_ohlc(rows=1)
+    h, l, c = (pd.Series(x[0]) for x in (high, low, close))
+
+    upper, middle, lower = TechnicalIndicators.calculate_bollinger_bands(c)
+    std = c.rolling(20).std()
+    assert_close(middle, c.rolling(20).mean())
+    assert_close(upper, c.rolling(20).mean() + 2 * std)
+    assert_close(lower, c.rolling(20).mean() - 2 * std)
+
+    hh, ll = h.rolling(14).max(), l.rolling(14).min()
+    assert_close(TechnicalIndicators.calculate_williams_r(h, l, c), (hh - c) / (hh - ll) * -100)
+
+    tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
+    assert_close(LegacyIndicators.calculate_atr(h, l, c), tr.rolling(14).mean())
+
+
+def test_wrappers_keep_index_and_accept_decimal_values():
+    from decimal import Decimal
+
+    prices = pd.Series([Decimal('10.5'), Decimal('11.0'), Decimal('10.75'), Decimal('11.25')],
+                       index=pd.date_range('2024-01-01', periods=4))
+    ma = TechnicalIndicators.calculate_ma(prices, 2)
+    assert list(ma.index) == list(prices.index)
+    assert ma.iloc[-1] == pytest.approx(11.0)
+
+
+def test_invalid_window_raises():
+    with pytest.raises(ValueError):
+        kernels.rolling_mean(np.arange(10.0), 0)
+    with pytest.raises(ValueError):
+        kernels.sma(np.zeros((2, 3, 4)), 2)
+
+
+def reference_wilder(values, period):
+    """Wilder 平滑逐筆參考實作：前 period 筆簡單平均起算"""
+    out = np.full(len(values), np.nan)
+    valid = [i for i, v in enumerate(values) if not np.isnan(v)]
+    if len(valid) < period:
+        return out
+    seed = valid[period - 1]
+    mean = np.mean([values[i] for i in valid[:period]])
+    out[seed] = mean
+    for t in range(seed + 1, len(values)):
+        if not np.isnan(values[t]):
+            mean = mean + (values[t] - mean) / period
+        out[t] = mean
+    return out
+
+
+@pytest.mark.parametrize('rows', [1, 3])
+def test_wilder_smooth_matches_reference_loop(rows):
+    _, _, close = make_ohlc(rows=rows)
+    close[0, :3] = np.nan
+    close[0, 40:43] = np.nan
+    expected = np.vstack([reference_wilder(row, 14) for row in close])
+    assert_close(kernels.wilder_smooth(close, 14), expected)
+
+
+def test_rsi_wilder_and_atr_wilder():
+    high, low, close = make_ohlc(rows=1)
+    h, l, c = (pd.Series(x[0]) for x in (high, low, close))
+
+    delta = c.diff().to_numpy()
+    gain = reference_wilder(np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)), 14)
+    loss = reference_wilder(np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)), 14)
+    expected = 100 - 100 / (1 + gain / loss)
+    assert_close(TechnicalIndicators.calculate_rsi_wilder(c), expected)
+    assert np.isnan(kernels.rsi_wilder(close[0])[13])
+
+    tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
+    assert_close(TechnicalIndicators.calculate_atr(h, l, c, wilder=True), reference_wilder(tr.to_numpy(), 14))
+
+
+def test_dmi_bounds_and_matrix_consistency():
+    high, low, close = make_ohlc()
+    result = kernels.dmi(high, low, close)
+    adx = result['adx'][~np.isnan(result['adx'])]
+    assert adx.size > 0 and np.all((adx >= 0) & (adx <= 100))
+    single = kernels.dmi(high[1], low[1], close[1])
+    for key in ('plus_di', 'minus_di', 'adx'):
+        assert_close(single[key], result[key][1])
+
+
+def test_obv_vwap_and_cci_match_pandas():
+    high, low, close = make_ohlc(rows=1)
+    volume = np.random.default_rng(3).integers(1_000, 50_000, size=close.shape[1]).astype(float)
+    h, l, c, v = pd.Series(high[0]), pd.Series(low[0]), pd.Series(close[0]), pd.Series(volume)
+
+    expected_obv = (np.sign(c.diff()).fillna(0) * v).cumsum()
+    assert_close(TechnicalIndicators.calculate_obv(c, v), expected_obv)
+
+    tp = (h + l + c) / 3
+    assert_close(TechnicalIndicators.calculate_vwap(h, l, c, v), (tp * v).rolling(20).sum() / v.rolling(20).sum())
+
+    mad = tp.rolling(20).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True)
+    assert_close(TechnicalIndicators.calculate_cci(h, l, c), (tp - tp.rolling(20).mean()) / (0.015 * mad))
+
+
+def test_ichimoku_shifts():
+    high, low, close = make_ohlc(rows=1)
+    h, l, c = (pd.Series(x[0]) for x in (high, low, close))
+    cloud = TechnicalIndicators.calculate_ichimoku(h, l, c)
+
+    tenkan = (h.rolling(9).max() + l.rolling(9).min()) / 2
+    kijun = (h.rolling(26).max() + l.rolling(26).min()) / 2
+    assert_close(cloud['tenkan'], tenkan)
+    assert_close(cloud['senkou_a'], ((tenkan + kijun) / 2).shift(26))
+    assert_close(cloud['senkou_b'], ((h.rolling(52).max() + l.rolling(52).min()) / 2).shift(26))
+    assert_close(cloud['chikou'], c.shift(-26))
+
+
+def test_calculate_extended_matches_individual_kernels():
+    high, low, close = make_ohlc()
+    volume = np.full(close.shape, 1_000.0)
+    result = kernels.calculate_extended(high, low, close, volume)
+
+    assert not set(result) & set(kernels.calculate_all(close, high, low))
+    assert_close(result['rsi_14_wilder'], kernels.rsi_wilder(close))
+    assert_close(result['adx_14'], kernels.dmi(high, low, close)['adx'])
+    assert_close(result['stoch_rsi_k'], kernels.stoch_rsi(close)['k'])
+    assert_close(result['ichimoku_senkou_b'], kernels.ichimoku(high, low, close)['senkou_b'])
+    assert_close(result['cci_20'], kernels.cci(high, low, close))
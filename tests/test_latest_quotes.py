@@ -0,0 +1,50 @@
+"""
+最新報價表維護邏輯測試（不需連線資料庫）
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data_loader import latest_quotes
+
+
+class RecordingCursor:
+    def __init__(self, rowcount=0):
+        self.calls = []
+        self.rowcount = rowcount
+
+    def execute(self, query, params=None):
+        self.calls.append((query, params))
+
+
+@pytest.mark.parametrize('market', list(latest_quotes.QUOTE_SOURCES))
+def test_refresh_sql_is_fully_formatted(market):
+    sql = latest_quotes.refresh_sql(market)
+    source = latest_quotes.QUOTE_SOURCES[market]
+    assert '{' not in sql and '}' not in sql
+    assert f"FROM {source['table']}" in sql
+    assert f"WHERE {source['key']} = s.symbol" in sql
+    assert 'ON CONFLICT (market, symbol)' in sql
+
+
+def test_us_quotes_are_keyed_by_symbol_column():
+    assert 'WHERE symbol = s.symbol' in latest_quotes.refresh_sql('us')
+
+
+def test_refresh_deduplicates_symbols_and_skips_empty_batches():
+    cursor = RecordingCursor(rowcount=2)
+    assert latest_quotes.refresh_latest_quotes(cursor, 'tw', ['2330', '2317', '2330', None]) == 2
+    _, params = cursor.calls[0]
+    assert params == {'market': 'tw', 'symbols': ['2317', '2330']}
+
+    assert latest_quotes.refresh_latest_quotes(cursor, 'tw', []) == 0
+    assert len(cursor.calls) == 1
+
+
+def test_unknown_market_raises():
+    with pytest.raises(KeyError):
+        latest_quotes.refresh_sql('jp')
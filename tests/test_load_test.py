@@ -0,0 +1,172 @@
+"""
+壓力測試工具測試（合成資料產生、端點組合、本機 HTTP 伺服器實測與報告比較；不需連線資料庫）
+"""
+
+import re
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts import load_test, seed_benchmark_data as seed
+
+
+@pytest.fixture
+def server():
+    app = Flask(__name__)
+    seen = []
+
+    @app.route('/api/prices/<code>')
+    def prices(code):
+        seen.append((code, request.args.get('market')))
+        return jsonify({'code': code})
+
+    @app.route('/api/bulk/prices')
+    def bulk():
+        seen.append((request.args['symbols'], 'bulk'))
+        return jsonify({})
+
+    @app.route('/api/quant/risk-analysis', methods=['POST'])
+    def risk():
+        return jsonify({'error': 'Insufficient data'}), 400
+
+    httpd = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}', seen
+    httpd.shutdown()
+
+
+MIX = [
+    {'name': 'prices', 'weight': 6, 'method': 'GET', 'path': '/api/prices/{tw}', 'params': {'market': 'tw'}},
+    {'name': 'bulk', 'weight': 2, 'method': 'GET', 'path': '/api/bulk/prices', 'params': {'symbols': '{tw_batch}'}},
+    {'name': 'risk', 'weight': 2, 'method': 'POST', 'path': '/api/quant/risk-analysis', 'json': {'code': '{tw}'}},
+    {'name': 'disabled', 'weight': 0, 'method': 'GET', 'path': '/missing'},
+]
+
+
+def test_synthetic_prices_are_consistent_and_reproducible():
+    dates = seed.trading_days(2)
+    first = seed.generate_prices(np.random.default_rng(3), 20, len(dates))
+    again = seed.generate_prices(np.random.default_rng(3), 20, len(dates))
+    np.testing.assert_array_equal(first['close_price'], again['close_price'])
+
+    close, listed = first['close_price'], ~np.isnan(first['close_price'])
+    assert (first['high_price'][listed] >= np.maximum(first['open_price'], close)[listed]).all()
+    assert (first['low_price'][listed] <= np.minimum(first['open_price'], close)[listed]).all()
+    assert (close[listed] > 0).all() and (first['volume'][listed] > 0).all()
+    # 上市前沒有價格，上市後連續有價格
+    assert (np.diff(listed.astype(int), axis=1) >= 0).all()
+
+    frame = seed.long_frame(seed.synthetic_symbols('tw', 20), dates, first)
+    assert len(frame) == listed.sum()
+    assert list(frame.columns[:2]) == ['stock_code', 'trade_date'] and frame['trade_date'].iloc[0] == str(dates[0])
+
+    trades, margins = seed.generate_chips(np.random.default_rng(3), first)
+    np.testing.assert_array_equal(trades['foreign_net'][listed],
+                                  (trades['foreign_buy'] - trades['foreign_sell'])[listed])
+    assert (margins['margin_quota'][listed] >= margins['margin_balance'][listed]).all()
+
+
+def _schema_columns(table):
+    """database/schema.sql 中 CREATE TABLE 與 ALTER TABLE ADD COLUMN 定義的欄位"""
+    schema = (Path(__file__).parent.parent / 'database' / 'schema.sql').read_text(encoding='utf-8')
+    body = re.search(rf'CREATE TABLE IF NOT EXISTS {table} \((.*?)\n\);', schema, re.S).group(1)
+    columns = set(re.findall(r'^\s*([a-z_0-9]+)\s+[A-Z]', body, re.M))
+    for alter in re.findall(rf'ALTER TABLE {table}\s(.*?);', schema, re.S):
+        columns |= set(re.findall(r'ADD COLUMN IF NOT EXISTS ([a-z_0-9]+)', alter))
+    return columns
+
+
+def test_seeded_frames_match_production_schema():
+    dates = seed.trading_days(1)
+    prices = seed.generate_prices(np.random.default_rng(5), 3, len(dates), decimals=4)
+    us = seed.long_frame(seed.synthetic_symbols('us', 3), dates, prices, key='symbol')
+    assert set(us.columns) <= _schema_columns('us_stock_prices')
+
+    indicators = seed.long_frame(
+        seed.synthetic_symbols('us', 3), dates, seed.generate_indicators(prices['close_price']),
+        {'security_type': 'US'}, key='security_code'
+    )
+    assert set(indicators.columns) <= _schema_columns('technical_indicators')
+    assert indicators['ma_5'].notna().all()
+
+
+def test_synthetic_symbols_and_dataset_fingerprint():
+    assert seed.synthetic_symbols('tw', 3) == ['1101', '1102', '1103']
+    us = seed.synthetic_symbols('us', 1000)
+    assert us[:2] == ['AAAA', 'AAAB'] and len(set(us)) == 1000
+
+    manifest = {'seed': 1, 'start_date': '2005-01-03', 'end_date': '2025-01-02',
+                'markets': {'tw': 10, 'us': 5}, 'ma_periods': [5, 20], 'generated_at': 'x'}
+    assert seed.dataset_fingerprint(manifest) == seed.dataset_fingerprint({**manifest, 'generated_at': 'y'})
+    assert seed.dataset_fingerprint(manifest) != seed.dataset_fingerprint({**manifest, 'seed': 2})
+
+
+def test_mix_overrides_and_placeholders():
+    mix = load_test.build_mix(MIX, weights={'disabled': 1}, only=['prices', 'disabled'])
+    assert [entry['name'] for entry in load_test.EndpointMix(mix).entries] == ['prices', 'disabled']
+    with pytest.raises(ValueError, match='nope'):
+        load_test.build_mix(MIX, weights={'nope': 1})
+
+    picker = load_test.SymbolPicker({'tw': [str(i) for i in range(100)]}, skew=1.0, batch_size=5)
+    rng = np.random.default_rng(0)
+    placeholders = load_test._Placeholders(picker, rng)
+    rendered = load_test.render({'path': '/x/{tw}', 'json': {'code': '{tw}', 'all': ['{tw_batch}']}}, placeholders)
+    assert rendered['path'] == f"/x/{rendered['json']['code']}"
+    assert len(set(rendered['json']['all'][0].split(','))) == 5
+
+    # 熱門標的被選中的次數較多
+    picks = [picker.one(rng, 'tw') for _ in range(2000)]
+    assert picks.count('0') > picks.count('99') * 5
+
+
+def test_run_load_test_against_local_server(server):
+    base_url, seen = server
+    result = load_test.run_load_test(
+        base_url, MIX, {'tw': ['2330', '2317', '2454']},
+        concurrency=4, duration=1.0, warmup=0.2, seed=1, batch_size=2
+    )
+    endpoints = result['endpoints']
+    assert set(endpoints) == {'prices', 'bulk', 'risk'}
+    assert endpoints['prices']['status_codes'] == {'200': endpoints['prices']['requests']}
+    assert endpoints['risk']['error_rate'] == 100.0 and endpoints['risk']['error_types'] == {
+        'HTTP 400': endpoints['risk']['requests']
+    }
+    summary = result['summary']
+    assert summary['requests'] == sum(stats['requests'] for stats in endpoints.values())
+    assert summary['throughput_rps'] > 0
+    latency = summary['latency_ms']
+    assert 0 < latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max']
+    # 預熱期間的請求有送出但不計入
+    assert len(seen) > summary['requests'] - endpoints['risk']['requests']
+    assert all(code in ('2330', '2317', '2454') for code, market in seen if market == 'tw')
+
+
+def test_fixed_rate_schedule(server):
+    base_url, _ = server
+    result = load_test.run_load_test(base_url, MIX[:1], {'tw': ['2330']}, concurrency=2, duration=1.0, rate=20)
+    assert 15 <= result['summary']['requests'] <= 21
+
+
+def test_compare_reports_flags_regressions_and_mismatched_conditions():
+    def report(p95, fingerprint='abc', concurrency=8):
+        stats = {'requests': 100, 'errors': 0, 'error_rate': 0.0, 'throughput_rps': 50.0,
+                 'latency_ms': {'p50': 10.0, 'p95': p95, 'p99': p95 * 2}}
+        return {'config': {'concurrency': concurrency, 'rate': None, 'mix': MIX}, 'dataset': {'fingerprint': fingerprint},
+                'summary': stats, 'endpoints': {'prices': stats}}
+
+    comparison = load_test.compare_reports(report(30.0), report(20.0))
+    assert comparison['comparable'] is True
+    assert comparison['endpoints']['prices']['p95_ms'] == {'baseline': 20.0, 'current': 30.0, 'change_pct': 50.0}
+    assert load_test.regressions(comparison, 25) == ['overall', 'prices']
+    assert load_test.regressions(comparison, 60) == []
+
+    mismatched = load_test.compare_reports(report(20.0, 'def', 16), report(20.0))
+    assert mismatched['comparable'] is False and len(mismatched['reasons']) == 2
@@ -0,0 +1,177 @@
+"""
+n8n 常駐任務執行器測試（排隊、去重、並行上限、執行紀錄與 HTTP 觸發；不需連線資料庫）
+"""
+
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import n8n_worker
+from n8n_worker import JobRunner, create_app
+from scripts.n8n import update_news_data
+
+
+class BlockingJobs:
+    """可控制何時結束的假任務"""
+
+    def __init__(self):
+        self.release = {}
+        self.lock = threading.Lock()
+
+    def job(self, name, fail=False):
+        def run(resources, params):
+            with self.lock:
+                gate = self.release.setdefault((name, str(params)), threading.Event())
+            gate.wait(5)
+            if fail:
+                raise RuntimeError('boom')
+            return {'job': name, **params}
+        return run
+
+    def finish(self, name, params=None):
+        with self.lock:
+            self.release.setdefault((name, str(params or {})), threading.Event()).set()
+
+
+def market_param(params):
+    return {'market': params.get('market', 'TW')}
+
+
+@pytest.fixture
+def jobs():
+    fake = BlockingJobs()
+    registry = {
+        'a': {'run': fake.job('a'), 'params': market_param, 'description': 'A'},
+        'b': {'run': fake.job('b'), 'params': n8n_worker._no_params, 'description': 'B'},
+        'bad': {'run': fake.job('bad', fail=True), 'params': n8n_worker._no_params, 'description': 'fails'},
+    }
+    return fake, registry
+
+
+class MemoryStore:
+    def __init__(self):
+        self.saved = []
+
+    def save(self, run):
+        self.saved.append((run['run_id'], run['status']))
+
+    def recent(self, job=None, limit=50):
+        raise ConnectionError('db down')
+
+    def get(self, run_id):
+        return None
+
+
+def test_duplicate_triggers_share_one_run_and_same_job_is_serialised(jobs):
+    fake, registry = jobs
+    runner = JobRunner(registry, concurrency=2)
+    try:
+        first, created = runner.submit('a', {'market': 'TW'}, source='cron')
+        again, created_again = runner.submit('a', {'market': 'TW'})
+        assert created and not created_again and again['run_id'] == first['run_id']
+
+        # 同一任務不同參數：排隊等待前一次結束
+        other, _ = runner.submit('a', {'market': 'US'})
+        assert runner.get(other['run_id'])['status'] == 'queued'
+        # 不同任務可並行
+        b, _ = runner.submit('b')
+        assert runner.wait(b['run_id'], 0.5)['status'] == 'running'
+        assert runner.status()['jobs']['a'] == {'description': 'A', 'running': 1, 'queued': 1}
+
+        fake.finish('a', {'market': 'TW'})
+        done = runner.wait(first['run_id'], 5)
+        assert done['status'] == 'done' and done['result'] == {'job': 'a', 'market': 'TW'}
+        assert done['trigger_source'] == 'cron' and done['finished_at'] >= done['started_at']
+
+        fake.finish('a', {'market': 'US'})
+        fake.finish('b')
+        assert runner.wait(other['run_id'], 5)['status'] == 'done'
+        # 結束後可再次觸發
+        _, created = runner.submit('a', {'market': 'TW'})
+        assert created
+        fake.finish('a', {'market': 'TW'})
+    finally:
+        runner.shutdown()
+
+
+def test_concurrency_limit_failures_and_history(jobs):
+    fake, registry = jobs
+    store = MemoryStore()
+    runner = JobRunner(registry, concurrency=1, store=store)
+    try:
+        a, _ = runner.submit('a')
+        bad, _ = runner.submit('bad')
+        assert runner.get(bad['run_id'])['status'] == 'queued'
+
+        fake.finish('a', {'market': 'TW'})
+        fake.finish('bad')
+        failed = runner.wait(bad['run_id'], 5)
+        assert failed['status'] == 'failed' and failed['error'] == 'RuntimeError: boom'
+
+        # 資料表無法讀取時改用本程序紀錄（新到舊）
+        runs, source = runner.history()
+        assert source == 'memory' and [run['run_id'] for run in runs] == [bad['run_id'], a['run_id']]
+        assert runner.history(job='a')[0][0]['run_id'] == a['run_id']
+
+        with pytest.raises(KeyError):
+            runner.submit('missing')
+        with pytest.raises(ValueError):
+            runner.submit('b', {'unexpected': 1})
+    finally:
+        runner.shutdown()
+    # 狀態變化依序寫入
+    assert [status for run_id, status in store.saved if run_id == a['run_id']] == ['queued', 'running', 'done']
+
+
+def test_http_trigger_wait_and_token(jobs):
+    fake, registry = jobs
+    runner = JobRunner(registry, concurrency=2)
+    client = create_app(runner, token='secret').test_client()
+    headers = {'X-Worker-Token': 'secret'}
+    try:
+        assert client.get('/api/health').status_code == 200
+        assert client.post('/api/jobs/b').status_code == 401
+        assert client.post('/api/jobs/nope', headers=headers).status_code == 404
+        assert client.post('/api/jobs/b', json={'x': 1}, headers=headers).status_code == 400
+        assert client.post('/api/jobs/b', data='{oops', headers=headers).status_code == 400
+
+        response = client.post('/api/jobs/a?wait=0.1', json={'market': 'US'}, headers=headers)
+        assert response.status_code == 202 and response.get_json()['run']['status'] == 'running'
+        run_id = response.get_json()['run']['run_id']
+
+        duplicate = client.post('/api/jobs/a', json={'market': 'US'}, headers=headers)
+        assert duplicate.get_json()['deduplicated'] is True and duplicate.get_json()['run']['run_id'] == run_id
+
+        fake.finish('a', {'market': 'US'})
+        runner.wait(run_id, 5)
+        assert client.get(f'/api/jobs/runs/{run_id}', headers=headers).get_json()['status'] == 'done'
+
+        fake.finish('bad')
+        failed = client.post('/api/jobs/bad?wait=5', headers=headers)
+        assert failed.status_code == 500 and failed.get_json()['run']['status'] == 'failed'
+
+        runs = client.get('/api/jobs/runs?job=a', headers=headers).get_json()
+        assert runs['source'] == 'memory' and len(runs['runs']) == 1
+    finally:
+        runner.shutdown()
+
+
+def test_script_skips_when_another_process_holds_the_lock():
+    class LockedDB:
+        @contextmanager
+        def advisory_lock(self, name):
+            assert name == update_news_data.LOCK_NAME
+            yield False
+
+    class NoCalls:
+        def __getattr__(self, name):
+            raise AssertionError('不應呼叫新聞客戶端')
+
+    assert update_news_data.update_news_data(db=LockedDB(), client=NoCalls()) == {
+        'skipped': True, 'reason': 'already running'
+    }
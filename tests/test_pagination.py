@@ -0,0 +1,83 @@
+"""
+時間序列 keyset 分頁測試
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import pagination
+
+
+def test_parse_page_args_defaults_and_limits():
+    assert pagination.parse_page_args({}) == {'before': None, 'after': None, 'limit': 100}
+    assert pagination.parse_page_args({'days': '30'})['limit'] == 30
+    assert pagination.parse_page_args({'limit': '99999'})['limit'] == pagination.MAX_PAGE_SIZE
+    assert pagination.parse_page_args({'since': '2024-03-01'})['after'] == date(2024, 3, 1)
+
+
+@pytest.mark.parametrize('args', [{'before': '2024/01/01'}, {'before': '2024-01-01', 'since': '2023-01-01'}])
+def test_parse_page_args_rejects_bad_cursors(args):
+    with pytest.raises(ValueError):
+        pagination.parse_page_args(args)
+
+
+def test_latest_page_reads_newest_rows_first():
+    page = pagination.parse_page_args({'limit': '20'})
+    query, params = pagination.keyset_query('tw_stock_prices', 'trade_date, close_price', {'stock_code': '2330'}, page)
+
+    assert 'ORDER BY trade_date DESC' in query
+    assert params == ('2330', 21)
+
+
+def test_us_prices_are_keyed_by_symbol():
+    import api_server_v5
+
+    page = pagination.parse_page_args({})
+    query, params = pagination.keyset_query(
+        api_server_v5.price_table('us'), 'trade_date', api_server_v5.price_filters('us', 'AAPL'), page
+    )
+    assert 'FROM us_stock_prices' in query and 'symbol = %s' in query
+    assert 'stock_code' not in query
+    assert api_server_v5.price_filters('tw', '2330') == {'stock_code': '2330'}
+
+
+def test_before_and_since_cursors():
+    before = pagination.parse_page_args({'before': '2024-01-10', 'limit': '5'})
+    query, params = pagination.keyset_query('t', 'trade_date', {'stock_code': '2330', 'period': 20}, before)
+    assert 'trade_date < %s' in query and 'DESC' in query
+    assert params == ('2330', 20, date(2024, 1, 10), 6)
+
+    since = pagination.parse_page_args({'since': '2024-01-10'})
+    query, params = pagination.keyset_query('t', 'trade_date', {'stock_code': '2330'}, since)
+    assert 'trade_date > %s' in query and 'ASC' in query
+    assert params == ('2330', date(2024, 1, 10), 101)
+
+
+def test_trim_page_orders_oldest_first_and_detects_more():
+    page = pagination.parse_page_args({'limit': '3'})
+    # 遞減查詢取回 limit + 1 筆
+    columns = {'close_price': np.array([4.0, 3.0, 2.0, 1.0])}
+
+    trimmed, has_more = pagination.trim_page(columns, page)
+    assert trimmed['close_price'].tolist() == [2.0, 3.0, 4.0]
+    assert has_more
+
+    since = pagination.parse_page_args({'since': '2024-01-01', 'limit': '3'})
+    trimmed, has_more = pagination.trim_page({'close_price': np.array([1.0, 2.0])}, since)
+    assert trimmed['close_price'].tolist() == [1.0, 2.0]
+    assert not has_more
+
+
+def test_page_info_cursors():
+    page = pagination.parse_page_args({'since': '2024-01-05'})
+    assert pagination.page_info(['2024-01-08', '2024-01-09'], page, False) == {
+        'limit': 100, 'has_more': False, 'before': '2024-01-08', 'after': '2024-01-09',
+    }
+    # 沒有新資料時沿用原游標
+    assert pagination.page_info([], page, False)['after'] == '2024-01-05'
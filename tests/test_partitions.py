@@ -0,0 +1,122 @@
+"""
+按年分區輔助函式測試（不需連線資料庫）
+"""
+
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data_loader import partitions
+
+
+class PartitionCursor:
+    """模擬 partitioning.sql：installed=False 表示函數未建立；ensure_yearly_partition 第一次呼叫時建立分區"""
+
+    def __init__(self, installed=True):
+        self.installed = installed
+        self.existing = set()
+        self.calls = []
+        self.result = None
+
+    def execute(self, query, params=None):
+        self.calls.append((query, params))
+        if 'to_regprocedure' in query:
+            self.result = self.installed
+        else:
+            assert self.installed, '函數不存在時不可呼叫 ensure_yearly_partition'
+            self.result = params not in self.existing
+            self.existing.add(params)
+
+    def fetchone(self):
+        return (self.result,)
+
+    def ensure_calls(self):
+        return [params for query, params in self.calls if 'to_regprocedure' not in query]
+
+
+@pytest.fixture(autouse=True)
+def reset_cache():
+    partitions._ensured.clear()
+    yield
+    partitions._ensured.clear()
+
+
+def test_partition_years_accepts_mixed_date_types():
+    values = [date(1999, 12, 31), datetime(2000, 1, 1), '2024-05-06',
+              pd.Timestamp('2024-07-01'), None, pd.NaT, float('nan')]
+    assert partitions.partition_years(values) == {1999, 2000, 2024}
+
+
+def test_ensure_yearly_partitions_caches_only_existing_partitions():
+    cursor = PartitionCursor()
+    dates = pd.Series(pd.to_datetime(['2023-12-29', '2024-01-02', '2024-01-03']))
+
+    assert partitions.ensure_yearly_partitions(cursor, 'tw_stock_prices', dates) == 2
+    assert cursor.ensure_calls() == [('tw_stock_prices', 2023), ('tw_stock_prices', 2024)]
+
+    # 剛建立的分區可能隨交易回滾，下次仍會檢查；確認已存在後才快取
+    assert partitions.ensure_yearly_partitions(cursor, 'tw_stock_prices', dates) == 0
+    assert len(cursor.ensure_calls()) == 4
+    calls = len(cursor.calls)
+    assert partitions.ensure_yearly_partitions(cursor, 'tw_stock_prices', dates) == 0
+    assert len(cursor.calls) == calls
+
+
+def test_ensure_yearly_partitions_skips_when_partitioning_not_applied():
+    cursor = PartitionCursor(installed=False)
+    assert partitions.ensure_yearly_partitions(cursor, 'tw_stock_prices', ['2024-01-02']) == 0
+    assert len(cursor.calls) == 1 and cursor.ensure_calls() == []
+    assert 'ensure_yearly_partition' not in cursor.calls[0][0]  # 函數名稱只以參數傳入，不會在解析時失敗
+
+
+def test_ensure_yearly_partitions_ignores_unpartitioned_tables():
+    cursor = PartitionCursor()
+    assert partitions.ensure_yearly_partitions(cursor, 'gold_prices', ['2024-01-02']) == 0
+    assert cursor.calls == []
+
+
+class MigrationConnection:
+    """逐段執行 partitioning.sql 的連線；fail 中的表格遷移失敗"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.autocommit = False
+        self.executed = []
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def execute(self, sql, params=None):
+                conn.executed.append(sql)
+                if any(f"migrate_to_yearly_partitions('{table}'" in sql for table in conn.fail):
+                    raise RuntimeError('could not create unique index')
+
+        return Cursor()
+
+
+def test_apply_partitioning_isolates_failing_tables():
+    sql = (Path(__file__).parent.parent / 'database' / 'partitioning.sql').read_text(encoding='utf-8')
+    preamble, blocks = partitions.split_migrations(sql)
+    assert 'CREATE OR REPLACE FUNCTION ensure_yearly_partition' in preamble
+    assert len(blocks) == 4 and all(block.startswith('BEGIN;') for block in blocks)
+
+    conn = MigrationConnection(fail=['tw_stock_prices'])
+    failed = partitions.apply_partitioning(conn, sql)
+    assert list(failed) == ['tw_stock_prices']
+    assert conn.autocommit
+    # 失敗的交易回滾後，其餘表格照常遷移
+    assert conn.executed[2] == 'ROLLBACK'
+    migrated = [s for s in conn.executed if 'migrate_to_yearly_partitions(' in s and s.startswith('BEGIN;')]
+    assert len(migrated) == 4
@@ -0,0 +1,101 @@
+"""
+效能量測中介層測試（直方圖、請求拆分、Prometheus 輸出與單請求 profiler；不需連線資料庫）
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from flask import Flask, jsonify
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import metrics as metrics_module
+from utils import profiling
+from utils.metrics import Histogram, external_call, metrics, record_cache
+
+
+class FakeCursor:
+    def execute(self, query, vars=None):
+        time.sleep(0.002)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(profiling.PROFILING_CONFIG, 'profile_token', 'secret')
+    monkeypatch.setattr(metrics_module.psycopg2, 'connect', metrics_module.psycopg2.connect)
+    metrics.reset()
+
+    app = Flask(__name__)
+    profiling.init_app(app)
+    timed_cursor = metrics_module._timed_cursor_class(FakeCursor)
+
+    @app.route('/api/items/<code>')
+    def item(code):
+        cursor = timed_cursor()
+        cursor.execute('SELECT 1')
+        cursor.execute('SELECT 2')
+        with external_call('twse'):
+            time.sleep(0.003)
+        record_cache('demo', hit=code == 'cached')
+        return jsonify({'code': code})
+
+    return app.test_client()
+
+
+def test_histogram_quantiles_and_cumulative_buckets():
+    hist = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        hist.observe(value)
+
+    assert hist.cumulative() == [(0.01, 1), (0.1, 3), (1.0, 4), (float('inf'), 5)]
+    assert 0.01 < hist.quantile(0.5) <= 0.1
+    assert hist.quantile(0.99) == 1.0
+    assert Histogram().quantile(0.5) is None
+
+
+def test_request_breakdown_is_recorded_per_route(client):
+    for code in ('2330', 'cached', '2317'):
+        response = client.get(f'/api/items/{code}')
+        assert response.status_code == 200
+    assert 'db;dur=' in response.headers['Server-Timing']
+
+    data = client.get('/api/system/metrics').get_json()['data']
+    route = next(r for r in data['routes'] if r['route'] == '/api/items/<code>')
+    assert route['count'] == 3
+    assert route['queries_mean'] == 2 and route['queries_max'] == 2
+    assert route['db_ms_mean'] >= 4 and route['external_ms_mean'] >= 3
+    assert data['caches']['demo'] == {'hits': 1, 'misses': 2, 'hit_ratio': 0.3333}
+    assert data['external']['twse']['count'] == 3
+
+
+def test_prometheus_output(client):
+    client.get('/api/items/2330')
+    text = client.get('/api/system/metrics?format=prometheus').get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/items/<code>",le="+Inf"} 1' in text
+    assert 'http_request_queries_total{method="GET",route="/api/items/<code>"} 2' in text
+    assert 'cache_requests_total{cache="demo",result="miss"} 1' in text
+    assert 'external_call_duration_seconds_count{service="twse"} 1' in text
+
+
+def test_profile_header_requires_token(client):
+    assert 'X-Profile-Id' not in client.get('/api/items/2330', headers={'X-Profile': 'wrong'}).headers
+
+    response = client.get('/api/items/2330', headers={'X-Profile': 'secret'})
+    profile_id = response.headers['X-Profile-Id']
+    text = client.get(f'/api/system/profiles/{profile_id}').get_data(as_text=True)
+    assert text.startswith('GET /api/items/2330')
+    assert 'function calls' in text
+    assert client.get('/api/system/profiles').get_json()['data'][0]['id'] == profile_id
+
+
+def test_timed_cursor_composes_with_custom_cursor_factories():
+    timed = metrics_module._timed_cursor_class(RealDictCursor)
+    assert issubclass(timed, RealDictCursor)
+    assert metrics_module._timed_cursor_class(RealDictCursor) is timed
+    # 請求外的查詢只計入全域統計
+    metrics.reset()
+    metrics_module._timed_cursor_class(FakeCursor)().execute('SELECT 1')
+    assert metrics.snapshot()['db']['count'] == 1
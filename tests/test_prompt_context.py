@@ -0,0 +1,71 @@
+"""
+精簡提示詞上下文測試
+"""
+
+import sys
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai.prompt_context import PromptContext, format_value
+from ai.stub_client import StubGeminiClient
+
+
+def test_format_value_compacts_numbers_and_skips_missing():
+    assert format_value(12.5000) == '12.5'
+    assert format_value(Decimal('3.14159')) == '3.14'
+    assert format_value(1234567.8) == '1,234,568'
+    assert format_value(date(2025, 1, 2)) == '2025-01-02'
+    assert format_value(None) is None
+    assert format_value(float('nan')) is None
+    assert format_value('') is None
+
+
+def test_build_renders_one_line_per_section_and_skips_empty():
+    context = PromptContext(budget_tokens=500)
+    context.add('因子', {'value': 80.0, 'quality': None, 'detail': {'roe': 18.25}})
+    context.add('空白', {'x': None})
+    text, tokens = context.build()
+
+    assert text == '[因子] value=80 | detail.roe=18.25'
+    assert tokens > 0
+
+
+def test_build_drops_lowest_priority_sections_first():
+    context = PromptContext(budget_tokens=40)
+    context.add('報價', {'price': 100, 'volume': 5000}, priority=10)
+    context.add('情緒', {'news': '正面' * 30}, priority=90)
+    context.add('籌碼', {'large_holders_pct': 55.1}, priority=30)
+    text, tokens = context.build()
+
+    assert '情緒' not in text
+    assert text.index('報價') < text.index('籌碼')
+    assert tokens <= 40
+
+
+def test_build_truncates_items_when_single_section_exceeds_budget():
+    context = PromptContext(budget_tokens=20)
+    context.add('報價', {f'field_{i}': i for i in range(30)})
+    text, tokens = context.build()
+
+    assert text.startswith('[報價] field_0=0')
+    assert 'field_29' not in text
+    assert tokens <= 20
+
+
+def test_stub_structured_output_follows_schema():
+    schema = {
+        'type': 'object',
+        'properties': {
+            'scores': {'type': 'object', 'properties': {'macro': {'type': 'number'}}},
+            'report_markdown': {'type': 'string'},
+        },
+    }
+    client = StubGeminiClient()
+    result = client.generate_structured('[報價] price=100', schema, system_instruction='固定指示')
+
+    assert result['data']['scores'] == {'macro': 70}
+    assert result['data']['report_markdown'].startswith('# Stub 報告')
+    assert client.calls == 1
@@ -0,0 +1,167 @@
+"""
+量化分析任務測試（參數正規化、指紋、任務執行與快取命中；不需連線資料庫）
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import quant_api
+from calculators import quant_jobs, quant_tasks
+from calculators.quant_jobs import QuantInputError, QuantJobExecutor
+
+AS_OF = date(2025, 1, 2)
+
+
+def make_returns(codes, rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2024-01-01', periods=rows)
+    return pd.DataFrame(rng.normal(0.0005, 0.01, (rows, len(codes))), index=index, columns=codes)
+
+
+def test_fingerprint_ignores_holding_order_but_not_inputs():
+    holdings = [{'code': '2330', 'weight': 0.6, 'market': 'tw'}, {'code': '2317', 'weight': 0.4}]
+    params = quant_jobs.normalize_request('monte-carlo', {'holdings': holdings, 'simulations': 500})
+    reordered = quant_jobs.normalize_request('monte-carlo', {'holdings': holdings[::-1], 'simulations': '500'})
+    assert params == reordered
+    assert [h['code'] for h in params['holdings']] == ['2317', '2330']
+
+    fingerprint = quant_jobs.job_fingerprint('monte-carlo', params, AS_OF)
+    assert fingerprint == quant_jobs.job_fingerprint('monte-carlo', reordered, AS_OF)
+    assert fingerprint != quant_jobs.job_fingerprint('monte-carlo', params, date(2025, 1, 3))
+
+    reweighted = quant_jobs.normalize_request('monte-carlo', {
+        'holdings': [{'code': '2330', 'weight': 0.5}, {'code': '2317', 'weight': 0.5}], 'simulations': 500
+    })
+    assert fingerprint != quant_jobs.job_fingerprint('monte-carlo', reweighted, AS_OF)
+
+
+def test_normalize_request_rejects_invalid_input():
+    with pytest.raises(QuantInputError, match='No holdings'):
+        quant_jobs.normalize_request('monte-carlo', {})
+    with pytest.raises(QuantInputError, match='simulations'):
+        quant_jobs.normalize_request('monte-carlo', {'holdings': [{'code': '2330', 'weight': 1}], 'simulations': 0})
+    with pytest.raises(QuantInputError, match='at least 2'):
+        quant_jobs.normalize_request('efficient-frontier', {'holdings': [{'code': '2330'}]})
+    with pytest.raises(QuantInputError, match='No code'):
+        quant_jobs.normalize_request('risk-analysis', {'market': 'TW'})
+    with pytest.raises(QuantInputError, match='Unknown job type'):
+        quant_jobs.normalize_request('black-scholes', {})
+
+    # 效率前緣與權重無關：權重不同仍為同一組參數
+    assert quant_jobs.normalize_request('efficient-frontier', {
+        'holdings': [{'code': 'AAPL', 'market': 'US', 'weight': 0.2}, {'code': 'MSFT', 'market': 'US'}]
+    }) == {'holdings': [{'code': 'AAPL', 'market': 'US'}, {'code': 'MSFT', 'market': 'US'}]}
+
+
+def test_run_job_reports_progress_stages(monkeypatch):
+    monkeypatch.setattr(quant_tasks, 'fetch_historical_returns',
+                        lambda holdings, days=252, conn=None: make_returns([h['code'] for h in holdings]))
+    params = quant_jobs.normalize_request('monte-carlo', {
+        'holdings': [{'code': '2330', 'weight': 0.7}, {'code': '2317', 'weight': 0.3}],
+        'simulations': 200, 'days': 20
+    })
+
+    stages = []
+    result = quant_jobs.run_job('monte-carlo', params, progress=stages.append)
+    assert stages == ['fetching', 'computing']
+    assert isinstance(result, dict) and result
+
+
+def test_run_job_without_data_raises_input_error(monkeypatch):
+    monkeypatch.setattr(quant_tasks, 'fetch_historical_returns', lambda holdings, days=252, conn=None: pd.DataFrame())
+    params = quant_jobs.normalize_request('risk-analysis', {'code': '2330'})
+    with pytest.raises(QuantInputError, match='Insufficient'):
+        quant_jobs.run_job('risk-analysis', params)
+
+
+def test_fetch_historical_returns_falls_back_to_api_for_missing_symbols(monkeypatch):
+    index = pd.bdate_range('2024-01-01', periods=300)
+    db_closes = {'2330': pd.Series(np.linspace(500, 600, 300), index=index)}
+    api_calls = []
+
+    monkeypatch.setattr(quant_tasks, '_load_db_closes', lambda conn, market, codes, start: db_closes)
+
+    def fetch_api(code, market, start, end):
+        api_calls.append(code)
+        return pd.Series(np.linspace(100, 110, 300), index=index)
+
+    monkeypatch.setattr(quant_tasks, '_fetch_api_closes', fetch_api)
+
+    returns = quant_tasks.fetch_historical_returns(
+        [{'code': '2330', 'market': 'TW'}, {'code': '2317', 'market': 'TW'}], conn=object()
+    )
+    assert api_calls == ['2317']
+    assert list(returns.columns) == ['2330', '2317']
+    assert len(returns) == 299
+
+
+def test_load_db_closes_uses_each_markets_key_column(monkeypatch):
+    queries = []
+
+    def fake_fetch(cursor, query, params, dtypes=None):
+        queries.append(query)
+        return {'code': np.array(['AAPL', 'AAPL'], dtype=object),
+                'trade_date': np.array(['2024-01-02', '2024-01-03'], dtype='datetime64[D]'),
+                'close_price': np.array([185.0, 184.0])}
+
+    class Conn:
+        def cursor(self):
+            return self
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(quant_tasks, 'fetch_arrays', fake_fetch)
+    closes = quant_tasks._load_db_closes(Conn(), 'US', ['AAPL'], date(2024, 1, 1))
+    assert 'FROM us_stock_prices' in queries[0] and 'symbol = ANY' in queries[0]
+    assert closes['AAPL'].tolist() == [185.0, 184.0]
+
+    quant_tasks._load_db_closes(Conn(), 'TW', ['2330'], date(2024, 1, 1))
+    assert 'FROM tw_stock_prices' in queries[1] and 'stock_code = ANY' in queries[1]
+
+
+def test_executor_returns_cached_result_without_submitting(monkeypatch):
+    cached = {'id': 9, 'status': 'done', 'result': {'expected_return': 0.1}, 'error': None}
+    monkeypatch.setattr(quant_jobs, 'lookup_result', lambda conn, fingerprint: cached)
+    monkeypatch.setattr(quant_jobs, 'create_job', lambda *args: pytest.fail('不應建立任務'))
+
+    executor = QuantJobExecutor(max_workers=1)
+    job = executor.submit(None, 'risk-analysis', {'code': '2330', 'market': 'TW'}, as_of=AS_OF)
+    assert job['cached'] is True and job['result'] == {'expected_return': 0.1}
+    assert executor._pool is None
+
+    payload, status_code = quant_api.job_response(job)
+    assert status_code == 200
+    assert payload['data'] == {'expected_return': 0.1} and payload['cached'] is True
+
+
+def test_executor_joins_active_job_with_same_fingerprint(monkeypatch):
+    active = {'id': 5, 'status': 'running', 'stage': 'computing', 'error': None}
+    monkeypatch.setattr(quant_jobs, 'lookup_result', lambda conn, fingerprint: None)
+    monkeypatch.setattr(quant_jobs, 'expire_stale', lambda conn: 0)
+    monkeypatch.setattr(quant_jobs, 'create_job', lambda *args: (active, False))
+
+    executor = QuantJobExecutor(max_workers=1)
+    job = executor.submit(None, 'risk-analysis', {'code': '2330', 'market': 'TW'}, as_of=AS_OF)
+    assert job['id'] == 5 and job['cached'] is False
+    assert executor._pool is None and executor.future(5) is None
+
+    payload, status_code = quant_api.job_response(job)
+    assert status_code == 202 and payload['job']['stage'] == 'computing'
+
+
+def test_job_response_maps_failures_to_status_codes():
+    insufficient = {'id': 1, 'status': 'failed', 'error': 'Insufficient data', 'error_type': 'QuantInputError'}
+    crashed = {'id': 2, 'status': 'failed', 'error': 'pool crashed', 'error_type': 'BrokenProcessPool'}
+    assert quant_api.job_response(insufficient)[1] == 400
+    assert quant_api.job_response(crashed)[1] == 500
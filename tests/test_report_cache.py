@@ -0,0 +1,175 @@
+"""
+AI 報告快取測試（不需連線資料庫）
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai.report_cache import ReportCache, advisory_lock_key, compute_fingerprint
+from data_loader.report_invalidation import mark_reports_outdated
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.calls = []
+        self.rowcount = 3
+
+    def execute(self, query, params=None):
+        self.calls.append((query, params))
+
+
+class MemoryReportCache(ReportCache):
+    """以字典取代 ai_reports 的快取"""
+
+    def __init__(self):
+        self.conn = None
+        self.ttl_days = 7
+        self.reports = {}
+
+    def lookup(self, fingerprint):
+        return self.reports.get(fingerprint)
+
+    def store(self, fingerprint, report_type, title, content, market_data, model,
+              template_version, security_type=None, security_code=None,
+              prompt_tokens=None, completion_tokens=None):
+        report = {
+            'id': len(self.reports) + 1,
+            'report_content': content,
+            'market_data': market_data,
+            'prompt_tokens': prompt_tokens,
+        }
+        self.reports[fingerprint] = report
+        return report
+
+    def _acquire_advisory_lock(self, fingerprint, timeout, poll_interval):
+        return False
+
+    async def _acquire_advisory_lock_async(self, fingerprint, timeout, poll_interval):
+        return False
+
+
+def test_fingerprint_ignores_key_order_and_numeric_type():
+    a = compute_fingerprint('stock_decision', {'price': Decimal('600.50'), 'date': date(2025, 1, 2)}, 'V8.1', 'm')
+    b = compute_fingerprint('stock_decision', {'date': '2025-01-02', 'price': 600.5}, 'V8.1', 'm')
+    assert a == b
+    assert len(a) == 64
+
+
+def test_fingerprint_changes_with_inputs_template_and_model():
+    inputs = {'price_date': '2025-01-02', 'tdcc_date': '2024-12-27'}
+    base = compute_fingerprint('decision_template', inputs, 'decision-v1', 'gemini-2.5-flash')
+    assert base != compute_fingerprint('decision_template', {**inputs, 'tdcc_date': '2025-01-03'},
+                                       'decision-v1', 'gemini-2.5-flash')
+    assert base != compute_fingerprint('decision_template', inputs, 'decision-v2', 'gemini-2.5-flash')
+    assert base != compute_fingerprint('decision_template', inputs, 'decision-v1', 'gemini-2.5-pro')
+
+
+def test_advisory_lock_key_is_signed_bigint():
+    key = advisory_lock_key('f' * 64)
+    assert -2 ** 63 <= key < 2 ** 63
+
+
+def test_get_or_generate_reuses_stored_report():
+    cache = MemoryReportCache()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return {'content': '報告', 'prompt_tokens': 120, 'market_data': {'six_factors': {'macro': 70}}}
+
+    report, hit = cache.get_or_generate('stock_decision', {'price': 1.0}, generate, 't', 'm', 'V8.1')
+    assert not hit
+    assert report['market_data'] == {'price': 1.0, 'six_factors': {'macro': 70}}
+    assert report['prompt_tokens'] == 120
+
+    report, hit = cache.get_or_generate('stock_decision', {'price': 1.0}, generate, 't', 'm', 'V8.1')
+    assert hit
+    assert report['report_content'] == '報告'
+    assert len(calls) == 1
+
+
+def test_concurrent_identical_requests_generate_once():
+    cache = MemoryReportCache()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.05)
+        return '報告'
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            cache.get_or_generate('daily_strategy', {'date': '2025-01-02'}, generate, 't', 'm', 'daily-v1')))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sum(1 for _, hit in results if not hit) == 1
+    assert {report['id'] for report, _ in results} == {1}
+
+
+def test_mark_reports_outdated_filters_codes():
+    cursor = RecordingCursor()
+    assert mark_reports_outdated(cursor, []) == 0
+    assert cursor.calls == []
+
+    assert mark_reports_outdated(cursor, ['2330', '2317', '2330']) == 3
+    query, params = cursor.calls[0]
+    assert 'security_code = ANY' in query
+    assert params[1] == ['2317', '2330']
+
+    mark_reports_outdated(cursor, report_types=('daily_strategy',))
+    query, params = cursor.calls[1]
+    assert 'security_code' not in query
+    assert params == [['daily_strategy']]
+
+
+def test_get_or_generate_async_coalesces_concurrent_requests():
+    cache = MemoryReportCache()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return '非同步報告'
+
+    async def request_all():
+        return await asyncio.gather(*[
+            cache.get_or_generate_async('decision_template', {'code': '2330'}, generate,
+                                        title='t', model='m', template_version='v')
+            for _ in range(5)
+        ])
+
+    results = asyncio.run(request_all())
+    assert len(calls) == 1
+    assert {report['report_content'] for report, _ in results} == {'非同步報告'}
+    assert sorted(hit for _, hit in results) == [False, True, True, True, True]
+
+
+def test_inflight_locks_are_released_after_generation():
+    cache = MemoryReportCache()
+
+    async def generate_async():
+        return '非同步報告'
+
+    for index in range(20):
+        cache.get_or_generate('daily_strategy', {'date': index}, lambda: '報告', 't', 'm', 'daily-v1')
+        asyncio.run(cache.get_or_generate_async('decision_template', {'code': index}, generate_async,
+                                                title='t', model='m', template_version='v'))
+
+    fingerprint = compute_fingerprint('daily_strategy', {'date': 0}, 'daily-v1', 'm')
+    assert fingerprint not in ReportCache._inflight
+    assert len(ReportCache._inflight) == 0
+    assert len(ReportCache._inflight_async) == 0
@@ -0,0 +1,121 @@
+"""
+增量同步規劃測試（交易日曆、缺漏區間、請求合併；不需連線資料庫）
+"""
+
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data_loader.sync_planner import _price_rows, plan_sync, run_incremental_sync
+from data_loader.trading_calendar import TradingCalendar, get_calendar
+
+TW = get_calendar('TW')
+
+
+def test_calendar_skips_weekends_holidays_and_typhoon_closures():
+    # 2024 春節：2/6 ~ 2/14 休市
+    assert TW.trading_days('2024-02-02', '2024-02-16') == [
+        date(2024, 2, 2), date(2024, 2, 5), date(2024, 2, 15), date(2024, 2, 16)
+    ]
+    assert not TW.is_trading_day('2024-07-24')  # 凱米颱風
+    assert TW.count_trading_days('2024-07-22', '2024-07-26') == 3
+    assert TW.next_trading_day('2024-02-10') == date(2024, 2, 15)
+    assert TW.previous_trading_day('2024-02-15', inclusive=False) == date(2024, 2, 5)
+
+
+def test_last_complete_session_waits_for_close():
+    cal = TradingCalendar('TW', {}, timezone='Asia/Taipei', close='13:30')
+    tz = cal.timezone
+    assert cal.last_complete_session(datetime(2024, 3, 6, 10, 0, tzinfo=tz)) == date(2024, 3, 5)
+    assert cal.last_complete_session(datetime(2024, 3, 6, 14, 0, tzinfo=tz)) == date(2024, 3, 6)
+    assert cal.last_complete_session(datetime(2024, 3, 6, 14, 0, tzinfo=tz), settle_minutes=60) == date(2024, 3, 5)
+    # 週一盤中 → 上週五
+    assert cal.last_complete_session(datetime(2024, 3, 11, 9, 0, tzinfo=tz)) == date(2024, 3, 8)
+
+
+def test_plan_only_requests_missing_trading_days():
+    end = date(2024, 2, 16)
+    watermarks = {
+        'UPTODATE': (date(2023, 1, 3), date(2024, 2, 16)),
+        'HOLIDAY': (date(2023, 1, 3), date(2024, 2, 5)),    # 只差春節休市 + 2/15、2/16
+        'NEW': (None, None),
+    }
+    plan = plan_sync(watermarks, TW, end, initial_start=date(2024, 2, 10))
+    assert plan == [
+        {'symbol': 'HOLIDAY', 'start': date(2024, 2, 15), 'end': date(2024, 2, 16), 'sessions': 2},
+        {'symbol': 'NEW', 'start': date(2024, 2, 15), 'end': date(2024, 2, 16), 'sessions': 2},
+    ]
+
+    # 同步到週末：最後一個交易日已有資料就不發請求
+    assert plan_sync({'X': (None, date(2024, 3, 8))}, TW, date(2024, 3, 10), date(2024, 1, 1)) == []
+
+
+def test_backfill_head_and_tail_are_merged_when_close_together():
+    watermarks = {'2330': (date(2024, 3, 4), date(2024, 3, 5))}
+    plan = plan_sync(watermarks, TW, date(2024, 3, 8), date(2024, 1, 1),
+                     backfill_start=date(2024, 2, 26), merge_gap_days=2)
+    assert plan == [{'symbol': '2330', 'start': date(2024, 2, 26), 'end': date(2024, 3, 8), 'sessions': 9}]
+
+    split = plan_sync(watermarks, TW, date(2024, 3, 8), date(2024, 1, 1),
+                      backfill_start=date(2024, 2, 26), merge_gap_days=1)
+    assert [(r['start'], r['end']) for r in split] == [
+        (date(2024, 2, 26), date(2024, 3, 1)), (date(2024, 3, 6), date(2024, 3, 8))
+    ]
+
+
+class WatermarkConn:
+    """只回應水位查詢的連線（dry-run 不寫入）"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self.params = params
+
+    def fetchall(self):
+        return [row for row in self.rows if row[0] in self.params['symbols']]
+
+    def commit(self):
+        pass
+
+
+def test_dry_run_dedups_symbols_and_uses_last_complete_session():
+    conn = WatermarkConn([
+        ('2330', date(2020, 1, 2), date(2024, 3, 5)),
+        ('2317', date(2020, 1, 2), date(2024, 3, 6)),
+    ])
+
+    def fetch(symbols, start, end):
+        raise AssertionError('dry-run 不應抓取')
+
+    now = datetime(2024, 3, 6, 16, 0, tzinfo=TW.timezone)
+    stats = run_incremental_sync(conn, 'tw', ['2330', '2317', '2330'], fetch, now=now, dry_run=True)
+    assert conn.params['symbols'] == ['2317', '2330'] and conn.params['data_source'] == 'taiwan_stock'
+    assert stats['end'] == '2024-03-06' and stats['up_to_date'] == 1 and stats['requests'] == 1
+    assert stats['plan'] == [{'symbol': '2330', 'start': date(2024, 3, 6), 'end': date(2024, 3, 6), 'sessions': 1}]
+
+
+def test_price_rows_convert_missing_values_to_null():
+    frame = pd.DataFrame({
+        'symbol': ['2330', '2330'],
+        'trade_date': [date(2024, 3, 5), date(2024, 3, 6)],
+        'open': [700.0, float('nan')], 'high': [710.0, 712.0], 'low': [695.0, 701.0],
+        'close': [705.0, 708.0], 'volume': [1000.0, float('nan')],
+    })
+    rows = _price_rows(frame)
+    assert rows[0] == ('2330', date(2024, 3, 5), 700.0, 710.0, 695.0, 705.0, 1000, 705.0)
+    assert rows[1][2] is None and rows[1][6] is None and isinstance(rows[0][6], int)
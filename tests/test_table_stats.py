@@ -0,0 +1,82 @@
+"""
+資料表統計模組測試（不需連線資料庫）
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data_loader import table_stats
+
+
+class ScriptedCursor:
+    """依序回傳預先準備的 fetchone / fetchall 結果"""
+
+    def __init__(self, results=()):
+        self.calls = []
+        self.results = list(results)
+
+    def execute(self, query, params=None):
+        self.calls.append((query, params))
+
+    def fetchone(self):
+        return self.results.pop(0)
+
+    def fetchall(self):
+        return self.results.pop(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+def test_count_inserted_ignores_conflict_updates():
+    assert table_stats.count_inserted([(True,), (False,), (True,)]) == 2
+    assert table_stats.count_inserted([]) == 0
+
+
+def test_increment_skips_zero_delta():
+    cursor = ScriptedCursor()
+    table_stats.increment_row_count(cursor, 'tw_stock_prices', 0)
+    assert cursor.calls == []
+    table_stats.increment_row_count(cursor, 'tw_stock_prices', 5)
+    assert cursor.calls[0][1] == (5, 'tw_stock_prices')
+
+
+def test_increment_never_creates_counter_rows():
+    # 尚無計數列時不可把 delta 當成總數（否則會回報 exact 的極小筆數）
+    cursor = ScriptedCursor()
+    table_stats.increment_row_count(cursor, 'tw_stock_prices', 300)
+    query = cursor.calls[0][0]
+    assert 'UPDATE table_row_counts' in query
+    assert 'INSERT' not in query
+
+
+def test_reconcile_skips_missing_tables():
+    cursor = ScriptedCursor([(True,), (1234,), (False,)])
+    counts = table_stats.reconcile_row_counts(cursor, ['tw_stock_prices', 'commodity_prices'])
+    assert counts == {'tw_stock_prices': 1234}
+    assert 'FROM tw_stock_prices' in cursor.calls[1][0]
+
+
+def test_table_stats_fall_back_to_estimates():
+    reconciled = datetime(2024, 1, 2, 3, 0)
+    cursor = ScriptedCursor([[
+        ('tw_stock_prices', 1000, reconciled, 990),
+        ('us_stock_prices', None, None, 500),
+    ]])
+    stats = table_stats.get_table_stats(FakeConnection(cursor), ['tw_stock_prices', 'us_stock_prices'])
+    assert stats['tw_stock_prices'] == {'count': 1000, 'exact': True, 'reconciled_at': reconciled.isoformat()}
+    assert stats['us_stock_prices'] == {'count': 500, 'exact': False, 'reconciled_at': None}
@@ -0,0 +1,87 @@
+"""
+證券主檔快取測試（代碼正規化、去重、批次 id 解析；不需連線資料庫）
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from data_loader.universe import SecurityUniverse, canonical_symbols, canonical_ticker, tw_listings
+
+MASTER = [
+    (1, '2330', 'TW', 'TWSE', 'listed'),
+    (2, '6488', 'TW', 'TPEX', 'listed'),
+    (3, '2888', 'TW', 'TWSE', 'delisted'),
+    (4, 'AAPL', 'US', None, 'listed'),
+]
+
+
+class MasterCursor:
+    """只回應證券主檔查詢的游標，記錄執行過的查詢"""
+
+    def __init__(self, rows, extra=None):
+        self.rows = rows
+        self.extra = extra or {}
+        self.queries = []
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.queries.append(params)
+        if params is None:
+            self.result = self.rows
+        else:
+            self.result = [(t, self.extra[t]) for t in params[0] if t in self.extra]
+
+    def fetchall(self):
+        return self.result
+
+
+class ListingClient:
+    def get_stock_list(self, market):
+        return [
+            {'code': '2330', 'name': '台積電', 'market': 'TWSE', 'industry': 'Unknown'},
+            {'code': '6488 ', 'name': '環球晶', 'market': 'TPEX', 'industry': 'Unknown'},
+            {'code': '2330', 'name': '台積電', 'market': 'TPEX', 'industry': 'Unknown'},
+        ]
+
+
+def test_canonical_symbols_dedup_and_strip_suffixes():
+    assert canonical_ticker(' 2330.tw ') == '2330'
+    assert canonical_ticker('6488.TWO') == '6488'
+    assert canonical_symbols(['2888', '5388', '2888.TW', 'aapl', '', 'AAPL']) == ['2888', '5388', 'AAPL']
+
+
+def test_tw_listings_keep_first_exchange_per_code():
+    listings = tw_listings(ListingClient())
+    assert listings == [
+        {'ticker': '2330', 'name': '台積電', 'exchange': 'TWSE', 'industry': None},
+        {'ticker': '6488', 'name': '環球晶', 'exchange': 'TPEX', 'industry': None},
+    ]
+
+
+def test_universe_symbols_exclude_delisted():
+    universe = SecurityUniverse()
+    cursor = MasterCursor(MASTER)
+    assert universe.symbols(cursor, 'tw') == ['2330', '6488']
+    assert universe.symbols(cursor, 'TW', exchange='TWSE') == ['2330']
+    assert universe.filter_listed(cursor, ['2888', '0050', '2330.TW', '2330']) == ['0050', '2330']
+    assert len(cursor.queries) == 1  # 主檔只載入一次
+
+
+def test_resolve_ids_loads_once_and_caches_misses():
+    universe = SecurityUniverse()
+    cursor = MasterCursor(MASTER, extra={'NVDA': 9})
+    assert universe.resolve_ids(cursor, ['2330', 'AAPL', '2330.TW']) == {'2330': 1, 'AAPL': 4}
+    assert len(cursor.queries) == 1
+
+    # 主檔快取中沒有的代碼以一次 ANY() 查詢補查，查不到的不再重查
+    assert universe.resolve_ids(cursor, ['NVDA', 'ZZZZ', '2330']) == {'NVDA': 9, '2330': 1}
+    assert cursor.queries[1] == (['NVDA', 'ZZZZ'],)
+    assert universe.security_id(cursor, 'ZZZZ') is None
+    assert universe.security_id(cursor, 'nvda') == 9
+    assert len(cursor.queries) == 2
+
+    universe.invalidate()
+    universe.security_id(cursor, '2330')
+    assert len(cursor.queries) == 3
@@ -0,0 +1,317 @@
+"""
+外部 API 呼叫遙測
+
+各 API 客戶端（BaseAPIClient 子類別與 Gemini）的實際流量統計，依資料來源（API_RATE_LIMITS 的鍵，
+例如 'yfinance'、'alpha_vantage'）與日期彙總：
+- 請求數、失敗數、重試數、快取命中數、限流等待次數
+- 延遲直方圖（p50 / p95 / p99）、最後成功 / 失敗時間與錯誤訊息
+
+統計先累積在程序內，由背景執行緒定期（與程序結束時，僅限資料庫可寫入時）把增量寫入 api_call_stats，
+多個程序（API worker、回溯腳本、排程）的流量在資料庫加總後即為當日實際用量，
+可據此計算剩餘配額。
+"""
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, Optional
+
+import psycopg2
+from loguru import logger
+
+from config.settings import API_RATE_LIMITS, API_TELEMETRY_CONFIG, DATABASE_CONFIG
+from utils.metrics import BUCKETS, Histogram, external_call
+
+COUNTERS = ('requests', 'errors', 'retries', 'cache_hits', 'rate_limit_waits')
+
+
+class SourceStats:
+    """單一來源單日的統計"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.rate_limit_waits = 0
+        self.latency = Histogram()
+        self.last_success_at: Optional[datetime] = None
+        self.last_error_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    def merge(self, other: 'SourceStats'):
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.latency.counts = [a + b for a, b in zip(self.latency.counts, other.latency.counts)]
+        self.latency.sum += other.latency.sum
+        self.latency.count += other.latency.count
+        if other.last_success_at and (not self.last_success_at or other.last_success_at > self.last_success_at):
+            self.last_success_at = other.last_success_at
+        if other.last_error_at and (not self.last_error_at or other.last_error_at > self.last_error_at):
+            self.last_error_at, self.last_error = other.last_error_at, other.last_error
+
+
+class TelemetryStore:
+    """程序內的 API 流量統計（執行緒安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 自程序啟動的累計值，與尚未寫入資料庫的增量
+        self._totals: Dict[tuple, SourceStats] = {}
+        self._pending: Dict[tuple, SourceStats] = {}
+        self._flusher: Optional[threading.Thread] = None
+        # 最近一次寫入資料庫是否成功（None 為尚未嘗試）
+        self._persist_ok: Optional[bool] = None
+
+    def _update(self, source: str, apply):
+        key = (source, date.today())
+        with self._lock:
+            for bucket in (self._totals, self._pending):
+                apply(bucket.setdefault(key, SourceStats()))
+        self._ensure_flusher()
+
+    def record_call(self, source: str, elapsed: float, error: Optional[str] = None):
+        """記錄一次實際送出的請求"""
+        now = datetime.now().astimezone()
+
+        def apply(stats):
+            stats.requests += 1
+            stats.latency.observe(elapsed)
+            if error is None:
+                stats.last_success_at = now
+            else:
+                stats.errors += 1
+                stats.last_error_at, stats.last_error = now, error[:500]
+        self._update(source, apply)
+
+    def record_retry(self, source: str):
+        self._update(source, lambda stats: setattr(stats, 'retries', stats.retries + 1))
+
+    def record_cache_hit(self, source: str):
+        self._update(source, lambda stats: setattr(stats, 'cache_hits', stats.cache_hits + 1))
+
+    def record_rate_limit_wait(self, source: str):
+        self._update(source, lambda stats: setattr(stats, 'rate_limit_waits', stats.rate_limit_waits + 1))
+
+    def local_stats(self, day: Optional[date] = None, pending_only: bool = False) -> Dict[str, SourceStats]:
+        """本程序的統計（{來源: SourceStats}，為複本）"""
+        day = day or date.today()
+        result = {}
+        with self._lock:
+            for (source, stat_date), stats in (self._pending if pending_only else self._totals).items():
+                if stat_date == day:
+                    copy = SourceStats()
+                    copy.merge(stats)
+                    result[source] = copy
+        return result
+
+    # ========== 寫入資料庫 ==========
+
+    def flush(self, conn=None) -> int:
+        """
+        將增量寫入 api_call_stats（失敗時保留增量待下次寫入）
+
+        Returns:
+            寫入的（來源, 日期）數
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        own_conn = conn is None
+        try:
+            conn = conn or psycopg2.connect(**DATABASE_CONFIG)
+            try:
+                with conn.cursor() as cursor:
+                    for (source, stat_date), stats in pending.items():
+                        upsert_stats(cursor, source, stat_date, stats)
+                conn.commit()
+            finally:
+                if own_conn:
+                    conn.close()
+            self._persist_ok = True
+            return len(pending)
+        except Exception as e:
+            self._persist_ok = False
+            logger.debug(f"API 遙測寫入失敗，保留至下次：{e}")
+            with self._lock:
+                for key, stats in pending.items():
+                    self._pending.setdefault(key, SourceStats()).merge(stats)
+            return 0
+
+    def _ensure_flusher(self):
+        if self._flusher is not None or not API_TELEMETRY_CONFIG['persist']:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='api-telemetry', daemon=True)
+            self._flusher.start()
+        atexit.register(self._flush_at_exit)
+
+    def _flush_at_exit(self):
+        """程序結束時寫入剩餘增量；資料庫不可用（測試、離線執行）時不在結束時嘗試連線"""
+        if self._persist_ok:
+            self.flush()
+
+    def _flush_loop(self):
+        # 啟動後先寫入一次，及早得知資料庫是否可用
+        while True:
+            self.flush()
+            time.sleep(API_TELEMETRY_CONFIG['flush_seconds'])
+
+
+class _Call:
+    """track_call() 產生的單次呼叫紀錄（未拋出例外的失敗可設定 error）"""
+    __slots__ = ('error',)
+
+    def __init__(self):
+        self.error: Optional[str] = None
+
+
+@contextmanager
+def track_call(source: str):
+    """
+    記錄一次外部呼叫的延遲與成功 / 失敗（同時計入目前請求的外部 API 時間）
+
+        with track_call('yfinance') as call:
+            response = requests.get(...)
+            if response.status_code >= 400:
+                call.error = f'HTTP {response.status_code}'
+    """
+    call = _Call()
+    started = time.perf_counter()
+    try:
+        with external_call(source):
+            yield call
+    except Exception as e:
+        call.error = call.error or f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        telemetry.record_call(source, time.perf_counter() - started, call.error)
+
+
+def upsert_stats(cursor, source: str, stat_date: date, stats: SourceStats):
+    """累加一筆（來源, 日期）的增量"""
+    cursor.execute("""
+        INSERT INTO api_call_stats (
+            source, stat_date, requests, errors, retries, cache_hits, rate_limit_waits,
+            latency_sum, latency_buckets, last_success_at, last_error_at, last_error
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (source, stat_date) DO UPDATE SET
+            requests = api_call_stats.requests + EXCLUDED.requests,
+            errors = api_call_stats.errors + EXCLUDED.errors,
+            retries = api_call_stats.retries + EXCLUDED.retries,
+            cache_hits = api_call_stats.cache_hits + EXCLUDED.cache_hits,
+            rate_limit_waits = api_call_stats.rate_limit_waits + EXCLUDED.rate_limit_waits,
+            latency_sum = api_call_stats.latency_sum + EXCLUDED.latency_sum,
+            latency_buckets = ARRAY(
+                SELECT COALESCE(a, 0) + COALESCE(b, 0)
+                FROM unnest(api_call_stats.latency_buckets, EXCLUDED.latency_buckets) AS t(a, b)
+            ),
+            last_success_at = GREATEST(api_call_stats.last_success_at, EXCLUDED.last_success_at),
+            last_error_at = GREATEST(api_call_stats.last_error_at, EXCLUDED.last_error_at),
+            last_error = CASE
+                WHEN EXCLUDED.last_error_at IS NOT NULL
+                     AND EXCLUDED.last_error_at >= COALESCE(api_call_stats.last_error_at, EXCLUDED.last_error_at)
+                THEN EXCLUDED.last_error ELSE api_call_stats.last_error END,
+            updated_at = NOW()
+    """, (
+        source, stat_date, stats.requests, stats.errors, stats.retries, stats.cache_hits,
+        stats.rate_limit_waits, stats.latency.sum, stats.latency.counts,
+        stats.last_success_at, stats.last_error_at, stats.last_error
+    ))
+
+
+def load_stats(conn, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, SourceStats]:
+    """
+    讀取所有程序寫入的統計，期間內依來源加總（{來源: SourceStats}）
+
+    Args:
+        conn: 資料庫連線
+        start: 起始日期（預設今天）
+        end: 結束日期（預設同 start 之後的所有日期）
+    """
+    start = start or date.today()
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT source, requests, errors, retries, cache_hits, rate_limit_waits,
+                   latency_sum, latency_buckets, last_success_at, last_error_at, last_error
+            FROM api_call_stats
+            WHERE stat_date >= %s AND (%s::date IS NULL OR stat_date <= %s)
+        """, (start, end, end))
+        rows = cursor.fetchall()
+
+    result = {}
+    for row in rows:
+        stats = SourceStats()
+        (source, stats.requests, stats.errors, stats.retries, stats.cache_hits, stats.rate_limit_waits,
+         latency_sum, buckets, stats.last_success_at, stats.last_error_at, stats.last_error) = row
+        buckets = list(buckets or [])
+        stats.latency.counts = (buckets + [0] * (len(BUCKETS) + 1))[:len(BUCKETS) + 1]
+        stats.latency.sum = float(latency_sum or 0)
+        stats.latency.count = sum(stats.latency.counts)
+        result.setdefault(source, SourceStats()).merge(stats)
+    return result
+
+
+def collect_stats(conn=None, start: Optional[date] = None) -> Dict[str, SourceStats]:
+    """
+    實際流量：資料庫（所有程序已寫入的部分）加上本程序尚未寫入的增量；
+    無資料庫連線時只有本程序的當日統計
+    """
+    if conn is None:
+        return telemetry.local_stats()
+    combined = load_stats(conn, start)
+    for source, stats in telemetry.local_stats(pending_only=True).items():
+        combined.setdefault(source, SourceStats()).merge(stats)
+    return combined
+
+
+def quota_remaining(stats: Optional[SourceStats], source: str) -> Optional[int]:
+    """依 API_RATE_LIMITS 的 daily_limit 計算剩餘配額（無上限時為 None）"""
+    limit = API_RATE_LIMITS.get(source, {}).get('daily_limit')
+    if limit is None:
+        return None
+    return max(limit - (stats.requests if stats else 0), 0)
+
+
+def remaining_quota(source: str, conn=None) -> Optional[int]:
+    """
+    來源今日剩餘配額（回溯排程依此決定是否執行；None 表示無每日上限）
+
+    Args:
+        source: API_RATE_LIMITS 的鍵
+        conn: 資料庫連線（跨程序加總）；None 時只計本程序
+    """
+    return quota_remaining(collect_stats(conn).get(source), source)
+
+
+def summarize(source: str, stats: Optional[SourceStats]) -> Dict:
+    """單一來源的統計摘要（API 狀態端點與回溯排程使用）"""
+    stats = stats or SourceStats()
+    limits = API_RATE_LIMITS.get(source, {})
+    latency = stats.latency.summary()
+    return {
+        'source': source,
+        'requests': stats.requests,
+        'errors': stats.errors,
+        'error_rate': round(stats.errors / stats.requests * 100, 2) if stats.requests else 0.0,
+        'retries': stats.retries,
+        'cache_hits': stats.cache_hits,
+        'rate_limit_waits': stats.rate_limit_waits,
+        'latency_p50_ms': latency['p50_ms'],
+        'latency_p95_ms': latency['p95_ms'],
+        'latency_p99_ms': latency['p99_ms'],
+        'daily_limit': limits.get('daily_limit'),
+        'quota_remaining': quota_remaining(stats, source),
+        'last_success_at': stats.last_success_at,
+        'last_error_at': stats.last_error_at,
+        'last_error': stats.last_error,
+    }
+
+
+telemetry = TelemetryStore()
@@ -0,0 +1,90 @@
+"""
+非同步 PostgreSQL 存取（asyncpg，供 asgi_server.py 使用）
+
+- create_pool：建立連線池，NUMERIC 直接解碼為 float
+- fetch_arrays_async：與 utils.typed_fetch.fetch_arrays 相同的欄位陣列輸出
+- to_asyncpg：將 psycopg2 風格的 %s 佔位符轉為 $1, $2...，
+  讓 utils.pagination / bulk_api 產生的查詢可直接沿用
+"""
+import os
+import re
+from typing import Dict, Optional
+
+import numpy as np
+
+from config.settings import ASGI_CONFIG
+from utils.typed_fetch import _column
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - 依部署環境而定
+    asyncpg = None
+
+_PLACEHOLDER = re.compile(r'%(s|%)')
+
+
+def to_asyncpg(query: str) -> str:
+    """'%s' → '$n'，'%%' → '%'"""
+    counter = iter(range(1, query.count('%s') + 1))
+    return _PLACEHOLDER.sub(lambda m: f'${next(counter)}' if m.group(1) == 's' else '%', query)
+
+
+async def _init_connection(conn):
+    await conn.set_type_codec(
+        'numeric', encoder=str, decoder=float, schema='pg_catalog', format='text'
+    )
+
+
+async def create_pool(min_size: Optional[int] = None, max_size: Optional[int] = None):
+    """
+    建立 asyncpg 連線池（連線參數與各 API 的 get_db() 相同，讀取 DB_* 環境變數）
+
+    Raises:
+        RuntimeError: 未安裝 asyncpg
+    """
+    if asyncpg is None:
+        raise RuntimeError('ASGI 模式需要 asyncpg：pip install asyncpg')
+    return await asyncpg.create_pool(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '15432')),
+        database=os.getenv('DB_NAME', 'quant_db'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'postgres'),
+        min_size=min_size or ASGI_CONFIG['db_pool_min_size'],
+        max_size=max_size or ASGI_CONFIG['db_pool_max_size'],
+        init=_init_connection,
+    )
+
+
+async def fetch_arrays_async(
+    pool,
+    query: str,
+    params=(),
+    dtypes: Optional[Dict[str, object]] = None,
+    reverse: bool = False
+) -> Dict[str, np.ndarray]:
+    """
+    fetch_arrays 的非同步版本
+
+    Args:
+        pool: asyncpg 連線池
+        query: SQL（%s 佔位符）
+        params: 查詢參數
+        dtypes: 欄位型別（同 fetch_arrays）
+        reverse: 反轉列順序
+
+    Returns:
+        {欄位名稱: 陣列}
+    """
+    dtypes = dtypes or {}
+    async with pool.acquire() as conn:
+        statement = await conn.prepare(to_asyncpg(query))
+        rows = await statement.fetch(*params)
+        names = [attribute.name for attribute in statement.get_attributes()]
+    if reverse:
+        rows.reverse()
+
+    return {
+        name: _column(rows, index, dtypes.get(name, np.float64))
+        for index, name in enumerate(names)
+    }
@@ -0,0 +1,174 @@
+"""
+API 回應編碼層
+
+- FastJSONProvider：以 orjson 序列化（原生支援 NumPy 陣列、date/datetime，
+  Decimal 轉 float），未安裝 orjson 時退回標準 json 並使用相同的型別轉換
+- tabular()：依查詢參數 ?format=columnar 回傳欄式（{"trade_date": [...], "close_price": [...]}）
+  或預設的列式（[{...}, ...]）資料
+- init_app()：GET 回應加上 ETag 並處理 If-None-Match（304），
+  大型回應依 Accept-Encoding 以 brotli / gzip 壓縮
+"""
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+from config.settings import API_RESPONSE_CONFIG
+from utils.metrics import record_cache
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 依部署環境而定
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/plain', 'text/csv', 'text/html'}
+
+
+def _default(obj):
+    """orjson / json 無法直接處理的型別"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps_bytes(obj) -> bytes:
+    """序列化為 UTF-8 bytes（NaN / Inf 輸出為 null）"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_replace_nan(obj), default=_default, ensure_ascii=False).encode('utf-8')
+
+
+def _replace_nan(obj):
+    # 與 orjson 行為一致：非有限浮點數輸出為 null，避免產生非法 JSON
+    if isinstance(obj, float):
+        return obj if np.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _replace_nan(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_replace_nan(value) for value in obj]
+    if isinstance(obj, np.ndarray) and obj.dtype.kind == 'f':
+        return [value if np.isfinite(value) else None for value in obj.tolist()]
+    return obj
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider（jsonify 與 app.json 皆使用）"""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_bytes(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def columnar_requested(args=None) -> bool:
+    """前端是否要求欄式格式（?format=columnar；args 預設為目前 Flask 請求的查詢參數）"""
+    args = request.args if args is None else args
+    return args.get('format', '').lower() == 'columnar'
+
+
+def tabular(columns: Dict[str, Sequence], columnar: Optional[bool] = None):
+    """
+    依請求格式輸出表格資料
+
+    Args:
+        columns: {欄位名稱: 等長的陣列或列表}
+        columnar: 是否輸出欄式（預設依目前 Flask 請求的 ?format= 判斷）
+
+    Returns:
+        欄式時原樣回傳 columns；否則轉為列式 [{欄位: 值}, ...]
+    """
+    if columnar is None:
+        columnar = columnar_requested()
+    if columnar:
+        return columns
+    names = list(columns)
+    values = [
+        column.tolist() if isinstance(column, np.ndarray) else list(column)
+        for column in columns.values()
+    ]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def _negotiate_encoding(accept_encoding: str):
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress_body(body: bytes, accept_encoding: str):
+    """
+    依 Accept-Encoding 壓縮回應本文（小於 compress_min_bytes 不壓縮）
+
+    Returns:
+        (本文, Content-Encoding 或 None)
+    """
+    if len(body) < API_RESPONSE_CONFIG['compress_min_bytes']:
+        return body, None
+    encoding = _negotiate_encoding(accept_encoding)
+    if encoding == 'br':
+        return brotli.compress(body, quality=API_RESPONSE_CONFIG['brotli_quality']), encoding
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=API_RESPONSE_CONFIG['gzip_level']), encoding
+    return body, None
+
+
+def _finalize_response(response):
+    # 串流（SSE）與檔案回應不處理
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if response.status_code != 200:
+        return response
+
+    # ETag 以未壓縮內容計算（weak，壓縮與否皆視為同一份資料）
+    if request.method in ('GET', 'HEAD'):
+        if not response.get_etag()[0]:
+            response.add_etag(weak=True)
+        response.make_conditional(request)
+        if 'If-None-Match' in request.headers:
+            record_cache('http_etag', response.status_code == 304)
+        if response.status_code == 304:
+            return response
+
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers:
+        return response
+
+    body = response.get_data()
+    if len(body) < API_RESPONSE_CONFIG['compress_min_bytes']:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body, encoding = compress_body(body, request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    """為 Flask app 啟用快速 JSON 編碼、ETag 與壓縮"""
+    app.json = FastJSONProvider(app)
+    app.after_request(_finalize_response)
+    return app
@@ -0,0 +1,109 @@
+"""
+延遲載入工具（縮短 API 伺服器與 n8n 排程腳本的啟動時間）
+
+- lazy_module()：模組代理物件，第一次存取屬性時才 import（scipy.optimize、yfinance、google.generativeai 等）
+- module_available()：只查找模組是否存在，不執行 import
+- lazy_exports()：套件 __init__ 的 __getattr__ / __dir__，匯出名稱在第一次使用時才載入子模組
+- lazy_singleton()：第一次呼叫時才建立的共用實例（API 客戶端、報告產生器）
+
+啟動時間可用 `python -X importtime -c "import api_server_v5"` 檢查，
+tests/test_import_time.py 對 API 伺服器與 n8n 腳本設有上限。
+"""
+import importlib
+import importlib.util
+import threading
+from typing import Callable, Dict, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class _LazyModule:
+    """第一次存取屬性時才 import 的模組代理"""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_module(name: str) -> _LazyModule:
+    """
+    延遲載入的模組，用法同 `import name`
+
+    >>> optimize = lazy_module('scipy.optimize')   # 此時尚未 import
+    >>> optimize.minimize(...)                      # 第一次使用時 import
+    """
+    return _LazyModule(name)
+
+
+def module_available(name: str) -> bool:
+    """模組是否已安裝（不執行 import，取代 try: import ... except ImportError 的可用性檢查）"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    套件層級的延遲匯出（PEP 562）
+
+    exports: {匯出名稱: 相對子模組}，例如 {'GeminiClient': '.gemini_client'}
+
+        __getattr__, __dir__ = lazy_exports(__name__, {...})
+
+    `from package import Name` 與 `package.Name` 照常可用，但只載入需要的子模組
+    """
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(f"module '{package}' has no attribute '{name}'")
+        value = getattr(importlib.import_module(exports[name], package), name)
+        # 快取到套件命名空間，之後不再經過 __getattr__
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(importlib.import_module(package))) | set(exports))
+
+    return __getattr__, __dir__
+
+
+def lazy_singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    第一次呼叫時以 factory() 建立並快取的共用實例（執行緒安全）
+
+        get_tw_client = lazy_singleton(TWStockClient)
+        get_tw_client().get_daily_price(...)
+    """
+    lock = threading.Lock()
+    instance = []
+
+    def get() -> T:
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    get.__name__ = f'get_{getattr(factory, "__name__", "instance")}'
+    get.__doc__ = f'{getattr(factory, "__name__", "factory")} 的共用實例（第一次呼叫時建立）'
+    return get
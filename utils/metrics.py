@@ -0,0 +1,317 @@
+"""
+程序內效能統計（不依賴 Flask，資料載入與 AI 模組也可回報）
+
+- Histogram：固定區間延遲直方圖（輸出 Prometheus 累積格式與 p50 / p95 / p99 估計）
+- metrics：路由延遲、SQL 查詢時間、快取命中、外部 API 呼叫的統計
+- record_cache / external_call：各模組回報快取命中與外部呼叫耗時
+- instrument_psycopg2：包裝 psycopg2 cursor.execute，計入目前請求的 DB 時間與查詢數
+
+目前請求的累計量測（RequestStats）存於 contextvar，由 utils.profiling 在請求開始時建立。
+"""
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Optional
+
+import psycopg2
+from psycopg2 import extensions
+
+# 延遲直方圖區間（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """固定區間直方圖（與 Prometheus histogram 相同的累積輸出）"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """以區間內線性插值估計分位數（超過最大區間時回傳最大區間上限）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def cumulative(self):
+        """[(le, 累積次數)]，最後一項為 +Inf"""
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """毫秒為單位的摘要"""
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+        return {
+            'count': self.count,
+            'mean_ms': ms(self.sum / self.count) if self.count else None,
+            'p50_ms': ms(self.quantile(0.5)),
+            'p95_ms': ms(self.quantile(0.95)),
+            'p99_ms': ms(self.quantile(0.99)),
+        }
+
+
+class RequestStats:
+    """單一請求的累計量測"""
+    __slots__ = ('started', 'db_time', 'queries', 'external_time', 'external_calls')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+        self.external_time = 0.0
+        self.external_calls = 0
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.db_time = 0.0
+        self.external_time = 0.0
+        self.queries = 0
+        self.max_queries = 0
+
+
+class MetricsRegistry:
+    """程序內的效能統計"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.routes: Dict[tuple, RouteStats] = defaultdict(RouteStats)
+            self.db = Histogram()
+            self.caches = defaultdict(lambda: {'hits': 0, 'misses': 0})
+            self.external = defaultdict(lambda: {'latency': Histogram(), 'errors': 0})
+
+    def observe_request(self, method: str, route: str, status_code: int, elapsed: float, stats: RequestStats):
+        with self._lock:
+            route_stats = self.routes[(method, route)]
+            route_stats.latency.observe(elapsed)
+            route_stats.errors += status_code >= 500
+            route_stats.db_time += stats.db_time
+            route_stats.external_time += stats.external_time
+            route_stats.queries += stats.queries
+            route_stats.max_queries = max(route_stats.max_queries, stats.queries)
+
+    def observe_query(self, elapsed: float):
+        with self._lock:
+            self.db.observe(elapsed)
+
+    def observe_cache(self, name: str, hit: bool):
+        with self._lock:
+            self.caches[name]['hits' if hit else 'misses'] += 1
+
+    def observe_external(self, service: str, elapsed: float, failed: bool):
+        with self._lock:
+            self.external[service]['latency'].observe(elapsed)
+            self.external[service]['errors'] += failed
+
+    def snapshot(self) -> Dict:
+        """JSON 輸出"""
+        with self._lock:
+            routes = []
+            for (method, route), stats in sorted(self.routes.items(), key=lambda item: -item[1].latency.sum):
+                count = stats.latency.count
+                compute = stats.latency.sum - stats.db_time - stats.external_time
+                routes.append({
+                    'method': method,
+                    'route': route,
+                    'errors': stats.errors,
+                    **stats.latency.summary(),
+                    'total_s': round(stats.latency.sum, 3),
+                    'db_ms_mean': round(stats.db_time * 1000 / count, 2),
+                    'external_ms_mean': round(stats.external_time * 1000 / count, 2),
+                    'compute_ms_mean': round(max(compute, 0.0) * 1000 / count, 2),
+                    'queries_mean': round(stats.queries / count, 2),
+                    'queries_max': stats.max_queries,
+                })
+            caches = {
+                name: dict(counts, hit_ratio=round(counts['hits'] / max(counts['hits'] + counts['misses'], 1), 4))
+                for name, counts in sorted(self.caches.items())
+            }
+            external = {
+                service: dict(values['latency'].summary(), errors=values['errors'])
+                for service, values in sorted(self.external.items())
+            }
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'routes': routes,
+                'db': self.db.summary(),
+                'caches': caches,
+                'external': external,
+            }
+
+    def prometheus(self) -> str:
+        """Prometheus 文字格式輸出"""
+        lines = []
+
+        def histogram(name, help_text, items):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, hist in items:
+                for bound, total in hist.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {total}' if labels
+                                 else f'{name}_bucket{{le="{le}"}} {total}')
+                suffix = f'{{{labels}}}' if labels else ''
+                lines.append(f'{name}_sum{suffix} {hist.sum:.6f}')
+                lines.append(f'{name}_count{suffix} {hist.count}')
+
+        def counter(name, help_text, items):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            lines.extend(f'{name}{{{labels}}} {value}' for labels, value in items)
+
+        with self._lock:
+            route_labels = {key: f'method="{key[0]}",route="{_escape(key[1])}"' for key in self.routes}
+            histogram('http_request_duration_seconds', '請求延遲',
+                      [(route_labels[key], stats.latency) for key, stats in self.routes.items()])
+            counter('http_request_errors_total', '5xx 回應數',
+                    [(route_labels[key], stats.errors) for key, stats in self.routes.items()])
+            counter('http_request_db_seconds_total', '請求內資料庫時間',
+                    [(route_labels[key], f'{stats.db_time:.6f}') for key, stats in self.routes.items()])
+            counter('http_request_external_seconds_total', '請求內外部 API 時間',
+                    [(route_labels[key], f'{stats.external_time:.6f}') for key, stats in self.routes.items()])
+            counter('http_request_queries_total', '請求內 SQL 查詢數',
+                    [(route_labels[key], stats.queries) for key, stats in self.routes.items()])
+            histogram('db_query_duration_seconds', 'SQL 查詢時間', [('', self.db)])
+            counter('cache_requests_total', '快取查詢數', [
+                (f'cache="{_escape(name)}",result="{result}"', counts[key])
+                for name, counts in self.caches.items()
+                for result, key in (('hit', 'hits'), ('miss', 'misses'))
+            ])
+            histogram('external_call_duration_seconds', '外部 API 呼叫時間',
+                      [(f'service="{_escape(service)}"', values['latency'])
+                       for service, values in self.external.items()])
+            counter('external_call_errors_total', '外部 API 呼叫失敗數',
+                    [(f'service="{_escape(service)}"', values['errors']) for service, values in self.external.items()])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+metrics = MetricsRegistry()
+# 目前請求的累計量測（請求外為 None）
+current_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar('request_stats', default=None)
+
+
+# ========== 各模組回報 ==========
+
+def record_cache(name: str, hit: bool):
+    """回報一次快取查詢結果"""
+    metrics.observe_cache(name, hit)
+
+
+@contextmanager
+def external_call(service: str):
+    """
+    量測外部 API 呼叫（計入目前請求的 external 時間）
+
+        with profiling.external_call('gemini'):
+            response = model.generate_content(...)
+    """
+    started = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe_external(service, elapsed, failed)
+        stats = current_stats.get()
+        if stats is not None:
+            stats.external_time += elapsed
+            stats.external_calls += 1
+
+
+# ========== psycopg2 查詢量測 ==========
+
+class _TimedCursorMixin:
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record_query(time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record_query(time.perf_counter() - started)
+
+    def callproc(self, procname, parameters=None):
+        started = time.perf_counter()
+        try:
+            return super().callproc(procname, parameters)
+        finally:
+            _record_query(time.perf_counter() - started)
+
+
+def _record_query(elapsed: float):
+    metrics.observe_query(elapsed)
+    stats = current_stats.get()
+    if stats is not None:
+        stats.db_time += elapsed
+        stats.queries += 1
+
+
+@lru_cache(maxsize=None)
+def _timed_cursor_class(factory):
+    # 與呼叫端指定的 cursor_factory（例如 RealDictCursor）組合
+    return type(f'Timed{factory.__name__}', (_TimedCursorMixin, factory), {})
+
+
+class InstrumentedConnection(extensions.connection):
+    """所有 cursor 皆量測 execute 時間的連線"""
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or extensions.cursor
+        kwargs['cursor_factory'] = _timed_cursor_class(factory)
+        return super().cursor(*args, **kwargs)
+
+
+_original_connect = psycopg2.connect
+
+
+def _instrumented_connect(dsn=None, connection_factory=None, cursor_factory=None, **kwargs):
+    return _original_connect(
+        dsn, connection_factory=connection_factory or InstrumentedConnection,
+        cursor_factory=cursor_factory, **kwargs
+    )
+
+
+def instrument_psycopg2():
+    """讓各模組 get_db() 建立的連線皆量測查詢（替換 psycopg2.connect，可重複呼叫）"""
+    psycopg2.connect = _instrumented_connect
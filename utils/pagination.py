@@ -0,0 +1,137 @@
+"""
+時間序列 keyset 分頁
+
+以交易日作為游標，搭配 (代碼, trade_date) 索引只讀取需要的列：
+- 無游標：最近 limit 筆
+- before=日期：早於該日的 limit 筆（往前翻頁）
+- after / since=日期：晚於該日的資料（圖表增量更新，只取新 K 棒）
+結果一律由舊到新排列。
+"""
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} 必須為 YYYY-MM-DD 格式：{value}')
+
+
+def parse_page_args(args, default_limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    解析分頁查詢參數
+
+    Args:
+        args: request.args
+        default_limit: 未指定 limit 時的筆數（舊參數 days 視同 limit）
+
+    Returns:
+        {'before': date|None, 'after': date|None, 'limit': int}
+
+    Raises:
+        ValueError: 日期格式錯誤或同時指定 before 與 after
+    """
+    before = _parse_date(args.get('before'), 'before')
+    after = _parse_date(args.get('after') or args.get('since'), 'after/since')
+    if before and after:
+        raise ValueError('before 與 after/since 不可同時指定')
+
+    limit = int(args.get('limit') or args.get('days') or default_limit)
+    return {
+        'before': before,
+        'after': after,
+        'limit': max(1, min(limit, MAX_PAGE_SIZE)),
+    }
+
+
+def keyset_query(
+    table: str,
+    columns: str,
+    filters: Dict[str, Any],
+    page: Dict[str, Any],
+    date_column: str = 'trade_date'
+) -> Tuple[str, tuple]:
+    """
+    產生 keyset 分頁查詢（多取一筆用於判斷是否還有下一頁）
+
+    Args:
+        table: 表格名稱
+        columns: 查詢欄位（需包含 date_column）
+        filters: 等值條件 {欄位: 值}，例如 {'stock_code': '2330'}
+        page: parse_page_args 的結果
+        date_column: 日期欄位
+
+    Returns:
+        (SQL, 參數)；after 查詢為遞增排序，其餘為遞減排序（呼叫端需反轉）
+    """
+    clauses = [f"{column} = %s" for column in filters]
+    params = list(filters.values())
+
+    if page['after']:
+        clauses.append(f"{date_column} > %s")
+        params.append(page['after'])
+        order = 'ASC'
+    else:
+        # 不加估算的日期下界：停牌等缺漏會讓下界截掉資料，使 has_more 誤判
+        if page['before']:
+            clauses.append(f"{date_column} < %s")
+            params.append(page['before'])
+        order = 'DESC'
+
+    query = f"""
+        SELECT {columns}
+        FROM {table}
+        WHERE {' AND '.join(clauses)}
+        ORDER BY {date_column} {order}
+        LIMIT %s
+    """
+    params.append(page['limit'] + 1)
+    return query, tuple(params)
+
+
+def is_descending(page: Dict[str, Any]) -> bool:
+    """keyset_query 是否以遞減排序取資料"""
+    return not page['after']
+
+
+def trim_page(columns: Dict[str, Any], page: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    去掉多取的一筆並轉為由舊到新
+
+    Args:
+        columns: fetch_arrays 的結果（查詢原始順序）
+        page: parse_page_args 的結果
+
+    Returns:
+        (由舊到新的欄位陣列, 是否還有更多資料)
+    """
+    count = len(next(iter(columns.values()))) if columns else 0
+    has_more = count > page['limit']
+    step = -1 if is_descending(page) else 1
+    return {name: values[:page['limit']][::step] for name, values in columns.items()}, has_more
+
+
+def page_info(dates: list, page: Dict[str, Any], has_more: bool) -> Dict[str, Any]:
+    """
+    回應中的分頁資訊
+
+    Args:
+        dates: 本頁由舊到新的 ISO 日期
+        page: parse_page_args 的結果
+        has_more: 查詢方向上是否還有資料
+
+    Returns:
+        {'limit', 'has_more', 'before', 'after'}：before / after 為取得前一頁、後續資料的游標
+    """
+    return {
+        'limit': page['limit'],
+        'has_more': has_more,
+        'before': dates[0] if dates else (page['before'].isoformat() if page['before'] else None),
+        'after': dates[-1] if dates else (page['after'].isoformat() if page['after'] else None),
+    }
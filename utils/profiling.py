@@ -0,0 +1,155 @@
+"""
+請求層級效能量測（Flask）
+
+init_app(app) 為 Flask app（含所有 Blueprint）加上：
+- 各路由延遲直方圖、請求數與 5xx 數
+- 每個請求的資料庫時間與查詢數（包裝 psycopg2 cursor.execute）、外部 API 時間，
+  其餘視為運算時間（compute = total - db - external）；回應附 Server-Timing 標頭
+- GET /api/system/metrics（JSON；?format=prometheus 輸出 Prometheus 文字格式），
+  含 utils.metrics 收集的快取命中率與外部呼叫耗時
+- 單一請求的 profiler：帶 X-Profile 標頭（值為 PROFILE_TOKEN）時以 cProfile
+  （或 pyinstrument）分析該請求，結果以 X-Profile-Id 標頭指向 /api/system/profiles/<id>
+
+統計資料為程序內記憶體，多 worker 部署時每個 worker 各自統計。
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import Response, current_app, g, jsonify, request
+from loguru import logger
+
+from config.settings import PROFILING_CONFIG
+from utils.metrics import RequestStats, current_stats, instrument_psycopg2, metrics
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - 依部署環境而定
+    pyinstrument = None
+
+
+# ========== Profiler ==========
+
+_profiles: 'OrderedDict[str, str]' = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def _profile_requested() -> bool:
+    value = request.headers.get('X-Profile')
+    if not value:
+        return False
+    token = PROFILING_CONFIG['profile_token']
+    # 未設定 token 時僅限 debug 模式使用
+    return value == token if token else current_app.debug
+
+
+def _start_profiler():
+    if PROFILING_CONFIG['profiler'] == 'pyinstrument' and pyinstrument is not None:
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    return profiler
+
+
+def _finish_profiler(profiler) -> str:
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PROFILING_CONFIG['profile_lines'])
+        return output.getvalue()
+    profiler.stop()
+    return profiler.output_text(unicode=True)
+
+
+def _store_profile(label: str, text: str) -> str:
+    profile_id = uuid.uuid4().hex[:12]
+    with _profiles_lock:
+        _profiles[profile_id] = f'{label}\n\n{text}'
+        while len(_profiles) > PROFILING_CONFIG['profile_keep']:
+            _profiles.popitem(last=False)
+    return profile_id
+
+
+# ========== Flask hooks ==========
+
+def _before_request():
+    g._request_stats_token = current_stats.set(RequestStats())
+    if _profile_requested():
+        g._profiler = _start_profiler()
+
+
+def _after_request(response):
+    stats = current_stats.get()
+    if stats is None:
+        return response
+    elapsed = time.perf_counter() - stats.started
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    metrics.observe_request(request.method, route, response.status_code, elapsed, stats)
+
+    compute = max(elapsed - stats.db_time - stats.external_time, 0.0)
+    response.headers['Server-Timing'] = (
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+        f'ext;dur={stats.external_time * 1000:.1f}, app;dur={compute * 1000:.1f}, '
+        f'total;dur={elapsed * 1000:.1f}'
+    )
+
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        label = f'{request.method} {request.full_path} → {response.status_code} ({elapsed * 1000:.1f} ms)'
+        response.headers['X-Profile-Id'] = _store_profile(label, _finish_profiler(profiler))
+
+    if elapsed * 1000 >= PROFILING_CONFIG['slow_request_ms']:
+        logger.warning(
+            f"慢請求 {request.method} {route}：{elapsed * 1000:.0f} ms"
+            f"（DB {stats.db_time * 1000:.0f} ms / {stats.queries} 次查詢，外部 {stats.external_time * 1000:.0f} ms）"
+        )
+    return response
+
+
+def _teardown_request(exc):
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        _finish_profiler(profiler)
+    token = g.pop('_request_stats_token', None)
+    if token is not None:
+        current_stats.reset(token)
+
+
+def metrics_view():
+    """效能統計（?format=prometheus 輸出 Prometheus 文字格式）"""
+    if request.args.get('format') == 'prometheus':
+        return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify({'success': True, 'data': metrics.snapshot()})
+
+
+def profiles_view(profile_id=None):
+    """已保存的 profiler 結果（不帶 ID 時列出最近的結果）"""
+    with _profiles_lock:
+        if profile_id is None:
+            return jsonify({'success': True, 'data': [
+                {'id': key, 'label': text.split('\n', 1)[0]} for key, text in reversed(_profiles.items())
+            ]})
+        text = _profiles.get(profile_id)
+    if text is None:
+        return jsonify({'success': False, 'error': 'profile 不存在'}), 404
+    return Response(text, mimetype='text/plain')
+
+
+def init_app(app):
+    """為 Flask app（含所有 Blueprint）啟用效能量測與 /api/system/metrics"""
+    if not PROFILING_CONFIG['enabled']:
+        return app
+    instrument_psycopg2()
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/api/system/metrics', 'system_metrics', metrics_view)
+    app.add_url_rule('/api/system/profiles', 'system_profiles', profiles_view)
+    app.add_url_rule('/api/system/profiles/<profile_id>', 'system_profile', profiles_view)
+    return app
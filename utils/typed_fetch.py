@@ -0,0 +1,94 @@
+"""
+查詢結果直接轉為 NumPy 陣列
+
+API 端點常只讀取數百列資料再算出幾個數字，逐列建立 RealDictCursor 字典、
+再組成 DataFrame 的成本遠高於計算本身。這裡以一般 cursor 取回 tuple，
+NUMERIC 在解析階段就轉成 float（不建立 Decimal），再以 np.fromiter 逐欄填入型別陣列。
+"""
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+from psycopg2 import extensions
+
+# NUMERIC → float（僅註冊在使用的 cursor 上，不影響其他查詢）
+NUMERIC_AS_FLOAT = extensions.new_type(
+    extensions.DECIMAL.values,
+    'NUMERIC_AS_FLOAT',
+    lambda value, cursor: float(value) if value is not None else None
+)
+
+
+def _column(rows: Sequence[tuple], index: int, dtype) -> np.ndarray:
+    count = len(rows)
+    if dtype is object:
+        column = np.empty(count, dtype=object)
+        column[:] = [row[index] for row in rows]
+        return column
+    if np.issubdtype(np.dtype(dtype), np.floating):
+        return np.fromiter(
+            (np.nan if row[index] is None else row[index] for row in rows),
+            dtype=dtype, count=count
+        )
+    return np.fromiter((row[index] for row in rows), dtype=dtype, count=count)
+
+
+def fetch_arrays(
+    cursor,
+    query: str,
+    params=None,
+    dtypes: Optional[Dict[str, object]] = None,
+    reverse: bool = False
+) -> Dict[str, np.ndarray]:
+    """
+    執行查詢並以欄位名稱回傳 NumPy 陣列
+
+    Args:
+        cursor: psycopg2 一般 cursor（非 RealDictCursor）
+        query: SQL
+        params: 查詢參數
+        dtypes: 欄位型別（預設 float64；可為空值的整數欄位請用 float64，
+                日期用 'datetime64[D]'，其他用 object）
+        reverse: 反轉列順序（常見於 ORDER BY ... DESC LIMIT 取最近 N 筆後轉為由舊到新）
+
+    Returns:
+        {欄位名稱: 陣列}；無資料時各欄為長度 0 的陣列
+    """
+    dtypes = dtypes or {}
+    extensions.register_type(NUMERIC_AS_FLOAT, cursor)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    if reverse:
+        rows.reverse()
+
+    return {
+        desc[0]: _column(rows, index, dtypes.get(desc[0], np.float64))
+        for index, desc in enumerate(cursor.description)
+    }
+
+
+def dates_to_iso(values: np.ndarray) -> list:
+    """datetime64[D] 陣列轉為 ISO 日期字串列表"""
+    return np.datetime_as_string(values, unit='D').tolist()
+
+
+def group_arrays(columns: Dict[str, np.ndarray], key: str) -> Dict[object, Dict[str, np.ndarray]]:
+    """
+    依鍵欄位切分多標的查詢結果（結果須已依鍵排序）
+
+    Args:
+        columns: fetch_arrays 的結果
+        key: 鍵欄位（例如 stock_code）
+
+    Returns:
+        {鍵值: {其餘欄位: 陣列切片}}
+    """
+    keys = columns[key]
+    if not len(keys):
+        return {}
+    boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(keys)]))
+    return {
+        keys[start]: {name: values[start:end] for name, values in columns.items() if name != key}
+        for start, end in zip(starts, ends)
+    }
@@ -19,6 +19,10 @@ app.config['SECRET_KEY'] = 'your-secret-key'
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# DatabaseWriter 寫入的 USD/TWD 匯率代碼（每 1 美元兌新台幣）
+USD_TWD_PAIR = 'TWD/USD'
+
+
 def get_db():
     """獲取資料庫連接"""
     return psycopg2.connect(
@@ -36,23 +40,34 @@ def get_market_data():
         conn = get_db()
         cursor = conn.cursor()
         
-        # 獲取最新黃金價格
+        # 黃金與USD/TWD匯率：一次讀取 latest_quotes
         cursor.execute("""
-            SELECT close_price, trade_date 
-            FROM commodity_prices 
-            WHERE commodity_code = 'GOLD' 
-            ORDER BY trade_date DESC LIMIT 1
-        """)
-        gold = cursor.fetchone()
+            SELECT market, close_price, trade_date
+            FROM latest_quotes
+            WHERE (market, symbol) IN (('gold', 'GOLD'), ('fx', %s))
+        """, (USD_TWD_PAIR,))
+        quotes = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        gold = quotes.get('gold')
+        forex = quotes.get('fx')
         
-        # 獲取最新USD/TWD匯率
-        cursor.execute("""
-            SELECT rate, trade_date 
-            FROM exchange_rates 
-            WHERE base_currency = 'USD' AND quote_currency = 'TWD' 
-            ORDER BY trade_date DESC LIMIT 1
-        """)
-        forex = cursor.fetchone()
+        # latest_quotes 尚未建立時回查原始表
+        if gold is None:
+            cursor.execute("""
+                SELECT close_price, trade_date 
+                FROM commodity_prices 
+                WHERE commodity_code = 'GOLD' 
+                ORDER BY trade_date DESC LIMIT 1
+            """)
+            gold = cursor.fetchone()
+        
+        if forex is None:
+            cursor.execute("""
+                SELECT rate, trade_date 
+                FROM exchange_rates 
+                WHERE base_currency = 'USD' AND quote_currency = 'TWD' 
+                ORDER BY trade_date DESC LIMIT 1
+            """)
+            forex = cursor.fetchone()
         
         cursor.close()
         conn.close()
@@ -111,22 +126,31 @@ def handle_subscribe_stock(data):
         cursor = conn.cursor()
         
         market = data.get('market', 'tw')
-        if market == 'tw':
-            cursor.execute("""
-                SELECT stock_code, close_price, trade_date, volume
-                FROM tw_stock_prices
-                WHERE stock_code = %s
-                ORDER BY trade_date DESC LIMIT 1
-            """, (stock_code,))
-        else:
-            cursor.execute("""
-                SELECT symbol, close_price, trade_date, volume
-                FROM us_stock_prices
-                WHERE symbol = %s
-                ORDER BY trade_date DESC LIMIT 1
-            """, (stock_code,))
-        
+        cursor.execute("""
+            SELECT symbol, close_price, trade_date, volume
+            FROM latest_quotes
+            WHERE market = %s AND symbol = %s
+        """, (market, stock_code))
         result = cursor.fetchone()
+        
+        # latest_quotes 尚未建立該標的時回查價格表
+        if result is None:
+            if market == 'tw':
+                cursor.execute("""
+                    SELECT stock_code, close_price, trade_date, volume
+                    FROM tw_stock_prices
+                    WHERE stock_code = %s
+                    ORDER BY trade_date DESC LIMIT 1
+                """, (stock_code,))
+            else:
+                cursor.execute("""
+                    SELECT symbol, close_price, trade_date, volume
+                    FROM us_stock_prices
+                    WHERE symbol = %s
+                    ORDER BY trade_date DESC LIMIT 1
+                """, (stock_code,))
+            result = cursor.fetchone()
+        
         cursor.close()
         conn.close()
         